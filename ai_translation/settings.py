@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Gzip JSON/text bodies; must run after anything that edits the content
+    'translation_generator_app.middleware.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -108,6 +110,135 @@ STATIC_ROOT = BASE_DIR / "staticfiles"  # Carpeta donde se recopilan archivos es
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Coalescing of identical in-flight jobs (seconds)
+SINGLE_FLIGHT_RESULT_TTL = env.int('SINGLE_FLIGHT_RESULT_TTL', default=120)
+SINGLE_FLIGHT_LOCK_TIMEOUT = env.int('SINGLE_FLIGHT_LOCK_TIMEOUT', default=600)
+
+# Stream audio into the AssemblyAI upload while it is downloaded (requires ffmpeg)
+PIPELINED_AUDIO_UPLOAD = env.bool('PIPELINED_AUDIO_UPLOAD', default=True)
+
+# Transcription polling: one shared poller per process tracks all pending transcripts
+TRANSCRIPTION_SHARED_POLLER = env.bool('TRANSCRIPTION_SHARED_POLLER', default=True)
+TRANSCRIPTION_POLL_MIN_INTERVAL = env.float('TRANSCRIPTION_POLL_MIN_INTERVAL', default=1.0)
+TRANSCRIPTION_POLL_MAX_INTERVAL = env.float('TRANSCRIPTION_POLL_MAX_INTERVAL', default=15.0)
+
+# Audio longer than AUDIO_SEGMENT_THRESHOLD seconds is split at silences
+# into parts of at most AUDIO_SEGMENT_MAX_SECONDS, transcribed in parallel
+AUDIO_SEGMENTATION = env.bool('AUDIO_SEGMENTATION', default=True)
+AUDIO_SEGMENT_THRESHOLD = env.int('AUDIO_SEGMENT_THRESHOLD', default=900)
+AUDIO_SEGMENT_MAX_SECONDS = env.int('AUDIO_SEGMENT_MAX_SECONDS', default=300)
+
+# Optional AssemblyAI completion webhook (public URL of /assemblyai-webhook/)
+ASSEMBLYAI_WEBHOOK_URL = env('ASSEMBLYAI_WEBHOOK_URL', default='')
+ASSEMBLYAI_WEBHOOK_SECRET = env('ASSEMBLYAI_WEBHOOK_SECRET', default='')
+
+# End-to-end budget for one processing job (seconds, 0 disables it); slow LLM
+# calls are hedged with a duplicate request once they exceed the recent p95
+JOB_DEADLINE_SECONDS = env.int('JOB_DEADLINE_SECONDS', default=110)
+LLM_HEDGING = env.bool('LLM_HEDGING', default=True)
+
+# Ask for language detection, verse formatting and translation in one
+# structured-output (JSON schema) completion instead of three calls
+LLM_COMBINED_CALL = env.bool('LLM_COMBINED_CALL', default=True)
+
+# OpenAI calls are paced per API key from the x-ratelimit-* response
+# headers, using this fraction of the reported request/token limits;
+# rate-limited (429) calls are retried with jittered backoff
+OPENAI_RATE_LIMIT_HEADROOM = env.float('OPENAI_RATE_LIMIT_HEADROOM', default=0.9)
+OPENAI_RATE_LIMIT_RETRIES = env.int('OPENAI_RATE_LIMIT_RETRIES', default=6)
+
+# yt-dlp command line used by the async (ASGI) pipeline; default: python -m yt_dlp
+YTDLP_COMMAND = env.list('YTDLP_COMMAND', default=[])
+
+# Admission control: concurrent slots per resource class in each worker
+# process (0 = unlimited) and how long a job waits for one before the
+# request fails with 429 + Retry-After
+ADMISSION_LIMITS = {
+    'job': env.int('ADMISSION_JOB_SLOTS', default=16),
+    'download': env.int('ADMISSION_DOWNLOAD_SLOTS', default=4),
+    'ffmpeg': env.int('ADMISSION_FFMPEG_SLOTS', default=os.cpu_count() or 1),
+    'transcription': env.int('ADMISSION_TRANSCRIPTION_SLOTS', default=8),
+    'llm': env.int('ADMISSION_LLM_SLOTS', default=8),
+}
+ADMISSION_QUEUE_TIMEOUT = env.float('ADMISSION_QUEUE_TIMEOUT', default=10.0)
+
+# Pre-flight cost limits (0 disables each): longer/larger videos are
+# rejected; videos over the VIDEO_* limits are processed as audio only
+ADMISSION_MAX_DURATION = env.int('ADMISSION_MAX_DURATION', default=3600)
+ADMISSION_MAX_DOWNLOAD_BYTES = env.int('ADMISSION_MAX_DOWNLOAD_BYTES', default=2 * 1024 ** 3)
+ADMISSION_VIDEO_MAX_DURATION = env.int('ADMISSION_VIDEO_MAX_DURATION', default=900)
+ADMISSION_VIDEO_MAX_BYTES = env.int('ADMISSION_VIDEO_MAX_BYTES', default=500 * 1024 ** 2)
+
+# Address browsers use to reach this API; Streamlit links its media
+# downloads here instead of reading the files into its own memory
+BACKEND_PUBLIC_URL = env('BACKEND_PUBLIC_URL', default='http://localhost:8000')
+
+# Address Streamlit submits jobs to (e.g. http://backend:8000); the UI is
+# a thin client of this API and never runs the pipeline itself
+BACKEND_API_URL = env('BACKEND_API_URL', default='http://localhost:8000')
+
+# Where published media lives: 'local' (MEDIA_ROOT, shared through a
+# volume) or 's3' (an S3-compatible bucket such as MinIO, shared by every
+# node; MEDIA_ROOT is then each node's working copy). S3 uploads are
+# multipart in S3_MULTIPART_CHUNK_MB parts and downloads redirect to
+# presigned URLs valid for S3_URL_EXPIRES seconds, signed for
+# S3_PUBLIC_ENDPOINT_URL when browsers reach the store at another address
+MEDIA_STORAGE = env('MEDIA_STORAGE', default='local')
+S3_BUCKET = env('S3_BUCKET', default='')
+S3_PREFIX = env('S3_PREFIX', default='media/')
+S3_ENDPOINT_URL = env('S3_ENDPOINT_URL', default='')
+S3_PUBLIC_ENDPOINT_URL = env('S3_PUBLIC_ENDPOINT_URL', default='')
+S3_REGION = env('S3_REGION', default='us-east-1')
+S3_ACCESS_KEY_ID = env('S3_ACCESS_KEY_ID', default='')
+S3_SECRET_ACCESS_KEY = env('S3_SECRET_ACCESS_KEY', default='')
+S3_MULTIPART_CHUNK_MB = env.int('S3_MULTIPART_CHUNK_MB', default=8)
+S3_UPLOAD_CONCURRENCY = env.int('S3_UPLOAD_CONCURRENCY', default=4)
+S3_URL_EXPIRES = env.int('S3_URL_EXPIRES', default=3600)
+
+# MP3 copies of the (natively downloaded) audio are encoded only when
+# requested, by this many concurrent ffmpeg processes per worker
+MP3_TRANSCODE_WORKERS = env.int('MP3_TRANSCODE_WORKERS', default=2)
+MP3_TRANSCODE_TIMEOUT = env.float('MP3_TRANSCODE_TIMEOUT', default=120.0)
+
+# Video metadata (title, duration, formats, caption tracks) cached in the
+# database for all workers; private/removed videos are cached as such for
+# the negative TTL. 0 disables the cache
+METADATA_CACHE_TTL = env.int('METADATA_CACHE_TTL', default=6 * 3600)
+METADATA_CACHE_NEGATIVE_TTL = env.int('METADATA_CACHE_NEGATIVE_TTL', default=600)
+METADATA_CACHE_MAX_ENTRIES = env.int('METADATA_CACHE_MAX_ENTRIES', default=10000)
+
+# Recognize songs processed before from their audio (spectral peak
+# fingerprints indexed in the database) and reuse their transcript and
+# translations. A match needs this share of the hashes aligned in time and
+# at least FINGERPRINT_MIN_MATCHES of them
+AUDIO_FINGERPRINTING = env.bool('AUDIO_FINGERPRINTING', default=True)
+FINGERPRINT_MATCH_THRESHOLD = env.float('FINGERPRINT_MATCH_THRESHOLD', default=0.15)
+FINGERPRINT_MIN_MATCHES = env.int('FINGERPRINT_MIN_MATCHES', default=20)
+
+# Cache warmer (manage.py warm_cache, run from cron): the most requested
+# (video, language) pairs of the last CACHE_WARM_WINDOW_HOURS keep fresh
+# metadata and a stored transcript/translation, within a budget per run.
+# Translations are only warmed with a server-side OpenAI key
+CACHE_WARM_WINDOW_HOURS = env.int('CACHE_WARM_WINDOW_HOURS', default=24)
+CACHE_WARM_TOP = env.int('CACHE_WARM_TOP', default=50)
+CACHE_WARM_MIN_REQUESTS = env.int('CACHE_WARM_MIN_REQUESTS', default=2)
+CACHE_WARM_MAX_DOWNLOADS = env.int('CACHE_WARM_MAX_DOWNLOADS', default=20)
+CACHE_WARM_MAX_TRANSCRIPTION_MINUTES = env.float('CACHE_WARM_MAX_TRANSCRIPTION_MINUTES', default=60.0)
+CACHE_WARM_MAX_TOKENS = env.int('CACHE_WARM_MAX_TOKENS', default=200000)
+CACHE_WARM_OPENAI_API_KEY = env('CACHE_WARM_OPENAI_API_KEY', default='')
+CACHE_WARM_QUALITY = env('CACHE_WARM_QUALITY', default='balanced')
+
+# Opt-in sampling profiler: a job is profiled when its request carries
+# X-Profile-Token equal to PROFILING_TOKEN (admins only), or at random with
+# probability PROFILING_SAMPLE_RATE. CPU samples every PROFILING_INTERVAL
+# seconds are written as collapsed stacks (flamegraph.pl, speedscope) to
+# PROFILING_DIR, which keeps the newest PROFILING_MAX_FILES profiles
+PROFILING_TOKEN = env('PROFILING_TOKEN', default='')
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)
+PROFILING_INTERVAL = env.float('PROFILING_INTERVAL', default=0.01)
+PROFILING_DIR = env('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = env.int('PROFILING_MAX_FILES', default=100)
+
 # Internacionalización
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
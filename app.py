@@ -1,17 +1,17 @@
-import django_setup
+import contextvars
 import os
 import logging
-
-# Initialize Django before importing any Django models
-django_setup.setup()
+import queue
+import threading
+from typing import Callable
 
 import streamlit as st
-from django.conf import settings
-import environ
 
-from translation_generator_app.models import translationPost
-from translation_generator_app.services import YouTubeService, TranscriptionService, TranslationService
+from translation_generator_app.api_client import TranslationAPIClient
+from translation_generator_app.progress import current_progress, track_progress
 from translation_generator_app.exceptions import (
+    DeadlineExceededException,
+    OverloadedException,
     YouTubeDownloadException,
     TranscriptionException,
     TranslationException,
@@ -22,76 +22,145 @@ from translation_generator_app.exceptions import (
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-env = environ.Env()
-environ.Env.read_env()
-AAI_API_KEY = env('AAI_API_KEY')
+# Backend the jobs are submitted to, and its address as seen by the browser
+# (same variables and defaults as the backend's settings; Django is not loaded here)
+BACKEND_API_URL = os.environ.get('BACKEND_API_URL', 'http://localhost:8000')
+BACKEND_PUBLIC_URL = os.environ.get('BACKEND_PUBLIC_URL', 'http://localhost:8000')
 
 
-def process_youtube_video_with_services(yt_link: str, openai_api_key: str, target_language: str = 'es') -> dict:
+def process_youtube_video_on_backend(yt_link: str, openai_api_key: str, target_language: str = 'es',
+                                     quality: str = 'balanced') -> dict:
     """
-    Process YouTube video using the new service architecture.
+    Process YouTube video on the Django backend (``BACKEND_API_URL``).
+    
+    The backend admits the job, runs it with its caches and limits and
+    streams its progress, which is relayed to the reporter of the current
+    job; this process only waits on the pooled HTTP connection.
     
     Args:
         yt_link: YouTube video URL
         openai_api_key: OpenAI API key for translation
         target_language: Target language code for translation (default: 'es')
+        quality: Latency/quality tier for model routing (default: 'balanced')
         
     Returns:
         Dictionary with processing results
         
     Raises:
-        YouTubeDownloadException: If download fails
-        TranscriptionException: If transcription fails
-        TranslationException: If translation fails
+        TranslationGeneratorException: Subclass matching the backend's error status
     """
-    # Initialize services
-    youtube_service = YouTubeService()
-    transcription_service = TranscriptionService(api_key=AAI_API_KEY)
-    translation_service = TranslationService(api_key=openai_api_key)
+    progress = current_progress()
+    response = TranslationAPIClient.shared(BACKEND_API_URL).translate(
+        yt_link,
+        openai_api_key,
+        target_language=target_language,
+        quality=quality,
+        on_event=progress.callback if progress else None
+    )
+    return {
+        "id": response['id'],
+        "title": response['title'],
+        "translation": response['content'],
+        "original_transcription": response['original_transcription'],
+        "video_file": response['video_file'],
+        "audio_file": response['audio_file'],
+        "video_url": response['video_url'],
+        "audio_url": response['audio_url'],
+        "audio_mp3_url": response['audio_mp3_url'],
+        "target_language": response['target_language']
+    }
+
+
+def media_url(path: str) -> str:
+    """
+    Backend URL serving a job's file, for the browser to download directly.
     
-    # Step 1: Get video title
-    logger.info(f"Fetching title for: {yt_link}")
-    title = youtube_service.get_title(yt_link)
-    logger.info(f"Video title: {title}")
+    Args:
+        path: Path returned by the API ('video_url', 'audio_url' or 'audio_mp3_url')
+        
+    Returns:
+        Absolute URL on BACKEND_PUBLIC_URL
+    """
+    return f"{BACKEND_PUBLIC_URL.rstrip('/')}{path}"
+
+
+# Stage labels and their share of the progress bar
+PROGRESS_STAGES = {
+    'metadata': ("Fetching title", 5),
+    'video_download': ("Downloading video", 30),
+    'audio_download': ("Downloading audio", 10),
+    'download': ("Downloading", 0),
+    'audio': ("Streaming audio", 0),
+    'upload': ("Uploading audio", 10),
+    'fingerprint': ("Recognizing song", 0),
+    'transcription': ("Transcribing", 25),
+    'translation': ("Translating", 15),
+    'db_write': ("Saving", 5),
+}
+
+
+def run_with_progress(job: Callable[[], dict]) -> dict:
+    """
+    Run a job in a background thread and show its progress events while it runs.
     
-    # Step 2: Download video and audio
-    logger.info(f"Downloading video and audio for: {title}")
-    video_file, audio_file = youtube_service.download_video_and_audio(yt_link, title)
-    logger.info(f"Downloaded - Video: {video_file}, Audio: {audio_file}")
+    Streamlit elements can only be updated from the script thread, so the
+    job's events (from any of its threads) go through a queue.
     
-    # Step 3: Transcribe audio
-    logger.info(f"Transcribing audio: {audio_file}")
-    original_text = transcription_service.transcribe_audio(audio_file, title)
-    logger.info(f"Transcription complete, length: {len(original_text)} chars")
+    Args:
+        job: Callable processing the video
+        
+    Returns:
+        The job's result
+        
+    Raises:
+        Whatever the job raised
+    """
+    events = queue.Queue()
+    outcome = {}
     
-    # Step 4: Format and translate
-    logger.info(f"Processing translation and formatting (target language: {target_language})")
-    processed_text = translation_service.process_transcription(original_text, target_language=target_language)
-    logger.info("Translation complete")
+    def run():
+        try:
+            with track_progress(events.put):
+                outcome['result'] = job()
+        except Exception as e:
+            outcome['error'] = e
+        finally:
+            events.put(None)
     
-    # Step 5: Save to database
-    translation = translationPost.objects.create(
-        youtube_title=title,
-        youtube_link=yt_link,
-        generated_content=processed_text['translated']
-    )
-    translation.save()
-    logger.info(f"Saved translation to database, ID: {translation.id}")
+    status = st.status("Processing...", expanded=True)
+    bar = st.progress(0)
+    total_weight = sum(weight for _, weight in PROGRESS_STAGES.values())
+    done_weight = 0
     
-    # Prepare transcript file path
-    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '_', '-')).rstrip()
-    transcription_file = settings.MEDIA_ROOT / f"{safe_title}.txt"
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        label, weight = PROGRESS_STAGES.get(event['stage'], (event['stage'], 0))
+        if event['type'] == 'stage':
+            if event['status'] == 'started':
+                status.update(label=f"{label}...")
+            else:
+                done_weight += weight
+                status.write(f"✅ {label} ({event['seconds']:.1f} s)")
+                bar.progress(min(done_weight / total_weight, 1.0))
+        else:
+            detail = f"{event['bytes'] / 1e6:.1f} MB"
+            if event['bytes_per_second']:
+                detail += f" at {event['bytes_per_second'] / 1e6:.1f} MB/s"
+            fraction = done_weight
+            if event['percent'] is not None:
+                detail = f"{event['percent']:.0f}% ({detail})"
+                fraction += weight * event['percent'] / 100
+            bar.progress(min(fraction / total_weight, 1.0), text=f"{label}: {detail}")
     
-    return {
-        "title": title,
-        "translation": processed_text['translated'],
-        "original_transcription": processed_text['original'],
-        "video_file": video_file,
-        "audio_file": audio_file,
-        "transcription_file": str(transcription_file),
-        "target_language": target_language
-    }
+    if 'error' in outcome:
+        status.update(label="Failed", state="error")
+        raise outcome['error']
+    bar.progress(1.0)
+    status.update(label="Done", state="complete", expanded=False)
+    return outcome['result']
 
 
 def main():
@@ -101,7 +170,7 @@ def main():
     with st.sidebar:
         st.header("Configuration")
         openai_api_key = st.text_input("OpenAI API Key", type="password")
-        st.info("This app uses OpenAI models. Please ensure your API key has access to at least one of the following: `gpt-4o`, `gpt-5-nano`, `gpt-4-turbo`, or `gpt-3.5-turbo`.")
+        st.info("This app uses OpenAI models. Please ensure your API key has access to at least one of the following: `gpt-4o`, `gpt-4o-mini`, `gpt-5-nano`, `gpt-4-turbo`, or `gpt-3.5-turbo`.")
         
         st.divider()
         
@@ -134,6 +203,26 @@ def main():
         
         st.divider()
         
+        st.subheader("Speed / Quality")
+        
+        quality_options = {
+            '⚡ Fast': 'fast',
+            '⚖️ Balanced': 'balanced',
+            '🎯 Best': 'best',
+        }
+        
+        selected_quality_name = st.radio(
+            "Select processing tier:",
+            options=list(quality_options.keys()),
+            index=1  # Default to balanced
+        )
+        
+        quality = quality_options[selected_quality_name]
+        
+        st.caption("Fast uses small models for every step. Balanced keeps the strongest model for the translation only. Best uses it for formatting too.")
+        
+        st.divider()
+        
         if st.button("Clear Chat"):
             # Clear the results from the session state
             if 'result' in st.session_state:
@@ -148,44 +237,59 @@ def main():
         elif not youtube_url:
             st.error("Please enter a YouTube URL.")
         else:
-            with st.spinner("Processing..."):
-                try:
-                    # Use the new service-based architecture with selected language
-                    st.session_state.result = process_youtube_video_with_services(
-                        youtube_url, 
-                        openai_api_key, 
-                        target_language=target_language
-                    )
+            def job():
+                # The backend checks the size, admits and runs the job
+                return process_youtube_video_on_backend(
+                    youtube_url,
+                    openai_api_key,
+                    target_language=target_language,
+                    quality=quality
+                )
+            
+            try:
+                st.session_state.result = run_with_progress(job)
+                
+            except DeadlineExceededException as e:
+                st.error(f"❌ Timed Out: {str(e)}")
+                logger.error(f"Deadline exceeded: {str(e)}")
+                if 'result' in st.session_state:
+                    del st.session_state.result
+                    
+            except OverloadedException as e:
+                st.warning(f"⏳ {str(e)} (retry in {e.retry_after} s)")
+                logger.warning(f"Overloaded: {str(e)}")
+                if 'result' in st.session_state:
+                    del st.session_state.result
+                    
+            except YouTubeDownloadException as e:
+                st.error(f"❌ YouTube Download Error: {str(e)}")
+                logger.error(f"YouTube download error: {str(e)}")
+                if 'result' in st.session_state:
+                    del st.session_state.result
+                    
+            except TranscriptionException as e:
+                st.error(f"❌ Transcription Error: {str(e)}")
+                logger.error(f"Transcription error: {str(e)}")
+                if 'result' in st.session_state:
+                    del st.session_state.result
                     
-                except YouTubeDownloadException as e:
-                    st.error(f"❌ YouTube Download Error: {str(e)}")
-                    logger.error(f"YouTube download error: {str(e)}")
-                    if 'result' in st.session_state:
-                        del st.session_state.result
-                        
-                except TranscriptionException as e:
-                    st.error(f"❌ Transcription Error: {str(e)}")
-                    logger.error(f"Transcription error: {str(e)}")
-                    if 'result' in st.session_state:
-                        del st.session_state.result
-                        
-                except TranslationException as e:
-                    st.error(f"❌ Translation Error: {str(e)}")
-                    logger.error(f"Translation error: {str(e)}")
-                    if 'result' in st.session_state:
-                        del st.session_state.result
-                        
-                except TranslationGeneratorException as e:
-                    st.error(f"❌ Error: {str(e)}")
-                    logger.error(f"General error: {str(e)}")
-                    if 'result' in st.session_state:
-                        del st.session_state.result
-                        
-                except Exception as e:
-                    st.error(f"❌ An unexpected error occurred: {str(e)}")
-                    logger.exception(f"Unexpected error: {str(e)}")
-                    if 'result' in st.session_state:
-                        del st.session_state.result
+            except TranslationException as e:
+                st.error(f"❌ Translation Error: {str(e)}")
+                logger.error(f"Translation error: {str(e)}")
+                if 'result' in st.session_state:
+                    del st.session_state.result
+                    
+            except TranslationGeneratorException as e:
+                st.error(f"❌ Error: {str(e)}")
+                logger.error(f"General error: {str(e)}")
+                if 'result' in st.session_state:
+                    del st.session_state.result
+                    
+            except Exception as e:
+                st.error(f"❌ An unexpected error occurred: {str(e)}")
+                logger.exception(f"Unexpected error: {str(e)}")
+                if 'result' in st.session_state:
+                    del st.session_state.result
 
     # If there are results in the session state, display them
     if 'result' in st.session_state:
@@ -222,24 +326,20 @@ def main():
             st.text_area("", result['translation'], height=300)
 
 
+        # Links to the backend, which streams the files from disk; the
+        # Streamlit server never reads the media into memory
         st.subheader("Downloads")
-        video_file_path = result['video_file']
-        with open(video_file_path, "rb") as file:
-            st.download_button(
-                label="Download Video",
-                data=file,
-                file_name=os.path.basename(video_file_path),
-                mime="video/mp4"
-            )
-        
-        audio_file_path = result['audio_file']
-        with open(audio_file_path, "rb") as file:
-            st.download_button(
-                label="Download Audio (MP3)",
-                data=file,
-                file_name=os.path.basename(audio_file_path),
-                mime="audio/mpeg"
-            )
+        if result['video_url']:
+            st.link_button("Download Video", media_url(result['video_url']))
+        else:
+            st.caption("Video too long to download; audio only.")
+        
+        audio_format = os.path.splitext(result['audio_file'])[1].lstrip('.')
+        st.link_button(f"Download Audio ({audio_format.upper()})", media_url(result['audio_url']))
+        
+        # The backend encodes the MP3 on the first click, then reuses it
+        if audio_format != 'mp3':
+            st.link_button("Download Audio (MP3)", media_url(result['audio_mp3_url']))
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,31 +1,46 @@
+import fcntl
 import os
+import shutil
 import time
-import django
-import sys
-
-def setup_django():
-    # Add the project root to the Python path
-    # This assumes the script is in the 'Backend' directory.
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    sys.path.append(project_root)
-    
-    # Set the Django settings module
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_translation.settings')
-    
-    # Initialize Django
-    django.setup()
-
-def cleanup_old_files():
+
+# Runs from cron every 5 minutes, so it only uses the standard library:
+# booting Django here would cost more than the sweep itself. Database
+# rows and remote storage objects are cleaned by
+# ``python manage.py cleanup_expired``, scheduled separately.
+
+# Age limit in seconds (5 minutes = 300 seconds)
+AGE_LIMIT_SECONDS = 300
+
+# Same as settings.MEDIA_ROOT (BASE_DIR / "media"); the script lives in BASE_DIR
+MEDIA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'media')
+
+# Same as JobWorkspace.SCRATCH_DIR and JobWorkspace.LOCK_FILE
+SCRATCH_DIR = '.jobs'
+LOCK_FILE = '.lock'
+
+def workspace_in_use(job_dir):
     """
-    Deletes files from the MEDIA_ROOT directory that are older than a specified age.
+    Whether a running job holds the lock of its workspace. Jobs can run
+    longer than the age limit (JOB_DEADLINE_SECONDS, backfill and warm-up
+    jobs), and a directory's mtime only changes when entries are added.
     """
-    setup_django()
-    from django.conf import settings
+    try:
+        fd = os.open(os.path.join(job_dir, LOCK_FILE), os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
 
-    # Age limit in seconds (5 minutes = 300 seconds)
-    AGE_LIMIT_SECONDS = 300
-    
-    media_dir = settings.MEDIA_ROOT
+def cleanup_old_files(media_dir=MEDIA_ROOT, age_limit=AGE_LIMIT_SECONDS):
+    """
+    Deletes files from the MEDIA_ROOT directory that are older than a specified age,
+    and the scratch directories of jobs whose worker died before removing them.
+    """
     if not os.path.isdir(media_dir):
         print(f"Media directory not found: {media_dir}")
         return
@@ -35,18 +50,29 @@ def cleanup_old_files():
 
     for filename in os.listdir(media_dir):
         file_path = os.path.join(media_dir, filename)
-        
+
         try:
             if os.path.isfile(file_path):
                 file_mod_time = os.path.getmtime(file_path)
-                
-                if (current_time - file_mod_time) > AGE_LIMIT_SECONDS:
+
+                if (current_time - file_mod_time) > age_limit:
                     print(f"Deleting old file: {filename}")
                     os.remove(file_path)
         except Exception as e:
             print(f"Error processing file {file_path}: {e}")
 
+    scratch_root = os.path.join(media_dir, SCRATCH_DIR)
+    if os.path.isdir(scratch_root):
+        for job_id in os.listdir(scratch_root):
+            job_dir = os.path.join(scratch_root, job_id)
+            try:
+                if (current_time - os.path.getmtime(job_dir)) > age_limit and not workspace_in_use(job_dir):
+                    print(f"Deleting abandoned job workspace: {job_id}")
+                    shutil.rmtree(job_dir)
+            except Exception as e:
+                print(f"Error processing job workspace {job_dir}: {e}")
+
     print("Cleanup finished.")
 
 if __name__ == "__main__":
-    cleanup_old_files() 
\ No newline at end of file
+    cleanup_old_files()
\ No newline at end of file
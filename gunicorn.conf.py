@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration for the Django API.
+
+The application is loaded once in the master and the workers are forked
+from it, so Django, the app and the SDKs are imported once and their
+memory is shared copy-on-write instead of every worker importing them on
+boot (``python manage.py startup_report`` measures that cost).
+"""
+import gc
+import importlib
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+
+if worker_class == 'gevent':
+    # Patch before the application is preloaded; the gevent worker would
+    # only patch after the fork, when ssl and threading are already in use
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'debug')
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+# Imported lazily by the services; a preloading master imports them up front
+PRELOADED_MODULES = ('yt_dlp', 'assemblyai', 'openai', 'httpx')
+if os.environ.get('MEDIA_STORAGE') == 's3':
+    PRELOADED_MODULES += ('boto3',)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    for name in PRELOADED_MODULES:
+        importlib.import_module(name)
+    # Objects loaded so far are never collected; the workers' collections
+    # then leave the pages shared with the master untouched
+    gc.freeze()
+    server.log.info("Preloaded %s and froze %d objects", ', '.join(PRELOADED_MODULES), gc.get_freeze_count())
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Connections opened while loading must not be shared with the workers
+        from django.db import connections
+        connections.close_all()
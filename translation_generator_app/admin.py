@@ -1,5 +1,54 @@
 from django.contrib import admin
-from .models import translationPost
+from django.utils.html import format_html, format_html_join
+from .models import translationPost, AudioRecording, VideoMetadata
 
-# Register your models here.
-admin.site.register(translationPost)
+
+@admin.register(translationPost)
+class TranslationPostAdmin(admin.ModelAdmin):
+    """Translations, with the stage waterfall of the job that produced each one."""
+    list_display = ('youtube_title', 'target_language', 'created_at', 'job_seconds')
+    list_filter = ('target_language',)
+    search_fields = ('youtube_title', 'youtube_link')
+    exclude = ('stage_timeline',)
+    readonly_fields = ('created_at', 'stage_waterfall')
+
+    @admin.display(description='Job (s)')
+    def job_seconds(self, obj):
+        return (obj.stage_timeline or {}).get('seconds')
+
+    @admin.display(description='Stage waterfall')
+    def stage_waterfall(self, obj):
+        """Render each recorded stage as a bar positioned on the job's time axis."""
+        timeline = obj.stage_timeline or {}
+        stages = timeline.get('stages') or []
+        if not stages:
+            return 'Not recorded'
+
+        total = timeline.get('seconds') or max(stage['end'] for stage in stages) or 1.0
+        rows = format_html_join('', (
+            '<tr><td style="padding-left:{}em">{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td>'
+            '<td style="width:50%"><div style="margin-left:{}%;width:{}%;min-width:1px;'
+            'height:0.8em;background:#79aec8"></div></td></tr>'
+        ), (
+            # format_html escapes its arguments into strings, so numbers are formatted here
+            (
+                1.5 if stage['parent'] else 0,
+                stage['name'],
+                f"{stage['start']:.2f}",
+                f"{stage['end'] - stage['start']:.2f}",
+                f"{stage['bytes']:,}" if stage['bytes'] else '',
+                f"{stage['tokens']:,}" if stage['tokens'] else '',
+                f"{100 * stage['start'] / total:.1f}",
+                f"{100 * (stage['end'] - stage['start']) / total:.1f}",
+            )
+            for stage in stages
+        ))
+        return format_html(
+            '<table><thead><tr><th>Stage</th><th>Start (s)</th><th>Duration (s)</th><th>Bytes</th>'
+            '<th>Tokens</th><th>Started {} &middot; {} s</th></tr></thead><tbody>{}</tbody></table>',
+            timeline.get('started_at', ''), f"{total:.2f}", rows
+        )
+
+
+admin.site.register(AudioRecording)
+admin.site.register(VideoMetadata)
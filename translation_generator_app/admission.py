@@ -0,0 +1,217 @@
+"""
+Admission - Concurrency limits per resource class and pre-flight job cost checks.
+"""
+import asyncio
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from django.conf import settings
+
+from .deadline import current_deadline
+from .exceptions import JobTooLargeException, OverloadedException
+
+
+class ResourceLimiter:
+    """
+    Bounded number of concurrent holders of one resource class in this process.
+
+    Each class ('job', 'download', 'ffmpeg', 'transcription', 'llm') has
+    its own limit in ``ADMISSION_LIMITS``; 0 means unlimited. A job that
+    cannot get a slot within ``ADMISSION_QUEUE_TIMEOUT`` seconds (or before
+    its deadline) fails with OverloadedException, whose ``retry_after`` is
+    the recent average time a slot is held. Under gevent the semaphore is
+    cooperative, so waiting does not block the worker.
+    """
+
+    # Weight of the latest hold time in the running average
+    _SMOOTHING = 0.2
+    # Poll interval of async waiters (the semaphore is shared with threads)
+    _ASYNC_POLL_INTERVAL = 0.05
+
+    def __init__(self, name: str, limit: int):
+        """
+        Initialize the limiter.
+
+        Args:
+            name: Resource class name
+            limit: Maximum concurrent holders (0 for unlimited)
+        """
+        self.name = name
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._average_hold = 1.0
+        self._lock = threading.Lock()
+
+    def _wait_timeout(self, timeout: Optional[float]) -> float:
+        if timeout is None:
+            timeout = getattr(settings, 'ADMISSION_QUEUE_TIMEOUT', 10)
+        deadline = current_deadline()
+        return min(timeout, deadline.remaining()) if deadline else timeout
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from the average slot hold time."""
+        return min(300, max(1, math.ceil(self._average_hold)))
+
+    def rejection(self) -> OverloadedException:
+        """Build the error raised when no slot is available."""
+        return OverloadedException(
+            f"Server busy: all {self.limit} {self.name} slots are in use. Try again later.",
+            retry_after=self.retry_after()
+        )
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Take a slot, waiting up to ``timeout`` seconds (0 to fail immediately).
+
+        Args:
+            timeout: Maximum wait (default: ``ADMISSION_QUEUE_TIMEOUT``, capped by the job deadline)
+
+        Returns:
+            Acquisition time, to pass to ``release``
+
+        Raises:
+            OverloadedException: If no slot frees up in time
+        """
+        if self._semaphore is not None:
+            wait = self._wait_timeout(timeout)
+            acquired = self._semaphore.acquire(timeout=wait) if wait > 0 else self._semaphore.acquire(blocking=False)
+            if not acquired:
+                raise self.rejection()
+        return time.monotonic()
+
+    async def aacquire(self, timeout: Optional[float] = None) -> float:
+        """Coroutine version of ``acquire``; polls so the event loop is never blocked."""
+        if self._semaphore is not None:
+            give_up = time.monotonic() + self._wait_timeout(timeout)
+            while not self._semaphore.acquire(blocking=False):
+                if time.monotonic() >= give_up:
+                    raise self.rejection()
+                await asyncio.sleep(self._ASYNC_POLL_INTERVAL)
+        return time.monotonic()
+
+    def release(self, acquired_at: float):
+        """
+        Return a slot taken with ``acquire``.
+
+        Args:
+            acquired_at: Value returned by ``acquire``
+        """
+        if self._semaphore is None:
+            return
+        held = time.monotonic() - acquired_at
+        with self._lock:
+            self._average_hold += self._SMOOTHING * (held - self._average_hold)
+        self._semaphore.release()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold a slot for the duration of the block."""
+        acquired_at = self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+    @asynccontextmanager
+    async def aslot(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the async block."""
+        acquired_at = await self.aacquire(timeout)
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+
+_limiters: Dict[str, ResourceLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter(name: str) -> ResourceLimiter:
+    """
+    Return the process-wide limiter of a resource class.
+
+    Args:
+        name: Resource class ('job', 'download', 'ffmpeg', 'transcription' or 'llm')
+
+    Returns:
+        The ResourceLimiter, created from ``ADMISSION_LIMITS`` on first use
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            limits = getattr(settings, 'ADMISSION_LIMITS', {})
+            _limiters[name] = ResourceLimiter(name, int(limits.get(name, 0)))
+        return _limiters[name]
+
+
+def reset_limiters():
+    """
+    Forget the process's limiters so the next ``limiter()`` call rebuilds them from ``ADMISSION_LIMITS``.
+
+    For commands that override the limits in settings; slots held at that
+    moment are released into the discarded limiters.
+    """
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def estimated_download_bytes(formats: list) -> Optional[int]:
+    """
+    Estimate the bytes downloaded for a video from its format list.
+
+    Args:
+        formats: Format summaries (``VideoMetadata.formats``)
+
+    Returns:
+        Largest video format plus largest audio format, or None if no sizes are known
+    """
+    video = [f.get('filesize') or 0 for f in formats if f.get('vcodec') not in (None, 'none')]
+    audio = [f.get('filesize') or 0 for f in formats if f.get('vcodec') in (None, 'none')]
+    total = max(video, default=0) + max(audio, default=0)
+    return total or None
+
+
+def _minutes_and_seconds(seconds: int) -> str:
+    """Format a duration as m:ss (e.g. 60:01), so a video just over the limit does not read as equal to it."""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def plan_job(metadata) -> bool:
+    """
+    Check a video's cost before any work and decide whether to download its video track.
+
+    Videos over ``ADMISSION_MAX_DURATION`` seconds or an estimated
+    ``ADMISSION_MAX_DOWNLOAD_BYTES`` are rejected. Videos over
+    ``ADMISSION_VIDEO_MAX_DURATION`` or ``ADMISSION_VIDEO_MAX_BYTES`` are
+    downgraded to audio only (no mp4). A limit of 0 disables that check.
+
+    Args:
+        metadata: VideoMetadata of the requested video
+
+    Returns:
+        True if the video track should be downloaded, False for audio only
+
+    Raises:
+        JobTooLargeException: If the video exceeds the hard limits
+    """
+    duration = metadata.duration or 0
+    size = estimated_download_bytes(metadata.formats or []) or 0
+
+    max_duration = getattr(settings, 'ADMISSION_MAX_DURATION', 0)
+    if max_duration and duration > max_duration:
+        raise JobTooLargeException(
+            f"Video is {_minutes_and_seconds(duration)} long; the limit is {_minutes_and_seconds(max_duration)}."
+        )
+    max_bytes = getattr(settings, 'ADMISSION_MAX_DOWNLOAD_BYTES', 0)
+    if max_bytes and size > max_bytes:
+        raise JobTooLargeException(
+            f"Video download would be about {-(-size // 2**20)} MB; the limit is {max_bytes // 2**20} MB."
+        )
+
+    video_max_duration = getattr(settings, 'ADMISSION_VIDEO_MAX_DURATION', 0)
+    video_max_bytes = getattr(settings, 'ADMISSION_VIDEO_MAX_BYTES', 0)
+    return not ((video_max_duration and duration > video_max_duration) or
+                (video_max_bytes and size > video_max_bytes))
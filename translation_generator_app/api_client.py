@@ -0,0 +1,208 @@
+"""
+API Client - Submits translation jobs to the Django backend over HTTP.
+"""
+import json
+import logging
+import threading
+from typing import Callable, Dict, Iterator, Optional
+
+from django.conf import settings
+
+from .exceptions import (
+    DeadlineExceededException,
+    InvalidDataException,
+    JobTooLargeException,
+    OverloadedException,
+    TranscriptionException,
+    TranslationException,
+    TranslationGeneratorException,
+    VideoUnavailableException,
+    YouTubeDownloadException,
+)
+from .lazy import LazyModule
+
+httpx = LazyModule('httpx')
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationAPIClient:
+    """
+    Client of ``POST /generate-translation/`` for frontends that do not run the pipeline.
+
+    The job is submitted with ``Accept: text/event-stream``: the backend's
+    ``stage`` and ``progress`` events are passed to ``on_event`` as they
+    arrive (same dictionaries as ``ProgressReporter``) and the final
+    ``result`` or ``error`` event ends the call. Admission, the stage
+    caches and the deadline all apply on the backend, so the caller only
+    waits on a socket.
+
+    One ``httpx.Client`` (a pool of keep-alive connections) is shared by
+    every caller with the same ``base_url``; use ``TranslationAPIClient.shared``.
+
+    Usage::
+
+        client = TranslationAPIClient.shared('http://backend:8000')
+        result = client.translate(link, openai_api_key, target_language='fr', on_event=print)
+    """
+
+    # Connections kept open to the backend per process
+    MAX_CONNECTIONS = 20
+    # Seconds to connect; reads wait longer than the backend's keep-alive interval
+    CONNECT_TIMEOUT = 5.0
+    READ_TIMEOUT = 60.0
+
+    # Exception raised for each ``code`` of the backend's error responses
+    ERROR_CODES = {
+        'job_too_large': JobTooLargeException,
+        'invalid_data': InvalidDataException,
+        'video_unavailable': VideoUnavailableException,
+        'deadline_exceeded': DeadlineExceededException,
+        'download_failed': YouTubeDownloadException,
+        'transcription_failed': TranscriptionException,
+        'translation_failed': TranslationException,
+    }
+
+    _clients: Dict[str, 'TranslationAPIClient'] = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, base_url: str, transport=None):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Backend address (e.g. 'http://backend:8000')
+            transport: httpx transport replacing the network (e.g. ``httpx.WSGITransport``
+                to call a backend in this process)
+        """
+        self.base_url = base_url.rstrip('/')
+        self._http = httpx.Client(
+            base_url=self.base_url,
+            transport=transport,
+            timeout=httpx.Timeout(self.READ_TIMEOUT, connect=self.CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=self.MAX_CONNECTIONS,
+                                max_keepalive_connections=self.MAX_CONNECTIONS),
+        )
+
+    @classmethod
+    def shared(cls, base_url: Optional[str] = None) -> 'TranslationAPIClient':
+        """
+        Return the process-wide client of a backend, creating it on first use.
+
+        Args:
+            base_url: Backend address (default: settings.BACKEND_API_URL)
+
+        Returns:
+            TranslationAPIClient whose connection pool is reused across calls and threads
+        """
+        base_url = (base_url or settings.BACKEND_API_URL).rstrip('/')
+        with cls._clients_lock:
+            client = cls._clients.get(base_url)
+            if client is None:
+                client = cls._clients[base_url] = cls(base_url)
+            return client
+
+    def translate(self, yt_link: str, openai_api_key: str, target_language: str = 'es',
+                  quality: str = 'balanced', on_event: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Submit a job and wait for its result, reporting progress events.
+
+        Args:
+            yt_link: YouTube video URL
+            openai_api_key: OpenAI API key for translation
+            target_language: Target language code for translation (default: 'es')
+            quality: Latency/quality tier for model routing (default: 'balanced')
+            on_event: Receives each ``stage`` and ``progress`` event
+
+        Returns:
+            The backend's response body (``id``, ``content``, ``title``,
+            ``original_transcription``, ``video_file``, ``audio_file``...)
+
+        Raises:
+            InvalidDataException: If the backend rejects the request (400)
+            JobTooLargeException: If the video is over the size limits (413)
+            OverloadedException: If the backend is at its job limit (429)
+            DeadlineExceededException: If the job deadline passes (504)
+            YouTubeDownloadException: If the download fails
+            TranscriptionException: If the transcription fails
+            TranslationException: If the translation fails
+            TranslationGeneratorException: If the job fails otherwise or the backend cannot be reached
+        """
+        body = {
+            'link': yt_link,
+            'openai_api_key': openai_api_key,
+            'target_language': target_language,
+            'quality': quality,
+        }
+        try:
+            with self._http.stream('POST', '/generate-translation/', json=body,
+                                   headers={'Accept': 'text/event-stream'}) as response:
+                if not response.headers.get('content-type', '').startswith('text/event-stream'):
+                    # Rejected before the job started (validation, size, admission)
+                    response.read()
+                    raise self._error(response.status_code, self._json(response.text),
+                                      response.headers.get('Retry-After'))
+                for event in self._events(response.iter_lines()):
+                    if event['type'] == 'result':
+                        return event
+                    if event['type'] == 'error':
+                        raise self._error(event.get('status', 500), event)
+                    if on_event:
+                        on_event(event)
+        except httpx.HTTPError as e:
+            raise TranslationGeneratorException(f"Backend request failed: {str(e) or type(e).__name__}")
+        raise TranslationGeneratorException("The backend closed the event stream before the result")
+
+    @staticmethod
+    def _events(lines: Iterator[str]) -> Iterator[dict]:
+        """Parse Server-Sent Events lines into the event dictionaries (comments are keep-alives)."""
+        data = []
+        for line in lines:
+            if line.startswith('data:'):
+                data.append(line[5:].lstrip())
+            elif not line and data:
+                yield json.loads('\n'.join(data))
+                data = []
+
+    @staticmethod
+    def _json(text: str) -> dict:
+        """Decode an error body, tolerating non-JSON responses from proxies."""
+        try:
+            body = json.loads(text)
+        except ValueError:
+            return {'error': text.strip()[:200]}
+        return body if isinstance(body, dict) else {'error': str(body)}
+
+    @classmethod
+    def _error(cls, status: int, body: dict, retry_after: Optional[str] = None) -> TranslationGeneratorException:
+        """
+        Map a backend error to the exception the pipeline would have raised.
+
+        The error ``code`` decides the exception; responses without one
+        (older backends, proxies) are mapped by status.
+
+        Args:
+            status: HTTP status of the error
+            body: Error body (``error``, ``code`` and, for 429, ``retry_after``)
+            retry_after: ``Retry-After`` header, if any
+
+        Returns:
+            Exception to raise
+        """
+        message = body.get('error') or f"Backend error {status}"
+        error_class = cls.ERROR_CODES.get(body.get('code'))
+        if error_class is not None:
+            if status >= 500:
+                logger.error(f"Backend job failed ({status}): {message}")
+            return error_class(message)
+        if status == 413:
+            return JobTooLargeException(message)
+        if status == 400:
+            return InvalidDataException(message)
+        if status == 429:
+            seconds = body.get('retry_after') or retry_after or 1
+            return OverloadedException(message, retry_after=int(seconds))
+        if status == 504:
+            return DeadlineExceededException(message)
+        logger.error(f"Backend job failed ({status}): {message}")
+        return TranslationGeneratorException(message)
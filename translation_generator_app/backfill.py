@@ -0,0 +1,355 @@
+"""
+Backfill - Bulk translation of a catalog of links, resumable from a checkpoint manifest.
+"""
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .admission import plan_job
+from .benchmarks import summarize
+from .deadline import job_deadline
+from .exceptions import InvalidDataException
+from .instrumentation import collect_stage_timings
+from .models import translationPost
+from .serializers import TranslationRequestValidator
+from .services import YouTubeService, process_video
+
+logger = logging.getLogger(__name__)
+
+END_TO_END = 'end_to_end'
+
+
+@dataclass
+class BackfillItem:
+    """One catalog entry: a link and the translation wanted for it."""
+    line: int
+    link: str
+    target_language: str = 'es'
+    quality: str = 'balanced'
+
+    @property
+    def key(self) -> str:
+        """Identity of the item in the checkpoint manifest."""
+        return f"{self.link}|{self.target_language}|{self.quality}"
+
+
+def read_catalog(path: str, target_language: str = 'es', quality: str = 'balanced') -> List[BackfillItem]:
+    """
+    Read the links to translate from a CSV or JSON Lines file.
+
+    CSV files need a header with a ``link`` column; ``target_language`` and
+    ``quality`` columns are optional. ``.jsonl`` files hold one object per
+    line with the same keys. Missing or empty values take the defaults.
+
+    Args:
+        path: Catalog file
+        target_language: Default target language
+        quality: Default quality tier
+
+    Returns:
+        Catalog items in file order
+
+    Raises:
+        InvalidDataException: If the file cannot be parsed
+    """
+    def item(line: int, row: dict) -> BackfillItem:
+        return BackfillItem(
+            line=line,
+            link=str(row.get('link') or '').strip(),
+            target_language=str(row.get('target_language') or target_language).strip(),
+            quality=str(row.get('quality') or quality).strip(),
+        )
+
+    items = []
+    with open(path, newline='', encoding='utf-8') as catalog:
+        if Path(path).suffix.lower() in ('.jsonl', '.ndjson'):
+            for number, line in enumerate(catalog, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    raise InvalidDataException(f"Line {number} of {path} is not valid JSON")
+                if not isinstance(row, dict):
+                    raise InvalidDataException(f"Line {number} of {path} is not a JSON object")
+                items.append(item(number, row))
+        else:
+            reader = csv.DictReader(catalog)
+            if 'link' not in (reader.fieldnames or []):
+                raise InvalidDataException(f"{path} has no 'link' column")
+            # Line numbers count the header
+            items = [item(number, row) for number, row in enumerate(reader, start=2)]
+    return items
+
+
+def _ends_with_newline(path: Path) -> bool:
+    """Whether a file is empty or its last line is complete."""
+    with open(path, 'rb') as manifest:
+        if manifest.seek(0, os.SEEK_END) == 0:
+            return True
+        manifest.seek(-1, os.SEEK_END)
+        return manifest.read(1) == b'\n'
+
+
+class CheckpointManifest:
+    """
+    Append-only JSON Lines record of the catalog items already processed.
+
+    Each line is ``{"key", "status", "post_id", "error", "at"}`` with status
+    ``done`` or ``failed``; a later line for a key replaces the earlier
+    ones. Lines are flushed and fsynced as they are written, and a torn
+    last line left by a crash is ignored on load, so a rerun resumes after
+    the last recorded item.
+    """
+
+    def __init__(self, path: str):
+        """
+        Load the manifest, creating the file if needed.
+
+        Args:
+            path: Manifest file
+        """
+        self.path = Path(path)
+        self.entries: Dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as manifest:
+                for line in manifest:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.entries[entry['key']] = entry
+            torn = not _ends_with_newline(self.path)
+        else:
+            torn = False
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if torn:
+            # End the torn line so the next entry starts on its own
+            self._file.write('\n')
+        self._lock = threading.Lock()
+
+    def status(self, key: str) -> Optional[str]:
+        """Recorded status of an item ('done', 'failed') or None if it was never processed."""
+        entry = self.entries.get(key)
+        return entry['status'] if entry else None
+
+    def record(self, entries: List[dict]):
+        """
+        Append item outcomes and force them to disk.
+
+        Args:
+            entries: Dictionaries with ``key`` and ``status`` (and optionally ``post_id``, ``error``)
+        """
+        if not entries:
+            return
+        at = timezone.now().isoformat()
+        with self._lock:
+            for entry in entries:
+                entry = {'post_id': None, 'error': '', **entry, 'at': at}
+                self.entries[entry['key']] = entry
+                self._file.write(json.dumps(entry) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        """Close the manifest file."""
+        self._file.close()
+
+    def __enter__(self) -> 'CheckpointManifest':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BackfillRunner:
+    """
+    Runs the translation pipeline over catalog items on a thread pool.
+
+    Every item goes through the same admission checks and pipeline as a
+    ``POST /generate-translation/`` (audio only unless ``include_video``),
+    so the per-stage ``ADMISSION_LIMITS`` cap how many items download,
+    transcode, transcribe or call the LLM at once, and repeated videos
+    reuse the stage and fingerprint caches. Translations are written to
+    ``translationPost`` in batches of ``batch_size`` rows per transaction
+    (or every ``FLUSH_INTERVAL`` seconds), and each batch is recorded in
+    the manifest only after it commits: after a crash, at most the
+    uncommitted batch is processed again.
+    """
+
+    # Longest time finished items wait for their batch to be written
+    FLUSH_INTERVAL = 30.0
+
+    def __init__(self, openai_api_key: str, manifest: CheckpointManifest, workers: int = 4,
+                 batch_size: int = 50, include_video: bool = False, retry_failed: bool = False,
+                 on_batch: Optional[Callable[[dict], None]] = None):
+        """
+        Initialize the runner.
+
+        Args:
+            openai_api_key: OpenAI API key used for every item
+            manifest: Checkpoint manifest to resume from and record into
+            workers: Items processed concurrently
+            batch_size: Translations written per transaction
+            include_video: Whether to also download each video track
+            retry_failed: Whether to process again items recorded as failed
+            on_batch: Called with the running counts after each batch is written
+        """
+        self.openai_api_key = openai_api_key
+        self.manifest = manifest
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.include_video = include_video
+        self.retry_failed = retry_failed
+        self.on_batch = on_batch
+        self._batch: List[Tuple[BackfillItem, dict]] = []
+        self._last_flush = time.monotonic()
+        self._samples: Dict[str, List[float]] = {}
+        self._counts = {'done': 0, 'failed': 0}
+
+    def pending(self, items: List[BackfillItem]) -> List[BackfillItem]:
+        """
+        Items not yet processed, without duplicates.
+
+        Args:
+            items: Catalog items
+
+        Returns:
+            Items with no ``done`` entry in the manifest (nor ``failed`` unless ``retry_failed``)
+        """
+        skip = {'done'} if self.retry_failed else {'done', 'failed'}
+        seen = set()
+        pending = []
+        for item in items:
+            if item.key in seen or self.manifest.status(item.key) in skip:
+                continue
+            seen.add(item.key)
+            pending.append(item)
+        return pending
+
+    def run(self, items: List[BackfillItem]) -> dict:
+        """
+        Process every pending item and write the translations.
+
+        Args:
+            items: Catalog items
+
+        Returns:
+            Dictionary with item counts, wall time, throughput (items/s) and per-stage summaries
+        """
+        pending = self.pending(items)
+        queued = iter(pending)
+        in_flight: Dict[Future, BackfillItem] = {}
+        start = time.perf_counter()
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill')
+        try:
+            while True:
+                # A short queue keeps the catalog from sitting in memory as futures
+                while len(in_flight) < self.workers * 2:
+                    item = next(queued, None)
+                    if item is None:
+                        break
+                    in_flight[executor.submit(self._process, item)] = item
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, timeout=self.FLUSH_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self._collect(in_flight.pop(future), future)
+                if len(self._batch) >= self.batch_size or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+                    self._flush()
+        finally:
+            # Keep whatever finished before an interruption
+            self._flush()
+            executor.shutdown(wait=False, cancel_futures=True)
+        wall_time = time.perf_counter() - start
+
+        return {
+            'total': len(items),
+            'skipped': len(items) - len(pending),
+            'done': self._counts['done'],
+            'failed': self._counts['failed'],
+            'wall_time': wall_time,
+            'throughput': self._counts['done'] / wall_time if wall_time else 0.0,
+            'stages': {name: summarize(values) for name, values in sorted(self._samples.items())},
+        }
+
+    def _process(self, item: BackfillItem) -> Tuple[dict, Dict[str, float]]:
+        """Run the pipeline for one item in a worker thread, without saving the translation."""
+        close_old_connections()
+        try:
+            validated_data = TranslationRequestValidator.validate({
+                'link': item.link,
+                'openai_api_key': self.openai_api_key,
+                'target_language': item.target_language,
+                'quality': item.quality,
+            })
+            with collect_stage_timings() as timings:
+                started = time.perf_counter()
+                # Same pre-flight checks as the API; oversized videos fail here
+                include_video = plan_job(YouTubeService.get_metadata(validated_data['link'])) and self.include_video
+                with job_deadline(settings.JOB_DEADLINE_SECONDS):
+                    result = process_video(
+                        yt_link=validated_data['link'],
+                        openai_api_key=validated_data['openai_api_key'],
+                        target_language=validated_data.get('target_language', 'es'),
+                        quality=validated_data.get('quality', 'balanced'),
+                        include_video=include_video,
+                        save=False
+                    )
+                timings[END_TO_END] = time.perf_counter() - started
+            return result, timings
+        finally:
+            close_old_connections()
+
+    def _collect(self, item: BackfillItem, future: Future):
+        """Queue a finished item for the next batch, or record its failure."""
+        try:
+            result, timings = future.result()
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.warning(f"Backfill item on line {item.line} failed: {error}")
+            self._counts['failed'] += 1
+            self.manifest.record([{'key': item.key, 'status': 'failed', 'error': error}])
+            return
+        for name, seconds in timings.items():
+            self._samples.setdefault(name, []).append(seconds)
+        self._batch.append((item, result))
+
+    def _flush(self):
+        """Write the batched translations in one transaction, then checkpoint them."""
+        self._last_flush = time.monotonic()
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        with transaction.atomic():
+            posts = translationPost.objects.bulk_create([
+                translationPost(
+                    youtube_title=result['title'],
+                    youtube_link=item.link,
+                    generated_content=result['translation'],
+                    original_transcription=result['original_transcription'],
+                    target_language=item.target_language,
+                    stage_timeline=result['stage_timeline']
+                )
+                for item, result in batch
+            ])
+        self.manifest.record([
+            {'key': item.key, 'status': 'done', 'post_id': post.pk}
+            for (item, _), post in zip(batch, posts)
+        ])
+        self._counts['done'] += len(batch)
+        logger.info(f"Backfill saved {len(batch)} translations")
+        if self.on_batch:
+            self.on_batch(dict(self._counts))
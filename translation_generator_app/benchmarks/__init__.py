@@ -0,0 +1,11 @@
+"""
+Reproducible pipeline benchmarks running against the offline stand-ins.
+"""
+from .runner import PipelineBenchmark, compare_to_baseline, percentile, summarize
+
+__all__ = [
+    'PipelineBenchmark',
+    'compare_to_baseline',
+    'percentile',
+    'summarize',
+]
@@ -0,0 +1,279 @@
+"""
+Pipeline Benchmark - Drives the processing pipeline at varying concurrency.
+"""
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.test import AsyncRequestFactory, RequestFactory
+
+from ..instrumentation import collect_stage_timings
+
+logger = logging.getLogger(__name__)
+
+
+TARGETS = ('view', 'streamlit', 'async')
+
+PERCENTILES = (50, 95, 99)
+
+END_TO_END = 'end_to_end'
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Compute a percentile with linear interpolation.
+
+    Args:
+        values: Sample values
+        pct: Percentile between 0 and 100
+
+    Returns:
+        Interpolated percentile (0.0 for an empty sample)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Summarize a sample of durations (seconds) into count, mean, percentiles and max."""
+    summary = {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else 0.0,
+        'max': max(values) if values else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = percentile(values, pct)
+    return summary
+
+
+class PipelineBenchmark:
+    """
+    Runs the pipeline repeatedly and reports per-stage and end-to-end percentiles.
+
+    Targets:
+        view: ``TranslationGeneratorView`` through a Django test request
+        streamlit: ``TranslationAPIClient``, as ``app.py`` submits jobs, against the
+            event-stream view served in this process through httpx's WSGI transport
+        async: ``AsyncTranslationGeneratorView``; each level runs its jobs as
+            tasks on one event loop instead of a thread pool
+    """
+
+    def __init__(
+        self,
+        target: str = 'view',
+        jobs: int = 20,
+        target_language: str = 'es',
+        openai_api_key: str = 'sk-benchmark-0000000000000000'
+    ):
+        """
+        Initialize the benchmark.
+
+        Args:
+            target: Entry point to drive ('view', 'streamlit' or 'async')
+            jobs: Number of jobs per concurrency level
+            target_language: Target language for every job
+            openai_api_key: API key sent to the (fake) OpenAI server
+        """
+        if target not in TARGETS:
+            raise ValueError(f"Unknown target: {target}. Choose one of: {', '.join(TARGETS)}")
+        self.target = target
+        self.jobs = jobs
+        self.target_language = target_language
+        self.openai_api_key = openai_api_key
+        self._request_factory = RequestFactory()
+        self._async_request_factory = AsyncRequestFactory()
+        self._api_client = self._in_process_api_client() if target == 'streamlit' else None
+
+    def _job_function(self) -> Callable[[str], None]:
+        if self.target == 'view':
+            return self._run_view_job
+        return self._run_streamlit_job
+
+    def _run_view_job(self, link: str):
+        from ..views import TranslationGeneratorView
+
+        request = self._request_factory.post(
+            '/generate-translation/',
+            data=json.dumps({
+                'link': link,
+                'openai_api_key': self.openai_api_key,
+                'target_language': self.target_language,
+            }),
+            content_type='application/json'
+        )
+        response = TranslationGeneratorView.as_view()(request)
+        if response.status_code != 200:
+            raise RuntimeError(json.loads(response.content).get('error', response.status_code))
+
+    @staticmethod
+    def _in_process_api_client():
+        """API client whose requests are handled by this process's WSGI application."""
+        import httpx
+        from django.core.wsgi import get_wsgi_application
+
+        from ..api_client import TranslationAPIClient
+
+        return TranslationAPIClient('http://localhost', transport=httpx.WSGITransport(app=get_wsgi_application()))
+
+    def _run_streamlit_job(self, link: str):
+        self._api_client.translate(link, self.openai_api_key, target_language=self.target_language)
+
+    async def _run_async_job(self, link: str):
+        from ..views import AsyncTranslationGeneratorView
+
+        request = self._async_request_factory.post(
+            '/generate-translation-async/',
+            data=json.dumps({
+                'link': link,
+                'openai_api_key': self.openai_api_key,
+                'target_language': self.target_language,
+            }),
+            content_type='application/json'
+        )
+        response = await AsyncTranslationGeneratorView.as_view()(request)
+        if response.status_code != 200:
+            raise RuntimeError(json.loads(response.content).get('error', response.status_code))
+
+    async def _timed_async_job(self, link: str, slots: asyncio.Semaphore) -> Optional[Dict[str, float]]:
+        async with slots:
+            try:
+                with collect_stage_timings() as timings:
+                    start = time.perf_counter()
+                    await self._run_async_job(link)
+                    timings[END_TO_END] = time.perf_counter() - start
+                return timings
+            except Exception:
+                logger.exception(f"Benchmark job failed: {link}")
+                return None
+
+    async def _run_async_level(self, links: List[str], concurrency: int) -> List[Optional[Dict[str, float]]]:
+        slots = asyncio.Semaphore(concurrency)
+        try:
+            return await asyncio.gather(*(self._timed_async_job(link, slots) for link in links))
+        finally:
+            await sync_to_async(close_old_connections)()
+
+    def _timed_job(self, link: str) -> Optional[Dict[str, float]]:
+        run = self._job_function()
+        close_old_connections()
+        try:
+            with collect_stage_timings() as timings:
+                start = time.perf_counter()
+                run(link)
+                timings[END_TO_END] = time.perf_counter() - start
+            return timings
+        except Exception:
+            logger.exception(f"Benchmark job failed: {link}")
+            return None
+        finally:
+            close_old_connections()
+
+    def run_level(self, concurrency: int, run_id: str = '') -> dict:
+        """
+        Run ``jobs`` jobs with the given number of concurrent workers.
+
+        Args:
+            concurrency: Number of concurrent workers
+            run_id: Prefix making video IDs unique across levels
+
+        Returns:
+            Dictionary with throughput, error count and per-stage summaries
+        """
+        links = [
+            f"https://www.youtube.com/watch?v=bench{run_id}c{concurrency}j{i:04d}"
+            for i in range(self.jobs)
+        ]
+
+        start = time.perf_counter()
+        if self.target == 'async':
+            results = asyncio.run(self._run_async_level(links, concurrency))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(self._timed_job, links))
+        wall_time = time.perf_counter() - start
+
+        samples: Dict[str, List[float]] = {}
+        for timings in results:
+            for stage_name, seconds in (timings or {}).items():
+                samples.setdefault(stage_name, []).append(seconds)
+
+        succeeded = sum(1 for timings in results if timings is not None)
+        return {
+            'jobs': self.jobs,
+            'errors': self.jobs - succeeded,
+            'wall_time': wall_time,
+            'throughput': succeeded / wall_time if wall_time else 0.0,
+            'stages': {name: summarize(values) for name, values in sorted(samples.items())},
+        }
+
+    def run(self, concurrency_levels: Iterable[int]) -> Dict[str, dict]:
+        """
+        Run the benchmark at each concurrency level.
+
+        Args:
+            concurrency_levels: Worker counts to measure
+
+        Returns:
+            Dictionary mapping concurrency level (as string) to level results
+        """
+        run_id = str(int(time.time()))
+        return {str(level): self.run_level(level, run_id) for level in concurrency_levels}
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, dict]],
+    baseline: Dict[str, Dict[str, dict]],
+    tolerance: float = 0.25,
+    min_slack: float = 0.01,
+    metric: str = 'p95'
+) -> List[str]:
+    """
+    Compare benchmark results against a stored baseline.
+
+    A stage regresses when its metric exceeds the baseline by more than
+    ``tolerance`` (relative) plus ``min_slack`` seconds, which keeps
+    sub-millisecond stages from flapping on noise.
+
+    Args:
+        results: Results keyed by target, then concurrency level
+        baseline: Baseline with the same shape
+        tolerance: Allowed relative slowdown (0.25 = 25%)
+        min_slack: Absolute slack in seconds added to the threshold
+        metric: Summary field to compare
+
+    Returns:
+        List of human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for target, levels in results.items():
+        for level, result in levels.items():
+            baseline_level = baseline.get(target, {}).get(level)
+            if not baseline_level:
+                continue
+            for stage_name, summary in result['stages'].items():
+                reference = baseline_level['stages'].get(stage_name)
+                if not reference:
+                    continue
+                limit = reference[metric] * (1 + tolerance) + min_slack
+                if summary[metric] > limit:
+                    regressions.append(
+                        f"{target} @ concurrency {level}: {stage_name} {metric} "
+                        f"{summary[metric] * 1000:.1f} ms > {limit * 1000:.1f} ms "
+                        f"(baseline {reference[metric] * 1000:.1f} ms)"
+                    )
+            if result['errors'] > baseline_level.get('errors', 0):
+                regressions.append(
+                    f"{target} @ concurrency {level}: {result['errors']} failed jobs "
+                    f"(baseline {baseline_level.get('errors', 0)})"
+                )
+    return regressions
@@ -0,0 +1,56 @@
+"""
+CPU Pool - Native threads for CPU-bound work, so it never stalls a gevent worker or an event loop.
+"""
+import contextvars
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _gevent_patched() -> bool:
+    """Whether gevent has replaced ``threading`` (threads would then be greenlets on one OS thread)."""
+    if 'gevent.monkey' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('threading')
+
+
+def _pool() -> ThreadPoolExecutor:
+    """Return the pool of the current process (created after a fork)."""
+    global _executor, _executor_pid
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='cpu-pool')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run_cpu_bound(fn: Callable[..., Any], *args) -> Any:
+    """
+    Run ``fn(*args)`` on a native thread and wait for its result.
+
+    NumPy releases the GIL in its array kernels, so the work runs in
+    parallel with the requests the calling worker keeps serving. Under
+    gevent it goes to the hub's thread pool (real OS threads) and only the
+    calling greenlet waits; otherwise to a per-process pool with one
+    thread per CPU. The function runs in a copy of the caller's context
+    (job deadline, trace, profiler).
+
+    Args:
+        fn: Function to run
+        args: Its positional arguments
+
+    Returns:
+        What ``fn`` returns (its exceptions propagate)
+    """
+    context = contextvars.copy_context()
+    if _gevent_patched():
+        from gevent import get_hub
+        return get_hub().threadpool.apply(context.run, (fn,) + args)
+    return _pool().submit(context.run, fn, *args).result()
@@ -0,0 +1,91 @@
+"""
+Deadline - End-to-end time budget carried by each processing job.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from .exceptions import DeadlineExceededException
+
+
+class Deadline:
+    """A point in time by which the whole job must be finished."""
+
+    def __init__(self, seconds: float):
+        """
+        Initialize the deadline.
+
+        Args:
+            seconds: Time budget from now, in seconds
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, default: Optional[float] = None) -> float:
+        """
+        Timeout to use for a single blocking operation.
+
+        Args:
+            default: Upper bound for the operation's own timeout
+
+        Returns:
+            The smaller of ``default`` and the remaining time
+        """
+        remaining = self.remaining()
+        return min(default, remaining) if default is not None else remaining
+
+    def check(self, stage: str):
+        """
+        Fail fast if the deadline has passed.
+
+        Args:
+            stage: Stage name used in the error message
+
+        Raises:
+            DeadlineExceededException: If the deadline has passed
+        """
+        if self.expired:
+            raise self.exceeded(stage)
+
+    def exceeded(self, stage: str) -> DeadlineExceededException:
+        """Build the error raised when ``stage`` runs out of time."""
+        return DeadlineExceededException(
+            f"The job could not finish within {self.seconds:.0f} seconds (deadline reached during {stage})."
+        )
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar('current_deadline', default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline of the job running in the current context, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def job_deadline(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Run the block with a job deadline that services enforce.
+
+    Args:
+        seconds: Time budget in seconds (None or 0 disables the deadline)
+
+    Yields:
+        The active Deadline, or None when disabled
+    """
+    deadline = Deadline(seconds) if seconds else None
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -13,6 +13,16 @@ class YouTubeDownloadException(TranslationGeneratorException):
     pass
 
 
+class VideoUnavailableException(YouTubeDownloadException):
+    """Raised when a video is private, removed or otherwise unavailable."""
+    pass
+
+
+class AudioConversionException(TranslationGeneratorException):
+    """Raised when an audio file cannot be converted (e.g. to MP3)."""
+    pass
+
+
 class TranscriptionException(TranslationGeneratorException):
     """Raised when transcription fails."""
     pass
@@ -25,4 +35,27 @@ class TranslationException(TranslationGeneratorException):
 
 class InvalidDataException(TranslationGeneratorException):
     """Raised when input data is invalid."""
-    pass 
\ No newline at end of file
+    pass
+
+
+class DeadlineExceededException(TranslationGeneratorException):
+    """Raised when a job cannot finish a stage before its deadline."""
+    pass
+
+
+class OverloadedException(TranslationGeneratorException):
+    """Raised when a job cannot get a slot for a limited resource in time."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobTooLargeException(InvalidDataException):
+    """Raised when a video is too long or too large to be processed."""
+    pass
+
+
+class StorageException(TranslationGeneratorException):
+    """Raised when published media cannot be stored in or read from the media storage."""
+    pass
@@ -0,0 +1,17 @@
+"""
+Offline stand-ins for YouTube (yt-dlp), AssemblyAI and OpenAI.
+"""
+from .profile import LatencyProfile
+from .fake_youtube import FakeYoutubeDL
+from .fake_assemblyai import FakeAssemblyAIServer
+from .fake_openai import FakeOpenAIServer
+from .offline import OfflineServices, offline_services
+
+__all__ = [
+    'LatencyProfile',
+    'FakeYoutubeDL',
+    'FakeAssemblyAIServer',
+    'FakeOpenAIServer',
+    'OfflineServices',
+    'offline_services',
+]
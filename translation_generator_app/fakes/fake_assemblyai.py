@@ -0,0 +1,141 @@
+"""
+Fake AssemblyAI - Local stand-in for the AssemblyAI v2 upload/transcript API.
+"""
+import json
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .http import FakeHTTPServer
+from .profile import LatencyProfile
+
+
+DEFAULT_LYRICS = (
+    "I walk along the empty road tonight\n"
+    "The city lights are fading out of sight\n"
+    "And every step I take I think of you\n"
+    "Hold on, hold on, the morning's coming through\n"
+)
+
+
+class FakeAssemblyAIServer(FakeHTTPServer):
+    """
+    Serves ``/v2/upload`` and ``/v2/transcript`` (create, get and list) like AssemblyAI does.
+
+    A transcript stays ``processing`` for ``profile.latency`` (+/- jitter)
+    seconds after it is created, then becomes ``completed`` (or ``error``
+    according to ``profile.failure_rate``). ``profile.payload_size`` sets the
+    length of the returned transcript in characters.
+    """
+
+    def __init__(self, profile: Optional[LatencyProfile] = None, text: str = DEFAULT_LYRICS):
+        """
+        Initialize the fake AssemblyAI server.
+
+        Args:
+            profile: Latency/failure profile for transcriptions
+            text: Transcript text template (repeated up to payload_size)
+        """
+        super().__init__(profile)
+        self.text = text
+        self.uploads: Dict[str, int] = {}
+        self.transcripts: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """Value for ``aai.settings.base_url``."""
+        return self.url
+
+    def _transcript_text(self) -> str:
+        size = self.profile.payload_size
+        if size <= 0:
+            return self.text
+        repeats = size // len(self.text) + 1
+        return (self.text * repeats)[:size]
+
+    def _render(self, transcript_id: str) -> dict:
+        job = self.transcripts[transcript_id]
+        payload = {
+            'id': transcript_id,
+            'audio_url': job['audio_url'],
+            'status': 'processing',
+            'text': None,
+            'error': None,
+        }
+        if time.monotonic() >= job['ready_at']:
+            if job['failed']:
+                payload.update({'status': 'error', 'error': 'Simulated transcription failure'})
+            else:
+                payload.update({
+                    'status': 'completed',
+                    'text': job['text'],
+                    'words': [],
+                    'audio_duration': job['audio_duration'],
+                    'confidence': 0.95,
+                })
+        return payload
+
+    def handle(self, handler, method, path, body):
+        if method == 'POST' and path == '/v2/upload':
+            upload_id = uuid.uuid4().hex
+            with self._lock:
+                self.uploads[upload_id] = len(body)
+            self.send_json(handler, 200, {'upload_url': f"{self.url}/uploads/{upload_id}"})
+            return
+
+        if method == 'POST' and path == '/v2/transcript':
+            request = json.loads(body or b'{}')
+            transcript_id = uuid.uuid4().hex
+            upload_id = request.get('audio_url', '').rsplit('/', 1)[-1]
+            with self._lock:
+                size = self.uploads.get(upload_id, 0)
+                self.transcripts[transcript_id] = {
+                    'audio_url': request.get('audio_url', ''),
+                    'ready_at': time.monotonic() + self.profile.delay(),
+                    'failed': self.profile.should_fail(),
+                    'text': self._transcript_text(),
+                    # Rough estimate assuming 128 kbps audio
+                    'audio_duration': max(1, size // 16000),
+                }
+            self.send_json(handler, 200, self._render(transcript_id))
+            return
+
+        if method == 'GET' and urlsplit(path).path == '/v2/transcript':
+            query = parse_qs(urlsplit(path).query)
+            limit = int(query.get('limit', ['10'])[0])
+            with self._lock:
+                ids = list(self.transcripts)[-limit:][::-1]
+            items = [
+                {
+                    'id': transcript_id,
+                    'resource_url': f"{self.url}/v2/transcript/{transcript_id}",
+                    'status': self._render(transcript_id)['status'],
+                    'created': '2024-01-01T00:00:00',
+                    'audio_url': self.transcripts[transcript_id]['audio_url'],
+                }
+                for transcript_id in ids
+            ]
+            self.send_json(handler, 200, {
+                'page_details': {
+                    'limit': limit,
+                    'result_count': len(items),
+                    'current_url': f"{self.url}{path}",
+                    'prev_url': None,
+                    'next_url': None,
+                },
+                'transcripts': items,
+            })
+            return
+
+        if method == 'GET' and path.startswith('/v2/transcript/'):
+            transcript_id = path.rstrip('/').rsplit('/', 1)[-1]
+            if transcript_id not in self.transcripts:
+                self.send_json(handler, 404, {'error': 'Transcript not found'})
+                return
+            self.send_json(handler, 200, self._render(transcript_id))
+            return
+
+        self.send_json(handler, 404, {'error': f"Unknown endpoint: {method} {path}"})
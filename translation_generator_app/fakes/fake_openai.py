@@ -0,0 +1,175 @@
+"""
+Fake OpenAI - Local stand-in for the OpenAI models and chat completions API.
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from .http import FakeHTTPServer
+from .profile import LatencyProfile
+
+
+class FakeOpenAIServer(FakeHTTPServer):
+    """
+    Serves ``/v1/models`` and ``/v1/chat/completions`` like OpenAI does.
+
+    Language detection prompts are answered with ``detected_language``.
+    Any other prompt echoes the text after the instruction line, so
+    formatting and translation return text of realistic size. Requests
+    with a JSON schema ``response_format`` get the combined
+    detection/formatting/translation object. A positive
+    ``profile.payload_size`` pads or truncates completions to that many
+    characters. Failures are answered with HTTP 500.
+
+    With ``requests_per_minute`` / ``tokens_per_minute`` set, completions
+    carry ``x-ratelimit-*`` headers and requests over either limit (a
+    bucket refilled continuously over a minute) are answered with 429 and
+    ``retry-after-ms``.
+    """
+
+    def __init__(
+        self,
+        profile: Optional[LatencyProfile] = None,
+        models: Optional[List[str]] = None,
+        detected_language: str = 'en',
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0
+    ):
+        """
+        Initialize the fake OpenAI server.
+
+        Args:
+            profile: Latency/failure profile for chat completions
+            models: Model IDs returned by the models endpoint
+            detected_language: Language code returned for detection prompts
+            requests_per_minute: Simulated request limit (0 for none)
+            tokens_per_minute: Simulated token limit (0 for none)
+        """
+        super().__init__(profile)
+        self.models = models or ['gpt-4o', 'gpt-4o-mini', 'gpt-3.5-turbo']
+        self.detected_language = detected_language
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.rate_limited = 0
+        self._allowance: Dict[str, float] = {}
+        self._allowance_updated = time.monotonic()
+        self._allowance_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        """Value for ``OPENAI_BASE_URL``."""
+        return f"{self.url}/v1"
+
+    def _admit(self, tokens: int) -> Tuple[Optional[float], dict]:
+        """
+        Count a request against the simulated limits.
+
+        Returns:
+            Seconds until it would fit (None if admitted) and the rate limit headers
+        """
+        if not (self.requests_per_minute or self.tokens_per_minute):
+            return None, {}
+        limits = {'requests': (self.requests_per_minute, 1), 'tokens': (self.tokens_per_minute, tokens)}
+        with self._allowance_lock:
+            now = time.monotonic()
+            elapsed, self._allowance_updated = now - self._allowance_updated, now
+            shortfall = 0.0
+            for name, (limit, cost) in limits.items():
+                if limit:
+                    level = min(limit, self._allowance.get(name, limit) + elapsed * limit / 60)
+                    self._allowance[name] = level
+                    shortfall = max(shortfall, (cost - level) * 60 / limit)
+            retry_after = shortfall if shortfall > 0 else None
+            if retry_after is None:
+                for name, (limit, cost) in limits.items():
+                    if limit:
+                        self._allowance[name] -= cost
+            else:
+                self.rate_limited += 1
+
+            headers = {}
+            for name, (limit, _) in limits.items():
+                if limit:
+                    remaining = max(0, int(self._allowance[name]))
+                    headers[f'x-ratelimit-limit-{name}'] = str(limit)
+                    headers[f'x-ratelimit-remaining-{name}'] = str(remaining)
+                    headers[f'x-ratelimit-reset-{name}'] = f"{60 * (limit - remaining) / limit:.3f}s"
+        if retry_after is not None:
+            headers['retry-after-ms'] = str(max(1, int(retry_after * 1000)))
+        return retry_after, headers
+
+    def _complete(self, messages: List[dict], response_format: Optional[dict] = None) -> str:
+        system = next((m['content'] for m in messages if m.get('role') == 'system'), '')
+        user = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+
+        if 'language detection' in system.lower():
+            return self.detected_language
+
+        content = user.split('\n\n', 1)[-1]
+        size = self.profile.payload_size
+        if size > 0:
+            content = (content * (size // max(len(content), 1) + 1))[:size]
+
+        if (response_format or {}).get('type') == 'json_schema':
+            target = re.search(r'target language: (\w+)', user)
+            same_language = target is not None and target.group(1) == self.detected_language
+            return json.dumps({
+                'detected_language': self.detected_language,
+                'formatted_original': content,
+                'translation': None if same_language else content,
+            })
+        return content
+
+    def handle(self, handler, method, path, body):
+        if method == 'GET' and path == '/v1/models':
+            self.send_json(handler, 200, {
+                'object': 'list',
+                'data': [
+                    {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'fake'}
+                    for model in self.models
+                ],
+            })
+            return
+
+        if method == 'POST' and path == '/v1/chat/completions':
+            request = json.loads(body or b'{}')
+            self.profile.sleep()
+
+            if self.profile.should_fail():
+                self.send_json(handler, 500, {
+                    'error': {'message': 'Simulated server error', 'type': 'server_error', 'code': None}
+                })
+                return
+
+            prompt_tokens = sum(len(m.get('content', '')) for m in request.get('messages', [])) // 4
+            retry_after, headers = self._admit(prompt_tokens + (request.get('max_tokens') or prompt_tokens))
+            if retry_after is not None:
+                self.send_json(handler, 429, {
+                    'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}
+                }, headers)
+                return
+
+            content = self._complete(request.get('messages', []), request.get('response_format'))
+            completion_tokens = len(content) // 4
+            self.send_json(handler, 200, {
+                'id': f"chatcmpl-{uuid.uuid4().hex}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', self.models[0]),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': completion_tokens,
+                    'total_tokens': prompt_tokens + completion_tokens,
+                },
+            }, headers)
+            return
+
+        self.send_json(handler, 404, {'error': {'message': f"Unknown endpoint: {method} {path}"}})
@@ -0,0 +1,235 @@
+"""
+Fake yt-dlp - Drop-in stand-in for ``yt_dlp.YoutubeDL`` serving local media fixtures.
+"""
+import math
+import os
+import random
+import re
+import shutil
+import struct
+import tempfile
+import threading
+import wave
+from pathlib import Path
+from typing import List, Optional
+
+from yt_dlp.utils import DownloadError
+
+from .profile import LatencyProfile
+
+
+VIDEO_ID_REGEX = re.compile(r'(?:v=|youtu\.be/|embed/)([\w-]+)')
+
+AUDIO_EXTENSIONS = ('wav', 'mp3', 'm4a', 'webm', 'opus')
+
+# Videos whose ID starts with this are private (yt-dlp's unavailable-video error)
+PRIVATE_VIDEO_PREFIX = 'private'
+
+
+def video_id_from_link(link: str) -> str:
+    """Extract the video ID from a YouTube link (falls back to the link itself)."""
+    match = VIDEO_ID_REGEX.search(link)
+    return match.group(1) if match else link
+
+
+def write_melody_wav(path: str, size: int, seed: str, sample_rate: int = 16000) -> str:
+    """
+    Write a mono 16-bit WAV file of roughly ``size`` bytes with a melody derived from ``seed``.
+
+    Each note is a decaying tone picked from a two-octave scale, so
+    different seeds (video IDs) produce audio that fingerprints as a
+    different song, while the same seed always produces the same one.
+
+    Args:
+        path: Destination path
+        size: Approximate file size in bytes
+        seed: Seed of the note sequence (e.g. the video ID)
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        The destination path
+    """
+    frames = max(size // 2, sample_rate // 10)
+    note_frames = sample_rate // 4
+    notes = []
+    for step in range(15):
+        frequency = 220.0 * 2 ** (step / 7)
+        notes.append(b''.join(
+            struct.pack('<h', int(12000 * math.exp(-6 * i / note_frames)
+                                  * math.sin(2 * math.pi * frequency * i / sample_rate)))
+            for i in range(note_frames)
+        ))
+    rng = random.Random(seed)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        while frames > 0:
+            note = rng.choice(notes)[:frames * 2]
+            wav.writeframes(note)
+            frames -= len(note) // 2
+    return path
+
+
+class FakeYoutubeDL:
+    """
+    Offline replacement for ``yt_dlp.YoutubeDL``.
+
+    Supports the subset of the API used by ``YouTubeService``: the context
+    manager protocol, ``extract_info``, ``download``, ``prepare_filename``,
+    ``outtmpl`` templates, ``FFmpegExtractAudio`` post-processing (by
+    extension only) and ``progress_hooks``. Media is copied from
+    ``fixtures_dir`` (``<video_id>.<ext>`` or ``default.<ext>``) or
+    synthesized with ``profile.payload_size`` bytes (audio is a melody
+    seeded by the video ID).
+
+    Use ``FakeYoutubeDL.configured(profile, fixtures_dir)`` to obtain a
+    class bound to a given profile.
+    """
+
+    profile: LatencyProfile = LatencyProfile()
+    fixtures_dir: Optional[Path] = None
+    default_payload_size = 256 * 1024
+
+    def __init__(self, params: Optional[dict] = None):
+        self.params = dict(params or {})
+
+    @classmethod
+    def configured(cls, profile: LatencyProfile, fixtures_dir: Optional[str] = None) -> type:
+        """
+        Create a subclass bound to a profile and fixtures directory.
+
+        Args:
+            profile: Latency/failure/payload profile
+            fixtures_dir: Directory containing local media fixtures
+
+        Returns:
+            Configured ``FakeYoutubeDL`` subclass
+        """
+        return type('ConfiguredFakeYoutubeDL', (cls,), {
+            'profile': profile,
+            'fixtures_dir': Path(fixtures_dir) if fixtures_dir else None,
+        })
+
+    def __enter__(self) -> 'FakeYoutubeDL':
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def _info(self, link: str) -> dict:
+        video_id = video_id_from_link(link)
+        return {
+            'id': video_id,
+            'title': f"Fake Song {video_id}",
+            'webpage_url': link,
+            'duration': 180,
+            'ext': 'mp4',
+            'formats': [
+                {'format_id': '140', 'ext': 'm4a', 'acodec': 'mp4a.40.2', 'vcodec': 'none'},
+                {'format_id': '18', 'ext': 'mp4', 'acodec': 'mp4a.40.2', 'vcodec': 'avc1'},
+            ],
+            'subtitles': {'en': [{'ext': 'vtt', 'url': f"https://example.invalid/{video_id}.en.vtt"}]},
+            'automatic_captions': {},
+        }
+
+    def _maybe_fail(self, link: str):
+        video_id = video_id_from_link(link)
+        if video_id.startswith(PRIVATE_VIDEO_PREFIX):
+            raise DownloadError(f"ERROR: [youtube] {video_id}: Private video. "
+                                "Sign in if you've been granted access to this video")
+        if self.profile.should_fail():
+            raise DownloadError(f"ERROR: [fake] {video_id_from_link(link)}: Simulated download failure")
+
+    def extract_info(self, link: str, download: bool = True) -> dict:
+        """
+        Return fake metadata, optionally downloading the media.
+
+        For audio-only formats without download, ``url`` points at a local
+        copy of the audio so it can be streamed (e.g. by ffmpeg).
+        """
+        self.profile.sleep()
+        self._maybe_fail(link)
+        info = self._info(link)
+        if download:
+            self._download_one(link, info)
+        elif self._is_audio_only():
+            info['url'] = self._stream_source(info['id'])
+        return info
+
+    def download(self, links: List[str]) -> int:
+        """Download the given links to the configured ``outtmpl``."""
+        for link in links:
+            self.profile.sleep()
+            self._maybe_fail(link)
+            self._download_one(link, self._info(link))
+        return 0
+
+    def prepare_filename(self, info: dict) -> str:
+        """Fill the ``outtmpl`` template for the given info dict."""
+        template = self.params.get('outtmpl', '%(title)s.%(ext)s')
+        if isinstance(template, dict):
+            template = template.get('default', '%(title)s.%(ext)s')
+        return template % {key: info.get(key, '') for key in ('id', 'title', 'ext')}
+
+    def _is_audio_only(self) -> bool:
+        return self.params.get('format', '').startswith('bestaudio')
+
+    def _target_path(self, info: dict) -> str:
+        info = dict(info, ext='m4a' if self._is_audio_only() else 'mp4')
+        target = self.prepare_filename(info)
+        for postprocessor in self.params.get('postprocessors', []):
+            if postprocessor.get('key') == 'FFmpegExtractAudio':
+                base, ext = os.path.splitext(target)
+                if ext.lstrip('.') in ('m4a', 'mp4', 'webm'):
+                    target = base
+                target = f"{target}.{postprocessor.get('preferredcodec', 'mp3')}"
+        return target
+
+    def _fixture(self, video_id: str) -> Optional[Path]:
+        if not self.fixtures_dir:
+            return None
+        extensions = AUDIO_EXTENSIONS if self._is_audio_only() else ('mp4',)
+        for name in (video_id, 'default'):
+            for ext in extensions:
+                candidate = self.fixtures_dir / f"{name}.{ext}"
+                if candidate.exists():
+                    return candidate
+        return None
+
+    def _stream_source(self, video_id: str) -> str:
+        fixture = self._fixture(video_id)
+        if fixture:
+            return str(fixture)
+        size = self.profile.payload_size or self.default_payload_size
+        source = Path(tempfile.gettempdir()) / 'fake-yt-dlp' / f"{video_id}-{size}.wav"
+        if not source.exists():
+            source.parent.mkdir(parents=True, exist_ok=True)
+            partial = source.with_suffix(f".{os.getpid()}.{threading.get_ident()}.part")
+            write_melody_wav(str(partial), size, video_id)
+            os.replace(partial, source)
+        return str(source)
+
+    def _download_one(self, link: str, info: dict):
+        target = self._target_path(info)
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+
+        fixture = self._fixture(info['id'])
+        size = self.profile.payload_size or self.default_payload_size
+        if fixture:
+            shutil.copyfile(fixture, target)
+        elif self._is_audio_only():
+            write_melody_wav(target, size, info['id'])
+        else:
+            with open(target, 'wb') as f:
+                f.write(os.urandom(size))
+
+        written = os.path.getsize(target)
+        for hook in self.params.get('progress_hooks', []):
+            hook({
+                'status': 'finished',
+                'filename': target,
+                'downloaded_bytes': written,
+                'total_bytes': written,
+                'info_dict': info,
+            })
@@ -0,0 +1,84 @@
+"""
+Fake yt-dlp command line - ``FakeYoutubeDL`` behind the subset of yt-dlp options used by ``AsyncYouTubeService``.
+
+Run as ``python -m translation_generator_app.fakes.fake_ytdlp_cli``. The
+latency profile and fixtures directory are read from the
+``FAKE_YTDLP_PROFILE`` (JSON) and ``FAKE_YTDLP_FIXTURES`` environment
+variables, which ``offline_services`` sets.
+"""
+import argparse
+import json
+import os
+import sys
+import zlib
+from typing import List, Optional
+
+from yt_dlp.utils import DownloadError
+
+from .fake_youtube import FakeYoutubeDL, video_id_from_link
+from .profile import LatencyProfile
+
+
+PROFILE_ENV = 'FAKE_YTDLP_PROFILE'
+FIXTURES_ENV = 'FAKE_YTDLP_FIXTURES'
+
+
+def profile_to_env(profile: LatencyProfile) -> str:
+    """Serialize a profile for ``FAKE_YTDLP_PROFILE``."""
+    return json.dumps({
+        'latency': profile.latency,
+        'jitter': profile.jitter,
+        'failure_rate': profile.failure_rate,
+        'payload_size': profile.payload_size,
+        'seed': profile.seed,
+    })
+
+
+def _profile_for(link: str) -> LatencyProfile:
+    options = json.loads(os.environ.get(PROFILE_ENV) or '{}')
+    if options.get('seed') is not None:
+        # Every process starts a new random sequence; vary it per video
+        options['seed'] += zlib.crc32(video_id_from_link(link).encode('utf-8'))
+    return LatencyProfile(**options)
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='yt-dlp')
+    parser.add_argument('link')
+    parser.add_argument('-f', '--format', default='best')
+    parser.add_argument('-o', '--output', default='%(title)s.%(ext)s')
+    parser.add_argument('-x', '--extract-audio', action='store_true')
+    parser.add_argument('--audio-format', default='mp3')
+    parser.add_argument('--print', dest='print_field')
+    parser.add_argument('--dump-single-json', action='store_true')
+    parser.add_argument('--skip-download', action='store_true')
+    # Accepted for compatibility; they do not change the fake's behaviour
+    for flag in ('--quiet', '--no-progress', '--no-check-certificates'):
+        parser.add_argument(flag, action='store_true')
+    for option in ('--extractor-args', '--add-header', '--socket-timeout', '--audio-quality'):
+        parser.add_argument(option, action='append')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parser().parse_args(argv)
+    params = {'format': args.format, 'outtmpl': args.output}
+    if args.extract_audio:
+        params['postprocessors'] = [{'key': 'FFmpegExtractAudio', 'preferredcodec': args.audio_format}]
+
+    fake_ydl = FakeYoutubeDL.configured(_profile_for(args.link), os.environ.get(FIXTURES_ENV) or None)
+    try:
+        with fake_ydl(params) as ydl:
+            if args.print_field or args.dump_single_json:
+                info = ydl.extract_info(args.link, download=not args.skip_download)
+                sys.stdout.write((json.dumps(info) if args.dump_single_json else str(info.get(args.print_field, 'NA'))) + '\n')
+            else:
+                ydl.download([args.link])
+    except DownloadError as e:
+        sys.stderr.write(f"{e}\n")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Fake HTTP Server - Threaded local HTTP server used by the API stand-ins.
+"""
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+from .profile import LatencyProfile
+
+
+class FakeHTTPServer:
+    """
+    Base class for local HTTP stand-ins of external APIs.
+
+    Subclasses implement ``handle(handler, method, path, body)`` and reply
+    through ``send_json``. The server listens on 127.0.0.1 on a free port.
+    """
+
+    def __init__(self, profile: Optional[LatencyProfile] = None):
+        """
+        Initialize the fake server.
+
+        Args:
+            profile: Latency/failure profile applied to requests
+        """
+        self.profile = profile or LatencyProfile()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server (e.g. 'http://127.0.0.1:51234')."""
+        if not self._server:
+            raise RuntimeError("Fake server is not running.")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeHTTPServer':
+        """Start serving requests in a background thread."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                fake.handle(self, 'GET', self.path, b'')
+
+            def do_POST(self):
+                try:
+                    body = fake.read_body(self)
+                except ConnectionAbortedError:
+                    self.close_connection = True
+                    return
+                fake.handle(self, 'POST', self.path, body)
+
+            def do_DELETE(self):
+                fake.handle(self, 'DELETE', self.path, b'')
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                # Clients that give up (e.g. on a deadline) close the socket mid-reply
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server and release the port."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self) -> 'FakeHTTPServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handle(self, handler: BaseHTTPRequestHandler, method: str, path: str, body: bytes):
+        """Handle a request. Must be implemented by subclasses."""
+        raise NotImplementedError
+
+    @staticmethod
+    def read_body(handler: BaseHTTPRequestHandler) -> bytes:
+        """
+        Read the request body, supporting both Content-Length and chunked encoding.
+
+        Args:
+            handler: Active request handler
+
+        Returns:
+            Raw request body
+
+        Raises:
+            ConnectionAbortedError: If the client stops in the middle of a chunked body
+        """
+        if handler.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                line = handler.rfile.readline().strip()
+                if not line:
+                    raise ConnectionAbortedError("Client aborted the chunked upload")
+                size = int(line.split(b';')[0], 16)
+                if size == 0:
+                    handler.rfile.readline()
+                    break
+                chunks.append(handler.rfile.read(size))
+                handler.rfile.readline()
+            return b''.join(chunks)
+
+        length = int(handler.headers.get('Content-Length') or 0)
+        return handler.rfile.read(length) if length else b''
+
+    @staticmethod
+    def send_json(handler: BaseHTTPRequestHandler, status: int, payload: Any, headers: Optional[dict] = None):
+        """
+        Send a JSON response.
+
+        Args:
+            handler: Active request handler
+            status: HTTP status code
+            payload: JSON-serializable body
+            headers: Extra response headers
+        """
+        body = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
@@ -0,0 +1,84 @@
+"""
+Offline Mode - Run the real services against the local stand-ins.
+"""
+import os
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from unittest import mock
+
+from .fake_assemblyai import FakeAssemblyAIServer
+from .fake_openai import FakeOpenAIServer
+from .fake_youtube import FakeYoutubeDL
+from .profile import LatencyProfile
+
+
+@dataclass
+class OfflineServices:
+    """Handles to the running stand-ins."""
+    youtube: type
+    assemblyai: FakeAssemblyAIServer
+    openai: FakeOpenAIServer
+
+
+@contextmanager
+def offline_services(
+    youtube: Optional[LatencyProfile] = None,
+    transcription: Optional[LatencyProfile] = None,
+    openai: Optional[LatencyProfile] = None,
+    fixtures_dir: Optional[str] = None,
+    polling_interval: float = 0.1
+) -> Iterator[OfflineServices]:
+    """
+    Route YouTube, AssemblyAI and OpenAI traffic to local stand-ins.
+
+    Inside the block ``YouTubeService`` uses ``FakeYoutubeDL`` (and
+    ``AsyncYouTubeService`` the equivalent ``fake_ytdlp_cli`` command), the
+    AssemblyAI SDK and async client talk to ``FakeAssemblyAIServer`` and
+    every OpenAI client created picks up ``FakeOpenAIServer`` through
+    ``OPENAI_BASE_URL``.
+
+    Args:
+        youtube: Profile for yt-dlp extraction/downloads
+        transcription: Profile for AssemblyAI transcriptions
+        openai: Profile for OpenAI chat completions
+        fixtures_dir: Directory with local media fixtures
+        polling_interval: Transcript polling interval in seconds (SDK and shared poller)
+
+    Yields:
+        OfflineServices with the running stand-ins
+    """
+    # Imported here so ``python -m ...fakes.fake_ytdlp_cli`` starts without the service stack
+    import assemblyai as aai
+    from django.test.utils import override_settings
+
+    from ..services import TranscriptionPoller, youtube_service
+    from .fake_ytdlp_cli import FIXTURES_ENV, PROFILE_ENV, profile_to_env
+
+    youtube = youtube or LatencyProfile()
+    fake_ydl = FakeYoutubeDL.configured(youtube, fixtures_dir)
+    fake_ytdlp_command = [sys.executable, '-m', f"{__package__}.fake_ytdlp_cli"]
+    fake_ytdlp_env = {PROFILE_ENV: profile_to_env(youtube), FIXTURES_ENV: fixtures_dir or ''}
+    assemblyai_server = FakeAssemblyAIServer(transcription)
+    openai_server = FakeOpenAIServer(openai)
+
+    previous_base_url = aai.settings.base_url
+    previous_polling_interval = aai.settings.polling_interval
+
+    with assemblyai_server, openai_server:
+        aai.settings.base_url = assemblyai_server.base_url
+        aai.settings.polling_interval = polling_interval
+        try:
+            poller = TranscriptionPoller(min_interval=polling_interval, max_interval=max(polling_interval, 1.0))
+            with mock.patch.object(youtube_service.yt_dlp, 'YoutubeDL', fake_ydl), \
+                    mock.patch.object(TranscriptionPoller, '_shared', poller), \
+                    mock.patch.object(TranscriptionPoller, '_shared_pid', os.getpid()), \
+                    mock.patch.dict(os.environ, {'OPENAI_BASE_URL': openai_server.base_url, **fake_ytdlp_env}), \
+                    override_settings(YTDLP_COMMAND=fake_ytdlp_command,
+                                      TRANSCRIPTION_POLL_MIN_INTERVAL=polling_interval,
+                                      TRANSCRIPTION_POLL_MAX_INTERVAL=max(polling_interval, 1.0)):
+                yield OfflineServices(youtube=fake_ydl, assemblyai=assemblyai_server, openai=openai_server)
+        finally:
+            aai.settings.base_url = previous_base_url
+            aai.settings.polling_interval = previous_polling_interval
@@ -0,0 +1,52 @@
+"""
+Latency Profile - Configurable latency, jitter, failures and payload size for fakes.
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Behaviour knobs shared by all offline stand-ins.
+
+    Attributes:
+        latency: Base latency in seconds for each simulated operation
+        jitter: Maximum random deviation (+/-) in seconds added to the latency
+        failure_rate: Probability (0.0 - 1.0) that an operation fails
+        payload_size: Size of generated payloads (bytes for media, characters for text)
+        seed: Optional seed to make jitter and failures reproducible
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    payload_size: int = 0
+    seed: Optional[int] = None
+    _random: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False, default_factory=threading.Lock)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+
+    def delay(self) -> float:
+        """Return the latency to apply to the next operation (never negative)."""
+        with self._lock:
+            offset = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + offset)
+
+    def sleep(self) -> float:
+        """Sleep for the next operation's latency and return it."""
+        seconds = self.delay()
+        if seconds:
+            time.sleep(seconds)
+        return seconds
+
+    def should_fail(self) -> bool:
+        """Decide whether the next operation should fail."""
+        if self.failure_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.failure_rate
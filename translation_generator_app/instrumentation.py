@@ -0,0 +1,217 @@
+"""
+Instrumentation - Lightweight per-stage timing for the processing pipeline.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from django.utils import timezone
+
+from .profiling import current_profiler
+from .progress import current_progress
+
+
+class JobTrace:
+    """
+    Waterfall of one job: when each stage ran, which stage it ran in, and what it moved.
+
+    Every ``stage()`` and ``span()`` finished while the trace is active is
+    recorded with its start and end (seconds since the job started), the
+    enclosing span's name and the bytes and LLM tokens counted inside it
+    with ``count_stage()``. Spans may finish in any of the job's threads.
+    """
+
+    def __init__(self):
+        """Start the trace's clock."""
+        self.started_at = timezone.now()
+        self.origin = time.perf_counter()
+        self.spans: List[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, end: float, parent: Optional[str] = None,
+               bytes: Optional[int] = None, tokens: Optional[int] = None):
+        """
+        Add a finished span.
+
+        Args:
+            name: Stage name
+            start: ``time.perf_counter()`` when it started
+            end: ``time.perf_counter()`` when it finished
+            parent: Name of the span it ran in, if any
+            bytes: Bytes downloaded, uploaded or written
+            tokens: LLM tokens used
+        """
+        span = {
+            'name': name,
+            'parent': parent,
+            'start': round(start - self.origin, 3),
+            'end': round(end - self.origin, 3),
+            'bytes': bytes or None,
+            'tokens': tokens or None,
+        }
+        with self._lock:
+            self.spans.append(span)
+
+    def as_dict(self) -> dict:
+        """
+        Serialize the trace for ``translationPost.stage_timeline``.
+
+        Returns:
+            Dictionary with 'started_at', 'seconds' (up to the last span's
+            end) and 'stages' ordered by start
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: (span['start'], -span['end']))
+        return {
+            'started_at': self.started_at.isoformat(),
+            'seconds': max((span['end'] for span in spans), default=0.0),
+            'stages': spans,
+        }
+
+
+# Active collector for the current job (None when nobody is measuring)
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('stage_timings', default=None)
+# Waterfall of the current job and the span open in the current context
+_job_trace: ContextVar[Optional[JobTrace]] = ContextVar('job_trace', default=None)
+_open_span: ContextVar[Optional[dict]] = ContextVar('open_span', default=None)
+
+
+@contextmanager
+def trace_job() -> Iterator[JobTrace]:
+    """
+    Record the waterfall of the stages run inside the block.
+
+    Yields:
+        The active JobTrace
+    """
+    trace = JobTrace()
+    token = _job_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _job_trace.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Record a step of a stage in the job's waterfall, if a trace is active.
+
+    Unlike ``stage()``, spans are not reported as progress nor summed into
+    the stage timings; they break a stage down (e.g. the detection,
+    formatting and translation calls of the LLM stage). In a job run under
+    ``profile_job()`` the span also labels the profiler's samples.
+
+    Args:
+        name: Span name (e.g. 'transcode', 'segment', 'detection')
+    """
+    trace = _job_trace.get()
+    profiler = current_profiler()
+    if trace is None and profiler is None:
+        yield
+        return
+
+    # A profiled job keeps the samples of this step, wherever it runs, under a [name] frame
+    mark = profiler.enter(name) if profiler is not None else None
+    if trace is None:
+        try:
+            yield
+        finally:
+            profiler.exit(mark)
+        return
+
+    parent = _open_span.get()
+    counters = {'name': name, 'bytes': 0, 'tokens': 0}
+    token = _open_span.set(counters)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _open_span.reset(token)
+        if mark is not None:
+            profiler.exit(mark)
+        trace.record(name, start, time.perf_counter(), parent['name'] if parent else None,
+                     counters['bytes'], counters['tokens'])
+
+
+def record_span(name: str, start: float, bytes: Optional[int] = None, tokens: Optional[int] = None):
+    """
+    Record a span that ends now, for work that cannot be wrapped in ``span()`` (e.g. a generator).
+
+    Args:
+        name: Span name
+        start: ``time.perf_counter()`` when the work started
+        bytes: Bytes moved
+        tokens: LLM tokens used
+    """
+    trace = _job_trace.get()
+    if trace is not None:
+        parent = _open_span.get()
+        trace.record(name, start, time.perf_counter(), parent['name'] if parent else None, bytes, tokens)
+
+
+def count_stage(bytes: int = 0, tokens: int = 0):
+    """
+    Add bytes or LLM tokens to the innermost open span; a no-op without a trace.
+
+    Args:
+        bytes: Bytes downloaded, uploaded or written
+        tokens: LLM tokens used
+    """
+    counters, trace = _open_span.get(), _job_trace.get()
+    if counters is not None and trace is not None:
+        # Threads started inside a span (e.g. transcribed segments) share its counters
+        with trace._lock:
+            counters['bytes'] += bytes
+            counters['tokens'] += tokens
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a pipeline stage if a collector is active for the current job.
+
+    The stage's start and end are also reported to the job's progress
+    reporter and recorded in its trace, if any. When none is active this
+    is a no-op, so it is safe to leave in the hot path.
+
+    Args:
+        name: Stage name (e.g. 'metadata', 'video_download', 'upload')
+    """
+    timings = _stage_timings.get()
+    progress = current_progress()
+    if timings is None and progress is None:
+        with span(name):
+            yield
+        return
+
+    start = time.perf_counter()
+    if progress is not None:
+        progress.stage_started(name)
+    try:
+        with span(name):
+            yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+        if progress is not None:
+            progress.stage_finished(name, elapsed)
+
+
+@contextmanager
+def collect_stage_timings() -> Iterator[Dict[str, float]]:
+    """
+    Collect stage durations (in seconds) for the code run inside the block.
+
+    Yields:
+        Dictionary mapping stage name to elapsed seconds, filled as stages finish
+    """
+    timings: Dict[str, float] = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
@@ -0,0 +1,56 @@
+"""
+Lazy Imports - Defer heavy third-party modules until they are first used.
+"""
+import importlib
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    ``yt_dlp``, ``assemblyai`` and ``openai`` each take hundreds of
+    milliseconds to import. Binding them through ``LazyModule`` keeps
+    that cost out of management commands, the cron job and the Streamlit
+    script until a job needs them; the gunicorn master
+    (``gunicorn.conf.py``) imports them once before forking the workers.
+
+    Usage::
+
+        aai = LazyModule('assemblyai')
+        aai.Transcriber()  # assemblyai is imported here
+
+    Attributes set on the proxy (e.g. a class patched by the offline
+    stand-ins) shadow the real module's own.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize the proxy.
+
+        Args:
+            name: Absolute module name (e.g. 'assemblyai')
+        """
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self) -> ModuleType:
+        module: Optional[ModuleType] = self._module
+        if module is None:
+            # import_module is thread-safe and returns the cached module after the first call
+            module = importlib.import_module(self._name)
+            object.__setattr__(self, '_module', module)
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the real module has been imported."""
+        return self._module is not None
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<LazyModule {self._name!r} ({state})>"
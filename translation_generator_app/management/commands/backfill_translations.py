@@ -0,0 +1,97 @@
+"""
+Management command: translate a catalog of links in bulk, resuming from a checkpoint manifest.
+
+Usage:
+    python manage.py backfill_translations catalog.csv --workers 8
+    python manage.py backfill_translations catalog.jsonl --limit llm=4 --limit download=2 --retry-failed
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from ...admission import reset_limiters
+from ...backfill import BackfillRunner, CheckpointManifest, read_catalog
+from ...exceptions import InvalidDataException
+
+
+class Command(BaseCommand):
+    help = "Run the translation pipeline over a CSV/JSONL catalog of links and store the results."
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', help="CSV (link[,target_language,quality]) or .jsonl file")
+        parser.add_argument('--manifest', default=None,
+                            help="Checkpoint manifest (default: <catalog>.manifest.jsonl)")
+        parser.add_argument('--openai-api-key', default=os.environ.get('OPENAI_API_KEY', ''),
+                            help="OpenAI API key (default: $OPENAI_API_KEY)")
+        parser.add_argument('--target-language', default='es', help="Default target language")
+        parser.add_argument('--quality', default='balanced', help="Default quality tier")
+        parser.add_argument('--workers', type=int, default=4, help="Items processed concurrently")
+        parser.add_argument('--limit', action='append', default=[], metavar='STAGE=N',
+                            help="Override a per-stage admission limit, e.g. llm=4 (repeatable)")
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help="Translations written per transaction (default: 50)")
+        parser.add_argument('--include-video', action='store_true',
+                            help="Also download each video track (default: audio only)")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help="Process again the items the manifest records as failed")
+
+    def handle(self, *args, **options):
+        if not options['openai_api_key']:
+            raise CommandError("An OpenAI API key is required (--openai-api-key or $OPENAI_API_KEY)")
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be positive")
+
+        limits = dict(getattr(settings, 'ADMISSION_LIMITS', {}))
+        for override in options['limit']:
+            name, _, value = override.partition('=')
+            if name not in limits or not value.isdigit():
+                raise CommandError(f"--limit must be STAGE=N with STAGE one of: {', '.join(limits)}")
+            limits[name] = int(value)
+
+        try:
+            items = read_catalog(options['catalog'], options['target_language'], options['quality'])
+        except (OSError, InvalidDataException) as e:
+            raise CommandError(str(e))
+        manifest_path = options['manifest'] or f"{options['catalog']}.manifest.jsonl"
+
+        # Stage waits are bounded by each item's deadline rather than the API's short queue timeout
+        with override_settings(ADMISSION_LIMITS=limits, ADMISSION_QUEUE_TIMEOUT=settings.JOB_DEADLINE_SECONDS), \
+                CheckpointManifest(manifest_path) as manifest:
+            reset_limiters()
+            runner = BackfillRunner(
+                openai_api_key=options['openai_api_key'],
+                manifest=manifest,
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                include_video=options['include_video'],
+                retry_failed=options['retry_failed'],
+                on_batch=lambda counts: self.stdout.write(
+                    f"  {counts['done']} saved, {counts['failed']} failed"
+                )
+            )
+            self.stdout.write(f"Backfilling {len(items)} items from {options['catalog']} "
+                              f"({options['workers']} workers, manifest {manifest_path})...")
+            try:
+                summary = runner.run(items)
+            finally:
+                reset_limiters()
+
+        self._report(summary)
+        if summary['failed']:
+            self.stdout.write(self.style.WARNING(
+                f"{summary['failed']} items failed; see {manifest_path} and rerun with --retry-failed."
+            ))
+
+    def _report(self, summary: dict):
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['done']} translated, {summary['failed']} failed, "
+            f"{summary['skipped']} skipped of {summary['total']} in {summary['wall_time']:.1f} s "
+            f"({summary['throughput'] * 3600:.0f} items/h)"
+        ))
+        for stage_name, stats in summary['stages'].items():
+            self.stdout.write(
+                f"    {stage_name:<14} p50 {stats['p50']:8.2f} s  p95 {stats['p95']:8.2f} s  "
+                f"max {stats['max']:8.2f} s"
+            )
@@ -0,0 +1,124 @@
+"""
+Management command: benchmark the pipeline against offline stand-ins.
+
+Usage:
+    python manage.py benchmark_pipeline --concurrency 1,4,8 --jobs 20
+    python manage.py benchmark_pipeline --update-baseline
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from ...benchmarks import PipelineBenchmark, compare_to_baseline
+from ...benchmarks.runner import TARGETS
+from ...fakes import LatencyProfile, offline_services
+
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = "Benchmark the translation pipeline offline and compare it against a stored baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=TARGETS + ('all',), default='all',
+                            help="Entry point to drive (default: all)")
+        parser.add_argument('--jobs', type=int, default=20, help="Jobs per concurrency level")
+        parser.add_argument('--concurrency', default='1,4,8',
+                            help="Comma-separated concurrency levels (default: 1,4,8)")
+        parser.add_argument('--youtube-latency', type=float, default=0.05)
+        parser.add_argument('--transcription-latency', type=float, default=0.2)
+        parser.add_argument('--openai-latency', type=float, default=0.05)
+        parser.add_argument('--jitter', type=float, default=0.0,
+                            help="Jitter in seconds applied to every stand-in")
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help="Failure probability applied to every stand-in (a failed job fails the command)")
+        parser.add_argument('--payload-size', type=int, default=256 * 1024,
+                            help="Media payload size in bytes")
+        parser.add_argument('--transcript-size', type=int, default=2000,
+                            help="Transcript size in characters")
+        parser.add_argument('--fixtures-dir', default=None,
+                            help="Directory with local media fixtures (<video_id>.<ext> or default.<ext>)")
+        parser.add_argument('--seed', type=int, default=1234)
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON file")
+        parser.add_argument('--update-baseline', action='store_true',
+                            help="Store these results as the new baseline instead of comparing")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed relative p95 slowdown before failing (default: 0.25)")
+        parser.add_argument('--output', default=None, help="Also write the raw results to this JSON file")
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError("--concurrency must be a comma-separated list of integers")
+        if not levels or min(levels) < 1:
+            raise CommandError("--concurrency levels must be positive")
+
+        targets = TARGETS if options['target'] == 'all' else (options['target'],)
+        seed = options['seed']
+        profiles = {
+            'youtube': LatencyProfile(options['youtube_latency'], options['jitter'], options['failure_rate'],
+                                      options['payload_size'], seed),
+            'transcription': LatencyProfile(options['transcription_latency'], options['jitter'],
+                                            options['failure_rate'], options['transcript_size'], seed),
+            'openai': LatencyProfile(options['openai_latency'], options['jitter'], options['failure_rate'],
+                                     0, seed),
+        }
+
+        results = {}
+        with tempfile.TemporaryDirectory(prefix='benchmark-media-') as media_root, \
+                override_settings(MEDIA_ROOT=Path(media_root)), \
+                offline_services(fixtures_dir=options['fixtures_dir'], **profiles):
+            for target in targets:
+                self.stdout.write(f"Benchmarking {target} ({options['jobs']} jobs per level)...")
+                benchmark = PipelineBenchmark(target=target, jobs=options['jobs'])
+                results[target] = benchmark.run(levels)
+                self._report(target, results[target])
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+
+        # Failed jobs are logged with their traceback; their timings would skew the comparison
+        failures = [
+            f"{target} @ concurrency {level}: {result['errors']} of {result['jobs']} jobs failed"
+            for target, levels in results.items()
+            for level, result in levels.items()
+            if result['errors']
+        ]
+        if failures:
+            raise CommandError("Benchmark jobs failed:\n  " + "\n  ".join(failures))
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            baseline_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(
+                f"No baseline at {baseline_path}; run with --update-baseline to create one."
+            ))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        regressions = compare_to_baseline(results, baseline, tolerance=options['tolerance'])
+        if regressions:
+            raise CommandError("Performance regressions detected:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline."))
+
+    def _report(self, target: str, levels: dict):
+        for level, result in levels.items():
+            self.stdout.write(
+                f"  concurrency {level}: {result['throughput']:.2f} jobs/s, "
+                f"{result['errors']} errors, wall {result['wall_time']:.2f} s"
+            )
+            for stage_name, summary in result['stages'].items():
+                self.stdout.write(
+                    f"    {stage_name:<14} p50 {summary['p50'] * 1000:8.1f} ms  "
+                    f"p95 {summary['p95'] * 1000:8.1f} ms  p99 {summary['p99'] * 1000:8.1f} ms  "
+                    f"max {summary['max'] * 1000:8.1f} ms"
+                )
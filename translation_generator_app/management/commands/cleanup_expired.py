@@ -0,0 +1,60 @@
+"""
+Management command: delete expired database rows and old objects in a remote media storage.
+
+Usage:
+    python manage.py cleanup_expired
+    python manage.py cleanup_expired --max-age 600
+
+Local files are swept by ``cleanup_media.py``, which runs without Django.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from ...exceptions import StorageException
+from ...models import StageResult, VideoMetadata
+from ...storage import get_storage
+
+
+class Command(BaseCommand):
+    help = "Delete expired stage results and video metadata, and old objects in a remote media storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=300,
+                            help="Age in seconds after which stored media is deleted "
+                                 "(default: 300, like cleanup_media.py)")
+
+    def handle(self, *args, **options):
+        if options['max_age'] < 0:
+            raise CommandError("--max-age must not be negative")
+
+        now = timezone.now()
+        deleted, _ = StageResult.objects.filter(
+            updated_at__lt=now - timedelta(seconds=settings.SINGLE_FLIGHT_RESULT_TTL)
+        ).delete()
+        self.stdout.write(f"Deleted {deleted} expired stage results.")
+
+        deleted, _ = VideoMetadata.objects.filter(
+            Q(available=True, fetched_at__lt=now - timedelta(seconds=settings.METADATA_CACHE_TTL)) |
+            Q(available=False, fetched_at__lt=now - timedelta(seconds=settings.METADATA_CACHE_NEGATIVE_TTL))
+        ).delete()
+        self.stdout.write(f"Deleted {deleted} expired video metadata entries.")
+
+        # Local copies are cleanup_media.py's; only a remote storage has its own
+        storage = get_storage()
+        if not storage.remote:
+            return
+        current_time = time.time()
+        deleted = 0
+        for name, modified in list(storage.list()):
+            if (current_time - modified) > options['max_age']:
+                try:
+                    storage.delete(name)
+                    deleted += 1
+                except StorageException as e:
+                    self.stderr.write(f"Error deleting stored file {name}: {e}")
+        self.stdout.write(f"Deleted {deleted} old stored files.")
@@ -0,0 +1,121 @@
+"""
+Management command: measure the import-time cost of each entry point against a budget.
+
+Usage:
+    python manage.py startup_report
+    python manage.py startup_report --entry-point wsgi --budget wsgi=900 --top 15
+"""
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Code run in a fresh interpreter for each entry point; what a worker,
+# the cron job or the Streamlit script imports before serving anything
+ENTRY_POINTS = {
+    'wsgi': "import ai_translation.wsgi\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns",
+    'asgi': "import ai_translation.asgi\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns",
+    'cron': "import cleanup_media",
+    'streamlit': "import app",
+}
+
+# Budgets in milliseconds of total import time, about twice what each entry
+# point needs today; the SDKs (yt_dlp, assemblyai, openai) are only imported
+# when a job first uses them. The 5-minute cron sweep must not load Django
+DEFAULT_BUDGETS = {
+    'wsgi': 600,
+    'asgi': 600,
+    'cron': 100,
+    'streamlit': 1000,
+}
+
+_IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)')
+
+
+class Command(BaseCommand):
+    help = "Report the import time of each entry point (python -X importtime) and check it against a budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entry-point', choices=tuple(ENTRY_POINTS) + ('all',), default='all',
+                            help="Entry point to measure (default: all)")
+        parser.add_argument('--budget', action='append', default=[], metavar='NAME=MS',
+                            help="Override the budget of an entry point in milliseconds (repeatable)")
+        parser.add_argument('--top', type=int, default=10, help="Slowest packages to list")
+        parser.add_argument('--runs', type=int, default=3,
+                            help="Measurements per entry point; the fastest is kept (default: 3)")
+
+    def handle(self, *args, **options):
+        budgets = dict(DEFAULT_BUDGETS)
+        for override in options['budget']:
+            name, _, value = override.partition('=')
+            if name not in ENTRY_POINTS:
+                raise CommandError(f"Unknown entry point in --budget: {name}")
+            try:
+                budgets[name] = float(value)
+            except ValueError:
+                raise CommandError("--budget must look like NAME=MILLISECONDS")
+        if options['runs'] < 1:
+            raise CommandError("--runs must be positive")
+
+        names = tuple(ENTRY_POINTS) if options['entry_point'] == 'all' else (options['entry_point'],)
+        over_budget = []
+        for name in names:
+            total_ms, imports = min(
+                (self._measure(name) for _ in range(options['runs'])), key=lambda result: result[0]
+            )
+            self._report(name, total_ms, budgets[name], imports, options['top'])
+            if total_ms > budgets[name]:
+                over_budget.append(f"{name}: {total_ms:.0f} ms (budget {budgets[name]:.0f} ms)")
+
+        if over_budget:
+            raise CommandError("Startup budgets exceeded:\n  " + "\n  ".join(over_budget))
+        self.stdout.write(self.style.SUCCESS("All entry points within their startup budget."))
+
+    @staticmethod
+    def _measure(name: str) -> Tuple[float, List[Tuple[str, float]]]:
+        """
+        Import an entry point in a fresh interpreter with ``-X importtime``.
+
+        Args:
+            name: Entry point name (key of ``ENTRY_POINTS``)
+
+        Returns:
+            Tuple of (total import time in ms, [(top-level package, ms)]), the
+            packages sorted by the time spent importing their modules
+
+        Raises:
+            CommandError: If the entry point fails to import
+        """
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', ENTRY_POINTS[name]],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True
+        )
+        if process.returncode != 0:
+            raise CommandError(f"Entry point '{name}' failed to import:\n{process.stderr[-2000:]}")
+
+        total_us = 0
+        packages: Dict[str, float] = {}
+        for line in process.stderr.splitlines():
+            match = _IMPORT_TIME_LINE.match(line)
+            if not match:
+                continue
+            self_us, module = int(match.group(1)), match.group(2)
+            total_us += self_us
+            package = module.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us / 1000
+        return total_us / 1000, sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+    def _report(self, name: str, total_ms: float, budget_ms: float, imports: List[Tuple[str, float]], top: int):
+        style = self.style.SUCCESS if total_ms <= budget_ms else self.style.ERROR
+        self.stdout.write(style(f"{name}: {total_ms:.0f} ms of imports (budget {budget_ms:.0f} ms)"))
+        for package, package_ms in imports[:top]:
+            self.stdout.write(f"  {package_ms:8.1f} ms  {package}")
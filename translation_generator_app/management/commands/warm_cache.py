@@ -0,0 +1,78 @@
+"""
+Management command: keep the cached artifacts of the most requested videos and languages warm.
+
+Usage:
+    python manage.py warm_cache
+    python manage.py warm_cache --top 20 --max-downloads 5 --max-tokens 50000 --dry-run
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from ...warmer import CacheWarmer, WarmBudget
+
+
+class Command(BaseCommand):
+    help = "Refresh the metadata, transcripts and translations of the most requested (video, language) pairs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-hours', type=int, default=None,
+                            help="Request history considered (default: CACHE_WARM_WINDOW_HOURS)")
+        parser.add_argument('--top', type=int, default=None, help="Pairs kept warm (default: CACHE_WARM_TOP)")
+        parser.add_argument('--min-requests', type=int, default=None,
+                            help="Requests for a pair to count as hot (default: CACHE_WARM_MIN_REQUESTS)")
+        parser.add_argument('--max-downloads', type=int, default=settings.CACHE_WARM_MAX_DOWNLOADS,
+                            help="Pipeline runs per invocation (default: CACHE_WARM_MAX_DOWNLOADS)")
+        parser.add_argument('--max-transcription-minutes', type=float,
+                            default=settings.CACHE_WARM_MAX_TRANSCRIPTION_MINUTES,
+                            help="Audio minutes sent to transcription (default: CACHE_WARM_MAX_TRANSCRIPTION_MINUTES)")
+        parser.add_argument('--max-tokens', type=int, default=settings.CACHE_WARM_MAX_TOKENS,
+                            help="Estimated LLM tokens (default: CACHE_WARM_MAX_TOKENS)")
+        parser.add_argument('--quality', default=None, help="Quality tier warmed (default: CACHE_WARM_QUALITY)")
+        parser.add_argument('--openai-api-key', default=None,
+                            help="OpenAI API key (default: CACHE_WARM_OPENAI_API_KEY)")
+        parser.add_argument('--workers', type=int, default=2, help="Pipeline runs in parallel")
+        parser.add_argument('--dry-run', action='store_true', help="Only show the ranking and the plan")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError("--workers must be positive")
+
+        warmer = CacheWarmer(
+            openai_api_key=options['openai_api_key'],
+            quality=options['quality'],
+            window_hours=options['window_hours'],
+            top=options['top'],
+            min_requests=options['min_requests'],
+            workers=options['workers'],
+        )
+        budget = WarmBudget(
+            downloads=options['max_downloads'],
+            transcription_minutes=options['max_transcription_minutes'],
+            tokens=options['max_tokens'],
+        )
+        if not warmer.openai_api_key:
+            self.stdout.write(self.style.WARNING(
+                "No OpenAI API key (CACHE_WARM_OPENAI_API_KEY): only metadata will be refreshed."
+            ))
+
+        # Stage waits are bounded by each run's deadline rather than the API's short queue timeout
+        with override_settings(ADMISSION_QUEUE_TIMEOUT=settings.JOB_DEADLINE_SECONDS):
+            report = warmer.warm(budget, dry_run=options['dry_run'])
+
+        for rank, (item, outcome) in enumerate(report['items'], start=1):
+            self.stdout.write(
+                f"  {rank:>3}. {item.video_id:<14} {item.target_language:<3} "
+                f"{item.requests:>5} requests  {outcome}"
+            )
+        counts, spent = report['counts'], report['spent']
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(report['items'])} hot pairs: {counts['warmed']} warmed, {counts['already_warm']} already warm, "
+            f"{counts['failed']} failed, {counts['over_budget']} over budget, {counts['skipped']} skipped; "
+            f"{counts['metadata_refreshed']} metadata entries refreshed"
+        ))
+        self.stdout.write(
+            f"Budget used: {spent['downloads']}/{budget.downloads} downloads, "
+            f"{spent['transcription_minutes']:.1f}/{budget.transcription_minutes:g} transcription minutes, "
+            f"{spent['tokens']}/{budget.tokens} tokens"
+        )
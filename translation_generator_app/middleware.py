@@ -0,0 +1,24 @@
+"""
+Middleware - Response compression limited to the payloads that benefit from it.
+"""
+from django.middleware.gzip import GZipMiddleware
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Gzip for JSON and text responses (clients sending ``Accept-Encoding: gzip``).
+
+    Transcripts and translations compress several times over. Media files
+    (MP3 downloads) are already compressed and pass through untouched, as
+    do Server-Sent Events: Django's streaming gzip holds small writes in
+    its buffer, which would delay every progress event.
+    """
+
+    COMPRESSIBLE_TYPES = ('application/json', 'text/')
+    UNBUFFERED_TYPES = ('text/event-stream',)
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(self.COMPRESSIBLE_TYPES) or content_type.startswith(self.UNBUFFERED_TYPES):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,35 @@
+# Generated by Django 4.1 on 2026-10-19 14:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translation_generator_app', '0002_stageresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudioRecording',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=64, unique=True)),
+                ('title', models.CharField(max_length=300)),
+                ('transcript', models.TextField()),
+                ('translations', models.JSONField(default=dict)),
+                ('hash_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FingerprintHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.IntegerField(db_index=True)),
+                ('offset', models.IntegerField()),
+                ('recording', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hashes', to='translation_generator_app.audiorecording')),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1 on 2026-10-19 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translation_generator_app', '0003_audiorecording_fingerprinthash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(max_length=64, unique=True)),
+                ('available', models.BooleanField(default=True)),
+                ('title', models.CharField(blank=True, max_length=300)),
+                ('duration', models.IntegerField(blank=True, null=True)),
+                ('formats', models.JSONField(default=list)),
+                ('captions', models.JSONField(default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('fetched_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1 on 2026-10-19 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translation_generator_app', '0004_videometadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationpost',
+            name='target_language',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+        migrations.AlterField(
+            model_name='translationpost',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translation_generator_app', '0005_translationpost_target_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationpost',
+            name='original_transcription',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translation_generator_app', '0006_translationpost_original_transcription'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationpost',
+            name='stage_timeline',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -5,7 +5,63 @@ class translationPost(models.Model):
     youtube_title = models.CharField(max_length=300)
     youtube_link = models.URLField()
     generated_content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Blank on rows saved before these were recorded
+    original_transcription = models.TextField(blank=True, default='')
+    target_language = models.CharField(max_length=8, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # JobTrace.as_dict(): {'started_at', 'seconds', 'stages': [{'name', 'parent', 'start', 'end', 'bytes', 'tokens'}]}
+    stage_timeline = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return self.youtube_title
+
+
+class StageResult(models.Model):
+    """Short-lived result of a pipeline stage, shared between concurrent identical jobs."""
+    key = models.CharField(max_length=255, unique=True)
+    payload = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+
+class AudioRecording(models.Model):
+    """Fingerprinted audio of a processed video, with its transcript and translations."""
+    video_id = models.CharField(max_length=64, unique=True)
+    title = models.CharField(max_length=300)
+    transcript = models.TextField()
+    # "<target_language>:<quality>" -> {'original': ..., 'translated': ...}
+    translations = models.JSONField(default=dict)
+    hash_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.title
+
+
+class FingerprintHash(models.Model):
+    """Inverted index entry: a spectral peak pair hash found at ``offset`` (frames) in a recording."""
+    hash = models.IntegerField(db_index=True)
+    recording = models.ForeignKey(AudioRecording, on_delete=models.CASCADE, related_name='hashes')
+    offset = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.hash} @ {self.offset}"
+
+
+class VideoMetadata(models.Model):
+    """Cached yt-dlp metadata of a video; ``available=False`` records a private or removed video."""
+    video_id = models.CharField(max_length=64, unique=True)
+    available = models.BooleanField(default=True)
+    title = models.CharField(max_length=300, blank=True)
+    duration = models.IntegerField(null=True, blank=True)
+    # [{'format_id', 'ext', 'acodec', 'vcodec', 'height', 'abr', 'filesize'}]
+    formats = models.JSONField(default=list)
+    # {'subtitles': [language, ...], 'automatic': [language, ...]}
+    captions = models.JSONField(default=dict)
+    error = models.TextField(blank=True)
+    fetched_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.title or self.video_id
@@ -0,0 +1,281 @@
+"""
+Profiling - Opt-in sampling profiler for individual processing jobs.
+"""
+import contextlib
+import hmac
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Request header carrying settings.PROFILING_TOKEN to profile that request's job
+PROFILE_HEADER = 'X-Profile-Token'
+
+# Context-manager plumbing skipped when looking for the frame that entered a stage
+_PLUMBING_MODULES = {__name__, f"{__package__}.instrumentation"}
+
+
+def _os_thread_primitives():
+    """
+    Thread functions that act on real OS threads, even when gevent has patched the stdlib.
+
+    Returns:
+        Tuple of (start_new_thread, allocate_lock, get_ident, sleep)
+    """
+    if 'gevent.monkey' in sys.modules:
+        from gevent import monkey
+        start_new_thread, allocate_lock, get_ident = monkey.get_original(
+            '_thread', ['start_new_thread', 'allocate_lock', 'get_ident']
+        )
+        return start_new_thread, allocate_lock, get_ident, monkey.get_original('time', 'sleep')
+    import _thread
+    return _thread.start_new_thread, _thread.allocate_lock, _thread.get_ident, time.sleep
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of one job's threads and aggregates them as collapsed stacks.
+
+    A background OS thread reads ``sys._current_frames()`` every
+    ``PROFILING_INTERVAL`` seconds; nothing is hooked into the profiled
+    code, which runs at full speed between samples. Only stacks that pass
+    through a frame the job entered (``profile_job()`` and every
+    ``stage()``/``span()`` run while profiling) are kept, so other requests
+    served by the same thread (gevent greenlets, the asyncio event loop)
+    are left out, and each stage shows up in the stack as a ``[name]``
+    frame under the function that entered it.
+
+    Each sample is weighted by the CPU time its thread used since the
+    previous sample (microseconds, from the thread's CPU clock), so time
+    spent waiting on the network or on ffmpeg does not count; where the
+    platform has no per-thread CPU clock every sample weighs one interval.
+    ``write()`` produces the ``frame;frame;frame weight`` lines read by
+    flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval: Seconds between samples (default: settings.PROFILING_INTERVAL)
+        """
+        self.interval = interval or getattr(settings, 'PROFILING_INTERVAL', 0.01)
+        self.samples: Counter = Counter()
+        self._start_thread, allocate_lock, self._get_ident, self._sleep = _os_thread_primitives()
+        self._lock = allocate_lock()
+        self._finished = allocate_lock()
+        self._running = False
+        # OS thread ID -> {id(frame): (frame, labels entered in that frame, None for no label)}
+        self._marks: Dict[int, Dict[int, Tuple[object, List[Optional[str]]]]] = {}
+        self._cpu_clocks: Dict[int, Tuple[int, float]] = {}
+        self._names: Dict[object, str] = {}
+
+    def start(self):
+        """Start sampling in a background OS thread."""
+        self._running = True
+        self._finished.acquire()
+        self._start_thread(self._run, ())
+
+    def stop(self):
+        """Stop sampling and wait for the sampling thread to exit."""
+        if self._running:
+            self._running = False
+            self._finished.acquire()
+            self._finished.release()
+
+    def enter(self, label: Optional[str] = None) -> Tuple[int, object, Optional[str]]:
+        """
+        Include the calling frame's stack in the profile until ``exit()``.
+
+        Args:
+            label: Stage name shown as a ``[label]`` frame below the caller (None for none)
+
+        Returns:
+            Mark to pass to ``exit()``
+        """
+        frame = sys._getframe(1)
+        while frame.f_code.co_filename == contextlib.__file__ or frame.f_globals.get('__name__') in _PLUMBING_MODULES:
+            frame = frame.f_back
+        thread = self._get_ident()
+        with self._lock:
+            _, labels = self._marks.setdefault(thread, {}).setdefault(id(frame), (frame, []))
+            labels.append(label)
+        return thread, frame, label
+
+    def exit(self, mark: Tuple[int, object, Optional[str]]):
+        """
+        Undo an ``enter()``.
+
+        Args:
+            mark: Value returned by ``enter()``
+        """
+        thread, frame, label = mark
+        with self._lock:
+            thread_marks = self._marks.get(thread, {})
+            _, labels = thread_marks.get(id(frame), (None, []))
+            if label in labels:
+                del labels[len(labels) - 1 - labels[::-1].index(label)]
+            if not labels:
+                thread_marks.pop(id(frame), None)
+
+    def _run(self):
+        """Sampling loop of the background thread."""
+        try:
+            while self._running:
+                self._sleep(self.interval)
+                self._sample()
+        except Exception:
+            logger.exception("Profiler sampling failed")
+        finally:
+            self._finished.release()
+
+    def _sample(self):
+        """Add the current stack of every thread the job runs in."""
+        frames = sys._current_frames()
+        with self._lock:
+            marks = {thread: dict(thread_marks) for thread, thread_marks in self._marks.items() if thread_marks}
+        # A thread that left the job (e.g. back in a pool) starts its CPU clock over when it returns
+        for thread in self._cpu_clocks.keys() - marks.keys():
+            del self._cpu_clocks[thread]
+
+        for thread, thread_marks in marks.items():
+            frame = frames.get(thread)
+            weight = self._cpu_weight(thread)
+            if frame is None or not weight:
+                continue
+            # Walked from the innermost frame out; cut above the outermost marked frame
+            stack, kept = [], 0
+            while frame is not None:
+                marked = thread_marks.get(id(frame))
+                if marked is not None:
+                    stack.extend(f"[{label}]" for label in reversed(marked[1]) if label is not None)
+                stack.append(self._frame_name(frame))
+                if marked is not None:
+                    kept = len(stack)
+                frame = frame.f_back
+            if kept:
+                self.samples[';'.join(reversed(stack[:kept]))] += weight
+
+    def _cpu_weight(self, thread: int) -> int:
+        """Microseconds of CPU the thread used since its last sample (one interval without a CPU clock)."""
+        if not hasattr(time, 'pthread_getcpuclockid'):
+            return int(self.interval * 1e6)
+        try:
+            previous = self._cpu_clocks.get(thread)
+            clock = previous[0] if previous else time.pthread_getcpuclockid(thread)
+            used = time.clock_gettime(clock)
+        except OSError:
+            # The thread has exited
+            return 0
+        self._cpu_clocks[thread] = (clock, used)
+        return int((used - previous[1]) * 1e6) if previous else 0
+
+    def _frame_name(self, frame) -> str:
+        """``module:qualified.name`` of a frame's function, cached per code object."""
+        name = self._names.get(frame.f_code)
+        if name is None:
+            code = frame.f_code
+            module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+            name = self._names[code] = f"{module}:{getattr(code, 'co_qualname', code.co_name)}".replace(';', ',')
+        return name
+
+    def write(self, label: str, directory: Optional[str] = None) -> Optional[Path]:
+        """
+        Write the samples as collapsed stacks and apply the retention limit.
+
+        Args:
+            label: Identifies the job in the file name (e.g. 'view-dQw4w9WgXcQ')
+            directory: Output directory (default: settings.PROFILING_DIR)
+
+        Returns:
+            Path of the written file, or None if nothing was sampled
+        """
+        if not self.samples:
+            return None
+        directory = Path(directory or settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+        path = directory / f"{time.strftime('%Y%m%dT%H%M%S')}-{safe_label}-{os.getpid()}.collapsed"
+        path.write_text(''.join(f"{stack} {weight}\n" for stack, weight in sorted(self.samples.items())))
+
+        profiles = sorted(directory.glob('*.collapsed'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in profiles[getattr(settings, 'PROFILING_MAX_FILES', 100):]:
+            old.unlink(missing_ok=True)
+        return path
+
+
+_current_profiler: ContextVar[Optional[SamplingProfiler]] = ContextVar('current_profiler', default=None)
+
+
+def current_profiler() -> Optional[SamplingProfiler]:
+    """Return the profiler of the job running in the current context, if any."""
+    return _current_profiler.get()
+
+
+def profiling_requested(request=None) -> bool:
+    """
+    Decide whether to profile a job.
+
+    A request is profiled when it carries ``X-Profile-Token`` equal to
+    ``PROFILING_TOKEN`` (a secret given to admins only); any job is also
+    profiled with probability ``PROFILING_SAMPLE_RATE``.
+
+    Args:
+        request: Django HTTP request that started the job, if any
+
+    Returns:
+        True if the job should run under ``profile_job()``
+    """
+    token = getattr(settings, 'PROFILING_TOKEN', '')
+    if token and request is not None:
+        sent = request.headers.get(PROFILE_HEADER, '')
+        if sent and hmac.compare_digest(sent.encode(), token.encode()):
+            return True
+    rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def profile_job(label: str, enabled: bool = True) -> Iterator[Optional[SamplingProfiler]]:
+    """
+    Profile the block and the stages it runs, writing a collapsed-stack file when it ends.
+
+    Args:
+        label: Identifies the job in the profile's file name
+        enabled: False runs the block untouched (no sampling thread, no marks)
+
+    Yields:
+        The active SamplingProfiler, or None when disabled
+    """
+    if not enabled:
+        yield None
+        return
+
+    profiler = SamplingProfiler()
+    mark = profiler.enter()
+    token = _current_profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.exit(mark)
+        _current_profiler.reset(token)
+        profiler.stop()
+        try:
+            path = profiler.write(label)
+        except OSError as e:
+            logger.warning(f"Could not write profile of {label}: {e}")
+        else:
+            if path:
+                logger.info(f"Wrote profile of {label} to {path}")
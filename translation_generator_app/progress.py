@@ -0,0 +1,121 @@
+"""
+Progress - Live progress events of a running job (stages, bytes and throughput).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+
+class ProgressReporter:
+    """
+    Turn stage transitions and byte counts into progress events for one job.
+
+    Events are plain dictionaries handed to ``callback``:
+
+    - ``{'type': 'stage', 'stage': 'video_download', 'status': 'started'}``
+    - ``{'type': 'stage', 'stage': 'video_download', 'status': 'finished', 'seconds': 1.2}``
+    - ``{'type': 'progress', 'stage': 'download', 'percent': 42.0, 'bytes': ...,
+      'total_bytes': ..., 'bytes_per_second': ..., 'eta': ...}``
+
+    Byte updates of a stage are throttled to one event per ``MIN_INTERVAL``
+    seconds (plus the final one), so hooks called for every network read
+    cost a clock read and a comparison. The callback may be invoked from
+    the job's worker threads and must be thread-safe.
+    """
+
+    MIN_INTERVAL = 0.25
+
+    def __init__(self, callback: Callable[[dict], None]):
+        """
+        Initialize the reporter.
+
+        Args:
+            callback: Receives each event (e.g. ``queue.Queue.put``)
+        """
+        self.callback = callback
+        self._last_update: Dict[str, float] = {}
+        self._stage_start: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def stage_started(self, name: str):
+        """Report that a pipeline stage started."""
+        with self._lock:
+            self._last_update.pop(name, None)
+            self._stage_start.pop(name, None)
+        self.callback({'type': 'stage', 'stage': name, 'status': 'started'})
+
+    def stage_finished(self, name: str, seconds: float):
+        """Report that a pipeline stage finished after ``seconds``."""
+        self.callback({'type': 'stage', 'stage': name, 'status': 'finished', 'seconds': round(seconds, 3)})
+
+    def update(self, stage: str, done_bytes: int, total_bytes: Optional[int] = None,
+               bytes_per_second: Optional[float] = None, eta: Optional[float] = None):
+        """
+        Report bytes processed by a stage.
+
+        Args:
+            stage: Stage name (e.g. 'download', 'audio')
+            done_bytes: Bytes processed so far
+            total_bytes: Expected total, if known
+            bytes_per_second: Current throughput (derived from the stage start when omitted)
+            eta: Seconds left, if known
+        """
+        now = time.monotonic()
+        finished = bool(total_bytes) and done_bytes >= total_bytes
+        with self._lock:
+            start = self._stage_start.setdefault(stage, now)
+            if not finished and now - self._last_update.get(stage, 0.0) < self.MIN_INTERVAL:
+                return
+            self._last_update[stage] = now
+
+        if bytes_per_second is None and now > start:
+            bytes_per_second = done_bytes / (now - start)
+        self.callback({
+            'type': 'progress',
+            'stage': stage,
+            'percent': round(100.0 * done_bytes / total_bytes, 1) if total_bytes else None,
+            'bytes': done_bytes,
+            'total_bytes': total_bytes,
+            'bytes_per_second': round(bytes_per_second) if bytes_per_second else None,
+            'eta': eta,
+        })
+
+    def ytdlp_hook(self, status: dict):
+        """yt-dlp ``progress_hooks`` entry reporting download progress."""
+        if status.get('status') in ('downloading', 'finished'):
+            self.update(
+                'download',
+                status.get('downloaded_bytes') or 0,
+                status.get('total_bytes') or status.get('total_bytes_estimate'),
+                status.get('speed'),
+                status.get('eta')
+            )
+
+
+_current_progress: ContextVar[Optional[ProgressReporter]] = ContextVar('current_progress', default=None)
+
+
+def current_progress() -> Optional[ProgressReporter]:
+    """Return the progress reporter of the job running in the current context, if any."""
+    return _current_progress.get()
+
+
+@contextmanager
+def track_progress(callback: Callable[[dict], None]) -> Iterator[ProgressReporter]:
+    """
+    Report the progress of the code run inside the block to ``callback``.
+
+    Args:
+        callback: Receives each progress event
+
+    Yields:
+        The active ProgressReporter
+    """
+    reporter = ProgressReporter(callback)
+    token = _current_progress.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _current_progress.reset(token)
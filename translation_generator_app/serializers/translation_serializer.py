@@ -15,6 +15,8 @@ class TranslationRequestValidator:
     
     SUPPORTED_LANGUAGES = ['es', 'en', 'fr', 'de', 'it', 'pt', 'ru', 'ja', 'ko', 'zh', 'ar']
     
+    SUPPORTED_QUALITY_TIERS = ['fast', 'balanced', 'best']
+    
     @staticmethod
     def validate(data: Dict[str, Any]) -> Dict[str, str]:
         """
@@ -24,7 +26,7 @@ class TranslationRequestValidator:
             data: Request data dictionary
             
         Returns:
-            Dictionary with validated 'link', 'openai_api_key', and optionally 'target_language'
+            Dictionary with validated 'link', 'openai_api_key', 'target_language' and 'quality'
             
         Raises:
             InvalidDataException: If validation fails
@@ -39,6 +41,7 @@ class TranslationRequestValidator:
         link = data['link']
         api_key = data['openai_api_key']
         target_language = data.get('target_language', 'es')  # Default to Spanish
+        quality = data.get('quality', 'balanced')
         
         # Validate link format
         if not isinstance(link, str) or not link.strip():
@@ -66,8 +69,20 @@ class TranslationRequestValidator:
                 f"Supported languages: {', '.join(TranslationRequestValidator.SUPPORTED_LANGUAGES)}"
             )
         
+        # Validate quality tier (optional)
+        if not isinstance(quality, str):
+            raise InvalidDataException("Field 'quality' must be a string")
+        
+        quality = quality.strip().lower()
+        if quality not in TranslationRequestValidator.SUPPORTED_QUALITY_TIERS:
+            raise InvalidDataException(
+                f"Unsupported quality tier: '{quality}'. "
+                f"Supported tiers: {', '.join(TranslationRequestValidator.SUPPORTED_QUALITY_TIERS)}"
+            )
+        
         return {
             'link': link.strip(),
             'openai_api_key': api_key.strip(),
-            'target_language': target_language
+            'target_language': target_language,
+            'quality': quality
         } 
\ No newline at end of file
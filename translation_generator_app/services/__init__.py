@@ -1,9 +1,32 @@
 from .youtube_service import YouTubeService
 from .transcription_service import TranscriptionService
+from .transcription_poller import TranscriptionPoller
 from .translation_service import TranslationService
+from .rate_limit_scheduler import RateLimitScheduler
+from .single_flight import SingleFlight
+from .metadata_cache import MetadataCache
+from .fingerprint_service import FingerprintService
+from .audio_transcoder import AudioTranscoder
+from .audio_segmenter import AudioSegmenter
+from .async_youtube_service import AsyncYouTubeService
+from .async_transcription_service import AsyncTranscriptionService
+from .async_translation_service import AsyncTranslationService
+from .pipeline import aprocess_video, process_video
 
 __all__ = [
     'YouTubeService',
     'TranscriptionService',
+    'TranscriptionPoller',
     'TranslationService',
+    'RateLimitScheduler',
+    'SingleFlight',
+    'MetadataCache',
+    'FingerprintService',
+    'AudioTranscoder',
+    'AudioSegmenter',
+    'AsyncYouTubeService',
+    'AsyncTranscriptionService',
+    'AsyncTranslationService',
+    'process_video',
+    'aprocess_video',
 ] 
\ No newline at end of file
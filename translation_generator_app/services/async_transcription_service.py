@@ -0,0 +1,272 @@
+"""
+Async Transcription Service - AssemblyAI transcription over an async HTTP client.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import AsyncIterable, AsyncIterator
+
+from django.conf import settings
+
+from ..admission import limiter
+from ..deadline import current_deadline
+from ..exceptions import (
+    TranscriptionException, YouTubeDownloadException, DeadlineExceededException, OverloadedException
+)
+from ..instrumentation import count_stage, span
+from ..lazy import LazyModule
+from ..workspace import artifact_workspace
+from .audio_segmenter import AudioSegmenter
+from .transcription_service import TranscriptionService, aai
+
+logger = logging.getLogger(__name__)
+
+httpx = LazyModule('httpx')
+
+
+class AsyncTranscriptionService:
+    """
+    Coroutine version of ``TranscriptionService`` for the ASGI request path.
+
+    Talks to the AssemblyAI v2 REST API with ``httpx.AsyncClient`` (the
+    SDK is synchronous). Each pending transcript is polled by its own
+    coroutine with exponential backoff between
+    ``TRANSCRIPTION_POLL_MIN_INTERVAL`` and ``TRANSCRIPTION_POLL_MAX_INTERVAL``,
+    which costs one sleeping task per job rather than a worker.
+    """
+
+    # Upper bound for a single HTTP request (seconds)
+    _REQUEST_TIMEOUT = 60
+
+    def __init__(self, api_key: str):
+        """
+        Initialize the async transcription service.
+
+        Args:
+            api_key: AssemblyAI API key
+        """
+        self.api_key = api_key
+
+    def _client(self) -> 'httpx.AsyncClient':
+        return httpx.AsyncClient(
+            base_url=aai.settings.base_url,
+            headers={'authorization': self.api_key},
+            timeout=self._timeout()
+        )
+
+    def _timeout(self) -> float:
+        deadline = current_deadline()
+        return deadline.timeout(self._REQUEST_TIMEOUT) if deadline else self._REQUEST_TIMEOUT
+
+    async def transcribe_audio(self, audio_file: str, title: str) -> str:
+        """
+        Transcribe an audio file or URL using AssemblyAI.
+
+        Long local files are split at silences and their segments
+        transcribed concurrently, as in ``TranscriptionService``.
+
+        Args:
+            audio_file: Path to audio file, or URL AssemblyAI can fetch
+            title: Title for saving transcription
+
+        Returns:
+            Transcribed text
+
+        Raises:
+            TranscriptionException: If transcription fails
+            DeadlineExceededException: If the job deadline passes first
+            OverloadedException: If no transcription slot frees up in time
+        """
+        try:
+            if os.path.isfile(audio_file) and AudioSegmenter().may_apply_to(audio_file):
+                text = await self._transcribe_segmented(audio_file)
+            else:
+                text = await self._transcribe(audio_file)
+        except (TranscriptionException, DeadlineExceededException, OverloadedException):
+            raise
+        except Exception as e:
+            self._raise_if_deadline_exceeded('transcription')
+            raise TranscriptionException(f"Transcription failed: {str(e)}")
+
+        await asyncio.to_thread(TranscriptionService._save_transcription, text, title)
+        return text
+
+    async def _transcribe(self, audio_file: str) -> str:
+        """Transcribe one file or URL in a transcription slot and return its text."""
+        async with limiter('transcription').aslot():
+            return await self._run_transcript(audio_file)
+
+    async def _run_transcript(self, audio_file: str) -> str:
+        """Upload (if local) and transcribe one file or URL; the caller holds the transcription slot."""
+        async with self._client() as client:
+            if audio_file.startswith(('http://', 'https://')):
+                audio_url = audio_file
+            else:
+                audio_url = await self._upload(client, self._read_file(audio_file))
+            return await self._transcribe_url(client, audio_url)
+
+    async def _transcribe_segmented(self, audio_file: str) -> str:
+        """
+        Transcribe a local file, split at silences first if it is long.
+
+        Segments run concurrently (as many at a time as the sync service's
+        thread pool) under one transcription slot for the whole job.
+        """
+        with artifact_workspace() as workspace:
+            directory = tempfile.mkdtemp(prefix='segments-', dir=workspace.path)
+            try:
+                try:
+                    with span('segmentation'):
+                        segments = await asyncio.to_thread(AudioSegmenter().split, audio_file, directory)
+                except (RuntimeError, OSError, subprocess.SubprocessError) as e:
+                    # Splitting is an optimization; the whole file can still be transcribed
+                    logger.warning(f"Could not split {os.path.basename(audio_file)}: {str(e)}")
+                    segments = []
+                if len(segments) <= 1:
+                    return await self._transcribe(audio_file)
+                workers = asyncio.Semaphore(
+                    min(len(segments), getattr(settings, 'ADMISSION_LIMITS', {}).get('transcription') or len(segments))
+                )
+                async with limiter('transcription').aslot():
+                    texts = await asyncio.gather(
+                        *(self._transcribe_segment(segment.path, workers) for segment in segments)
+                    )
+                logger.info(f"Transcribed {len(segments)} segments of {os.path.basename(audio_file)}")
+                return '\n'.join(text.strip() for text in texts if text.strip())
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    async def _transcribe_segment(self, segment_file: str, workers: asyncio.Semaphore) -> str:
+        """Transcribe one segment of a split recording once one of the job's ``workers`` is free."""
+        async with workers:
+            with span('segment'):
+                count_stage(bytes=os.path.getsize(segment_file))
+                return await self._run_transcript(segment_file)
+
+    async def transcribe_stream(self, chunks: AsyncIterable[bytes], title: str) -> str:
+        """
+        Upload audio to AssemblyAI as it is produced, then transcribe it.
+
+        Args:
+            chunks: Async iterable of audio bytes (e.g. from AsyncYouTubeService.stream_audio)
+            title: Title for saving transcription
+
+        Returns:
+            Transcribed text
+
+        Raises:
+            YouTubeDownloadException: If producing the audio fails
+            TranscriptionException: If upload or transcription fails
+            DeadlineExceededException: If the job deadline passes first
+        """
+        return await self.transcribe_audio(await self.upload_stream(chunks), title)
+
+    async def upload_stream(self, chunks: AsyncIterable[bytes]) -> str:
+        """
+        Upload audio to AssemblyAI as it is produced, without transcribing it.
+
+        Args:
+            chunks: Async iterable of audio bytes (e.g. from AsyncYouTubeService.stream_audio)
+
+        Returns:
+            URL of the uploaded audio, accepted by ``transcribe_audio``
+
+        Raises:
+            YouTubeDownloadException: If producing the audio fails
+            TranscriptionException: If the upload fails
+            DeadlineExceededException: If the job deadline passes first
+            OverloadedException: If no transcription or ffmpeg slot frees up in time
+        """
+        uploaded = 0
+
+        async def counted():
+            nonlocal uploaded
+            async for chunk in chunks:
+                uploaded += len(chunk)
+                yield chunk
+
+        try:
+            async with limiter('transcription').aslot(), self._client() as client:
+                upload_url = await self._upload(client, counted())
+                count_stage(bytes=uploaded)
+                return upload_url
+        except (YouTubeDownloadException, TranscriptionException, DeadlineExceededException, OverloadedException):
+            raise
+        except Exception as e:
+            self._raise_if_deadline_exceeded('audio upload')
+            raise TranscriptionException(f"Audio upload failed: {str(e)}")
+
+    async def _upload(self, client: 'httpx.AsyncClient', chunks: AsyncIterable[bytes]) -> str:
+        """Upload audio with chunked transfer encoding and return its URL."""
+        response = await client.post('/v2/upload', content=chunks)
+        if response.status_code != httpx.codes.OK:
+            raise TranscriptionException(f"Audio upload failed: {self._error_message(response)}")
+        return response.json()['upload_url']
+
+    async def _transcribe_url(self, client: 'httpx.AsyncClient', audio_url: str) -> str:
+        """Submit a transcript for ``audio_url`` and poll until it finishes."""
+        response = await client.post('/v2/transcript', json=self._transcript_request(audio_url))
+        if response.status_code != httpx.codes.OK:
+            raise TranscriptionException(f"Transcription failed: {self._error_message(response)}")
+
+        transcript = response.json()
+        interval = getattr(settings, 'TRANSCRIPTION_POLL_MIN_INTERVAL', 1.0)
+        max_interval = getattr(settings, 'TRANSCRIPTION_POLL_MAX_INTERVAL', 15.0)
+        deadline = current_deadline()
+        while transcript['status'] in ('queued', 'processing'):
+            if deadline:
+                if deadline.remaining() <= 0:
+                    raise deadline.exceeded('transcription')
+                interval = min(interval, deadline.remaining())
+            await asyncio.sleep(interval)
+            interval = min(interval * 1.5, max_interval)
+
+            response = await client.get(f"/v2/transcript/{transcript['id']}", timeout=self._timeout())
+            if response.status_code != httpx.codes.OK:
+                raise TranscriptionException(f"Transcription failed: {self._error_message(response)}")
+            transcript = response.json()
+
+        if transcript['status'] == 'error':
+            raise TranscriptionException(f"Transcription failed: {transcript.get('error')}")
+        if not transcript.get('text'):
+            raise TranscriptionException("Transcription returned empty result.")
+        return transcript['text']
+
+    @staticmethod
+    def _transcript_request(audio_url: str) -> dict:
+        """Build the transcript request body, registering the webhook if one is configured."""
+        request = {'audio_url': audio_url}
+        webhook_url = getattr(settings, 'ASSEMBLYAI_WEBHOOK_URL', '')
+        if webhook_url:
+            request['webhook_url'] = webhook_url
+            secret = getattr(settings, 'ASSEMBLYAI_WEBHOOK_SECRET', '')
+            if secret:
+                request['webhook_auth_header_name'] = 'X-Webhook-Secret'
+                request['webhook_auth_header_value'] = secret
+        return request
+
+    @staticmethod
+    async def _read_file(path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """Read a local file in chunks without blocking the event loop."""
+        with open(path, 'rb') as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    @staticmethod
+    def _error_message(response: 'httpx.Response') -> str:
+        try:
+            return response.json().get('error') or response.text
+        except ValueError:
+            return response.text or str(response.status_code)
+
+    @staticmethod
+    def _raise_if_deadline_exceeded(stage: str):
+        deadline = current_deadline()
+        if deadline and deadline.expired:
+            raise deadline.exceeded(stage)
@@ -0,0 +1,337 @@
+"""
+Async Translation Service - Text formatting and translation with AsyncOpenAI.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from ..admission import limiter
+from ..deadline import current_deadline
+from ..exceptions import TranslationException, DeadlineExceededException, OverloadedException
+from ..instrumentation import count_stage, span
+from .translation_service import TranslationService, openai
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTranslationService(TranslationService):
+    """
+    Coroutine version of ``TranslationService`` for the ASGI request path.
+
+    Prompts, model routing, quality tiers and the latency window used for
+    hedging are shared with ``TranslationService``; requests go through
+    ``AsyncOpenAI`` so many jobs can wait on the API from one event loop.
+    """
+
+    def __init__(self, api_key: str, quality: str = TranslationService.DEFAULT_QUALITY):
+        """
+        Initialize the async translation service.
+
+        Args:
+            api_key: OpenAI API key
+            quality: Latency/quality tier ('fast', 'balanced' or 'best')
+
+        Raises:
+            TranslationException: If the quality tier is unknown
+        """
+        super().__init__(api_key, quality)
+        self.client = openai.AsyncOpenAI(api_key=api_key)
+
+    async def __aenter__(self) -> 'AsyncTranslationService':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the HTTP connections of the OpenAI client."""
+        await self.client.close()
+
+    async def _alist_available_models(self) -> List[str]:
+        """
+        List the model IDs available to this API key (fetched once per service).
+
+        Returns:
+            List of available model IDs
+
+        Raises:
+            TranslationException: If the model list cannot be retrieved
+        """
+        if self._available_models is None:
+            try:
+                deadline = current_deadline()
+                options = {'timeout': deadline.remaining()} if deadline else {}
+                page = await self.client.models.list(**options)
+                self._available_models = [model.id for model in page.data]
+            except Exception as e:
+                raise TranslationException(f"Failed to get available models: {str(e)}")
+        return self._available_models
+
+    async def _aget_model_for_task(self, task: str) -> str:
+        """
+        Pick the model for a task, loading the model list without blocking.
+
+        Args:
+            task: Task name ('detection', 'formatting' or 'translation')
+
+        Returns:
+            Selected model name
+
+        Raises:
+            TranslationException: If no suitable model is found
+        """
+        await self._alist_available_models()
+        return self._get_model_for_task(task)
+
+    async def _create_completion(self, task: str, **kwargs):
+        """
+        Create a chat completion within the job deadline, hedging slow calls.
+
+        Same policy as ``TranslationService._create_completion``; the losing
+        request of a hedged pair is cancelled instead of left running.
+
+        Args:
+            task: Task name ('detection', 'formatting', 'translation' or 'combined')
+            **kwargs: Arguments for ``chat.completions.create``
+
+        Returns:
+            Chat completion response
+
+        Raises:
+            DeadlineExceededException: If the job deadline passes first
+        """
+        deadline = current_deadline()
+        if deadline:
+            deadline.check(task)
+
+        attempts = self.client.max_retries + 1
+        try:
+            with span(self.TASK_SPANS.get(task, task)):
+                for attempt in range(attempts):
+                    try:
+                        response = await self._hedged_completion(task, kwargs, deadline)
+                        count_stage(tokens=self._total_tokens(response))
+                        return response
+                    except self._retryable_errors():
+                        backoff = 0.5 * 2 ** attempt
+                        if attempt + 1 == attempts or (deadline and deadline.remaining() <= backoff):
+                            raise
+                        await asyncio.sleep(backoff)
+        except Exception:
+            if deadline and deadline.expired:
+                raise deadline.exceeded(task)
+            raise
+
+    async def _hedged_completion(self, task: str, kwargs: dict, deadline):
+        """Send one completion request, plus a duplicate if it is slower than usual."""
+        if deadline:
+            kwargs = dict(kwargs, timeout=deadline.remaining())
+        hedge_delay = self._hedge_delay(kwargs['model'], task)
+        if hedge_delay is None or (deadline and deadline.remaining() <= hedge_delay):
+            return await self._timed_completion(task, kwargs)
+
+        primary = asyncio.ensure_future(self._timed_completion(task, kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        logger.info(f"Hedging slow {task} request to {kwargs['model']} after {hedge_delay:.2f}s")
+        if deadline:
+            kwargs = dict(kwargs, timeout=deadline.remaining())
+        pending = {primary, asyncio.ensure_future(self._timed_completion(task, kwargs))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def _timed_completion(self, task: str, kwargs: dict):
+        """Run one completion request, paced by the key's rate limits, and record its latency."""
+        # Errors are retried by _create_completion, 429s below with the scheduler's backoff
+        client = self.client.with_options(max_retries=0)
+        tokens = self.scheduler.estimate_tokens(kwargs)
+        expires = time.monotonic() + kwargs['timeout'] if 'timeout' in kwargs else None
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._pacing_delay(task, tokens, expires))
+            request = dict(kwargs, timeout=expires - time.monotonic()) if expires else kwargs
+            start = time.monotonic()
+            try:
+                raw = await client.chat.completions.with_raw_response.create(**request)
+            except openai.RateLimitError as e:
+                if not self.scheduler.should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self._rate_limit_backoff(task, e, attempt, expires))
+                attempt += 1
+                continue
+            self.scheduler.observe(raw.headers)
+            self._record_latency(kwargs['model'], task, time.monotonic() - start)
+            return raw.parse()
+
+    async def detect_language(self, text: str) -> str:
+        """
+        Detect the language of the given text.
+
+        Args:
+            text: Text to analyze
+
+        Returns:
+            Language code ('es' for Spanish, 'en' for English, etc.)
+
+        Raises:
+            TranslationException: If language detection fails
+            DeadlineExceededException: If the job deadline passes
+        """
+        try:
+            model = await self._aget_model_for_task('detection')
+            response = await self._create_completion('detection', model=model, **self._detection_request(text))
+            return response.choices[0].message.content.strip().lower()
+        except DeadlineExceededException:
+            raise
+        except Exception as e:
+            raise TranslationException(f"Language detection failed: {str(e)}")
+
+    async def format_text_as_verses(self, text: str) -> str:
+        """
+        Format text into song verses without changing language.
+
+        Args:
+            text: Original text
+
+        Returns:
+            Formatted text
+
+        Raises:
+            TranslationException: If formatting fails
+            DeadlineExceededException: If the job deadline passes
+        """
+        try:
+            model = await self._aget_model_for_task('formatting')
+            response = await self._create_completion('formatting', model=model, **self._formatting_request(text))
+            return response.choices[0].message.content.strip()
+        except (TranslationException, DeadlineExceededException):
+            raise
+        except Exception as e:
+            raise TranslationException(f"Text formatting failed: {str(e)}")
+
+    async def translate_text(self, text: str, target_language: str = 'es') -> str:
+        """
+        Translate text to the specified language and format as song verses.
+
+        Args:
+            text: Original text
+            target_language: Target language code (e.g., 'es', 'fr', 'de')
+
+        Returns:
+            Translated and formatted text
+
+        Raises:
+            TranslationException: If translation fails
+            DeadlineExceededException: If the job deadline passes
+        """
+        try:
+            request = self._translation_request(text, target_language)
+            model = await self._aget_model_for_task('translation')
+            response = await self._create_completion('translation', model=model, **request)
+            return response.choices[0].message.content.strip()
+        except (TranslationException, DeadlineExceededException):
+            raise
+        except Exception as e:
+            raise TranslationException(f"Translation failed: {str(e)}")
+
+    async def translate_to_spanish(self, text: str) -> str:
+        """
+        Translate text to Spanish and format as song verses.
+        (Deprecated: Use translate_text with target_language='es' instead)
+        """
+        return await self.translate_text(text, target_language='es')
+
+    async def _process_combined(self, original_text: str, target_language: str) -> Optional[Dict[str, str]]:
+        """
+        Detect, format and translate with a single structured-output completion.
+
+        Args:
+            original_text: Original transcribed text
+            target_language: Target language code
+
+        Returns:
+            Same result as ``process_transcription``, or None when the
+            response is unusable or the model rejects structured output
+
+        Raises:
+            TranslationException: If the request fails
+            DeadlineExceededException: If the job deadline passes
+        """
+        request = self._combined_request(original_text, target_language)
+        model = await self._aget_model_for_task('translation')
+        try:
+            response = await self._create_completion('combined', model=model, **request)
+        except openai.BadRequestError as e:
+            logger.warning(f"Model {model} rejected the combined request, using separate calls: {str(e)}")
+            return None
+
+        result = self._parse_combined_response(response, target_language)
+        if result is None:
+            logger.warning(f"Invalid combined response from {model}, using separate calls")
+        return result
+
+    async def process_transcription(self, original_text: str, target_language: str = 'es') -> Dict[str, str]:
+        """
+        Process transcription: detect language, format original and translate if needed.
+
+        With ``LLM_COMBINED_CALL`` enabled the three steps are one
+        structured-output completion. Otherwise, or when its response is
+        not valid, formatting runs concurrently with detection and the
+        (conditional) translation.
+
+        Args:
+            original_text: Original transcribed text
+            target_language: Target language code for translation (default: 'es' for Spanish)
+
+        Returns:
+            Dictionary with 'original' (formatted) and 'translated' keys.
+            If already in target language, 'translated' will be the same as 'original'.
+
+        Raises:
+            TranslationException: If processing fails
+            DeadlineExceededException: If the job deadline passes
+            OverloadedException: If no LLM slot frees up in time
+        """
+        async def translate_if_needed():
+            detected_language = await self.detect_language(original_text)
+            if self._normalize_language_code(detected_language) == target_language:
+                return None
+            return await self.translate_text(original_text, target_language)
+
+        try:
+            async with limiter('llm').aslot():
+                # The model list is loaded once before the concurrent requests use it
+                await self._alist_available_models()
+                if getattr(settings, 'LLM_COMBINED_CALL', True):
+                    result = await self._process_combined(original_text, target_language)
+                    if result is not None:
+                        return result
+
+                formatted_original, translated_text = await asyncio.gather(
+                    self.format_text_as_verses(original_text),
+                    translate_if_needed()
+                )
+
+                return {
+                    'original': formatted_original,
+                    'translated': formatted_original if translated_text is None else translated_text
+                }
+        except (TranslationException, DeadlineExceededException, OverloadedException):
+            raise
+        except Exception as e:
+            raise TranslationException(f"Text processing failed: {str(e)}")
@@ -0,0 +1,367 @@
+"""
+Async YouTube Service - yt-dlp and ffmpeg run as asyncio subprocesses.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import AsyncIterator, List, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from ..deadline import current_deadline
+from ..admission import limiter
+from ..exceptions import (
+    YouTubeDownloadException, VideoUnavailableException, OverloadedException, DeadlineExceededException
+)
+from ..instrumentation import count_stage, record_span
+from ..progress import current_progress
+from ..models import VideoMetadata
+from ..workspace import JobWorkspace, artifact_workspace, current_workspace
+from .metadata_cache import MetadataCache
+from .youtube_service import YouTubeService
+
+
+class AsyncYouTubeService(YouTubeService):
+    """
+    Coroutine version of ``YouTubeService`` for the ASGI request path.
+
+    yt-dlp is run through its command line (``YTDLP_COMMAND``, by default
+    ``python -m yt_dlp``) and ffmpeg is read through an asyncio pipe, so
+    waiting on YouTube never blocks the event loop. Subprocesses still
+    running when the job deadline passes or the request is cancelled are
+    killed.
+    """
+
+    _VIDEO_FORMAT = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+
+    @staticmethod
+    def _ytdlp_command(*args: str) -> List[str]:
+        """
+        Build a yt-dlp command line with the common options.
+
+        Args:
+            args: Extra arguments (format, output template, link...)
+
+        Returns:
+            Command as a list of arguments
+        """
+        command = list(getattr(settings, 'YTDLP_COMMAND', None) or [sys.executable, '-m', 'yt_dlp'])
+        opts = YouTubeService._COMMON_OPTS
+        player_clients = ','.join(opts['extractor_args']['youtube']['player_client'])
+        command += [
+            '--quiet', '--no-progress', '--no-check-certificates',
+            '--extractor-args', f"youtube:player_client={player_clients}",
+        ]
+        for name, value in opts['http_headers'].items():
+            command += ['--add-header', f"{name}:{value}"]
+
+        deadline = current_deadline()
+        socket_timeout = deadline.timeout(YouTubeService._SOCKET_TIMEOUT) if deadline else YouTubeService._SOCKET_TIMEOUT
+        command += ['--socket-timeout', str(max(1, int(socket_timeout)))]
+        return command + list(args)
+
+    @staticmethod
+    async def _run(command: List[str], stage: str) -> bytes:
+        """
+        Run a command to completion within the job deadline.
+
+        Args:
+            command: Command to run
+            stage: Stage name used in deadline errors
+
+        Returns:
+            Captured stdout
+
+        Raises:
+            YouTubeDownloadException: If the command exits with an error
+            DeadlineExceededException: If the job deadline passes first
+        """
+        deadline = current_deadline()
+        if deadline:
+            deadline.check(stage)
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(), timeout=deadline.remaining() if deadline else None
+            )
+        except asyncio.TimeoutError:
+            raise deadline.exceeded(stage)
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+        if process.returncode != 0:
+            lines = stderr.decode('utf-8', errors='replace').strip().splitlines()
+            raise YouTubeDownloadException(lines[-1] if lines else f"{command[0]} exited with status {process.returncode}")
+        return stdout
+
+    @staticmethod
+    async def get_title(link: str) -> str:
+        """
+        Extract the title from a YouTube video.
+
+        Args:
+            link: YouTube video URL
+
+        Returns:
+            Video title
+
+        Raises:
+            YouTubeDownloadException: If title extraction fails
+            VideoUnavailableException: If the video is private or removed
+            DeadlineExceededException: If the job deadline passes first
+        """
+        title = (await AsyncYouTubeService.get_metadata(link)).title
+        if not title:
+            raise YouTubeDownloadException("Could not retrieve YouTube video title.")
+        return title
+
+    @staticmethod
+    async def get_metadata(link: str) -> VideoMetadata:
+        """
+        Get a video's title, duration, formats and caption tracks, from the shared cache if possible.
+
+        Args:
+            link: YouTube video URL
+
+        Returns:
+            VideoMetadata of the video
+
+        Raises:
+            YouTubeDownloadException: If metadata extraction fails
+            VideoUnavailableException: If the video is private or removed
+                (also while that answer is cached)
+            DeadlineExceededException: If the job deadline passes first
+        """
+        video_id = YouTubeService._video_id_or_empty(link)
+        cache = MetadataCache()
+        cached = await sync_to_async(cache.get)(video_id) if video_id else None
+        if cached is not None:
+            if not cached.available:
+                raise VideoUnavailableException(f"Video unavailable: {cached.error}")
+            return cached
+
+        try:
+            output = await AsyncYouTubeService._run(
+                AsyncYouTubeService._ytdlp_command('--skip-download', '--dump-single-json', link), 'metadata'
+            )
+            info = json.loads(output)
+        except DeadlineExceededException:
+            raise
+        except Exception as e:
+            if YouTubeService._UNAVAILABLE_REGEX.search(str(e)):
+                await sync_to_async(cache.store_unavailable)(video_id, str(e))
+                raise VideoUnavailableException(f"Video unavailable: {str(e)}")
+            raise YouTubeDownloadException(f"Failed to extract metadata: {str(e)}")
+
+        return await sync_to_async(cache.store)(video_id, info)
+
+    @staticmethod
+    async def download_video(link: str, title: str) -> str:
+        """
+        Download only the video (mp4) from YouTube.
+
+        Args:
+            link: YouTube video URL
+            title: Video title for filename
+
+        Returns:
+            Path to the downloaded video file
+
+        Raises:
+            YouTubeDownloadException: If download fails
+            OverloadedException: If no download slot frees up in time
+            DeadlineExceededException: If the job deadline passes first
+        """
+        try:
+            with artifact_workspace(YouTubeService._video_id_or_empty(link)) as workspace:
+                video_file = str(workspace.scratch_path(title, '_video.mp4'))
+
+                async with limiter('download').aslot():
+                    await AsyncYouTubeService._run(
+                        AsyncYouTubeService._ytdlp_command('-f', AsyncYouTubeService._VIDEO_FORMAT, '-o', video_file, link),
+                        'download'
+                    )
+
+                if not os.path.exists(video_file) or os.path.getsize(video_file) == 0:
+                    raise YouTubeDownloadException("Failed to download video file or file is empty.")
+                count_stage(bytes=os.path.getsize(video_file))
+
+                return await workspace.apublish(title, '_video.mp4')
+        except (OverloadedException, DeadlineExceededException):
+            raise
+        except Exception as e:
+            raise YouTubeDownloadException(f"Video download failed: {str(e)}")
+
+    @staticmethod
+    async def download_audio(link: str, title: str) -> str:
+        """
+        Download the audio track from YouTube in its native container (m4a, webm...).
+
+        Args:
+            link: YouTube video URL
+            title: Video title for filename
+
+        Returns:
+            Path to the downloaded audio file
+
+        Raises:
+            YouTubeDownloadException: If download fails
+            OverloadedException: If no download slot frees up in time
+            DeadlineExceededException: If the job deadline passes first
+        """
+        try:
+            with artifact_workspace(YouTubeService._video_id_or_empty(link)) as workspace:
+                async with limiter('download').aslot():
+                    await AsyncYouTubeService._run(
+                        AsyncYouTubeService._ytdlp_command(
+                            '-f', YouTubeService._AUDIO_FORMAT,
+                            '-o', str(workspace.scratch_path(title, '_audio.%(ext)s')), link
+                        ),
+                        'download'
+                    )
+
+                suffix = YouTubeService._downloaded_audio_suffix(workspace, title)
+                if suffix is None:
+                    raise YouTubeDownloadException("Failed to download audio file or file is empty.")
+                count_stage(bytes=workspace.scratch_path(title, suffix).stat().st_size)
+
+                return await workspace.apublish(title, suffix)
+        except (OverloadedException, DeadlineExceededException):
+            raise
+        except Exception as e:
+            raise YouTubeDownloadException(f"Audio download failed: {str(e)}")
+
+    @staticmethod
+    async def download_video_and_audio(link: str, title: str) -> Tuple[str, str]:
+        """
+        Download both video (mp4) and audio (native container) from YouTube concurrently.
+
+        Args:
+            link: YouTube video URL
+            title: Video title for filename
+
+        Returns:
+            Tuple of (video_file_path, audio_file_path)
+
+        Raises:
+            YouTubeDownloadException: If download fails
+            OverloadedException: If no download slot frees up in time
+            DeadlineExceededException: If the job deadline passes first
+        """
+        video_file, audio_file = await asyncio.gather(
+            AsyncYouTubeService.download_video(link, title),
+            AsyncYouTubeService.download_audio(link, title)
+        )
+        return video_file, audio_file
+
+    @staticmethod
+    async def stream_audio(link: str, title: str, chunk_size: int = 64 * 1024) -> Tuple[str, AsyncIterator[bytes]]:
+        """
+        Stream the audio track in its native codec while it is downloaded.
+
+        Args:
+            link: YouTube video URL
+            title: Video title for filename
+            chunk_size: Maximum size of each yielded chunk in bytes
+
+        Returns:
+            Tuple of (audio_file_path, async_chunk_iterator). The file is
+            complete once the iterator is exhausted.
+
+        Raises:
+            YouTubeDownloadException: If the audio stream cannot be resolved
+                (raised by the iterator if ffmpeg fails)
+        """
+        try:
+            output = await AsyncYouTubeService._run(
+                AsyncYouTubeService._ytdlp_command(
+                    '-f', YouTubeService._AUDIO_FORMAT, '--skip-download', '--dump-single-json', link
+                ),
+                'audio streaming'
+            )
+            info = json.loads(output)
+
+            source_url = info.get('url')
+            if not source_url:
+                raise YouTubeDownloadException("Could not resolve the audio stream URL.")
+        except DeadlineExceededException:
+            raise
+        except Exception as e:
+            raise YouTubeDownloadException(f"Audio stream resolution failed: {str(e)}")
+
+        workspace = current_workspace() or JobWorkspace(YouTubeService._video_id_or_empty(link))
+        muxer, extension = YouTubeService._audio_container(info)
+        suffix = f'_audio.{extension}'
+        audio_file = str(workspace.artifact_path(title, suffix))
+        command = YouTubeService._ffmpeg_audio_command(source_url, info.get('http_headers'), muxer)
+
+        return audio_file, AsyncYouTubeService._pipe_chunks(command, workspace, title, suffix, chunk_size)
+
+    @staticmethod
+    async def _pipe_chunks(command: list, workspace: JobWorkspace, title: str, suffix: str,
+                           chunk_size: int) -> AsyncIterator[bytes]:
+        """
+        Run an ffmpeg command and yield its stdout while copying it to the audio file.
+
+        Args:
+            command: ffmpeg command writing to stdout
+            workspace: Workspace the audio file is written to and published from
+            title: Video title naming the audio file
+            suffix: Artifact suffix of the audio file (e.g. '_audio.m4a')
+            chunk_size: Maximum size of each yielded chunk in bytes
+
+        Yields:
+            Output chunks as soon as ffmpeg produces them
+
+        Raises:
+            YouTubeDownloadException: If ffmpeg fails or produces no output
+            OverloadedException: If no ffmpeg slot frees up in time
+            DeadlineExceededException: If the job deadline passes while streaming
+        """
+        audio_file = workspace.scratch_path(title, suffix)
+        deadline = current_deadline()
+        progress = current_progress()
+        produced = 0
+        ffmpeg_slot = limiter('ffmpeg')
+        acquired_at = await ffmpeg_slot.aacquire()
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            with open(audio_file, 'wb') as f:
+                while True:
+                    chunk = await process.stdout.read(chunk_size)
+                    if not chunk:
+                        break
+                    if deadline:
+                        deadline.check('audio streaming')
+                    f.write(chunk)
+                    produced += len(chunk)
+                    if progress:
+                        progress.update('audio', produced)
+                    yield chunk
+
+            stderr = (await process.stderr.read()).decode('utf-8', errors='replace').strip()
+            if await process.wait() != 0:
+                raise YouTubeDownloadException(f"Audio streaming failed: {stderr}")
+            if os.path.getsize(audio_file) == 0:
+                raise YouTubeDownloadException("Failed to download audio file or file is empty.")
+            # Download and remux by ffmpeg, overlapped with the upload reading the chunks
+            record_span('transcode', started, bytes=produced)
+            await workspace.apublish(title, suffix)
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            ffmpeg_slot.release(acquired_at)
+            if workspace is not current_workspace():
+                # Private workspace of a call made outside a job
+                workspace.cleanup()
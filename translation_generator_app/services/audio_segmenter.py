@@ -0,0 +1,228 @@
+"""
+Audio Segmenter - Splits long recordings at silences so their parts can be transcribed in parallel.
+"""
+import logging
+import os
+import re
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+
+from ..admission import limiter
+from ..lazy import LazyModule
+
+logger = logging.getLogger(__name__)
+
+np = LazyModule('numpy')
+
+
+@dataclass
+class AudioSegment:
+    """One part of a split recording and where it starts and ends in the original (seconds)."""
+    path: str
+    start: float
+    end: float
+
+
+class AudioSegmenter:
+    """
+    Cuts recordings longer than ``AUDIO_SEGMENT_THRESHOLD`` seconds into parts of bounded length.
+
+    The audio is decoded by ffmpeg to 8 kHz mono PCM and read from the
+    pipe in blocks, each reduced at once to the energy of its 50 ms
+    frames, so memory stays flat for hour-long mixes. The energy curve is
+    smoothed over ``SMOOTHING_SECONDS`` and every cut is placed at its
+    quietest frame between ``MIN_FRACTION`` and 1 of
+    ``AUDIO_SEGMENT_MAX_SECONDS`` after the previous cut, i.e. in a pause
+    between songs or phrases rather than mid-word. One more ffmpeg call
+    splits the file at those times with ``-c copy`` (no re-encode).
+    """
+
+    SAMPLE_RATE = 8000
+    FRAME_SECONDS = 0.05
+    SMOOTHING_SECONDS = 0.5
+    # Earliest cut, as a share of the maximum segment length
+    MIN_FRACTION = 0.6
+    # Frames decoded per pipe read
+    BLOCK_FRAMES = 2000
+    # Lowest audio bitrate expected (32 kbit/s): smaller files cannot be
+    # over the threshold, so they are not probed
+    MIN_BYTES_PER_SECOND = 4000
+
+    _DURATION = re.compile(r'Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)')
+
+    def __init__(self, threshold: Optional[float] = None, max_seconds: Optional[float] = None):
+        """
+        Initialize the segmenter.
+
+        Args:
+            threshold: Shortest recording that is split (default: settings.AUDIO_SEGMENT_THRESHOLD)
+            max_seconds: Longest segment (default: settings.AUDIO_SEGMENT_MAX_SECONDS)
+        """
+        self.threshold = threshold if threshold is not None else getattr(settings, 'AUDIO_SEGMENT_THRESHOLD', 900)
+        self.max_seconds = max_seconds if max_seconds is not None else getattr(settings, 'AUDIO_SEGMENT_MAX_SECONDS', 300)
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Whether segmentation is enabled in settings and ffmpeg is installed."""
+        return getattr(settings, 'AUDIO_SEGMENTATION', True) and shutil.which('ffmpeg') is not None
+
+    def applies_to(self, duration: Optional[float]) -> bool:
+        """
+        Whether a recording of ``duration`` seconds is split before transcription.
+
+        Args:
+            duration: Length of the recording in seconds (None if unknown)
+
+        Returns:
+            True if segmentation is enabled and the recording is over the threshold
+        """
+        return bool(duration) and duration > self.threshold and self.is_enabled()
+
+    def may_apply_to(self, audio_file: str) -> bool:
+        """
+        Whether a local file is large enough to be over the threshold, judged by its size alone.
+
+        Args:
+            audio_file: Path to the audio file
+
+        Returns:
+            False if segmentation is disabled or the file is too small to
+            last ``threshold`` seconds at ``MIN_BYTES_PER_SECOND``; True if
+            its duration has to be probed
+        """
+        return self.is_enabled() and os.path.getsize(audio_file) > self.threshold * self.MIN_BYTES_PER_SECOND
+
+    def probe_duration(self, audio_file: str) -> Optional[float]:
+        """
+        Read the duration of an audio file from its container header.
+
+        Args:
+            audio_file: Path to the audio file
+
+        Returns:
+            Duration in seconds, or None if ffmpeg cannot tell
+        """
+        # Without an output ffmpeg only prints the input's header (and exits with an error)
+        process = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-nostdin', '-i', audio_file],
+            capture_output=True, timeout=30
+        )
+        match = self._DURATION.search(process.stderr.decode('utf-8', errors='replace'))
+        if not match:
+            return None
+        hours, minutes, seconds = match.groups()
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    def split(self, audio_file: str, directory: str) -> List[AudioSegment]:
+        """
+        Split an audio file at silences into segments of at most ``max_seconds``.
+
+        Args:
+            audio_file: Path to the audio file
+            directory: Existing directory the segment files are written to
+
+        Returns:
+            Segments in playback order (the whole file as a single segment
+            when it is not over the threshold)
+
+        Raises:
+            RuntimeError: If ffmpeg fails to decode or cut the audio
+        """
+        duration = self.probe_duration(audio_file)
+        if not self.applies_to(duration):
+            return [AudioSegment(audio_file, 0.0, duration or 0.0)]
+
+        with limiter('ffmpeg').slot():
+            energy = self.frame_energy(audio_file)
+        cuts = self.split_points(energy)
+        bounds = [0.0, *cuts, duration]
+
+        suffix = Path(audio_file).suffix or '.m4a'
+        pattern = os.path.join(directory, f"segment%03d{suffix}")
+        with limiter('ffmpeg').slot():
+            process = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin', '-i', audio_file,
+                 '-vn', '-c', 'copy', '-f', 'segment', '-segment_times', ','.join(f"{cut:.3f}" for cut in cuts),
+                 '-reset_timestamps', '1', pattern],
+                capture_output=True
+            )
+        if process.returncode != 0:
+            raise RuntimeError(process.stderr.decode('utf-8', errors='replace').strip() or "ffmpeg failed")
+
+        segments = [
+            AudioSegment(pattern % index, start, end)
+            for index, (start, end) in enumerate(zip(bounds, bounds[1:]))
+            if os.path.exists(pattern % index)
+        ]
+        logger.info(f"Split {os.path.basename(audio_file)} ({duration:.0f} s) into {len(segments)} segments")
+        return segments
+
+    def frame_energy(self, audio_file: str) -> 'np.ndarray':
+        """
+        Decode an audio file and measure the energy of each frame.
+
+        Args:
+            audio_file: Path to the audio file
+
+        Returns:
+            Energy in dB of each ``FRAME_SECONDS`` frame, as a float32 array
+
+        Raises:
+            RuntimeError: If ffmpeg cannot decode the file
+        """
+        frame_size = int(self.SAMPLE_RATE * self.FRAME_SECONDS)
+        block_bytes = frame_size * self.BLOCK_FRAMES * 2
+        process = subprocess.Popen(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin', '-i', audio_file,
+             '-vn', '-ac', '1', '-ar', str(self.SAMPLE_RATE), '-f', 's16le', 'pipe:1'],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        blocks = []
+        try:
+            while True:
+                data = process.stdout.read(block_bytes)
+                if not data:
+                    break
+                # A short last read keeps its whole frames only
+                samples = np.frombuffer(data[:len(data) // (frame_size * 2) * frame_size * 2], dtype='<i2')
+                frames = samples.reshape(-1, frame_size).astype(np.float32)
+                blocks.append(np.einsum('ij,ij->i', frames, frames) / frame_size)
+            stderr = process.stderr.read()
+        finally:
+            process.stdout.close()
+            process.stderr.close()
+            returncode = process.wait()
+        if returncode != 0:
+            raise RuntimeError(stderr.decode('utf-8', errors='replace').strip() or "ffmpeg failed")
+
+        power = np.concatenate(blocks) if blocks else np.empty(0, dtype=np.float32)
+        return (10 * np.log10(power + 1.0)).astype(np.float32)
+
+    def split_points(self, energy: 'np.ndarray') -> List[float]:
+        """
+        Choose the cut times of a recording from its frame energy.
+
+        Args:
+            energy: Energy in dB of each ``FRAME_SECONDS`` frame
+
+        Returns:
+            Cut times in seconds, increasing; consecutive cuts (and the
+            start and end) are at most ``max_seconds`` apart
+        """
+        smoothing = max(1, int(self.SMOOTHING_SECONDS / self.FRAME_SECONDS))
+        smoothed = np.convolve(energy, np.ones(smoothing, dtype=np.float32) / smoothing, mode='same')
+        max_frames = max(1, int(self.max_seconds / self.FRAME_SECONDS))
+        min_frames = max(1, int(max_frames * self.MIN_FRACTION))
+
+        cuts = []
+        start = 0
+        while len(smoothed) - start > max_frames:
+            window = smoothed[start + min_frames:start + max_frames + 1]
+            start += min_frames + int(np.argmin(window))
+            cuts.append(round(start * self.FRAME_SECONDS, 3))
+        return cuts
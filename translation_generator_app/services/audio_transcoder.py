@@ -0,0 +1,151 @@
+"""
+Audio Transcoder - MP3 copies of downloaded audio, made on request in the background.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from ..admission import limiter
+from ..exceptions import AudioConversionException
+from ..storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+
+class AudioTranscoder:
+    """
+    Converts a job's native audio (m4a, webm...) to MP3 only when a user asks for it.
+
+    Transcription uses the audio as downloaded, so no job waits on an MP3
+    encode. The MP3 is written next to the source (``..._audio.mp3``) and
+    reused by every later request. Encodes run as ffmpeg processes started
+    from a small per-process pool (``MP3_TRANSCODE_WORKERS``) and take an
+    ``ffmpeg`` admission slot; concurrent requests for the same file share
+    one encode. With a remote media storage the MP3 is stored there as well.
+    """
+
+    BITRATE = '192k'
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_pid: Optional[int] = None
+    _pending: Dict[str, Future] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _pool(cls) -> ThreadPoolExecutor:
+        """Return the transcoding pool of the current process (created after a fork)."""
+        if cls._executor is None or cls._executor_pid != os.getpid():
+            cls._executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MP3_TRANSCODE_WORKERS', 2), thread_name_prefix='mp3-transcode'
+            )
+            cls._executor_pid = os.getpid()
+            cls._pending = {}
+        return cls._executor
+
+    @staticmethod
+    def mp3_path(audio_file: str) -> str:
+        """
+        Path of the MP3 copy of an audio file.
+
+        Args:
+            audio_file: Path of the native audio file
+
+        Returns:
+            The same path with an ``.mp3`` extension
+        """
+        return str(Path(audio_file).with_suffix('.mp3'))
+
+    @classmethod
+    def submit(cls, audio_file: str) -> Future:
+        """
+        Start converting an audio file to MP3 unless the copy exists or is being made.
+
+        Args:
+            audio_file: Path of the native audio file
+
+        Returns:
+            Future resolved with the MP3 path, or failed with AudioConversionException
+        """
+        target = cls.mp3_path(audio_file)
+        with cls._lock:
+            pool = cls._pool()
+            pending = cls._pending.get(target)
+            if pending is not None:
+                return pending
+            if os.path.exists(target):
+                done: Future = Future()
+                done.set_result(target)
+                return done
+            future = pool.submit(cls._transcode, audio_file, target)
+            cls._pending[target] = future
+        future.add_done_callback(lambda _: cls._forget(target))
+        return future
+
+    @classmethod
+    def _forget(cls, target: str):
+        with cls._lock:
+            cls._pending.pop(target, None)
+
+    @classmethod
+    def to_mp3(cls, audio_file: str, timeout: Optional[float] = None) -> str:
+        """
+        Return the MP3 copy of an audio file, converting it first if needed.
+
+        Args:
+            audio_file: Path of the native audio file
+            timeout: Maximum seconds to wait (default: settings.MP3_TRANSCODE_TIMEOUT)
+
+        Returns:
+            Path of the MP3 file
+
+        Raises:
+            AudioConversionException: If the file does not exist, the
+                conversion fails or it takes longer than ``timeout``
+        """
+        if audio_file.endswith('.mp3'):
+            return audio_file
+        if not os.path.exists(audio_file):
+            raise AudioConversionException(f"Audio file not found: {os.path.basename(audio_file)}")
+        if timeout is None:
+            timeout = getattr(settings, 'MP3_TRANSCODE_TIMEOUT', 120)
+        try:
+            return cls.submit(audio_file).result(timeout=timeout)
+        except AudioConversionException:
+            raise
+        except Exception as e:
+            raise AudioConversionException(f"MP3 conversion failed: {str(e) or type(e).__name__}")
+
+    @classmethod
+    def _transcode(cls, source: str, target: str) -> str:
+        """Encode ``source`` to MP3 in a temporary file and move it to ``target``."""
+        if shutil.which('ffmpeg') is None:
+            raise AudioConversionException("ffmpeg is required to convert audio to MP3")
+        partial = f"{target}.{uuid.uuid4().hex[:8]}.part"
+        try:
+            # Runs outside any job deadline, so it may queue as long as the caller waits
+            with limiter('ffmpeg').slot(timeout=getattr(settings, 'MP3_TRANSCODE_TIMEOUT', 120)):
+                process = subprocess.run(
+                    ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin', '-i', source,
+                     '-vn', '-codec:a', 'libmp3lame', '-b:a', cls.BITRATE, '-f', 'mp3', partial],
+                    capture_output=True
+                )
+            if process.returncode != 0 or not os.path.getsize(partial):
+                stderr = process.stderr.decode('utf-8', errors='replace').strip()
+                raise AudioConversionException(f"MP3 conversion failed: {stderr or 'empty output'}")
+            storage = get_storage()
+            if storage.remote:
+                storage.save(os.path.basename(target), partial)
+            os.replace(partial, target)
+            logger.info(f"Converted {os.path.basename(source)} to MP3")
+            return target
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
@@ -0,0 +1,376 @@
+"""
+Fingerprint Service - Recognizes songs processed before from their audio.
+"""
+import logging
+import shutil
+import subprocess
+import wave
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from ..admission import limiter
+from ..cpu_pool import run_cpu_bound
+from ..lazy import LazyModule
+from ..models import AudioRecording, FingerprintHash
+
+logger = logging.getLogger(__name__)
+
+np = LazyModule('numpy')
+
+
+class Recognition:
+    """Outcome of fingerprinting one audio file."""
+
+    def __init__(self, hashes=None, offsets=None, recording: Optional[AudioRecording] = None,
+                 confidence: float = 0.0):
+        """
+        Initialize the recognition result.
+
+        Args:
+            hashes: Fingerprint hashes of the audio (None if it could not be fingerprinted)
+            offsets: Frame offset of each hash
+            recording: Earlier recording of the same song, if one matched
+            confidence: Share of hashes aligned with the matched recording
+        """
+        self.hashes = hashes
+        self.offsets = offsets
+        self.recording = recording
+        self.confidence = confidence
+
+    @property
+    def transcript(self) -> Optional[str]:
+        """Transcript of the matched recording, if any."""
+        return self.recording.transcript if self.recording else None
+
+    def translation(self, target_language: str, quality: str) -> Optional[Dict[str, str]]:
+        """
+        Stored ``process_transcription`` result of the matched recording.
+
+        Args:
+            target_language: Target language code
+            quality: Latency/quality tier
+
+        Returns:
+            Dictionary with 'original' and 'translated' keys, or None
+        """
+        if not self.recording:
+            return None
+        return self.recording.translations.get(FingerprintService.translation_key(target_language, quality))
+
+
+class FingerprintService:
+    """
+    Audio fingerprinting with spectral peak pairs and an inverted index in the database.
+
+    The audio is decoded to 8 kHz mono, turned into a log-magnitude
+    spectrogram and reduced to its local maxima. Each peak is paired with
+    the next few peaks; a pair hashes its two frequencies and time gap and
+    keeps the anchor's frame offset. A recording matches when many query
+    hashes are found in it at the same relative offset, so re-encodes,
+    re-uploads and versions with a different intro are recognized while
+    the transcript and translations of the first one are reused.
+
+    Decoding holds an ``ffmpeg`` admission slot, and the NumPy work
+    (resampling, spectrogram, peak pairing, offset voting) runs on native
+    threads (``run_cpu_bound``), so a fingerprint never blocks the gevent
+    worker or event loop that requested it.
+    """
+
+    SAMPLE_RATE = 8000
+    WINDOW_SIZE = 1024
+    HOP_SIZE = 256
+    MAX_SECONDS = 600
+
+    # Peaks are maxima of a (2 * radius + 1) neighbourhood of time frames x frequency bins
+    PEAK_TIME_RADIUS = 10
+    PEAK_FREQ_RADIUS = 15
+    FAN_OUT = 10
+    MAX_PAIR_GAP = 63
+
+    LOOKUP_BATCH = 1000
+
+    def __init__(self, threshold: Optional[float] = None, min_matches: Optional[int] = None):
+        """
+        Initialize the fingerprint service.
+
+        Args:
+            threshold: Minimum share of aligned hashes for a match (default: settings.FINGERPRINT_MATCH_THRESHOLD)
+            min_matches: Minimum number of aligned hashes for a match (default: settings.FINGERPRINT_MIN_MATCHES)
+        """
+        self.threshold = threshold if threshold is not None else getattr(settings, 'FINGERPRINT_MATCH_THRESHOLD', 0.15)
+        self.min_matches = min_matches if min_matches is not None else getattr(settings, 'FINGERPRINT_MIN_MATCHES', 20)
+        self._recognitions: Dict[str, Recognition] = {}
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Whether audio fingerprinting is enabled in settings."""
+        return getattr(settings, 'AUDIO_FINGERPRINTING', True)
+
+    @staticmethod
+    def translation_key(target_language: str, quality: str) -> str:
+        """Key of a stored translation in ``AudioRecording.translations``."""
+        return f"{target_language}:{quality}"
+
+    def recognize(self, audio_file: str) -> Recognition:
+        """
+        Fingerprint an audio file and look for an earlier recording of the same song.
+
+        Fingerprinting is an optimization: any failure is logged and an
+        empty recognition is returned, so the job transcribes as usual.
+
+        Args:
+            audio_file: Path to the audio file
+
+        Returns:
+            Recognition with the fingerprint and the matched recording, if any
+        """
+        if audio_file in self._recognitions:
+            return self._recognitions[audio_file]
+
+        recognition = Recognition()
+        if self.is_enabled():
+            try:
+                with limiter('ffmpeg').slot():
+                    samples = self._decode(audio_file)
+                hashes, offsets = run_cpu_bound(self.fingerprint, samples)
+                recognition = Recognition(hashes, offsets)
+                match = self._find_match(hashes, offsets)
+                if match:
+                    recognition.recording, recognition.confidence = match
+                    logger.info(f"Recognized audio as '{recognition.recording.title}' "
+                                f"({recognition.recording.video_id}, confidence {recognition.confidence:.2f})")
+            except Exception as e:
+                logger.warning(f"Audio fingerprinting failed for {audio_file}: {str(e)}")
+
+        self._recognitions[audio_file] = recognition
+        return recognition
+
+    def remember(self, recognition: Recognition, video_id: str, title: str, transcript: str,
+                 target_language: str, quality: str, processed_text: Dict[str, str]):
+        """
+        Index a processed recording and store its transcript and translation.
+
+        A recognized song gets the translation added to the matched
+        recording; otherwise a new recording is created with its hashes,
+        written by one bulk insert in the same transaction. Failures are
+        logged, never raised.
+
+        Args:
+            recognition: Result of ``recognize`` for the job's audio
+            video_id: YouTube video ID
+            title: Video title
+            transcript: Transcribed text
+            target_language: Target language code
+            quality: Latency/quality tier
+            processed_text: ``process_transcription`` result
+        """
+        if recognition.hashes is None:
+            return
+        key = self.translation_key(target_language, quality)
+        try:
+            recording = recognition.recording
+            if recording is None:
+                pairs = run_cpu_bound(self._unique_pairs, recognition.hashes, recognition.offsets)
+                try:
+                    self._index(video_id, title, transcript, {key: processed_text}, pairs)
+                    return
+                except IntegrityError:
+                    # Another job indexed this video meanwhile; add the translation to its recording
+                    recording = AudioRecording.objects.get(video_id=video_id)
+
+            with transaction.atomic():
+                recording = AudioRecording.objects.select_for_update().get(pk=recording.pk)
+                if key not in recording.translations:
+                    recording.translations[key] = processed_text
+                    recording.save(update_fields=['translations'])
+        except Exception as e:
+            logger.warning(f"Could not store the fingerprint of {video_id}: {str(e)}")
+
+    @staticmethod
+    def _unique_pairs(hashes, offsets) -> List[Tuple[int, int]]:
+        """Distinct (hash, offset) pairs of a fingerprint, as Python ints ready to insert."""
+        return np.unique(np.stack([hashes, offsets], axis=1), axis=0).tolist()
+
+    @staticmethod
+    def _index(video_id: str, title: str, transcript: str, translations: Dict[str, Dict[str, str]],
+               pairs: List[Tuple[int, int]]):
+        """
+        Create a recording and its hashes in one short transaction.
+
+        The recording row is written first, so on SQLite the transaction
+        takes the write lock at its first statement instead of upgrading
+        a read lock (which fails at once with "database is locked" when
+        another job is writing).
+
+        Raises:
+            IntegrityError: If the video is already indexed
+        """
+        with transaction.atomic():
+            recording = AudioRecording.objects.create(
+                video_id=video_id, title=title, transcript=transcript,
+                translations=translations, hash_count=len(pairs)
+            )
+            FingerprintHash.objects.bulk_create(
+                [FingerprintHash(hash=h, recording=recording, offset=t) for h, t in pairs]
+            )
+
+    def _decode(self, audio_file: str):
+        """
+        Decode audio to mono float samples at ``SAMPLE_RATE``.
+
+        WAV files are read directly; anything else is decoded with ffmpeg.
+
+        Raises:
+            RuntimeError: If the file cannot be decoded
+        """
+        try:
+            return run_cpu_bound(self._read_wav, audio_file)
+        except (wave.Error, EOFError):
+            pass
+
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError("ffmpeg is required to decode this audio format")
+        process = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin', '-i', audio_file,
+             '-t', str(self.MAX_SECONDS), '-ac', '1', '-ar', str(self.SAMPLE_RATE), '-f', 's16le', 'pipe:1'],
+            capture_output=True, timeout=60
+        )
+        if process.returncode != 0:
+            raise RuntimeError(process.stderr.decode('utf-8', errors='replace').strip() or "ffmpeg failed")
+        return np.frombuffer(process.stdout, dtype='<i2').astype(np.float32)
+
+    @classmethod
+    def _read_wav(cls, audio_file: str):
+        """
+        Read a 16-bit WAV file as mono float samples at ``SAMPLE_RATE``.
+
+        Raises:
+            wave.Error: If the file is not a 16-bit WAV file
+        """
+        with wave.open(audio_file, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise wave.Error("only 16-bit WAV is read directly")
+            frames = wav.readframes(min(wav.getnframes(), wav.getframerate() * cls.MAX_SECONDS))
+            samples = np.frombuffer(frames, dtype='<i2').astype(np.float32)
+            samples = samples.reshape(-1, wav.getnchannels()).mean(axis=1)
+            rate = wav.getframerate()
+        if rate != cls.SAMPLE_RATE:
+            positions = np.arange(0, len(samples) - 1, rate / cls.SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        return samples
+
+    @classmethod
+    def fingerprint(cls, samples) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Compute the peak-pair hashes of decoded audio.
+
+        Args:
+            samples: Mono samples at ``SAMPLE_RATE``
+
+        Returns:
+            Tuple of (hashes, anchor frame offsets) as int64 arrays
+        """
+        if len(samples) < cls.WINDOW_SIZE:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # Log-magnitude spectrogram, frames x frequency bins (the Nyquist bin is dropped)
+        frames = np.lib.stride_tricks.sliding_window_view(samples, cls.WINDOW_SIZE)[::cls.HOP_SIZE]
+        spectrum = np.abs(np.fft.rfft(frames * np.hanning(cls.WINDOW_SIZE), axis=1))[:, :-1]
+        spectrogram = np.log1p(spectrum)
+
+        # Local maxima above the average level: a separable max filter over
+        # time and frequency, built from shifted copies
+        neighbourhood = cls._max_filter(cls._max_filter(spectrogram, cls.PEAK_TIME_RADIUS, 0),
+                                        cls.PEAK_FREQ_RADIUS, 1)
+        is_peak = (spectrogram == neighbourhood) & (spectrogram > spectrogram.mean() + spectrogram.std())
+        times, bins = np.nonzero(is_peak)  # sorted by time
+
+        # Pair every peak with the next FAN_OUT peaks
+        hashes, offsets = [], []
+        for step in range(1, cls.FAN_OUT + 1):
+            gap = times[step:] - times[:-step]
+            valid = (gap > 0) & (gap <= cls.MAX_PAIR_GAP)
+            anchor_bins, target_bins = bins[:-step][valid], bins[step:][valid]
+            hashes.append((anchor_bins.astype(np.int64) << 15) | (target_bins.astype(np.int64) << 6) | gap[valid])
+            offsets.append(times[:-step][valid].astype(np.int64))
+        return np.concatenate(hashes), np.concatenate(offsets)
+
+    @staticmethod
+    def _max_filter(values, radius: int, axis: int):
+        result = values.copy()
+        for shift in range(1, radius + 1):
+            forward = [slice(None)] * values.ndim
+            backward = [slice(None)] * values.ndim
+            forward[axis], backward[axis] = slice(shift, None), slice(None, -shift)
+            np.maximum(result[tuple(forward)], values[tuple(backward)], out=result[tuple(forward)])
+            np.maximum(result[tuple(backward)], values[tuple(forward)], out=result[tuple(backward)])
+        return result
+
+    def _find_match(self, hashes, offsets) -> Optional[Tuple[AudioRecording, float]]:
+        """
+        Find the indexed recording whose hashes line up best with the query.
+
+        Every stored occurrence of a query hash votes for its recording and
+        the offset between the two occurrences; the same song at any time
+        shift collects its votes in one (recording, offset) bin.
+
+        Returns:
+            Tuple of (recording, confidence) above the thresholds, or None
+        """
+        if len(hashes) < self.min_matches:
+            return None
+
+        unique_hashes = np.unique(hashes).tolist()
+        rows = []
+        for start in range(0, len(unique_hashes), self.LOOKUP_BATCH):
+            rows.extend(FingerprintHash.objects.filter(
+                hash__in=unique_hashes[start:start + self.LOOKUP_BATCH]
+            ).values_list('hash', 'recording_id', 'offset'))
+        if not rows:
+            return None
+        recording_id, matches = run_cpu_bound(self._vote, hashes, offsets, rows)
+        recording = AudioRecording.objects.filter(pk=recording_id).first()
+        if recording is None or matches < self.min_matches:
+            return None
+
+        confidence = matches / max(1, min(len(hashes), recording.hash_count or len(hashes)))
+        if confidence < self.threshold:
+            return None
+        return recording, min(1.0, confidence)
+
+    @staticmethod
+    def _vote(hashes, offsets, rows) -> Tuple[int, int]:
+        """
+        Count the aligned votes of the stored hash occurrences found for a query.
+
+        Args:
+            hashes: Query hashes
+            offsets: Frame offset of each query hash
+            rows: Stored occurrences as (hash, recording_id, offset) tuples
+
+        Returns:
+            Tuple of (recording_id, votes) of the best aligned recording
+        """
+        stored = np.array(rows, dtype=np.int64)
+
+        # Pair each stored occurrence with every query occurrence of its hash
+        order = np.argsort(hashes, kind='stable')
+        query_hashes, query_offsets = hashes[order], offsets[order]
+        first = np.searchsorted(query_hashes, stored[:, 0], side='left')
+        counts = np.searchsorted(query_hashes, stored[:, 0], side='right') - first
+        stored_index = np.repeat(np.arange(len(stored)), counts)
+        query_index = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        # Votes per (recording, offset difference); a neighbouring bin is
+        # added to tolerate a one-frame misalignment between encodings
+        shift = np.int64(1 << 32)
+        vote_bins = stored[stored_index, 1] * shift + (stored[stored_index, 2] - query_offsets[query_index] + (shift >> 1))
+        keys, votes = np.unique(vote_bins, return_counts=True)
+        neighbour = np.searchsorted(keys, keys + 1)
+        has_neighbour = (neighbour < len(keys)) & (keys[np.minimum(neighbour, len(keys) - 1)] == keys + 1)
+        scores = votes + np.where(has_neighbour, votes[np.minimum(neighbour, len(keys) - 1)], 0)
+
+        best = int(np.argmax(scores))
+        return int(keys[best] // shift), int(scores[best])
@@ -0,0 +1,142 @@
+"""
+Metadata Cache - Video metadata shared by all workers, with expiry and a size bound.
+"""
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from ..models import VideoMetadata
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    """
+    Cache of yt-dlp metadata (title, duration, formats, caption tracks) keyed by video ID.
+
+    Entries live in the database, so every worker and process shares them.
+    Available videos are kept for ``ttl`` seconds; private or removed
+    videos are remembered for ``negative_ttl`` seconds, so repeated
+    requests for them are rejected without another extraction. Beyond
+    ``max_entries`` rows the least recently fetched ones are dropped.
+    """
+
+    def __init__(self, ttl: Optional[int] = None, negative_ttl: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Lifetime of an available video's entry in seconds (default: settings.METADATA_CACHE_TTL)
+            negative_ttl: Lifetime of an unavailable video's entry (default: settings.METADATA_CACHE_NEGATIVE_TTL)
+            max_entries: Maximum number of entries (default: settings.METADATA_CACHE_MAX_ENTRIES)
+        """
+        self.ttl = ttl if ttl is not None else getattr(settings, 'METADATA_CACHE_TTL', 6 * 3600)
+        self.negative_ttl = negative_ttl if negative_ttl is not None else getattr(settings, 'METADATA_CACHE_NEGATIVE_TTL', 600)
+        self.max_entries = max_entries if max_entries is not None else getattr(settings, 'METADATA_CACHE_MAX_ENTRIES', 10000)
+
+    def get(self, video_id: str) -> Optional[VideoMetadata]:
+        """
+        Return the cached metadata of a video if it has not expired.
+
+        Args:
+            video_id: YouTube video ID
+
+        Returns:
+            VideoMetadata (check ``available``), or None on a miss
+        """
+        if self.ttl <= 0:
+            return None
+        entry = VideoMetadata.objects.filter(video_id=video_id).first()
+        if entry is None:
+            return None
+        ttl = self.ttl if entry.available else self.negative_ttl
+        if entry.fetched_at < timezone.now() - timedelta(seconds=ttl):
+            return None
+        return entry
+
+    def store(self, video_id: str, info: dict) -> VideoMetadata:
+        """
+        Cache the metadata of an available video.
+
+        Args:
+            video_id: YouTube video ID
+            info: Info dictionary returned by yt-dlp's ``extract_info``
+
+        Returns:
+            The cached VideoMetadata
+        """
+        return self._save(video_id, self.summarize(info))
+
+    def store_unavailable(self, video_id: str, error: str) -> VideoMetadata:
+        """
+        Remember that a video is private, removed or otherwise unavailable.
+
+        Args:
+            video_id: YouTube video ID
+            error: Reason reported by yt-dlp
+
+        Returns:
+            The cached VideoMetadata
+        """
+        return self._save(video_id, {
+            'available': False, 'title': '', 'duration': None, 'formats': [], 'captions': {}, 'error': error
+        })
+
+    @staticmethod
+    def summarize(info: dict) -> dict:
+        """
+        Keep the fields of a yt-dlp info dictionary worth caching.
+
+        Format URLs are left out: they expire and are resolved again when
+        the media is downloaded.
+
+        Args:
+            info: Info dictionary returned by yt-dlp's ``extract_info``
+
+        Returns:
+            VideoMetadata field values
+        """
+        duration = info.get('duration')
+        return {
+            'available': True,
+            'title': (info.get('title') or '')[:300],
+            'duration': int(duration) if duration is not None else None,
+            'formats': [
+                {key: fmt.get(key) for key in ('format_id', 'ext', 'acodec', 'vcodec', 'height', 'abr', 'filesize')}
+                for fmt in info.get('formats') or []
+            ],
+            'captions': {
+                'subtitles': sorted(info.get('subtitles') or {}),
+                'automatic': sorted(info.get('automatic_captions') or {}),
+            },
+            'error': '',
+        }
+
+    def _save(self, video_id: str, fields: dict) -> VideoMetadata:
+        fields['fetched_at'] = timezone.now()
+        if self.ttl <= 0 or not video_id:
+            return VideoMetadata(video_id=video_id, **fields)
+
+        # Plain UPDATE/INSERT, as in SingleFlight: no row lock is held while
+        # other workers may be reading the entry
+        if not VideoMetadata.objects.filter(video_id=video_id).update(**fields):
+            try:
+                VideoMetadata.objects.create(video_id=video_id, **fields)
+            except IntegrityError:
+                VideoMetadata.objects.filter(video_id=video_id).update(**fields)
+            else:
+                self._prune()
+        return VideoMetadata(video_id=video_id, **fields)
+
+    def _prune(self):
+        """Drop the least recently fetched entries beyond ``max_entries``."""
+        excess = VideoMetadata.objects.count() - self.max_entries
+        if excess > 0:
+            stale = VideoMetadata.objects.order_by('fetched_at').values_list('pk', flat=True)[:excess]
+            deleted, _ = VideoMetadata.objects.filter(pk__in=list(stale)).delete()
+            logger.info(f"Pruned {deleted} video metadata entries over the {self.max_entries} limit")
@@ -0,0 +1,386 @@
+"""
+Pipeline - The processing job shared by every entry point: download, transcribe, translate, store.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from ..instrumentation import stage, trace_job
+from ..models import translationPost
+from ..workspace import job_workspace
+from .async_transcription_service import AsyncTranscriptionService
+from .async_translation_service import AsyncTranslationService
+from .async_youtube_service import AsyncYouTubeService
+from .audio_segmenter import AudioSegmenter
+from .fingerprint_service import FingerprintService
+from .single_flight import SingleFlight
+from .transcription_service import TranscriptionService
+from .translation_service import TranslationService
+from .youtube_service import YouTubeService
+
+logger = logging.getLogger(__name__)
+
+
+def _in_worker_thread(fn):
+    """
+    Wrap a blocking ORM-using call to run in a pooled thread of its own.
+
+    ``sync_to_async`` runs everything on one shared thread by default, which
+    would queue every job's fingerprinting behind the others. The call's
+    database connection is handled as at the end of a request.
+    """
+    def call(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+def process_video(yt_link: str, openai_api_key: str, target_language: str = 'es',
+                  quality: str = 'balanced', include_video: bool = True, save: bool = True) -> dict:
+    """
+    Process YouTube video: download, transcribe, translate and store the result.
+
+    The job every entry point runs (the API view, the backfill and the
+    cache warmer); the caller applies admission, the job deadline and
+    profiling around it.
+
+    Args:
+        yt_link: YouTube video URL
+        openai_api_key: OpenAI API key for translation
+        target_language: Target language code for translation (default: 'es')
+        quality: Latency/quality tier for model routing (default: 'balanced')
+        include_video: Whether to download the video track (False for audio only)
+        save: Whether to store the translation in ``translationPost`` (False
+            when the caller writes results in batches)
+
+    Returns:
+        Dictionary with processing results
+
+    Raises:
+        YouTubeDownloadException: If download fails
+        TranscriptionException: If transcription fails
+        TranslationException: If translation fails
+        DeadlineExceededException: If the job deadline passes
+        OverloadedException: If a resource slot does not free up in time
+    """
+    # Initialize services
+    youtube_service = YouTubeService()
+    transcription_service = TranscriptionService(api_key=settings.AAI_API_KEY)
+    translation_service = TranslationService(api_key=openai_api_key, quality=quality)
+    fingerprint_service = FingerprintService()
+    single_flight = SingleFlight()
+
+    # Identical concurrent jobs (same video/stage/language) share one execution
+    video_id = youtube_service.extract_video_id(yt_link)
+
+    # Each job writes to its own scratch directory and publishes finished
+    # files; its stage waterfall is stored with the translation
+    with trace_job() as trace, job_workspace(video_id) as workspace:
+        # Step 1: Get video title
+        logger.info(f"Fetching title for: {yt_link}")
+        with stage('metadata'):
+            title = single_flight.run(
+                SingleFlight.make_key(video_id, 'metadata'),
+                lambda: youtube_service.get_title(yt_link)
+            )
+        logger.info(f"Video title: {title}")
+
+        # Long recordings are downloaded whole and transcribed in segments instead
+        duration = youtube_service.get_metadata(yt_link).duration
+        if youtube_service.can_stream_audio() and not AudioSegmenter().applies_to(duration):
+            # Steps 2-3: Stream the audio into the transcription upload while the video downloads
+            def transcribe_streamed_audio():
+                audio_path, chunks = youtube_service.stream_audio(yt_link, title)
+                # The audio is downloaded and remuxed (the 'transcode' span) while it uploads
+                with stage('upload'):
+                    upload_url = transcription_service.upload_stream(chunks)
+                # A song processed before keeps its transcript; skip the transcription wait
+                with stage('fingerprint'):
+                    transcript = fingerprint_service.recognize(audio_path).transcript
+                if transcript:
+                    TranscriptionService._save_transcription(transcript, title)
+                    return [audio_path, transcript]
+                with stage('transcription'):
+                    return [audio_path, transcription_service.transcribe_audio(upload_url, title)]
+
+            def run_audio_job():
+                try:
+                    return single_flight.run(
+                        SingleFlight.make_key(video_id, 'audio_transcription'),
+                        transcribe_streamed_audio,
+                        validate=lambda result: os.path.exists(result[0])
+                    )
+                finally:
+                    # The worker thread opened its own database connection
+                    connection.close()
+
+            logger.info(f"Downloading video and streaming audio to transcription for: {title}")
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                audio_job = executor.submit(contextvars.copy_context().run, run_audio_job)
+                video_file = None
+                if include_video:
+                    with stage('video_download'):
+                        video_file = single_flight.run(
+                            SingleFlight.make_key(video_id, 'video'),
+                            lambda: youtube_service.download_video(yt_link, title),
+                            validate=os.path.exists
+                        )
+                    logger.info(f"Downloaded - Video: {video_file}")
+                audio_file, original_text = audio_job.result()
+            logger.info(f"Transcription complete, length: {len(original_text)} chars")
+        else:
+            # Step 2: Download video and audio (audio only for oversized videos)
+            logger.info(f"Downloading video and audio for: {title}")
+            video_file = None
+            if include_video:
+                with stage('video_download'):
+                    video_file = single_flight.run(
+                        SingleFlight.make_key(video_id, 'video'),
+                        lambda: youtube_service.download_video(yt_link, title),
+                        validate=os.path.exists
+                    )
+            with stage('audio_download'):
+                audio_file = single_flight.run(
+                    SingleFlight.make_key(video_id, 'audio'),
+                    lambda: youtube_service.download_audio(yt_link, title),
+                    validate=os.path.exists
+                )
+            logger.info(f"Downloaded - Video: {video_file}, Audio: {audio_file}")
+
+            # Step 3: Transcribe audio, unless the song was processed before
+            logger.info(f"Transcribing audio: {audio_file}")
+            with stage('fingerprint'):
+                transcript = fingerprint_service.recognize(audio_file).transcript
+            if transcript:
+                TranscriptionService._save_transcription(transcript, title)
+                original_text = transcript
+            else:
+                with stage('transcription'):
+                    original_text = single_flight.run(
+                        SingleFlight.make_key(video_id, 'transcription'),
+                        lambda: transcription_service.transcribe_audio(audio_file, title)
+                    )
+            logger.info(f"Transcription complete, length: {len(original_text)} chars")
+
+        # Step 4: Format and translate
+        logger.info(f"Processing translation and formatting (target language: {target_language})")
+        with stage('fingerprint'):
+            recognition = fingerprint_service.recognize(audio_file)
+        processed_text = recognition.translation(target_language, quality)
+        if processed_text is None:
+            with stage('translation'):
+                processed_text = single_flight.run(
+                    SingleFlight.make_key(video_id, 'translation', target_language, quality),
+                    lambda: translation_service.process_transcription(original_text, target_language=target_language)
+                )
+            with stage('fingerprint'):
+                fingerprint_service.remember(recognition, video_id, title, original_text,
+                                             target_language, quality, processed_text)
+        logger.info("Translation complete")
+
+        # Step 5: Save to database
+        if save:
+            with stage('db_write'):
+                translation = translationPost.objects.create(
+                    youtube_title=title,
+                    youtube_link=yt_link,
+                    generated_content=processed_text['translated'],
+                    original_transcription=processed_text['original'],
+                    target_language=target_language
+                )
+                translation.save()
+            # Stored after the insert so the waterfall includes it
+            translationPost.objects.filter(pk=translation.pk).update(stage_timeline=trace.as_dict())
+            logger.info(f"Saved translation to database, ID: {translation.id}")
+
+        # Transcript published by the transcription stage
+        transcription_file = workspace.artifact_path(title, '.txt')
+
+        return {
+            "id": translation.id if save else None,
+            "title": title,
+            "translation": processed_text['translated'],
+            "original_transcription": processed_text['original'],
+            "video_file": video_file,
+            "audio_file": audio_file,
+            "transcription_file": str(transcription_file),
+            "target_language": target_language,
+            "stage_timeline": trace.as_dict()
+        }
+
+
+async def aprocess_video(yt_link: str, openai_api_key: str, target_language: str = 'es',
+                         quality: str = 'balanced', include_video: bool = True) -> dict:
+    """
+    Coroutine version of ``process_video``, for the ASGI view.
+
+    Same stages, caches and result; every external call is awaited.
+
+    Args:
+        yt_link: YouTube video URL
+        openai_api_key: OpenAI API key for translation
+        target_language: Target language code for translation (default: 'es')
+        quality: Latency/quality tier for model routing (default: 'balanced')
+        include_video: Whether to download the video track (False for audio only)
+
+    Returns:
+        Dictionary with processing results
+
+    Raises:
+        YouTubeDownloadException: If download fails
+        TranscriptionException: If transcription fails
+        TranslationException: If translation fails
+        DeadlineExceededException: If the job deadline passes
+        OverloadedException: If a resource slot does not free up in time
+    """
+    # Initialize services
+    youtube_service = AsyncYouTubeService()
+    transcription_service = AsyncTranscriptionService(api_key=settings.AAI_API_KEY)
+    translation_service = AsyncTranslationService(api_key=openai_api_key, quality=quality)
+    fingerprint_service = FingerprintService()
+    # Fingerprinting decodes, hashes and queries the database; concurrent jobs run it in parallel
+    recognize = _in_worker_thread(fingerprint_service.recognize)
+    single_flight = SingleFlight()
+
+    # Identical concurrent jobs (same video/stage/language) share one execution
+    video_id = youtube_service.extract_video_id(yt_link)
+
+    # Each job writes to its own scratch directory and publishes finished
+    # files (its stage waterfall is stored with the translation); the
+    # OpenAI connection pool is closed when the job ends
+    async with translation_service:
+        with trace_job() as trace, job_workspace(video_id) as workspace:
+            # Step 1: Get video title
+            logger.info(f"Fetching title for: {yt_link}")
+            with stage('metadata'):
+                title = await single_flight.arun(
+                    SingleFlight.make_key(video_id, 'metadata'),
+                    lambda: youtube_service.get_title(yt_link)
+                )
+            logger.info(f"Video title: {title}")
+
+            # Long recordings are downloaded whole and transcribed in segments instead
+            duration = (await youtube_service.get_metadata(yt_link)).duration
+            if youtube_service.can_stream_audio() and not AudioSegmenter().applies_to(duration):
+                # Steps 2-3: Stream the audio into the transcription upload while the video downloads
+                async def transcribe_streamed_audio():
+                    audio_path, chunks = await youtube_service.stream_audio(yt_link, title)
+                    # The audio is downloaded and remuxed (the 'transcode' span) while it uploads
+                    with stage('upload'):
+                        upload_url = await transcription_service.upload_stream(chunks)
+                    # A song processed before keeps its transcript; skip the transcription wait
+                    with stage('fingerprint'):
+                        transcript = (await recognize(audio_path)).transcript
+                    if transcript:
+                        await asyncio.to_thread(TranscriptionService._save_transcription, transcript, title)
+                        return [audio_path, transcript]
+                    with stage('transcription'):
+                        return [audio_path, await transcription_service.transcribe_audio(upload_url, title)]
+
+                async def download_video():
+                    if not include_video:
+                        return None
+                    with stage('video_download'):
+                        return await single_flight.arun(
+                            SingleFlight.make_key(video_id, 'video'),
+                            lambda: youtube_service.download_video(yt_link, title),
+                            validate=os.path.exists
+                        )
+
+                logger.info(f"Downloading video and streaming audio to transcription for: {title}")
+                video_file, (audio_file, original_text) = await asyncio.gather(
+                    download_video(),
+                    single_flight.arun(
+                        SingleFlight.make_key(video_id, 'audio_transcription'),
+                        transcribe_streamed_audio,
+                        validate=lambda result: os.path.exists(result[0])
+                    )
+                )
+                logger.info(f"Downloaded - Video: {video_file}")
+                logger.info(f"Transcription complete, length: {len(original_text)} chars")
+            else:
+                # Step 2: Download video and audio (audio only for oversized videos)
+                logger.info(f"Downloading video and audio for: {title}")
+                video_file = None
+                if include_video:
+                    with stage('video_download'):
+                        video_file = await single_flight.arun(
+                            SingleFlight.make_key(video_id, 'video'),
+                            lambda: youtube_service.download_video(yt_link, title),
+                            validate=os.path.exists
+                        )
+                with stage('audio_download'):
+                    audio_file = await single_flight.arun(
+                        SingleFlight.make_key(video_id, 'audio'),
+                        lambda: youtube_service.download_audio(yt_link, title),
+                        validate=os.path.exists
+                    )
+                logger.info(f"Downloaded - Video: {video_file}, Audio: {audio_file}")
+
+                # Step 3: Transcribe audio, unless the song was processed before
+                logger.info(f"Transcribing audio: {audio_file}")
+                with stage('fingerprint'):
+                    transcript = (await recognize(audio_file)).transcript
+                if transcript:
+                    await asyncio.to_thread(TranscriptionService._save_transcription, transcript, title)
+                    original_text = transcript
+                else:
+                    with stage('transcription'):
+                        original_text = await single_flight.arun(
+                            SingleFlight.make_key(video_id, 'transcription'),
+                            lambda: transcription_service.transcribe_audio(audio_file, title)
+                        )
+                logger.info(f"Transcription complete, length: {len(original_text)} chars")
+
+            # Step 4: Format and translate
+            logger.info(f"Processing translation and formatting (target language: {target_language})")
+            with stage('fingerprint'):
+                recognition = await recognize(audio_file)
+            processed_text = recognition.translation(target_language, quality)
+            if processed_text is None:
+                with stage('translation'):
+                    processed_text = await single_flight.arun(
+                        SingleFlight.make_key(video_id, 'translation', target_language, quality),
+                        lambda: translation_service.process_transcription(original_text, target_language=target_language)
+                    )
+                with stage('fingerprint'):
+                    await _in_worker_thread(fingerprint_service.remember)(
+                        recognition, video_id, title, original_text, target_language, quality, processed_text
+                    )
+            logger.info("Translation complete")
+
+            # Step 5: Save to database
+            with stage('db_write'):
+                translation = await translationPost.objects.acreate(
+                    youtube_title=title,
+                    youtube_link=yt_link,
+                    generated_content=processed_text['translated'],
+                    original_transcription=processed_text['original'],
+                    target_language=target_language
+                )
+            # Stored after the insert so the waterfall includes it
+            await translationPost.objects.filter(pk=translation.pk).aupdate(stage_timeline=trace.as_dict())
+            logger.info(f"Saved translation to database, ID: {translation.id}")
+
+            # Transcript published by the transcription stage
+            transcription_file = workspace.artifact_path(title, '.txt')
+
+            return {
+                "id": translation.id,
+                "title": title,
+                "translation": processed_text['translated'],
+                "original_transcription": processed_text['original'],
+                "video_file": video_file,
+                "audio_file": audio_file,
+                "transcription_file": str(transcription_file),
+                "target_language": target_language,
+                "stage_timeline": trace.as_dict()
+            }
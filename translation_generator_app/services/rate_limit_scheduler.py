@@ -0,0 +1,254 @@
+"""
+Rate Limit Scheduler - Paces OpenAI requests per API key under its request and token limits.
+"""
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, Mapping, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _TokenBucket:
+    """
+    Per-minute allowance refilled continuously at ``limit / 60`` per second.
+
+    Reservations may drive the level below zero: the deficit is the time
+    the caller must wait, so concurrent callers queue up in arrival order
+    instead of racing for the same refill.
+    """
+
+    def __init__(self):
+        self.limit: Optional[float] = None
+        self.level = 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.limit:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+    def reserve(self, cost: float, now: float) -> float:
+        """Take ``cost`` from the bucket and return the seconds until it is covered."""
+        if not self.limit:
+            return 0.0
+        self._refill(now)
+        self.level -= cost
+        return max(0.0, -self.level * 60 / self.limit)
+
+    def refund(self, cost: float):
+        """Give back a reservation that was not used."""
+        if self.limit:
+            self.level = min(self.limit, self.level + cost)
+
+    def observe(self, limit: float, remaining: float, now: float):
+        """Adopt the limit and remaining allowance reported by the server."""
+        first = self.limit is None
+        self._refill(now)
+        self.limit = limit
+        # Never trust more than the server reports; requests reserved here
+        # but not yet counted there keep the local level lower
+        self.level = remaining if first else min(self.level, remaining)
+
+    def block(self, seconds: float, now: float):
+        """Make the next reservation wait at least ``seconds``."""
+        if self.limit:
+            self._refill(now)
+            self.level = min(self.level, -seconds * self.limit / 60)
+
+
+class RateLimitScheduler:
+    """
+    Client-side pacing of the OpenAI calls made with one API key.
+
+    OpenAI limits each key (organization) by requests and tokens per
+    minute and reports both in the ``x-ratelimit-*`` headers of every
+    response. The scheduler mirrors them in two token buckets, scaled by
+    ``OPENAI_RATE_LIMIT_HEADROOM``: before a request, ``reserve`` returns
+    how long to wait so that all jobs sharing the key stay just under the
+    limit. A 429 that still happens blocks the key for its ``Retry-After``
+    and is retried with jittered exponential backoff, up to
+    ``OPENAI_RATE_LIMIT_RETRIES`` times.
+
+    Until a key's first response arrives its limits are unknown and
+    requests are not delayed. Use ``RateLimitScheduler.for_key()`` to get
+    the per-process instance of a key.
+    """
+
+    # Seconds of the first 429 backoff (doubled on each further attempt)
+    BASE_BACKOFF = 0.5
+    MAX_BACKOFF = 30.0
+
+    _schedulers: Dict[str, 'RateLimitScheduler'] = {}
+    _schedulers_pid: Optional[int] = None
+    _schedulers_lock = threading.Lock()
+
+    def __init__(self, headroom: Optional[float] = None, max_retries: Optional[int] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            headroom: Fraction of the reported limits to use (default: settings.OPENAI_RATE_LIMIT_HEADROOM)
+            max_retries: Retries of a rate-limited request (default: settings.OPENAI_RATE_LIMIT_RETRIES)
+        """
+        self.headroom = headroom if headroom is not None else getattr(settings, 'OPENAI_RATE_LIMIT_HEADROOM', 0.9)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'OPENAI_RATE_LIMIT_RETRIES', 6)
+        self.requests = _TokenBucket()
+        self.tokens = _TokenBucket()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_key(cls, api_key: str) -> 'RateLimitScheduler':
+        """
+        Return the scheduler of an API key in the current process.
+
+        Keys are held by digest, so the registry never stores them in clear.
+
+        Args:
+            api_key: OpenAI API key
+
+        Returns:
+            The key's RateLimitScheduler
+        """
+        digest = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()
+        with cls._schedulers_lock:
+            if cls._schedulers_pid != os.getpid():
+                cls._schedulers = {}
+                cls._schedulers_pid = os.getpid()
+            if digest not in cls._schedulers:
+                cls._schedulers[digest] = cls()
+            return cls._schedulers[digest]
+
+    @staticmethod
+    def estimate_tokens(request: Mapping) -> int:
+        """
+        Estimate the tokens a chat completion counts against the limit.
+
+        OpenAI counts the prompt plus the maximum completion length; when
+        no maximum is given the completion is assumed as long as the prompt
+        (formatting and translation echo their input).
+
+        Args:
+            request: Arguments for ``chat.completions.create``
+
+        Returns:
+            Estimated token count (about 4 characters per token)
+        """
+        prompt = sum(len(str(m.get('content') or '')) for m in request.get('messages', [])) // 4 + 1
+        completion = request.get('max_completion_tokens') or request.get('max_tokens') or prompt
+        return prompt + completion
+
+    def reserve(self, tokens: int, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve one request and ``tokens`` tokens.
+
+        Args:
+            tokens: Estimated token cost of the request
+            max_wait: Longest acceptable wait in seconds (None for no limit)
+
+        Returns:
+            Seconds to wait before sending the request, or None (nothing
+            reserved) if that would exceed ``max_wait``
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+            if max_wait is not None and wait > max_wait:
+                self.requests.refund(1)
+                self.tokens.refund(tokens)
+                return None
+        if wait > 0:
+            logger.debug(f"Pacing OpenAI request by {wait:.2f}s to stay under the rate limit")
+        return wait
+
+    def observe(self, headers: Mapping[str, str]):
+        """
+        Update the limits from the ``x-ratelimit-*`` headers of a response.
+
+        Args:
+            headers: Response headers
+        """
+        with self._lock:
+            now = time.monotonic()
+            for name, bucket in (('requests', self.requests), ('tokens', self.tokens)):
+                limit = _number(headers.get(f'x-ratelimit-limit-{name}'))
+                remaining = _number(headers.get(f'x-ratelimit-remaining-{name}'))
+                if limit and remaining is not None:
+                    usable = limit * self.headroom
+                    bucket.observe(usable, remaining - (limit - usable), now)
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """
+        Whether a rate-limited request should be sent again.
+
+        Exhausted quota (``insufficient_quota``) is also reported as 429
+        but does not recover by waiting.
+
+        Args:
+            error: The ``openai.RateLimitError`` raised
+            attempt: Number of retries already made
+
+        Returns:
+            True to retry after ``backoff``
+        """
+        return attempt < self.max_retries and getattr(error, 'code', None) != 'insufficient_quota'
+
+    def backoff(self, error: Exception, attempt: int) -> float:
+        """
+        Delay before retrying a rate-limited request; later requests of the key wait as well.
+
+        Args:
+            error: The ``openai.RateLimitError`` raised
+            attempt: Number of retries already made
+
+        Returns:
+            Seconds to wait: the server's ``Retry-After`` (or the reset time
+            of the exhausted limit) plus a random share of the exponential
+            backoff, so queued requests do not retry in lockstep
+        """
+        response = getattr(error, 'response', None)
+        headers = response.headers if response is not None else {}
+        self.observe(headers)
+        retry_after = _retry_after(headers)
+        exponential = min(self.MAX_BACKOFF, self.BASE_BACKOFF * 2 ** attempt)
+        delay = min(self.MAX_BACKOFF, retry_after + random.uniform(0, exponential))
+        with self._lock:
+            now = time.monotonic()
+            self.requests.block(delay, now)
+            self.tokens.block(delay, now)
+        logger.info(f"OpenAI rate limit hit; retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+        return delay
+
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _duration(value: Optional[str]) -> float:
+    """Parse an OpenAI reset duration such as ``'6m0s'``, ``'1.5s'`` or ``'20ms'``."""
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in _DURATION_PART.findall(value or ''))
+
+
+def _retry_after(headers: Mapping[str, str]) -> float:
+    """Seconds the server asked to wait, from ``retry-after-ms``, ``retry-after`` or the reset headers."""
+    milliseconds = _number(headers.get('retry-after-ms'))
+    if milliseconds is not None:
+        return milliseconds / 1000
+    seconds = _number(headers.get('retry-after'))
+    if seconds is not None:
+        return seconds
+    return max(_duration(headers.get('x-ratelimit-reset-requests')),
+               _duration(headers.get('x-ratelimit-reset-tokens')))
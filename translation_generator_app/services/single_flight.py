@@ -0,0 +1,277 @@
+"""
+Single-Flight Service - Coalesces concurrent identical pipeline stages.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connection
+from django.utils import timezone
+
+from ..deadline import current_deadline
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class _Call:
+    """An in-flight call that followers in the same process can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Run a stage once per key and share its result with concurrent callers.
+
+    Within a process, callers with the same key wait for the first one
+    (the leader) and receive its result. Errors are not shared: a leader
+    may fail for reasons of its own (its OpenAI key is rejected with
+    ``AuthenticationError``, its quota answers ``RateLimitError``, its
+    deadline passes), so when it fails one of the waiting callers becomes
+    the new leader and runs the work with its own arguments while the rest
+    wait on it in turn. Across processes (gunicorn workers), the leader holds a PostgreSQL advisory lock while
+    it runs and stores the result in ``StageResult``; callers in other
+    processes wait on the lock and then read the stored result. On other
+    database backends only in-process coalescing is done.
+
+    Keys are built with ``make_key``, e.g. ``(video_id, 'translation', 'es')``.
+    ``arun`` is the coroutine version used by the async views; it coalesces
+    callers on the same event loop and reuses stored results, but does not
+    take the advisory lock.
+    """
+
+    _lock = threading.Lock()
+    _calls: Dict[str, _Call] = {}
+    _async_calls: Dict[str, 'asyncio.Future'] = {}
+
+    def __init__(
+        self,
+        result_ttl: Optional[int] = None,
+        lock_timeout: Optional[int] = None,
+        poll_interval: float = 0.25
+    ):
+        """
+        Initialize the single-flight coordinator.
+
+        Args:
+            result_ttl: Seconds a stored result can be reused (default: settings.SINGLE_FLIGHT_RESULT_TTL)
+            lock_timeout: Maximum seconds to wait for another worker (default: settings.SINGLE_FLIGHT_LOCK_TIMEOUT)
+            poll_interval: Seconds between advisory lock attempts
+        """
+        self.result_ttl = result_ttl if result_ttl is not None else getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL', 120)
+        self.lock_timeout = lock_timeout if lock_timeout is not None else getattr(settings, 'SINGLE_FLIGHT_LOCK_TIMEOUT', 600)
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def make_key(video_id: str, stage: str, *parts: str) -> str:
+        """
+        Build a coalescing key.
+
+        Args:
+            video_id: YouTube video ID
+            stage: Pipeline stage name
+            parts: Extra discriminators (e.g. target language, quality tier)
+
+        Returns:
+            Key string
+        """
+        return ':'.join((video_id, stage) + tuple(str(part) for part in parts))
+
+    def run(self, key: str, fn: Callable[[], Any], validate: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Run ``fn`` unless an identical call is in flight, and share the result.
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument callable doing the work; its result must be JSON-serializable
+            validate: Optional check that a stored result is still usable (e.g. files exist)
+
+        Returns:
+            Result of ``fn`` (or of the identical call it was attached to)
+
+        Raises:
+            DeadlineExceededException: If the job deadline passes while waiting on another caller
+            Exception: Whatever ``fn`` raises when run by this caller
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+            if leader:
+                break
+
+            logger.info(f"Attaching to in-flight job: {key}")
+            deadline = current_deadline()
+            if not call.event.wait(timeout=deadline.remaining() if deadline else None):
+                raise deadline.exceeded(key)
+            if call.error is None:
+                return call.result
+            # The first waiter back in the registry leads the retry; the others attach to it
+            logger.info(f"In-flight job {key} failed ({type(call.error).__name__}); retrying it for its waiters")
+
+        try:
+            call.result = self._run_shared(key, fn, validate)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    async def arun(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        validate: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """
+        Coroutine version of ``run`` for async callers.
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument coroutine function doing the work; its result must be JSON-serializable
+            validate: Optional check that a stored result is still usable (e.g. files exist)
+
+        Returns:
+            Result of ``fn`` (or of the identical call it was attached to)
+
+        Raises:
+            DeadlineExceededException: If the job deadline passes while waiting on another caller
+            Exception: Whatever ``fn`` raises when run by this caller
+        """
+        while key in self._async_calls:
+            call = self._async_calls[key]
+            logger.info(f"Attaching to in-flight job: {key}")
+            deadline = current_deadline()
+            try:
+                return await asyncio.wait_for(asyncio.shield(call), timeout=deadline.remaining() if deadline else None)
+            except asyncio.CancelledError:
+                # The leader's request was cancelled; take over unless this task was
+                if not call.cancelled():
+                    raise
+            except Exception as e:
+                if not call.done():
+                    # wait_for timed out, the leader is still running
+                    raise deadline.exceeded(key)
+                # The first waiter to resume leads the retry; the others attach to it
+                logger.info(f"In-flight job {key} failed ({type(e).__name__}); retrying it for its waiters")
+
+        call = asyncio.get_running_loop().create_future()
+        self._async_calls[key] = call
+        try:
+            result = await sync_to_async(self._load)(key, validate)
+            if result is not _MISSING:
+                logger.info(f"Reusing result of finished job: {key}")
+            else:
+                result = await fn()
+                await sync_to_async(self._store)(key, result)
+            call.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            # Followers only check for it; avoid "exception was never retrieved" when there are none
+            call.exception()
+            raise
+        finally:
+            self._async_calls.pop(key, None)
+
+    def _run_shared(self, key: str, fn: Callable[[], Any], validate: Optional[Callable[[Any], bool]]) -> Any:
+        with self._advisory_lock(key):
+            stored = self._load(key, validate)
+            if stored is not _MISSING:
+                logger.info(f"Reusing result of finished job: {key}")
+                return stored
+
+            result = fn()
+            self._store(key, result)
+            return result
+
+    def _load(self, key: str, validate: Optional[Callable[[Any], bool]]) -> Any:
+        from ..models import StageResult
+
+        if self.result_ttl <= 0:
+            return _MISSING
+
+        cutoff = timezone.now() - timedelta(seconds=self.result_ttl)
+        stored = StageResult.objects.filter(key=key, updated_at__gte=cutoff).first()
+        if stored is None or (validate and not validate(stored.payload)):
+            return _MISSING
+        return stored.payload
+
+    def _store(self, key: str, result: Any):
+        from ..models import StageResult
+
+        if self.result_ttl <= 0:
+            return
+        # Plain UPDATE/INSERT rather than update_or_create: no row lock is held
+        # while other workers may be reading the key
+        updated = StageResult.objects.filter(key=key).update(payload=result, updated_at=timezone.now())
+        if not updated:
+            try:
+                StageResult.objects.create(key=key, payload=result)
+            except IntegrityError:
+                StageResult.objects.filter(key=key).update(payload=result, updated_at=timezone.now())
+
+    @staticmethod
+    def _lock_id(key: str) -> int:
+        """Map a key to a signed 64-bit advisory lock ID."""
+        return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+    @contextmanager
+    def _advisory_lock(self, key: str) -> Iterator[None]:
+        """
+        Hold a PostgreSQL session advisory lock for ``key``.
+
+        Uses ``pg_try_advisory_lock`` in a sleep loop instead of the blocking
+        variant so gevent workers keep serving other requests while waiting.
+        If the lock cannot be taken within ``lock_timeout`` the stage runs
+        without it; if the job deadline passes first, waiting stops with
+        DeadlineExceededException.
+        """
+        if connection.vendor != 'postgresql':
+            yield
+            return
+
+        lock_id = self._lock_id(key)
+        give_up_at = time.monotonic() + self.lock_timeout
+        job_deadline = current_deadline()
+        acquired = False
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute("SELECT pg_try_advisory_lock(%s)", [lock_id])
+                acquired = cursor.fetchone()[0]
+                if acquired or time.monotonic() >= give_up_at:
+                    break
+                if job_deadline:
+                    job_deadline.check(key)
+                time.sleep(self.poll_interval)
+
+        if not acquired:
+            logger.warning(f"Timed out waiting for in-flight job {key}; running it independently")
+
+        try:
+            yield
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
@@ -0,0 +1,232 @@
+"""
+Transcription Poller - One shared background poller for all pending AssemblyAI transcripts.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from ..exceptions import TranscriptionException
+from ..lazy import LazyModule
+
+logger = logging.getLogger(__name__)
+
+aai = LazyModule('assemblyai')
+
+
+class _PendingTranscript:
+    """Bookkeeping for one transcript the poller is waiting on."""
+
+    def __init__(self, transcript_id: str, interval: float, max_wait: float):
+        self.transcript_id = transcript_id
+        self.future: Future = Future()
+        self.interval = interval
+        self.next_check = time.monotonic() + interval
+        self.deadline = time.monotonic() + max_wait
+        # Set by notify(); a check already under way must not push the next one back
+        self.notified = False
+
+
+class TranscriptionPoller:
+    """
+    Tracks many submitted transcripts from a single background thread.
+
+    Instead of each request blocking a worker while the SDK polls its own
+    transcript, requests submit the transcript and wait on a ``Future``
+    resolved by this poller. Each tick the poller checks every transcript
+    that is due: when several are due it reads their status from one
+    ``list_transcripts`` page and only fetches the full transcript for the
+    finished ones. Transcripts still processing are re-checked with
+    exponential backoff between ``min_interval`` and ``max_interval``.
+    A caller that stops waiting (e.g. its job deadline passed) calls
+    ``untrack`` so the transcript is not polled for nobody.
+
+    Use ``TranscriptionPoller.shared()`` to get the per-process instance.
+    """
+
+    _shared: Optional['TranscriptionPoller'] = None
+    _shared_pid: Optional[int] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        min_interval: float = 1.0,
+        max_interval: float = 15.0,
+        backoff: float = 1.5,
+        batch_threshold: int = 3,
+        max_wait: float = 3600.0
+    ):
+        """
+        Initialize the poller.
+
+        Args:
+            min_interval: First (and minimum) delay between checks of a transcript, in seconds
+            max_interval: Maximum delay between checks of a transcript, in seconds
+            backoff: Factor applied to a transcript's delay after each check that finds it pending
+            batch_threshold: Minimum number of due transcripts to use one list request
+            max_wait: Seconds after which a transcript is given up
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.batch_threshold = batch_threshold
+        self.max_wait = max_wait
+        self._pending: Dict[str, _PendingTranscript] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def shared(cls) -> 'TranscriptionPoller':
+        """
+        Return the poller shared by the current process.
+
+        A new instance is created after a fork (e.g. in each gunicorn worker),
+        since the parent's polling thread does not exist in the child.
+        """
+        with cls._shared_lock:
+            if cls._shared is None or cls._shared_pid != os.getpid():
+                cls._shared = cls(
+                    min_interval=getattr(settings, 'TRANSCRIPTION_POLL_MIN_INTERVAL', 1.0),
+                    max_interval=getattr(settings, 'TRANSCRIPTION_POLL_MAX_INTERVAL', 15.0),
+                )
+                cls._shared_pid = os.getpid()
+            return cls._shared
+
+    @property
+    def pending_count(self) -> int:
+        """Number of transcripts currently being tracked."""
+        with self._condition:
+            return len(self._pending)
+
+    def track(self, transcript_id: str) -> Future:
+        """
+        Start tracking a submitted transcript.
+
+        Args:
+            transcript_id: AssemblyAI transcript ID
+
+        Returns:
+            Future resolved with the completed ``aai.Transcript`` or failed with TranscriptionException
+        """
+        with self._condition:
+            job = self._pending.get(transcript_id)
+            if job is None:
+                job = _PendingTranscript(transcript_id, self.min_interval, self.max_wait)
+                self._pending[transcript_id] = job
+            self._ensure_thread()
+            self._condition.notify()
+            return job.future
+
+    def untrack(self, transcript_id: str):
+        """
+        Stop tracking a transcript and cancel its future (e.g. when the waiting job gave up).
+
+        Args:
+            transcript_id: AssemblyAI transcript ID
+        """
+        with self._condition:
+            job = self._pending.pop(transcript_id, None)
+            if job is not None:
+                job.future.cancel()
+
+    def notify(self, transcript_id: str):
+        """
+        Check a transcript on the next tick (e.g. after a webhook said it finished).
+
+        Args:
+            transcript_id: AssemblyAI transcript ID
+        """
+        with self._condition:
+            job = self._pending.get(transcript_id)
+            if job is not None:
+                job.notified = True
+                job.next_check = time.monotonic()
+                self._condition.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='transcription-poller', daemon=True)
+            self._thread.start()
+
+    def _next_due(self) -> List[_PendingTranscript]:
+        """Block until at least one transcript is due and return the due ones."""
+        with self._condition:
+            while True:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                due = [job for job in self._pending.values() if job.next_check <= now]
+                if due:
+                    for job in due:
+                        job.notified = False
+                    return due
+                self._condition.wait(timeout=min(job.next_check for job in self._pending.values()) - now)
+
+    def _run(self):
+        while True:
+            due = self._next_due()
+            try:
+                statuses = self._batch_statuses() if len(due) >= self.batch_threshold else {}
+            except Exception as e:
+                logger.warning(f"Batched transcript status check failed: {str(e)}")
+                statuses = {}
+
+            for job in due:
+                try:
+                    self._check(job, statuses.get(job.transcript_id))
+                except Exception as e:
+                    logger.warning(f"Status check for transcript {job.transcript_id} failed: {str(e)}")
+                    self._reschedule(job)
+
+    def _batch_statuses(self) -> Dict[str, 'aai.TranscriptStatus']:
+        """Read the status of recent transcripts with a single list request."""
+        response = aai.Transcriber().list_transcripts(aai.ListTranscriptParameters(limit=200))
+        return {item.id: item.status for item in response.transcripts}
+
+    @staticmethod
+    def _fetch(transcript_id: str) -> 'aai.Transcript':
+        """Read a transcript's current state with one request (``Transcript.get_by_id`` waits until it finishes)."""
+        client = aai.Client.get_default()
+        return aai.Transcript.from_response(client=client, response=aai.api.get_transcript(client.http_client, transcript_id))
+
+    def _check(self, job: _PendingTranscript, known_status: Optional['aai.TranscriptStatus']):
+        if known_status in (aai.TranscriptStatus.queued, aai.TranscriptStatus.processing):
+            self._reschedule(job)
+            return
+
+        transcript = self._fetch(job.transcript_id)
+        if transcript.status == aai.TranscriptStatus.completed:
+            self._finish(job, result=transcript)
+        elif transcript.status == aai.TranscriptStatus.error:
+            self._finish(job, error=TranscriptionException(f"Transcription failed: {transcript.error}"))
+        else:
+            self._reschedule(job)
+
+    def _reschedule(self, job: _PendingTranscript):
+        with self._condition:
+            now = time.monotonic()
+            expired = now >= job.deadline
+            if not expired:
+                job.interval = min(job.interval * self.backoff, self.max_interval)
+                # A webhook that arrived during the check asked for another one now
+                job.next_check = now if job.notified else min(now + job.interval, job.deadline)
+        if expired:
+            self._finish(job, error=TranscriptionException(
+                f"Transcription {job.transcript_id} did not finish within {self.max_wait:g} seconds."
+            ))
+
+    def _finish(self, job: _PendingTranscript, result=None, error: Optional[Exception] = None):
+        with self._condition:
+            self._pending.pop(job.transcript_id, None)
+            # Untracked while it was being checked
+            if job.future.cancelled():
+                return
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
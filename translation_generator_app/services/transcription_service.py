@@ -1,12 +1,31 @@
 """
 Transcription Service - Handles audio transcription using AssemblyAI.
 """
-import assemblyai as aai
+import contextvars
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
 from django.conf import settings
-from typing import Optional
+from typing import Iterable, Optional
 
-from ..exceptions import TranscriptionException
+from ..admission import limiter
+from ..deadline import current_deadline
+from ..exceptions import (
+    TranscriptionException, YouTubeDownloadException, DeadlineExceededException, OverloadedException
+)
+from ..instrumentation import count_stage, span
+from ..lazy import LazyModule
+from ..workspace import artifact_workspace
+from .audio_segmenter import AudioSegmenter
+from .transcription_poller import TranscriptionPoller
+
+logger = logging.getLogger(__name__)
+
+aai = LazyModule('assemblyai')
 
 
 class TranscriptionService:
@@ -26,8 +45,12 @@ class TranscriptionService:
         """
         Transcribe audio file using AssemblyAI.
         
+        Local files longer than ``AUDIO_SEGMENT_THRESHOLD`` are split at
+        silences and their segments transcribed concurrently (see
+        ``AudioSegmenter``), so the wait stays close to that of one segment.
+        
         Args:
-            audio_file: Path to audio file
+            audio_file: Path to audio file, or URL AssemblyAI can fetch
             title: Title for saving transcription
             
         Returns:
@@ -35,28 +58,184 @@ class TranscriptionService:
             
         Raises:
             TranscriptionException: If transcription fails
+            DeadlineExceededException: If the job deadline passes first
+            OverloadedException: If no transcription slot frees up in time
         """
+        deadline = current_deadline()
         try:
-            transcriber = aai.Transcriber()
-            transcript = transcriber.transcribe(audio_file)
-            
-            if not transcript or not hasattr(transcript, 'text') or not transcript.text:
-                raise TranscriptionException("Transcription returned empty result.")
+            if os.path.isfile(audio_file) and AudioSegmenter().may_apply_to(audio_file):
+                text = self._transcribe_segmented(audio_file)
+            else:
+                text = self._transcribe(audio_file)
             
             # Save transcription to file
-            self._save_transcription(transcript.text, title)
+            self._save_transcription(text, title)
             
-            return transcript.text
+            return text
             
-        except TranscriptionException:
+        except (TranscriptionException, DeadlineExceededException, OverloadedException):
             raise
         except Exception as e:
+            if deadline and deadline.expired:
+                raise deadline.exceeded('transcription')
             raise TranscriptionException(f"Transcription failed: {str(e)}")
     
+    def _transcribe(self, audio_file: str) -> str:
+        """Transcribe one file or URL in a transcription slot and return its text."""
+        with limiter('transcription').slot():
+            return self._run_transcript(audio_file)
+    
+    def _run_transcript(self, audio_file: str) -> str:
+        """Submit one file or URL and wait for its text; the caller holds the transcription slot."""
+        deadline = current_deadline()
+        if deadline:
+            deadline.check('transcription')
+        transcriber = aai.Transcriber()
+        if getattr(settings, 'TRANSCRIPTION_SHARED_POLLER', True):
+            # Submit without blocking on the SDK's own polling loop; the
+            # shared poller resolves the transcript when it is done
+            submitted = transcriber.submit(audio_file, config=self._transcription_config())
+            if submitted.status == aai.TranscriptStatus.error:
+                raise TranscriptionException(f"Transcription failed: {submitted.error}")
+            poller = TranscriptionPoller.shared()
+            future = poller.track(submitted.id)
+            try:
+                transcript = future.result(timeout=deadline.remaining() if deadline else None)
+            except FutureTimeoutError:
+                poller.untrack(submitted.id)
+                raise deadline.exceeded('transcription')
+        else:
+            transcript = transcriber.transcribe(audio_file)
+            if deadline:
+                deadline.check('transcription')
+        
+        if not transcript or not hasattr(transcript, 'text') or not transcript.text:
+            raise TranscriptionException("Transcription returned empty result.")
+        return transcript.text
+    
+    def _transcribe_segmented(self, audio_file: str) -> str:
+        """
+        Transcribe a local file, split at silences first if it is long.
+        
+        Segments are transcribed on a thread pool and their texts joined
+        in playback order. The job holds a single transcription slot for
+        all of them, so a split recording counts as one job against
+        ``ADMISSION_LIMITS['transcription']`` instead of taking every slot
+        of the process with its segments.
+        """
+        segmenter = AudioSegmenter()
+        with artifact_workspace() as workspace:
+            directory = tempfile.mkdtemp(prefix='segments-', dir=workspace.path)
+            try:
+                try:
+                    with span('segmentation'):
+                        segments = segmenter.split(audio_file, directory)
+                except (RuntimeError, OSError, subprocess.SubprocessError) as e:
+                    # Splitting is an optimization; the whole file can still be transcribed
+                    logger.warning(f"Could not split {os.path.basename(audio_file)}: {str(e)}")
+                    segments = []
+                if len(segments) <= 1:
+                    return self._transcribe(audio_file)
+                
+                workers = min(len(segments), getattr(settings, 'ADMISSION_LIMITS', {}).get('transcription') or len(segments))
+                with limiter('transcription').slot(), \
+                        ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcribe-segment') as executor:
+                    # Each worker runs in a copy of the job's context (deadline, progress)
+                    futures = [
+                        executor.submit(contextvars.copy_context().run, self._transcribe_segment, segment.path)
+                        for segment in segments
+                    ]
+                    texts = [future.result() for future in futures]
+                logger.info(f"Transcribed {len(segments)} segments of {os.path.basename(audio_file)}")
+                return '\n'.join(text.strip() for text in texts if text.strip())
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+    
+    def transcribe_stream(self, chunks: Iterable[bytes], title: str) -> str:
+        """
+        Upload audio to AssemblyAI as it is produced, then transcribe it.
+        
+        The chunks are sent with chunked transfer encoding, so the upload
+        overlaps the download/transcode producing them.
+        
+        Args:
+            chunks: Iterable of audio bytes (e.g. from YouTubeService.stream_audio)
+            title: Title for saving transcription
+            
+        Returns:
+            Transcribed text
+            
+        Raises:
+            YouTubeDownloadException: If producing the audio fails
+            TranscriptionException: If upload or transcription fails
+            DeadlineExceededException: If the job deadline passes first
+        """
+        return self.transcribe_audio(self.upload_stream(chunks), title)
+    
+    def upload_stream(self, chunks: Iterable[bytes]) -> str:
+        """
+        Upload audio to AssemblyAI as it is produced, without transcribing it.
+        
+        Args:
+            chunks: Iterable of audio bytes (e.g. from YouTubeService.stream_audio)
+            
+        Returns:
+            URL of the uploaded audio, accepted by ``transcribe_audio``
+            
+        Raises:
+            YouTubeDownloadException: If producing the audio fails
+            TranscriptionException: If the upload fails
+            DeadlineExceededException: If the job deadline passes first
+            OverloadedException: If no transcription or ffmpeg slot frees up in time
+        """
+        uploaded = 0
+        
+        def counted():
+            nonlocal uploaded
+            for chunk in chunks:
+                uploaded += len(chunk)
+                yield chunk
+        
+        try:
+            with limiter('transcription').slot():
+                upload_url = aai.Transcriber().upload_file(counted())
+                count_stage(bytes=uploaded)
+                return upload_url
+        except (YouTubeDownloadException, TranscriptionException, DeadlineExceededException, OverloadedException):
+            raise
+        except Exception as e:
+            deadline = current_deadline()
+            if deadline and deadline.expired:
+                raise deadline.exceeded('audio upload')
+            raise TranscriptionException(f"Audio upload failed: {str(e)}")
+    
+    def _transcribe_segment(self, segment_file: str) -> str:
+        """Transcribe one segment of a split recording (in a worker thread)."""
+        with span('segment'):
+            count_stage(bytes=os.path.getsize(segment_file))
+            return self._run_transcript(segment_file)
+    
+    @staticmethod
+    def _transcription_config() -> Optional['aai.TranscriptionConfig']:
+        """
+        Build the transcription config, registering the webhook if one is configured.
+        
+        Returns:
+            TranscriptionConfig with webhook settings, or None
+        """
+        webhook_url = getattr(settings, 'ASSEMBLYAI_WEBHOOK_URL', '')
+        if not webhook_url:
+            return None
+        
+        config = aai.TranscriptionConfig()
+        secret = getattr(settings, 'ASSEMBLYAI_WEBHOOK_SECRET', '')
+        config.set_webhook(webhook_url, 'X-Webhook-Secret' if secret else None, secret or None)
+        return config
+    
     @staticmethod
     def _save_transcription(text: str, title: str) -> Path:
         """
-        Save transcription to a text file.
+        Save transcription to a text file, published atomically from the job's workspace.
         
         Args:
             text: Transcribed text
@@ -65,10 +244,8 @@ class TranscriptionService:
         Returns:
             Path to saved file
         """
-        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '_', '-')).rstrip()
-        transcript_file = settings.MEDIA_ROOT / f"{safe_title}.txt"
-        
-        with open(transcript_file, "w", encoding="utf-8") as f:
-            f.write(text)
-        
-        return transcript_file 
\ No newline at end of file
+        with artifact_workspace() as workspace:
+            with open(workspace.scratch_path(title, '.txt'), "w", encoding="utf-8") as f:
+                f.write(text)
+            
+            return Path(workspace.publish(title, '.txt')) 
\ No newline at end of file
@@ -1,10 +1,25 @@
 """
 Translation Service - Handles text formatting and translation using OpenAI.
 """
-from typing import Dict, List, Optional
-from openai import OpenAI
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Deque, Dict, List, Optional, Tuple
+from django.conf import settings
+from ..admission import limiter
+from ..deadline import current_deadline
+from ..exceptions import TranslationException, DeadlineExceededException, OverloadedException
+from ..instrumentation import count_stage, span
+from ..lazy import LazyModule
+from .rate_limit_scheduler import RateLimitScheduler
 
-from ..exceptions import TranslationException
+logger = logging.getLogger(__name__)
+
+openai = LazyModule('openai')
 
 
 class TranslationService:
@@ -13,6 +28,31 @@ class TranslationService:
     # Preferred models in order of preference
     PREFERRED_MODELS = ['gpt-4o', 'gpt-5-nano', 'gpt-4-turbo', 'gpt-3.5-turbo']
     
+    # Latency/quality tiers selectable per request
+    QUALITY_TIERS = ['fast', 'balanced', 'best']
+    DEFAULT_QUALITY = 'balanced'
+    
+    # Candidate models per tier and task, in order of preference.
+    # Detection and formatting are trivial, so they use small/fast models
+    # unless the 'best' tier is requested.
+    MODEL_ROUTES = {
+        'fast': {
+            'detection': ['gpt-4o-mini', 'gpt-5-nano', 'gpt-3.5-turbo'],
+            'formatting': ['gpt-4o-mini', 'gpt-5-nano', 'gpt-3.5-turbo'],
+            'translation': ['gpt-4o-mini', 'gpt-5-nano', 'gpt-3.5-turbo'],
+        },
+        'balanced': {
+            'detection': ['gpt-4o-mini', 'gpt-5-nano', 'gpt-3.5-turbo'],
+            'formatting': ['gpt-4o-mini', 'gpt-5-nano', 'gpt-3.5-turbo'],
+            'translation': ['gpt-4o', 'gpt-4-turbo', 'gpt-4o-mini'],
+        },
+        'best': {
+            'detection': ['gpt-4o-mini', 'gpt-5-nano', 'gpt-3.5-turbo'],
+            'formatting': ['gpt-4o', 'gpt-4-turbo', 'gpt-4o-mini'],
+            'translation': ['gpt-4o', 'gpt-4-turbo'],
+        },
+    }
+    
     # Supported languages with their codes and names
     SUPPORTED_LANGUAGES = {
         'es': {'name': 'Español', 'native': 'español'},
@@ -28,15 +68,41 @@ class TranslationService:
         'ar': {'name': 'العربية', 'native': 'árabe'},
     }
     
-    def __init__(self, api_key: str):
+    # Hedged requests: when a call is slower than the recent p95 latency for
+    # its model and task, a duplicate is sent and the first response wins
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_PERCENTILE = 95
+    _latencies: Dict[Tuple[str, str], Deque[float]] = {}
+    _latencies_lock = threading.Lock()
+    _hedge_executor: Optional[ThreadPoolExecutor] = None
+    _hedge_executor_pid: Optional[int] = None
+    
+    # Waterfall span of each task's calls; the combined call stands for all three
+    TASK_SPANS = {'combined': 'detection+formatting+translation'}
+    
+    def __init__(self, api_key: str, quality: str = DEFAULT_QUALITY):
         """
         Initialize the translation service.
         
         Args:
             api_key: OpenAI API key
+            quality: Latency/quality tier ('fast', 'balanced' or 'best')
+            
+        Raises:
+            TranslationException: If the quality tier is unknown
         """
-        self.client = OpenAI(api_key=api_key)
+        if quality not in self.QUALITY_TIERS:
+            raise TranslationException(
+                f"Unsupported quality tier: {quality}. "
+                f"Supported tiers: {', '.join(self.QUALITY_TIERS)}"
+            )
+        self.client = openai.OpenAI(api_key=api_key)
+        # Jobs sharing a key share its request/token budget
+        self.scheduler = RateLimitScheduler.for_key(api_key)
+        self.quality = quality
         self.selected_model = None
+        self._available_models: Optional[List[str]] = None
+        self._task_models: Dict[str, str] = {}
     
     def detect_language(self, text: str) -> str:
         """
@@ -50,32 +116,17 @@ class TranslationService:
             
         Raises:
             TranslationException: If language detection fails
+            DeadlineExceededException: If the job deadline passes
         """
         try:
-            model = self._get_available_model()
-            
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a language detection expert. Respond ONLY with the ISO 639-1 language code (e.g., 'es' for Spanish, 'en' for English). Nothing else."
-                },
-                {
-                    "role": "user",
-                    "content": f"Detect the language of this text:\n\n{text[:500]}"  # Use first 500 chars
-                }
-            ]
-            
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                max_tokens=10,
-                temperature=0.0,
-                stream=False
-            )
+            model = self._get_model_for_task('detection')
+            response = self._create_completion('detection', model=model, **self._detection_request(text))
             
             language_code = response.choices[0].message.content.strip().lower()
             return language_code
             
+        except DeadlineExceededException:
+            raise
         except Exception as e:
             raise TranslationException(f"Language detection failed: {str(e)}")
     
@@ -92,39 +143,253 @@ class TranslationService:
         if self.selected_model:
             return self.selected_model
         
-        try:
-            available_models = [model.id for model in self.client.models.list().data]
+        available_models = self._list_available_models()
+        
+        for model in self.PREFERRED_MODELS:
+            if model in available_models:
+                self.selected_model = model
+                return model
+        
+        raise TranslationException(
+            f"No suitable OpenAI model found. Requires one of: {', '.join(self.PREFERRED_MODELS)}"
+        )
+    
+    def _list_available_models(self) -> List[str]:
+        """
+        List the model IDs available to this API key (fetched once per service).
+        
+        Returns:
+            List of available model IDs
             
-            for model in self.PREFERRED_MODELS:
-                if model in available_models:
-                    self.selected_model = model
-                    return model
+        Raises:
+            TranslationException: If the model list cannot be retrieved
+        """
+        if self._available_models is None:
+            try:
+                deadline = current_deadline()
+                options = {'timeout': deadline.remaining()} if deadline else {}
+                self._available_models = [model.id for model in self.client.models.list(**options).data]
+            except Exception as e:
+                raise TranslationException(f"Failed to get available models: {str(e)}")
+        return self._available_models
+    
+    def _get_model_for_task(self, task: str) -> str:
+        """
+        Pick the model for a task ('detection', 'formatting' or 'translation').
+        
+        Uses the first available candidate for the configured quality tier and
+        falls back to the general preferred model when none is available.
+        
+        Args:
+            task: Task name
             
-            raise TranslationException(
-                f"No suitable OpenAI model found. Requires one of: {', '.join(self.PREFERRED_MODELS)}"
-            )
-        except TranslationException:
-            raise
-        except Exception as e:
-            raise TranslationException(f"Failed to get available models: {str(e)}")
+        Returns:
+            Selected model name
+            
+        Raises:
+            TranslationException: If no suitable model is found
+        """
+        if task in self._task_models:
+            return self._task_models[task]
+        
+        available_models = self._list_available_models()
+        candidates = self.MODEL_ROUTES[self.quality].get(task, [])
+        model = next((m for m in candidates if m in available_models), None) or self._get_available_model()
+        
+        self._task_models[task] = model
+        return model
     
-    def format_text_as_verses(self, text: str) -> str:
+    def _create_completion(self, task: str, **kwargs):
         """
-        Format text into song verses without changing language.
+        Create a chat completion within the job deadline, hedging slow calls.
+        
+        Once enough latencies are known for the model/task, a call still
+        running after the recent p95 latency gets a duplicate request and
+        the first successful response is used. Under a deadline the SDK's
+        own retries are replaced by ones that stop when time runs out.
+        Every request is paced by the key's ``RateLimitScheduler``, which
+        also retries rate-limited (429) requests.
         
         Args:
-            text: Original text
+            task: Task name ('detection', 'formatting', 'translation' or 'combined')
+            **kwargs: Arguments for ``chat.completions.create``
             
         Returns:
-            Formatted text
+            Chat completion response
             
         Raises:
-            TranslationException: If formatting fails
+            DeadlineExceededException: If the job deadline passes first
         """
+        deadline = current_deadline()
+        if deadline:
+            deadline.check(task)
+        
+        attempts = self.client.max_retries + 1
         try:
-            model = self._get_available_model()
+            with span(self.TASK_SPANS.get(task, task)):
+                for attempt in range(attempts):
+                    try:
+                        response = self._hedged_completion(task, kwargs, deadline)
+                        count_stage(tokens=self._total_tokens(response))
+                        return response
+                    except self._retryable_errors():
+                        backoff = 0.5 * 2 ** attempt
+                        if attempt + 1 == attempts or (deadline and deadline.remaining() <= backoff):
+                            raise
+                        time.sleep(backoff)
+        except Exception:
+            if deadline and deadline.expired:
+                raise deadline.exceeded(task)
+            raise
+    
+    @staticmethod
+    def _total_tokens(response) -> int:
+        """Tokens a completion used, as reported in its ``usage`` (0 if absent)."""
+        usage = getattr(response, 'usage', None)
+        return getattr(usage, 'total_tokens', None) or 0
+    
+    @classmethod
+    def _hedge_pool(cls) -> ThreadPoolExecutor:
+        """Return the hedging thread pool of the current process (created after a fork)."""
+        with cls._latencies_lock:
+            if cls._hedge_executor is None or cls._hedge_executor_pid != os.getpid():
+                cls._hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='llm-hedge')
+                cls._hedge_executor_pid = os.getpid()
+            return cls._hedge_executor
+    
+    @staticmethod
+    def _retryable_errors() -> tuple:
+        """Errors retried while the job deadline leaves time for the backoff (429s are retried when sent)."""
+        return (openai.APIConnectionError, openai.InternalServerError)
+    
+    def _hedged_completion(self, task: str, kwargs: dict, deadline):
+        """Send one completion request, plus a duplicate if it is slower than usual."""
+        if deadline:
+            kwargs = dict(kwargs, timeout=deadline.remaining())
+        hedge_delay = self._hedge_delay(kwargs['model'], task)
+        if hedge_delay is None or (deadline and deadline.remaining() <= hedge_delay):
+            return self._timed_completion(task, kwargs)
+        
+        primary = self._hedge_pool().submit(self._timed_completion, task, kwargs)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+        
+        logger.info(f"Hedging slow {task} request to {kwargs['model']} after {hedge_delay:.2f}s")
+        if deadline:
+            kwargs = dict(kwargs, timeout=deadline.remaining())
+        pending = {primary, self._hedge_pool().submit(self._timed_completion, task, kwargs)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    
+    def _timed_completion(self, task: str, kwargs: dict):
+        """Run one completion request, paced by the key's rate limits, and record its latency."""
+        # Errors are retried by _create_completion, 429s below with the scheduler's backoff
+        client = self.client.with_options(max_retries=0)
+        tokens = self.scheduler.estimate_tokens(kwargs)
+        expires = time.monotonic() + kwargs['timeout'] if 'timeout' in kwargs else None
+        attempt = 0
+        while True:
+            time.sleep(self._pacing_delay(task, tokens, expires))
+            request = dict(kwargs, timeout=expires - time.monotonic()) if expires else kwargs
+            start = time.monotonic()
+            try:
+                raw = client.chat.completions.with_raw_response.create(**request)
+            except openai.RateLimitError as e:
+                if not self.scheduler.should_retry(e, attempt):
+                    raise
+                time.sleep(self._rate_limit_backoff(task, e, attempt, expires))
+                attempt += 1
+                continue
+            self.scheduler.observe(raw.headers)
+            self._record_latency(kwargs['model'], task, time.monotonic() - start)
+            return raw.parse()
+    
+    def _pacing_delay(self, task: str, tokens: int, expires: Optional[float]) -> float:
+        """
+        Reserve a request in the key's rate limits and return how long to wait before sending it.
+        
+        Args:
+            task: Task name, for the deadline error
+            tokens: Estimated token cost of the request
+            expires: Monotonic time the request must finish by (the job deadline), or None
+            
+        Returns:
+            Seconds to wait
             
-            messages = [
+        Raises:
+            DeadlineExceededException: If the wait would outlast the job deadline
+        """
+        wait = self.scheduler.reserve(tokens, max_wait=expires - time.monotonic() if expires else None)
+        if wait is None:
+            raise DeadlineExceededException(
+                f"The job could not finish before its deadline (rate limit wait during {task})."
+            )
+        return wait
+    
+    def _rate_limit_backoff(self, task: str, error: Exception, attempt: int, expires: Optional[float]) -> float:
+        """Backoff before retrying a 429, failing when it would outlast the job deadline."""
+        delay = self.scheduler.backoff(error, attempt)
+        if expires is not None and time.monotonic() + delay >= expires:
+            raise DeadlineExceededException(
+                f"The job could not finish before its deadline (rate limited during {task})."
+            )
+        return delay
+    
+    @classmethod
+    def _record_latency(cls, model: str, task: str, seconds: float):
+        """Add a successful call's latency to the window used for hedging."""
+        with cls._latencies_lock:
+            samples = cls._latencies.setdefault((model, task), deque(maxlen=200))
+            samples.append(seconds)
+    
+    def _hedge_delay(self, model: str, task: str) -> Optional[float]:
+        """
+        Delay after which a duplicate request is sent.
+        
+        Returns:
+            The recent p95 latency for the model/task, or None when hedging
+            is disabled or there are not enough samples yet
+        """
+        if not getattr(settings, 'LLM_HEDGING', True):
+            return None
+        
+        with self._latencies_lock:
+            samples = sorted(self._latencies.get((model, task), ()))
+        if len(samples) < self.HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * self.HEDGE_PERCENTILE / 100))]
+    
+    @staticmethod
+    def _detection_request(text: str) -> dict:
+        """Messages and sampling options for language detection."""
+        return {
+            'messages': [
+                {
+                    "role": "system",
+                    "content": "You are a language detection expert. Respond ONLY with the ISO 639-1 language code (e.g., 'es' for Spanish, 'en' for English). Nothing else."
+                },
+                {
+                    "role": "user",
+                    "content": f"Detect the language of this text:\n\n{text[:500]}"  # Use first 500 chars
+                }
+            ],
+            'max_tokens': 10,
+            'temperature': 0.0,
+            'stream': False,
+        }
+    
+    @staticmethod
+    def _formatting_request(text: str) -> dict:
+        """Messages and sampling options for verse formatting."""
+        return {
+            'messages': [
                 {
                     "role": "system",
                     "content": (
@@ -139,20 +404,222 @@ class TranslationService:
                     "role": "user",
                     "content": f"Format this song transcription into proper verses:\n\n{text}"
                 }
-            ]
-            
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                max_tokens=4096,
-                temperature=0.3,  # Lower temperature for more consistent formatting
-                stream=False
+            ],
+            'max_tokens': 4096,
+            'temperature': 0.3,  # Lower temperature for more consistent formatting
+            'stream': False,
+        }
+    
+    def _translation_request(self, text: str, target_language: str) -> dict:
+        """
+        Messages and sampling options for translating to ``target_language``.
+        
+        Raises:
+            TranslationException: If the target language is not supported
+        """
+        # Validate target language
+        if target_language not in self.SUPPORTED_LANGUAGES:
+            raise TranslationException(
+                f"Unsupported language: {target_language}. "
+                f"Supported languages: {', '.join(self.SUPPORTED_LANGUAGES.keys())}"
+            )
+        
+        lang_info = self.SUPPORTED_LANGUAGES[target_language]
+        
+        # Create language-specific prompt
+        if target_language == 'es':
+            system_content = (
+                "Eres un experto traductor de canciones al español. Tu tarea es traducir letras de canciones "
+                "manteniendo el significado, el sentimiento y la naturalidad en español. "
+                "NO hagas traducciones literales palabra por palabra. "
+                "Adapta expresiones idiomáticas y frases para que suenen naturales en español. "
+                "Mantén el ritmo poético y la estructura de versos. "
+                "Si hay juegos de palabras o expresiones culturales, encuentra equivalentes en español que transmitan la misma idea."
+            )
+            user_content = f"Traduce esta canción al español de forma natural y contextual, organizándola en versos:\n\n{text}"
+        else:
+            system_content = (
+                f"You are an expert song translator to {lang_info['name']}. Your task is to translate song lyrics "
+                f"while maintaining the meaning, sentiment, and naturalness in {lang_info['name']}. "
+                "DO NOT do literal word-by-word translations. "
+                f"Adapt idiomatic expressions and phrases to sound natural in {lang_info['name']}. "
+                "Maintain the poetic rhythm and verse structure. "
+                f"If there are wordplays or cultural expressions, find equivalents in {lang_info['name']} that convey the same idea."
+            )
+            user_content = f"Translate this song to {lang_info['name']} in a natural and contextual way, organizing it in verses:\n\n{text}"
+        
+        return {
+            'messages': [
+                {"role": "system", "content": system_content},
+                {"role": "user", "content": user_content}
+            ],
+            'max_tokens': 4096,
+            'temperature': 0.7,
+            'stream': False,
+        }
+    
+    def _combined_request(self, text: str, target_language: str) -> dict:
+        """
+        Messages, sampling options and JSON schema for detection, formatting and translation in one call.
+        
+        Raises:
+            TranslationException: If the target language is not supported
+        """
+        if target_language not in self.SUPPORTED_LANGUAGES:
+            raise TranslationException(
+                f"Unsupported language: {target_language}. "
+                f"Supported languages: {', '.join(self.SUPPORTED_LANGUAGES.keys())}"
             )
+        
+        lang_name = self.SUPPORTED_LANGUAGES[target_language]['name']
+        system_content = (
+            "You are an expert in song lyrics. For the transcribed song you receive, return a JSON object with:\n"
+            "- detected_language: the ISO 639-1 code of the lyrics' language (e.g., 'es', 'en').\n"
+            "- formatted_original: the lyrics organized into proper verses with line breaks, identifying "
+            "choruses, verses and bridges. DO NOT change the language, translate or alter the words.\n"
+            f"- translation: the lyrics translated to {lang_name} ({target_language}), organized in verses. "
+            "DO NOT do literal word-by-word translations; keep the meaning, sentiment, poetic rhythm and "
+            f"naturalness, adapting idioms, wordplays and cultural expressions to {lang_name}. "
+            f"Use null if the lyrics are already in {lang_name}."
+        )
+        return {
+            'messages': [
+                {"role": "system", "content": system_content},
+                {"role": "user", "content": f"Process this song transcription (target language: {target_language}):\n\n{text}"}
+            ],
+            'max_tokens': 8192,
+            'temperature': 0.5,
+            'stream': False,
+            'response_format': {
+                'type': 'json_schema',
+                'json_schema': {
+                    'name': 'song_processing',
+                    'strict': True,
+                    'schema': {
+                        'type': 'object',
+                        'properties': {
+                            'detected_language': {'type': 'string'},
+                            'formatted_original': {'type': 'string'},
+                            'translation': {'type': ['string', 'null']},
+                        },
+                        'required': ['detected_language', 'formatted_original', 'translation'],
+                        'additionalProperties': False,
+                    },
+                },
+            },
+        }
+    
+    def _parse_combined_response(self, response, target_language: str) -> Optional[Dict[str, str]]:
+        """
+        Validate a combined response and turn it into the ``process_transcription`` result.
+        
+        Args:
+            response: Chat completion for ``_combined_request``
+            target_language: Requested target language code
+            
+        Returns:
+            Dictionary with 'original' and 'translated' keys, or None if the
+            response is truncated, refused or does not match the schema
+        """
+        choice = response.choices[0]
+        if choice.finish_reason != 'stop' or getattr(choice.message, 'refusal', None):
+            return None
+        try:
+            data = json.loads(choice.message.content or '')
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        
+        detected_language = data.get('detected_language')
+        formatted_original = data.get('formatted_original')
+        translation = data.get('translation')
+        if not isinstance(detected_language, str) or not detected_language.strip():
+            return None
+        if not isinstance(formatted_original, str) or not formatted_original.strip():
+            return None
+        
+        if self._normalize_language_code(detected_language.strip().lower()) == target_language:
+            # Already in target language, no translation needed
+            translation = formatted_original
+        elif not isinstance(translation, str) or not translation.strip():
+            return None
+        
+        return {
+            'original': formatted_original.strip(),
+            'translated': translation.strip()
+        }
+    
+    def _process_combined(self, original_text: str, target_language: str) -> Optional[Dict[str, str]]:
+        """
+        Detect, format and translate with a single structured-output completion.
+        
+        Args:
+            original_text: Original transcribed text
+            target_language: Target language code
+            
+        Returns:
+            Same result as ``process_transcription``, or None when the
+            response is unusable or the model rejects structured output
+            
+        Raises:
+            TranslationException: If the request fails
+            DeadlineExceededException: If the job deadline passes
+        """
+        request = self._combined_request(original_text, target_language)
+        model = self._get_model_for_task('translation')
+        try:
+            response = self._create_completion('combined', model=model, **request)
+        except openai.BadRequestError as e:
+            logger.warning(f"Model {model} rejected the combined request, using separate calls: {str(e)}")
+            return None
+        
+        result = self._parse_combined_response(response, target_language)
+        if result is None:
+            logger.warning(f"Invalid combined response from {model}, using separate calls")
+        return result
+    
+    @staticmethod
+    def _normalize_language_code(code: str) -> str:
+        """Map detected language code variations (e.g. 'spa') to ISO 639-1."""
+        # Normalize language codes (handle variations like 'spa' for Spanish)
+        lang_code_mapping = {
+            'spa': 'es',
+            'eng': 'en',
+            'fra': 'fr',
+            'deu': 'de',
+            'ita': 'it',
+            'por': 'pt',
+            'rus': 'ru',
+            'jpn': 'ja',
+            'kor': 'ko',
+            'zho': 'zh',
+            'ara': 'ar',
+        }
+        return lang_code_mapping.get(code, code)
+    
+    def format_text_as_verses(self, text: str) -> str:
+        """
+        Format text into song verses without changing language.
+        
+        Args:
+            text: Original text
+            
+        Returns:
+            Formatted text
+            
+        Raises:
+            TranslationException: If formatting fails
+            DeadlineExceededException: If the job deadline passes
+        """
+        try:
+            model = self._get_model_for_task('formatting')
+            response = self._create_completion('formatting', model=model, **self._formatting_request(text))
             
             formatted_text = response.choices[0].message.content.strip()
             return formatted_text
             
-        except TranslationException:
+        except (TranslationException, DeadlineExceededException):
             raise
         except Exception as e:
             raise TranslationException(f"Text formatting failed: {str(e)}")
@@ -170,57 +637,17 @@ class TranslationService:
             
         Raises:
             TranslationException: If translation fails
+            DeadlineExceededException: If the job deadline passes
         """
         try:
-            # Validate target language
-            if target_language not in self.SUPPORTED_LANGUAGES:
-                raise TranslationException(
-                    f"Unsupported language: {target_language}. "
-                    f"Supported languages: {', '.join(self.SUPPORTED_LANGUAGES.keys())}"
-                )
-            
-            model = self._get_available_model()
-            lang_info = self.SUPPORTED_LANGUAGES[target_language]
-            
-            # Create language-specific prompt
-            if target_language == 'es':
-                system_content = (
-                    "Eres un experto traductor de canciones al español. Tu tarea es traducir letras de canciones "
-                    "manteniendo el significado, el sentimiento y la naturalidad en español. "
-                    "NO hagas traducciones literales palabra por palabra. "
-                    "Adapta expresiones idiomáticas y frases para que suenen naturales en español. "
-                    "Mantén el ritmo poético y la estructura de versos. "
-                    "Si hay juegos de palabras o expresiones culturales, encuentra equivalentes en español que transmitan la misma idea."
-                )
-                user_content = f"Traduce esta canción al español de forma natural y contextual, organizándola en versos:\n\n{text}"
-            else:
-                system_content = (
-                    f"You are an expert song translator to {lang_info['name']}. Your task is to translate song lyrics "
-                    f"while maintaining the meaning, sentiment, and naturalness in {lang_info['name']}. "
-                    "DO NOT do literal word-by-word translations. "
-                    f"Adapt idiomatic expressions and phrases to sound natural in {lang_info['name']}. "
-                    "Maintain the poetic rhythm and verse structure. "
-                    f"If there are wordplays or cultural expressions, find equivalents in {lang_info['name']} that convey the same idea."
-                )
-                user_content = f"Translate this song to {lang_info['name']} in a natural and contextual way, organizing it in verses:\n\n{text}"
-            
-            messages = [
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": user_content}
-            ]
-            
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                max_tokens=4096,
-                temperature=0.7,
-                stream=False
-            )
+            request = self._translation_request(text, target_language)
+            model = self._get_model_for_task('translation')
+            response = self._create_completion('translation', model=model, **request)
             
             translated_text = response.choices[0].message.content.strip()
             return translated_text
             
-        except TranslationException:
+        except (TranslationException, DeadlineExceededException):
             raise
         except Exception as e:
             raise TranslationException(f"Translation failed: {str(e)}")
@@ -238,6 +665,7 @@ class TranslationService:
             
         Raises:
             TranslationException: If translation fails
+            DeadlineExceededException: If the job deadline passes
         """
         return self.translate_text(text, target_language='es')
     
@@ -245,6 +673,10 @@ class TranslationService:
         """
         Process transcription: detect language, format original and translate if needed.
         
+        With ``LLM_COMBINED_CALL`` enabled the three steps are one
+        structured-output completion; the separate detection, formatting
+        and translation calls are used when its response is not valid.
+        
         Args:
             original_text: Original transcribed text
             target_language: Target language code for translation (default: 'es' for Spanish)
@@ -255,44 +687,35 @@ class TranslationService:
             
         Raises:
             TranslationException: If processing fails
+            DeadlineExceededException: If the job deadline passes
+            OverloadedException: If no LLM slot frees up in time
         """
         try:
-            # Detect the language of the transcription
-            detected_language = self.detect_language(original_text)
-            
-            # Format the original text
-            formatted_original = self.format_text_as_verses(original_text)
-            
-            # Normalize language codes (handle variations like 'spa' for Spanish)
-            lang_code_mapping = {
-                'spa': 'es',
-                'eng': 'en',
-                'fra': 'fr',
-                'deu': 'de',
-                'ita': 'it',
-                'por': 'pt',
-                'rus': 'ru',
-                'jpn': 'ja',
-                'kor': 'ko',
-                'zho': 'zh',
-                'ara': 'ar',
-            }
-            
-            normalized_detected = lang_code_mapping.get(detected_language, detected_language)
-            
-            # Only translate if the detected language is different from target language
-            if normalized_detected == target_language:
-                # Already in target language, no translation needed
-                translated_text = formatted_original
-            else:
-                # Translate to target language
-                translated_text = self.translate_text(original_text, target_language)
-            
-            return {
-                'original': formatted_original,
-                'translated': translated_text
-            }
-        except TranslationException:
+            with limiter('llm').slot():
+                if getattr(settings, 'LLM_COMBINED_CALL', True):
+                    result = self._process_combined(original_text, target_language)
+                    if result is not None:
+                        return result
+                
+                # Detect the language of the transcription
+                detected_language = self.detect_language(original_text)
+                
+                # Format the original text
+                formatted_original = self.format_text_as_verses(original_text)
+                
+                # Only translate if the detected language is different from target language
+                if self._normalize_language_code(detected_language) == target_language:
+                    # Already in target language, no translation needed
+                    translated_text = formatted_original
+                else:
+                    # Translate to target language
+                    translated_text = self.translate_text(original_text, target_language)
+                
+                return {
+                    'original': formatted_original,
+                    'translated': translated_text
+                }
+        except (TranslationException, DeadlineExceededException, OverloadedException):
             raise
         except Exception as e:
             raise TranslationException(f"Text processing failed: {str(e)}") 
\ No newline at end of file
@@ -1,13 +1,29 @@
 """
 YouTube Service - Handles video/audio downloading and title extraction.
 """
+import glob
 import os
+import re
+import shutil
+import subprocess
+import time
 from pathlib import Path
-from typing import Tuple, Optional
-from yt_dlp import YoutubeDL
+from typing import Iterator, Tuple, Optional
 from django.conf import settings
 
-from ..exceptions import YouTubeDownloadException
+from ..deadline import current_deadline
+from ..admission import limiter
+from ..exceptions import (
+    YouTubeDownloadException, VideoUnavailableException, OverloadedException, DeadlineExceededException
+)
+from ..instrumentation import count_stage, record_span
+from ..lazy import LazyModule
+from ..progress import current_progress
+from ..models import VideoMetadata
+from ..workspace import JobWorkspace, artifact_workspace, current_workspace
+from .metadata_cache import MetadataCache
+
+yt_dlp = LazyModule('yt_dlp')
 
 
 class YouTubeService:
@@ -27,6 +43,83 @@ class YouTubeService:
         }
     }
 
+    # Upper bound for a single socket operation (seconds)
+    _SOCKET_TIMEOUT = 20
+    
+    # Audio is kept in the container YouTube serves (AssemblyAI accepts it as
+    # is); m4a is preferred as the most widely playable one. MP3 copies are
+    # made on request by AudioTranscoder.
+    _AUDIO_FORMAT = 'bestaudio[ext=m4a]/bestaudio/best'
+    
+    # ffmpeg muxer and file extension that carry a codec without re-encoding
+    # to a pipe; codecs not listed go into Matroska
+    _AUDIO_CONTAINERS = (
+        ('mp4a', ('mp4', 'm4a')),
+        ('opus', ('webm', 'webm')),
+        ('vorbis', ('webm', 'webm')),
+        ('mp3', ('mp3', 'mp3')),
+    )
+
+    @staticmethod
+    def _ydl_opts() -> dict:
+        """
+        Build yt-dlp options bound to the current job deadline and progress reporter.
+        
+        Socket operations time out no later than the deadline, and a progress
+        hook aborts downloads that are still running when it passes. Another
+        hook reports download progress to the job's progress reporter.
+        
+        Returns:
+            Copy of the common options
+        """
+        opts = YouTubeService._COMMON_OPTS.copy()
+        hooks = []
+        deadline = current_deadline()
+        if deadline:
+            deadline.check('download')
+            opts['socket_timeout'] = max(1, deadline.timeout(YouTubeService._SOCKET_TIMEOUT))
+            hooks.append(lambda status: deadline.check('download'))
+        progress = current_progress()
+        if progress:
+            hooks.append(progress.ytdlp_hook)
+        if hooks:
+            opts['progress_hooks'] = hooks
+        return opts
+
+    @staticmethod
+    def _raise_if_deadline_exceeded(stage: str):
+        """
+        Report a failure caused by the job deadline as such.
+        
+        Raises:
+            DeadlineExceededException: If the current job's deadline has passed
+        """
+        deadline = current_deadline()
+        if deadline and deadline.expired:
+            raise deadline.exceeded(stage)
+
+    # Video ID in watch, short and embed URLs
+    _VIDEO_ID_REGEX = re.compile(r'(?:v=|youtu\.be/|/embed/)([\w-]+)')
+
+    @staticmethod
+    def extract_video_id(link: str) -> str:
+        """
+        Extract the video ID from a YouTube URL.
+        
+        Args:
+            link: YouTube video URL
+            
+        Returns:
+            Video ID
+            
+        Raises:
+            YouTubeDownloadException: If the URL contains no video ID
+        """
+        match = YouTubeService._VIDEO_ID_REGEX.search(link)
+        if not match:
+            raise YouTubeDownloadException(f"Could not find a video ID in: {link}")
+        return match.group(1)
+
     @staticmethod
     def get_title(link: str) -> str:
         """
@@ -40,19 +133,67 @@ class YouTubeService:
             
         Raises:
             YouTubeDownloadException: If title extraction fails
+            VideoUnavailableException: If the video is private or removed
+            DeadlineExceededException: If the job deadline passes first
+        """
+        title = YouTubeService.get_metadata(link).title
+        if not title:
+            raise YouTubeDownloadException("Could not retrieve YouTube video title.")
+        return title
+    
+    # yt-dlp errors for videos that will not become available by retrying
+    _UNAVAILABLE_REGEX = re.compile(
+        r'private video|video unavailable|has been removed|no longer available|members-only'
+        r'|account associated with this video has been terminated|not available in your country',
+        re.IGNORECASE
+    )
+    
+    @staticmethod
+    def get_metadata(link: str, refresh: bool = False) -> VideoMetadata:
         """
+        Get a video's title, duration, formats and caption tracks, from the shared cache if possible.
+        
+        Args:
+            link: YouTube video URL
+            refresh: Extract the metadata again even if the cached entry is still valid
+            
+        Returns:
+            VideoMetadata of the video
+            
+        Raises:
+            YouTubeDownloadException: If metadata extraction fails
+            VideoUnavailableException: If the video is private or removed
+                (also while that answer is cached)
+            DeadlineExceededException: If the job deadline passes first
+        """
+        video_id = YouTubeService._video_id_or_empty(link)
+        cache = MetadataCache()
+        cached = cache.get(video_id) if video_id and not refresh else None
+        if cached is not None:
+            if not cached.available:
+                raise VideoUnavailableException(f"Video unavailable: {cached.error}")
+            return cached
+        
         try:
-            ydl_opts = YouTubeService._COMMON_OPTS.copy()
-            with YoutubeDL(ydl_opts) as ydl:
+            ydl_opts = YouTubeService._ydl_opts()
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(link, download=False)
-                title = info.get('title', None)
-                
-            if not title:
-                raise YouTubeDownloadException("Could not retrieve YouTube video title.")
-                
-            return title
+        except DeadlineExceededException:
+            raise
         except Exception as e:
-            raise YouTubeDownloadException(f"Failed to extract title: {str(e)}")
+            YouTubeService._raise_if_deadline_exceeded('metadata')
+            if YouTubeService._UNAVAILABLE_REGEX.search(str(e)):
+                cache.store_unavailable(video_id, str(e))
+                raise VideoUnavailableException(f"Video unavailable: {str(e)}")
+            raise YouTubeDownloadException(f"Failed to extract metadata: {str(e)}")
+        
+        return cache.store(video_id, info)
+    
+    @staticmethod
+    def _video_id_or_empty(link: str) -> str:
+        """Video ID naming the artifacts of a link ('' if the URL has none)."""
+        match = YouTubeService._VIDEO_ID_REGEX.search(link)
+        return match.group(1) if match else ''
     
     @staticmethod
     def _sanitize_filename(title: str) -> str:
@@ -70,7 +211,7 @@ class YouTubeService:
     @staticmethod
     def download_video_and_audio(link: str, title: str) -> Tuple[str, str]:
         """
-        Download both video (mp4) and audio (mp3) from YouTube.
+        Download both video (mp4) and audio (native container) from YouTube.
         
         Args:
             link: YouTube video URL
@@ -81,51 +222,279 @@ class YouTubeService:
             
         Raises:
             YouTubeDownloadException: If download fails
+            OverloadedException: If no download slot frees up in time
+            DeadlineExceededException: If the job deadline passes first
+        """
+        return YouTubeService.download_video(link, title), YouTubeService.download_audio(link, title)
+    
+    @staticmethod
+    def download_audio(link: str, title: str) -> str:
+        """
+        Download the audio track from YouTube in its native container (m4a, webm...).
+        
+        The audio is not re-encoded; ``AudioTranscoder`` makes an MP3 copy
+        when one is requested.
+        
+        Args:
+            link: YouTube video URL
+            title: Video title for filename
+            
+        Returns:
+            Path to the downloaded audio file
+            
+        Raises:
+            YouTubeDownloadException: If download fails
+            OverloadedException: If no download slot frees up in time
+            DeadlineExceededException: If the job deadline passes first
         """
         try:
-            safe_title = YouTubeService._sanitize_filename(title)
-            video_path = settings.MEDIA_ROOT / f"{safe_title}_video"
-            audio_path = settings.MEDIA_ROOT / f"{safe_title}_audio"
-            
-            # Download video as .mp4
-            video_opts = YouTubeService._COMMON_OPTS.copy()
-            video_opts.update({
-                'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best', # Ensure mp4
-                'outtmpl': str(video_path) + '.mp4',
-            })
+            with artifact_workspace(YouTubeService._video_id_or_empty(link)) as workspace:
+                # Download into the job's scratch directory; the file is published once complete
+                audio_opts = YouTubeService._ydl_opts()
+                audio_opts.update({
+                    'format': YouTubeService._AUDIO_FORMAT,
+                    'outtmpl': str(workspace.scratch_path(title, '_audio.%(ext)s')),
+                })
+                
+                with limiter('download').slot(), yt_dlp.YoutubeDL(audio_opts) as ydl:
+                    ydl.download([link])
+                
+                suffix = YouTubeService._downloaded_audio_suffix(workspace, title)
+                if suffix is None:
+                    raise YouTubeDownloadException("Failed to download audio file or file is empty.")
+                count_stage(bytes=workspace.scratch_path(title, suffix).stat().st_size)
+                
+                return workspace.publish(title, suffix)
             
-            with YoutubeDL(video_opts) as ydl:
-                ydl.download([link])
-            video_file = str(video_path) + '.mp4'
+        except (YouTubeDownloadException, OverloadedException, DeadlineExceededException):
+            raise
+        except Exception as e:
+            YouTubeService._raise_if_deadline_exceeded('download')
+            raise YouTubeDownloadException(f"Audio download failed: {str(e)}")
+    
+    @staticmethod
+    def _downloaded_audio_suffix(workspace: JobWorkspace, title: str) -> Optional[str]:
+        """
+        Find the audio file yt-dlp wrote to the scratch directory.
+        
+        Args:
+            workspace: Workspace the audio was downloaded to
+            title: Video title naming the audio file
             
-            # Download audio as .mp3
-            audio_opts = YouTubeService._COMMON_OPTS.copy()
-            audio_opts.update({
-                'format': 'bestaudio/best',
-                'outtmpl': str(audio_path),
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-            })
-
-            with YoutubeDL(audio_opts) as ydl:
-                ydl.download([link])
-            audio_file = str(audio_path) + '.mp3'
-            
-            # Verify files were downloaded
-            if not os.path.exists(video_file) or os.path.getsize(video_file) == 0:
-                raise YouTubeDownloadException("Failed to download video file or file is empty.")
-            if not os.path.exists(audio_file) or os.path.getsize(audio_file) == 0:
-                raise YouTubeDownloadException("Failed to download audio file or file is empty.")
+        Returns:
+            Artifact suffix of the file (e.g. '_audio.m4a'), or None if
+            there is no complete, non-empty file
+        """
+        prefix = workspace.artifact_name(title, '_audio.')
+        for path in workspace.path.glob(f"{glob.escape(prefix)}*"):
+            if path.suffix not in ('.part', '.ytdl') and path.stat().st_size > 0:
+                return '_audio' + path.suffix
+        return None
+    
+    @staticmethod
+    def _audio_container(info: dict) -> Tuple[str, str]:
+        """
+        Pick the container an audio stream is copied into without re-encoding.
+        
+        Args:
+            info: yt-dlp info dictionary of the selected audio format
+            
+        Returns:
+            Tuple of (ffmpeg muxer, file extension)
+        """
+        codec = (info.get('acodec') or '').lower()
+        for prefix, container in YouTubeService._AUDIO_CONTAINERS:
+            if codec.startswith(prefix):
+                return container
+        return 'matroska', 'mka'
+    
+    @staticmethod
+    def download_video(link: str, title: str) -> str:
+        """
+        Download only the video (mp4) from YouTube.
+        
+        Args:
+            link: YouTube video URL
+            title: Video title for filename
+            
+        Returns:
+            Path to the downloaded video file
+            
+        Raises:
+            YouTubeDownloadException: If download fails
+            OverloadedException: If no download slot frees up in time
+            DeadlineExceededException: If the job deadline passes first
+        """
+        try:
+            with artifact_workspace(YouTubeService._video_id_or_empty(link)) as workspace:
+                video_file = str(workspace.scratch_path(title, '_video.mp4'))
+                
+                video_opts = YouTubeService._ydl_opts()
+                video_opts.update({
+                    'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best', # Ensure mp4
+                    'outtmpl': video_file,
+                })
+                
+                with limiter('download').slot(), yt_dlp.YoutubeDL(video_opts) as ydl:
+                    ydl.download([link])
+                
+                if not os.path.exists(video_file) or os.path.getsize(video_file) == 0:
+                    raise YouTubeDownloadException("Failed to download video file or file is empty.")
+                count_stage(bytes=os.path.getsize(video_file))
+                
+                return workspace.publish(title, '_video.mp4')
+            
+        except (YouTubeDownloadException, OverloadedException, DeadlineExceededException):
+            raise
+        except Exception as e:
+            YouTubeService._raise_if_deadline_exceeded('download')
+            raise YouTubeDownloadException(f"Video download failed: {str(e)}")
+    
+    @staticmethod
+    def can_stream_audio() -> bool:
+        """
+        Check whether audio can be streamed through an ffmpeg pipe.
+        
+        Returns:
+            True if streaming is enabled in settings and ffmpeg is installed
+        """
+        return getattr(settings, 'PIPELINED_AUDIO_UPLOAD', True) and shutil.which('ffmpeg') is not None
+    
+    @staticmethod
+    def stream_audio(link: str, title: str, chunk_size: int = 64 * 1024) -> Tuple[str, Iterator[bytes]]:
+        """
+        Stream the audio track in its native codec while it is downloaded.
+        
+        ffmpeg reads the best audio stream directly and copies it, without
+        re-encoding, into a streamable container on a pipe (fragmented m4a,
+        webm, or Matroska). Each chunk is appended to a scratch file and
+        yielded, so the caller can upload it while the rest of the audio is
+        still being downloaded; the file is published once ffmpeg finishes.
+        
+        Args:
+            link: YouTube video URL
+            title: Video title for filename
+            chunk_size: Maximum size of each yielded chunk in bytes
+            
+        Returns:
+            Tuple of (audio_file_path, chunk_iterator). The file is complete
+            once the iterator is exhausted.
+            
+        Raises:
+            YouTubeDownloadException: If the audio stream cannot be resolved
+                (raised by the iterator if ffmpeg fails)
+        """
+        try:
+            audio_opts = YouTubeService._ydl_opts()
+            audio_opts['format'] = YouTubeService._AUDIO_FORMAT
             
-            return video_file, audio_file
+            with yt_dlp.YoutubeDL(audio_opts) as ydl:
+                info = ydl.extract_info(link, download=False)
             
-        except YouTubeDownloadException:
+            source_url = info.get('url')
+            if not source_url:
+                raise YouTubeDownloadException("Could not resolve the audio stream URL.")
+        except (YouTubeDownloadException, DeadlineExceededException):
             raise
         except Exception as e:
-            raise YouTubeDownloadException(f"Download failed: {str(e)}")
+            YouTubeService._raise_if_deadline_exceeded('audio streaming')
+            raise YouTubeDownloadException(f"Audio stream resolution failed: {str(e)}")
+        
+        workspace = current_workspace() or JobWorkspace(YouTubeService._video_id_or_empty(link))
+        muxer, extension = YouTubeService._audio_container(info)
+        suffix = f'_audio.{extension}'
+        audio_file = str(workspace.artifact_path(title, suffix))
+        command = YouTubeService._ffmpeg_audio_command(source_url, info.get('http_headers'), muxer)
+        
+        return audio_file, YouTubeService._pipe_chunks(command, workspace, title, suffix, chunk_size)
+    
+    @staticmethod
+    def _ffmpeg_audio_command(source_url: str, http_headers: Optional[dict] = None, muxer: str = 'matroska') -> list:
+        """
+        Build the ffmpeg command copying an audio stream to stdout without re-encoding.
+        
+        Args:
+            source_url: Media URL resolved by yt-dlp
+            http_headers: HTTP headers yt-dlp requires for the URL
+            muxer: Output container (see ``_audio_container``)
+            
+        Returns:
+            Command as a list of arguments
+        """
+        command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin']
+        deadline = current_deadline()
+        if deadline:
+            # Network read/write timeout in microseconds
+            command += ['-rw_timeout', str(int(max(1, deadline.timeout(YouTubeService._SOCKET_TIMEOUT)) * 1_000_000))]
+        headers = ''.join(f"{name}: {value}\r\n" for name, value in (http_headers or {}).items())
+        if headers:
+            command += ['-headers', headers]
+        command += ['-i', source_url, '-vn', '-codec:a', 'copy']
+        if muxer == 'mp4':
+            # A pipe cannot be seeked back to write the index; emit 1 s fragments instead
+            command += ['-movflags', 'empty_moov+default_base_moof', '-frag_duration', '1000000']
+        command += ['-f', muxer, 'pipe:1']
+        return command
+    
+    @staticmethod
+    def _pipe_chunks(command: list, workspace: JobWorkspace, title: str, suffix: str,
+                     chunk_size: int) -> Iterator[bytes]:
+        """
+        Run an ffmpeg command and yield its stdout while copying it to the audio file.
+        
+        Args:
+            command: ffmpeg command writing to stdout
+            workspace: Workspace the audio file is written to and published from
+            title: Video title naming the audio file
+            suffix: Artifact suffix of the audio file (e.g. '_audio.m4a')
+            chunk_size: Maximum size of each yielded chunk in bytes
+            
+        Yields:
+            Output chunks as soon as ffmpeg produces them
+            
+        Raises:
+            YouTubeDownloadException: If ffmpeg fails or produces no output
+            OverloadedException: If no ffmpeg slot frees up in time
+            DeadlineExceededException: If the job deadline passes while streaming
+        """
+        audio_file = workspace.scratch_path(title, suffix)
+        deadline = current_deadline()
+        progress = current_progress()
+        produced = 0
+        ffmpeg_slot = limiter('ffmpeg')
+        acquired_at = ffmpeg_slot.acquire()
+        started = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            with open(audio_file, 'wb') as f:
+                while True:
+                    chunk = process.stdout.read1(chunk_size)
+                    if not chunk:
+                        break
+                    if deadline:
+                        deadline.check('audio streaming')
+                    f.write(chunk)
+                    produced += len(chunk)
+                    if progress:
+                        progress.update('audio', produced)
+                    yield chunk
+            
+            stderr = process.stderr.read().decode('utf-8', errors='replace').strip()
+            if process.wait() != 0:
+                raise YouTubeDownloadException(f"Audio streaming failed: {stderr}")
+            if os.path.getsize(audio_file) == 0:
+                raise YouTubeDownloadException("Failed to download audio file or file is empty.")
+            # Download and remux by ffmpeg, overlapped with the upload reading the chunks
+            record_span('transcode', started, bytes=produced)
+            workspace.publish(title, suffix)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            ffmpeg_slot.release(acquired_at)
+            if workspace is not current_workspace():
+                # Private workspace of a call made outside a job
+                workspace.cleanup()
     
     @staticmethod
     def download_audio_only(link: str) -> str:
@@ -140,9 +509,10 @@ class YouTubeService:
             
         Raises:
             YouTubeDownloadException: If download fails
+            DeadlineExceededException: If the job deadline passes first
         """
         try:
-            ydl_opts = YouTubeService._COMMON_OPTS.copy()
+            ydl_opts = YouTubeService._ydl_opts()
             ydl_opts.update({
                 'format': 'bestaudio/best',
                 'outtmpl': os.path.join(settings.MEDIA_ROOT, '%(title)s.%(ext)s'),
@@ -153,12 +523,15 @@ class YouTubeService:
                 }],
             })
             
-            with YoutubeDL(ydl_opts) as ydl:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(link, download=True)
                 file_path = ydl.prepare_filename(info)
                 base, ext = os.path.splitext(file_path)
                 new_file = f"{base}.mp3"
             
             return new_file
+        except DeadlineExceededException:
+            raise
         except Exception as e:
+            YouTubeService._raise_if_deadline_exceeded('download')
             raise YouTubeDownloadException(f"Audio download failed: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""
+Storage - Where published job media lives: the local MEDIA_ROOT or an S3-compatible bucket.
+"""
+import abc
+import logging
+import mimetypes
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+
+from .exceptions import StorageException
+from .instrumentation import count_stage, span
+from .lazy import LazyModule
+
+boto3 = LazyModule('boto3')
+botocore_config = LazyModule('botocore.config')
+s3transfer = LazyModule('boto3.s3.transfer')
+
+logger = logging.getLogger(__name__)
+
+
+class MediaStorage(abc.ABC):
+    """
+    Backend holding the artifacts jobs publish (videos, audio, transcripts and MP3 copies).
+
+    Artifacts are always produced on local disk first (yt-dlp, ffmpeg, the
+    fingerprinter and the AssemblyAI upload all work on files), so the
+    interface is file based: ``save`` stores a finished local file and
+    ``fetch`` brings one back to this node. Names are the flat artifact
+    names of ``JobWorkspace`` (e.g. ``Song_abc123_audio.m4a``).
+    """
+
+    # Whether artifacts leave this node (saving uploads them; coroutines run it in a thread)
+    remote = False
+
+    @abc.abstractmethod
+    def save(self, name: str, local_path: str):
+        """
+        Store a finished local file under ``name``, replacing any previous one.
+
+        Args:
+            name: Artifact name
+            local_path: Path of the complete file
+
+        Raises:
+            StorageException: If the file cannot be stored
+        """
+
+    @abc.abstractmethod
+    def exists(self, name: str) -> bool:
+        """Whether an artifact is stored under ``name``."""
+
+    @abc.abstractmethod
+    def fetch(self, name: str, local_path: str) -> bool:
+        """
+        Copy a stored artifact to a local file.
+
+        Args:
+            name: Artifact name
+            local_path: Where to write it (replaced atomically)
+
+        Returns:
+            False if there is no such artifact
+
+        Raises:
+            StorageException: If the artifact cannot be read
+        """
+
+    @abc.abstractmethod
+    def url(self, name: str) -> Optional[str]:
+        """
+        URL a browser can download the artifact from directly.
+
+        Args:
+            name: Artifact name
+
+        Returns:
+            The URL, or None when the application has to serve the file itself
+        """
+
+    @abc.abstractmethod
+    def delete(self, name: str):
+        """Remove an artifact, if it exists."""
+
+    @abc.abstractmethod
+    def list(self) -> Iterator[Tuple[str, float]]:
+        """
+        List stored artifacts.
+
+        Yields:
+            Tuples of (artifact name, modification time as a Unix timestamp)
+        """
+
+
+class LocalMediaStorage(MediaStorage):
+    """
+    Artifacts as files in ``MEDIA_ROOT``, shared between containers by a volume.
+
+    Jobs publish straight into ``MEDIA_ROOT`` (``JobWorkspace.publish``),
+    so nothing is copied, and ``MediaDownloadView`` streams downloads from
+    disk. Every node reading the artifacts needs the same directory.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        """
+        Initialize the storage.
+
+        Args:
+            root: Directory holding the artifacts (default: MEDIA_ROOT, read on each call)
+        """
+        self._root = root
+
+    @property
+    def root(self) -> Path:
+        return Path(self._root or settings.MEDIA_ROOT)
+
+    def save(self, name: str, local_path: str):
+        target = self.root / name
+        if Path(local_path).resolve() == target.resolve():
+            return
+        partial = target.with_name(f"{name}.{uuid.uuid4().hex[:8]}.part")
+        try:
+            shutil.copyfile(local_path, partial)
+            os.replace(partial, target)
+        except OSError as e:
+            partial.unlink(missing_ok=True)
+            raise StorageException(f"Could not store {name}: {e}")
+
+    def exists(self, name: str) -> bool:
+        return (self.root / name).is_file()
+
+    def fetch(self, name: str, local_path: str) -> bool:
+        source = self.root / name
+        if not source.is_file():
+            return False
+        if Path(local_path).resolve() != source.resolve():
+            shutil.copyfile(source, local_path)
+        return True
+
+    def url(self, name: str) -> Optional[str]:
+        return None
+
+    def delete(self, name: str):
+        (self.root / name).unlink(missing_ok=True)
+
+    def list(self) -> Iterator[Tuple[str, float]]:
+        if not self.root.is_dir():
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.startswith('.'):
+                yield entry.name, entry.stat().st_mtime
+
+
+class S3MediaStorage(MediaStorage):
+    """
+    Artifacts as objects in an S3-compatible bucket (AWS S3, MinIO...), shared by every node.
+
+    Files are uploaded with boto3's managed transfer: above
+    ``S3_MULTIPART_CHUNK_MB`` a multipart upload reads the file in parts
+    of that size and sends ``S3_UPLOAD_CONCURRENCY`` of them at a time, so
+    an upload never holds more than those parts in memory. Downloads are
+    presigned ``GET`` URLs, valid for ``S3_URL_EXPIRES`` seconds, that the
+    browser follows straight to the bucket; no byte of media goes through
+    a Python process. ``MEDIA_ROOT`` remains each node's working copy of
+    the artifacts it produced.
+
+    When the API reaches the store at a different address than browsers
+    do (``http://minio:9000`` inside docker compose, ``localhost:9000``
+    outside), URLs are signed for ``S3_PUBLIC_ENDPOINT_URL``.
+    """
+
+    remote = True
+
+    def __init__(self, bucket: Optional[str] = None, prefix: Optional[str] = None):
+        """
+        Initialize the storage.
+
+        Args:
+            bucket: Bucket name (default: settings.S3_BUCKET)
+            prefix: Key prefix of the artifacts (default: settings.S3_PREFIX)
+        """
+        self.bucket = bucket or settings.S3_BUCKET
+        if not self.bucket:
+            raise StorageException("S3_BUCKET must be set when MEDIA_STORAGE is 's3'")
+        self.prefix = settings.S3_PREFIX if prefix is None else prefix
+        self._client = None
+        self._signer = None
+        self._lock = threading.Lock()
+
+    def _make_client(self, endpoint_url: str):
+        """Create an S3 client (thread-safe, with its own connection pool)."""
+        return boto3.session.Session().client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            region_name=settings.S3_REGION or None,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+            config=botocore_config.Config(
+                signature_version='s3v4',
+                # S3-compatible servers are addressed by path (no bucket subdomains)
+                s3={'addressing_style': 'path' if endpoint_url else 'auto'},
+                max_pool_connections=max(10, settings.S3_UPLOAD_CONCURRENCY * 2),
+                retries={'max_attempts': 5, 'mode': 'standard'},
+            ),
+        )
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self._make_client(settings.S3_ENDPOINT_URL)
+            return self._client
+
+    @property
+    def signer(self):
+        """Client whose presigned URLs point at the address browsers use."""
+        if not settings.S3_PUBLIC_ENDPOINT_URL:
+            return self.client
+        with self._lock:
+            if self._signer is None:
+                self._signer = self._make_client(settings.S3_PUBLIC_ENDPOINT_URL)
+            return self._signer
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    @staticmethod
+    def _not_found(error: Exception) -> bool:
+        code = str(getattr(error, 'response', {}).get('Error', {}).get('Code', ''))
+        return code in ('404', 'NoSuchKey', 'NotFound')
+
+    def save(self, name: str, local_path: str):
+        chunk = settings.S3_MULTIPART_CHUNK_MB * 1024 ** 2
+        transfer = s3transfer.TransferConfig(
+            multipart_threshold=chunk, multipart_chunksize=chunk, max_concurrency=settings.S3_UPLOAD_CONCURRENCY
+        )
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        try:
+            with span('storage_upload'):
+                self.client.upload_file(
+                    str(local_path), self.bucket, self._key(name),
+                    ExtraArgs={'ContentType': content_type}, Config=transfer
+                )
+                count_stage(bytes=os.path.getsize(local_path))
+        except Exception as e:
+            raise StorageException(f"Upload of {name} to s3://{self.bucket} failed: {e}")
+        logger.info(f"Stored {name} in s3://{self.bucket}/{self._key(name)}")
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except Exception as e:
+            if self._not_found(e):
+                return False
+            raise StorageException(f"Lookup of {name} in s3://{self.bucket} failed: {e}")
+        return True
+
+    def fetch(self, name: str, local_path: str) -> bool:
+        partial = f"{local_path}.{uuid.uuid4().hex[:8]}.part"
+        try:
+            self.client.download_file(self.bucket, self._key(name), partial)
+            os.replace(partial, local_path)
+        except Exception as e:
+            if self._not_found(e):
+                return False
+            raise StorageException(f"Download of {name} from s3://{self.bucket} failed: {e}")
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        return True
+
+    def url(self, name: str) -> Optional[str]:
+        return self.signer.generate_presigned_url(
+            'get_object',
+            Params={
+                'Bucket': self.bucket,
+                'Key': self._key(name),
+                'ResponseContentDisposition': f"attachment; filename*=UTF-8''{quote(name)}",
+            },
+            ExpiresIn=settings.S3_URL_EXPIRES,
+        )
+
+    def delete(self, name: str):
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+        except Exception as e:
+            raise StorageException(f"Deletion of {name} from s3://{self.bucket} failed: {e}")
+
+    def list(self) -> Iterator[Tuple[str, float]]:
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get('Contents', []):
+                yield item['Key'][len(self.prefix):], item['LastModified'].timestamp()
+
+
+STORAGE_BACKENDS = {
+    'local': LocalMediaStorage,
+    's3': S3MediaStorage,
+}
+
+_storage: Optional[MediaStorage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> MediaStorage:
+    """
+    Return the process-wide media storage.
+
+    Returns:
+        The MediaStorage selected by ``MEDIA_STORAGE`` ('local' or 's3'), created on first use
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            backend = getattr(settings, 'MEDIA_STORAGE', 'local')
+            if backend not in STORAGE_BACKENDS:
+                raise StorageException(
+                    f"Unknown MEDIA_STORAGE '{backend}'. Choose from: {', '.join(STORAGE_BACKENDS)}"
+                )
+            _storage = STORAGE_BACKENDS[backend]()
+        return _storage
+
+
+def reset_storage():
+    """Forget the process's storage so the next ``get_storage()`` call rebuilds it from settings."""
+    global _storage
+    with _storage_lock:
+        _storage = None
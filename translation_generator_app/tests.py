@@ -1,3 +1,1981 @@
-from django.test import TestCase
+"""
+Tests for the translation generator app.
 
-# Create your tests here.
+Pipeline tests run the real services against the offline stand-ins in
+``fakes`` (local yt-dlp, AssemblyAI and OpenAI servers), so they need no
+network access or API keys; ffmpeg must be on the PATH.
+"""
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator, Optional, Tuple
+from unittest import mock
+
+import assemblyai as aai
+import httpx
+import numpy as np
+import openai
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import cleanup_media
+
+from .admission import limiter, plan_job, reset_limiters
+from .api_client import TranslationAPIClient
+from .backfill import BackfillItem, BackfillRunner, CheckpointManifest, read_catalog
+from .benchmarks import compare_to_baseline, percentile, summarize
+from .cpu_pool import run_cpu_bound
+from .deadline import Deadline, current_deadline, job_deadline
+from .exceptions import (
+    DeadlineExceededException,
+    InvalidDataException,
+    JobTooLargeException,
+    OverloadedException,
+    StorageException,
+    TranscriptionException,
+    TranslationException,
+    VideoUnavailableException,
+    YouTubeDownloadException,
+)
+from .fakes import FakeOpenAIServer, LatencyProfile, offline_services
+from .fakes.fake_youtube import write_melody_wav
+from .instrumentation import stage
+from .middleware import CompressionMiddleware
+from .models import AudioRecording, FingerprintHash, StageResult, VideoMetadata, translationPost
+from .profiling import SamplingProfiler, current_profiler, profile_job, profiling_requested
+from .progress import ProgressReporter, current_progress, track_progress
+from .services import (
+    AsyncTranscriptionService,
+    AudioSegmenter,
+    AudioTranscoder,
+    FingerprintService,
+    MetadataCache,
+    SingleFlight,
+    TranscriptionPoller,
+    TranscriptionService,
+    TranslationService,
+)
+from .services import rate_limit_scheduler
+from .services.audio_segmenter import AudioSegment
+from .services.rate_limit_scheduler import RateLimitScheduler, _TokenBucket, _duration, _retry_after
+from .storage import LocalMediaStorage, MediaStorage, S3MediaStorage, get_storage, reset_storage
+from .views import AsyncTranslationGeneratorView, TranslationGeneratorView, views_app
+from .warmer import CacheWarmer, WarmBudget
+from .workspace import JobWorkspace, job_workspace
+
+TEST_API_KEY = 'sk-test-0000000000000000'
+
+
+def unique_video_id(prefix: str = 'test') -> str:
+    """Video ID not seen by earlier tests (metadata and stage results are cached per video)."""
+    return f"{prefix}{uuid.uuid4().hex[:8]}"
+
+
+class MemoryMediaStorage(MediaStorage):
+    """Remote-style storage keeping artifacts in a dict of name -> (bytes, modification time)."""
+
+    remote = True
+
+    def __init__(self):
+        self.objects = {}
+
+    def save(self, name: str, local_path: str):
+        self.objects[name] = (Path(local_path).read_bytes(), time.time())
+
+    def exists(self, name: str) -> bool:
+        return name in self.objects
+
+    def fetch(self, name: str, local_path: str) -> bool:
+        if name not in self.objects:
+            return False
+        Path(local_path).write_bytes(self.objects[name][0])
+        return True
+
+    def url(self, name: str) -> Optional[str]:
+        return f"https://storage.invalid/{name}"
+
+    def delete(self, name: str):
+        self.objects.pop(name, None)
+
+    def list(self) -> Iterator[Tuple[str, float]]:
+        for name, (_, modified) in list(self.objects.items()):
+            yield name, modified
+
+
+class TemporaryMediaMixin:
+    """Points MEDIA_ROOT at a fresh directory for each test."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = Path(tempfile.mkdtemp(prefix='test-media-'))
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+
+class PercentileTests(SimpleTestCase):
+
+    def test_empty_sample_is_zero(self):
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_interpolates_between_ranks(self):
+        self.assertEqual(percentile([4.0, 1.0, 3.0, 2.0], 50), 2.5)
+        self.assertAlmostEqual(percentile([1.0, 2.0, 3.0, 4.0], 95), 3.85)
+
+    def test_bounds_are_min_and_max(self):
+        values = [3.0, 1.0, 2.0]
+        self.assertEqual(percentile(values, 0), 1.0)
+        self.assertEqual(percentile(values, 100), 3.0)
+        self.assertEqual(percentile([5.0], 99), 5.0)
+
+    def test_summarize(self):
+        summary = summarize([1.0, 2.0, 3.0])
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['mean'], 2.0)
+        self.assertEqual(summary['max'], 3.0)
+        self.assertEqual(summary['p50'], 2.0)
+        self.assertEqual(set(summary), {'count', 'mean', 'max', 'p50', 'p95', 'p99'})
+
+
+class CompareToBaselineTests(SimpleTestCase):
+
+    @staticmethod
+    def _results(p95: float, errors: int = 0) -> dict:
+        return {'view': {'4': {'errors': errors, 'stages': {'translation': {'p95': p95}}}}}
+
+    def test_within_tolerance(self):
+        self.assertEqual(compare_to_baseline(self._results(1.2), self._results(1.0), tolerance=0.25), [])
+
+    def test_slower_stage_regresses(self):
+        regressions = compare_to_baseline(self._results(1.5), self._results(1.0), tolerance=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('view @ concurrency 4: translation p95', regressions[0])
+
+    def test_slack_absorbs_noise_on_fast_stages(self):
+        self.assertEqual(compare_to_baseline(self._results(0.008), self._results(0.001), min_slack=0.01), [])
+
+    def test_more_failed_jobs_regress(self):
+        regressions = compare_to_baseline(self._results(1.0, errors=2), self._results(1.0))
+        self.assertEqual(regressions, ['view @ concurrency 4: 2 failed jobs (baseline 0)'])
+
+    def test_missing_baseline_entries_are_skipped(self):
+        self.assertEqual(compare_to_baseline(self._results(9.0), {'async': {}}), [])
+        baseline = {'view': {'4': {'errors': 0, 'stages': {}}}}
+        self.assertEqual(compare_to_baseline(self._results(9.0), baseline), [])
+
+
+class ErrorResponseTests(SimpleTestCase):
+
+    def _response(self, error: Exception):
+        with self.assertLogs('translation_generator_app.views.views_app', level='WARNING'):
+            response = TranslationGeneratorView()._error_response(error)
+        return response, json.loads(response.content)
+
+    def test_job_too_large_is_413(self):
+        response, body = self._response(JobTooLargeException("Video is too long"))
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(body['error'], "Video is too long")
+
+    def test_overloaded_is_429_with_retry_after(self):
+        response, body = self._response(OverloadedException("Server busy", retry_after=7))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(body['retry_after'], 7)
+
+    def test_deadline_exceeded_is_504(self):
+        response, _ = self._response(DeadlineExceededException("Job deadline exceeded during translation"))
+        self.assertEqual(response.status_code, 504)
+
+    def test_client_errors_are_400(self):
+        for error in (InvalidDataException("Invalid JSON data"), VideoUnavailableException("Private video")):
+            with self.subTest(error=type(error).__name__):
+                response, body = self._response(error)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(body['error'], str(error))
+
+    def test_stage_failures_are_500_with_prefix(self):
+        response, body = self._response(TranscriptionException("upload refused"))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(body['error'], "Transcription failed: upload refused")
+        self.assertEqual(body['code'], 'transcription_failed')
+
+    def test_unexpected_errors_hide_details(self):
+        response, body = self._response(ValueError("secret detail"))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(body['error'], 'An unexpected error occurred')
+
+
+class LatencyProfileTests(SimpleTestCase):
+
+    def test_seeded_profiles_repeat(self):
+        first = LatencyProfile(latency=0.1, jitter=0.05, failure_rate=0.5, seed=7)
+        second = LatencyProfile(latency=0.1, jitter=0.05, failure_rate=0.5, seed=7)
+        self.assertEqual([first.delay() for _ in range(5)], [second.delay() for _ in range(5)])
+        self.assertEqual([first.should_fail() for _ in range(5)], [second.should_fail() for _ in range(5)])
+
+    def test_delay_is_never_negative(self):
+        profile = LatencyProfile(latency=0.01, jitter=1.0, seed=1)
+        self.assertTrue(all(profile.delay() >= 0 for _ in range(50)))
+
+    def test_failure_rate_bounds(self):
+        self.assertFalse(any(LatencyProfile(failure_rate=0.0).should_fail() for _ in range(20)))
+        self.assertTrue(all(LatencyProfile(failure_rate=1.0).should_fail() for _ in range(20)))
+
+
+class FakeOpenAIServerTests(SimpleTestCase):
+
+    def _complete(self, server: FakeOpenAIServer) -> httpx.Response:
+        return httpx.post(f"{server.base_url}/chat/completions", json={
+            'model': 'gpt-4o-mini',
+            'messages': [{'role': 'user', 'content': 'Translate to es:\n\nHello'}],
+        })
+
+    def test_echoes_the_prompt_text(self):
+        with FakeOpenAIServer() as server:
+            response = self._complete(server)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['choices'][0]['message']['content'], 'Hello')
+
+    def test_simulated_rate_limit(self):
+        with FakeOpenAIServer(requests_per_minute=1) as server:
+            first, second = self._complete(server), self._complete(server)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers['x-ratelimit-limit-requests'], '1')
+        self.assertEqual(second.status_code, 429)
+        self.assertGreater(int(second.headers['retry-after-ms']), 0)
+        self.assertEqual(server.rate_limited, 1)
+
+
+class OfflineServicesMixin(TemporaryMediaMixin):
+    """Runs each test against the offline stand-ins and posts to ``TranslationGeneratorView``."""
+
+    # Seconds the fake AssemblyAI takes to finish a transcript
+    transcription_latency = 0.05
+
+    def setUp(self):
+        super().setUp()
+        services = offline_services(
+            youtube=LatencyProfile(payload_size=64 * 1024),
+            transcription=LatencyProfile(latency=self.transcription_latency),
+            polling_interval=0.05,
+        )
+        self.services = services.__enter__()
+        self.addCleanup(services.__exit__, None, None, None)
+
+    def _post(self, video_id: str, **headers):
+        request = RequestFactory().post(
+            '/generate-translation/',
+            data=json.dumps({
+                'link': f"https://www.youtube.com/watch?v={video_id}",
+                'openai_api_key': TEST_API_KEY,
+                'target_language': 'es',
+            }),
+            content_type='application/json',
+            **headers
+        )
+        return TranslationGeneratorView.as_view()(request)
+
+
+class OfflinePipelineTests(OfflineServicesMixin, TransactionTestCase):
+    """``TranslationGeneratorView`` end to end against the offline stand-ins."""
+
+    def test_translates_and_stores_the_result(self):
+        video_id = unique_video_id()
+        response = self._post(video_id)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = json.loads(response.content)
+        self.assertEqual(body['title'], f"Fake Song {video_id}")
+        self.assertTrue(body['content'])
+        self.assertTrue(Path(body['audio_file']).is_file())
+
+        stored = translationPost.objects.get(pk=body['id'])
+        self.assertEqual(stored.generated_content, body['content'])
+        self.assertIn('transcription', {span['name'] for span in stored.stage_timeline['stages']})
+
+    def test_private_video_is_rejected(self):
+        response = self._post(unique_video_id('private'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(translationPost.objects.count(), 0)
+
+
+class AsyncPipelineTests(OfflineServicesMixin, TransactionTestCase):
+    """``AsyncTranslationGeneratorView`` end to end against the offline stand-ins."""
+
+    def _apost(self, video_id: str):
+        request = AsyncRequestFactory().post(
+            '/generate-translation-async/',
+            data=json.dumps({
+                'link': f"https://www.youtube.com/watch?v={video_id}",
+                'openai_api_key': TEST_API_KEY,
+                'target_language': 'es',
+            }),
+            content_type='application/json'
+        )
+        return asyncio.run(AsyncTranslationGeneratorView.as_view()(request))
+
+    def test_translates_and_stores_the_result(self):
+        video_id = unique_video_id()
+        response = self._apost(video_id)
+        self.assertEqual(response.status_code, 200, response.content)
+        body = json.loads(response.content)
+        self.assertEqual(body['title'], f"Fake Song {video_id}")
+        self.assertTrue(Path(body['audio_file']).is_file())
+        stored = translationPost.objects.get(pk=body['id'])
+        self.assertEqual(stored.generated_content, body['content'])
+        self.assertIn('translation', {span['name'] for span in stored.stage_timeline['stages']})
+
+    def test_private_video_is_rejected(self):
+        with self.assertLogs('translation_generator_app.views.views_app', 'WARNING'):
+            response = self._apost(unique_video_id('private'))
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(ADMISSION_LIMITS={'job': 1})
+    def test_full_server_answers_429(self):
+        reset_limiters()
+        self.addCleanup(reset_limiters)
+        with limiter('job').slot(timeout=0), self.assertLogs('translation_generator_app.views.views_app', 'WARNING'):
+            response = self._apost(unique_video_id())
+        self.assertEqual(response.status_code, 429)
+
+
+class APIClientTests(OfflineServicesMixin, TransactionTestCase):
+    """``TranslationAPIClient``, as the Streamlit app uses it, against the view served in process."""
+
+    def setUp(self):
+        super().setUp()
+        self.client_under_test = TranslationAPIClient(
+            'http://localhost', transport=httpx.WSGITransport(app=get_wsgi_application())
+        )
+
+    def test_relays_progress_and_returns_the_result(self):
+        video_id = unique_video_id()
+        events = []
+        result = self.client_under_test.translate(
+            f"https://www.youtube.com/watch?v={video_id}", TEST_API_KEY, on_event=events.append
+        )
+        self.assertEqual(result['title'], f"Fake Song {video_id}")
+        self.assertTrue(translationPost.objects.filter(pk=result['id']).exists())
+        self.assertIn('transcription', {event['stage'] for event in events if event['type'] == 'stage'})
+        self.assertEqual(self.client_under_test._http.get(result['audio_url']).status_code, 200)
+
+    def test_maps_rejections_to_exceptions(self):
+        with self.assertRaises(VideoUnavailableException), \
+                self.assertLogs('translation_generator_app.views.views_app', 'WARNING'):
+            self.client_under_test.translate(
+                f"https://www.youtube.com/watch?v={unique_video_id('private')}", TEST_API_KEY
+            )
+        with self.assertRaises(InvalidDataException), \
+                self.assertLogs('translation_generator_app.views.views_app', 'WARNING'):
+            self.client_under_test.translate("https://example.com/not-youtube", TEST_API_KEY)
+
+    def test_maps_stage_failures_to_their_exceptions(self):
+        failures = (YouTubeDownloadException("blocked"), TranscriptionException("upload refused"),
+                    TranslationException("no models"))
+        for failure in failures:
+            with self.subTest(error=type(failure).__name__), \
+                    mock.patch.object(TranslationGeneratorView, '_run_job', side_effect=failure), \
+                    self.assertLogs('translation_generator_app', 'ERROR'), \
+                    self.assertRaises(type(failure)) as raised:
+                self.client_under_test.translate(
+                    f"https://www.youtube.com/watch?v={unique_video_id()}", TEST_API_KEY
+                )
+            self.assertIn(str(failure), str(raised.exception))
+
+
+class StreamlitAppTests(SimpleTestCase):
+
+    def test_does_not_set_up_django(self):
+        code = "import app; from django.apps import apps; print(apps.ready)"
+        output = subprocess.run([sys.executable, '-c', code], cwd=Path(cleanup_media.__file__).parent,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip().splitlines()[-1], 'False')
+
+
+class EventStreamTests(OfflineServicesMixin, TransactionTestCase):
+    """``Accept: text/event-stream`` responses of ``POST /generate-translation/``."""
+
+    def _events(self, response) -> list:
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        self.body = b''.join(response.streaming_content).decode()
+        return list(TranslationAPIClient._events(self.body.splitlines()))
+
+    def test_stage_events_then_the_result(self):
+        events = self._events(self._post(unique_video_id(), HTTP_ACCEPT='text/event-stream'))
+
+        self.assertEqual(events[-1]['type'], 'result')
+        self.assertEqual(events[-1]['content'], translationPost.objects.get(pk=events[-1]['id']).generated_content)
+        stages = [(event['stage'], event['status']) for event in events if event['type'] == 'stage']
+        self.assertEqual(stages[0], ('metadata', 'started'))
+        self.assertEqual(stages[-1], ('db_write', 'finished'))
+        for name in {name for name, _ in stages}:
+            with self.subTest(stage=name):
+                self.assertLess(stages.index((name, 'started')), stages.index((name, 'finished')))
+        self.assertTrue(all(event['seconds'] >= 0 for event in events if event.get('status') == 'finished'))
+
+    def test_failure_ends_the_stream_with_an_error_event(self):
+        with mock.patch.object(TranslationGeneratorView, '_run_job', side_effect=TranscriptionException("upload refused")), \
+                self.assertLogs('translation_generator_app.views.views_app', 'ERROR'):
+            events = self._events(self._post(unique_video_id(), HTTP_ACCEPT='text/event-stream'))
+        self.assertEqual(events, [{
+            'type': 'error', 'status': 500, 'code': 'transcription_failed',
+            'error': 'Transcription failed: upload refused',
+        }])
+
+    def test_quiet_job_sends_keep_alives(self):
+        def slow_job(*args):
+            time.sleep(0.2)
+            raise TranscriptionException("timed out")
+
+        with mock.patch.object(TranslationGeneratorView, 'EVENT_STREAM_KEEPALIVE', 0.05), \
+                mock.patch.object(TranslationGeneratorView, '_run_job', side_effect=slow_job), \
+                self.assertLogs('translation_generator_app.views.views_app', 'ERROR'):
+            events = self._events(self._post(unique_video_id(), HTTP_ACCEPT='text/event-stream'))
+        self.assertTrue(self.body.startswith(': keep-alive\n\n'))
+        self.assertEqual([event['type'] for event in events], ['error'])
+
+
+class ProgressReporterTests(SimpleTestCase):
+
+    def test_byte_updates_are_throttled_but_the_last_one_is_sent(self):
+        events = []
+        reporter = ProgressReporter(events.append)
+        for done in range(0, 1000, 100):
+            reporter.update('download', done, total_bytes=1000)
+        reporter.update('download', 1000, total_bytes=1000)
+        self.assertEqual([event['percent'] for event in events], [0.0, 100.0])
+
+        time.sleep(ProgressReporter.MIN_INTERVAL)
+        reporter.update('audio', 500)
+        self.assertEqual(events[-1]['stage'], 'audio')
+        self.assertIsNone(events[-1]['percent'])
+
+    def test_ytdlp_hook_reports_the_download(self):
+        events = []
+        ProgressReporter(events.append).ytdlp_hook({
+            'status': 'downloading', 'downloaded_bytes': 250, 'total_bytes_estimate': 1000, 'speed': 125.0, 'eta': 6,
+        })
+        self.assertEqual(events, [{
+            'type': 'progress', 'stage': 'download', 'percent': 25.0, 'bytes': 250,
+            'total_bytes': 1000, 'bytes_per_second': 125, 'eta': 6,
+        }])
+
+    def test_reporter_is_scoped_to_the_block(self):
+        self.assertIsNone(current_progress())
+        with track_progress(print) as reporter:
+            self.assertIs(current_progress(), reporter)
+        self.assertIsNone(current_progress())
+
+
+class TranslationResultViewTests(TestCase):
+
+    def setUp(self):
+        self.post = translationPost.objects.create(
+            youtube_title='Fake Song', youtube_link='https://www.youtube.com/watch?v=abc123',
+            generated_content='Hola mundo\n' * 100, original_transcription='Hello world\n' * 100,
+            target_language='es',
+        )
+        self.url = reverse('translation-result', args=[self.post.pk])
+
+    def test_etag_is_the_hash_of_the_body(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{hashlib.sha256(response.content).hexdigest()}"')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_current_copy_is_not_sent_again(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.post.generated_content = 'Adiós mundo'
+        self.post.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_fields_limit_the_body(self):
+        response = self.client.get(self.url, {'fields': 'title, content'})
+        self.assertEqual(set(response.json()), {'title', 'content'})
+        self.assertNotEqual(response['ETag'], self.client.get(self.url)['ETag'])
+
+        response = self.client.get(self.url, {'fields': 'title,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_gzipped_response_revalidates_with_its_weak_etag(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(json.loads(gzip.decompress(response.content))['id'], self.post.pk)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_translation_is_404(self):
+        self.assertEqual(self.client.get(reverse('translation-result', args=[self.post.pk + 1])).status_code, 404)
+
+
+class TranslationTimelineViewTests(OfflineServicesMixin, TransactionTestCase):
+    """The stage waterfall of an offline job, read back through ``TranslationTimelineView``."""
+
+    def _timeline(self) -> dict:
+        response = self._post(unique_video_id())
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.get(reverse('translation-timeline', args=[json.loads(response.content)['id']]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    @staticmethod
+    def _spans(timeline: dict, parent=None) -> dict:
+        return {span['name']: span for span in timeline['stages'] if span['parent'] == parent}
+
+    def test_streamed_job_records_each_stage(self):
+        timeline = self._timeline()
+        stages = self._spans(timeline)
+        self.assertLessEqual({'metadata', 'video_download', 'upload', 'transcription', 'translation', 'db_write'},
+                             set(stages))
+        self.assertNotIn('download', stages)
+        self.assertGreater(stages['video_download']['bytes'], 0)
+        self.assertGreater(stages['upload']['bytes'], 0)
+        # ffmpeg downloads and remuxes the audio while it is uploaded
+        self.assertIn('transcode', self._spans(timeline, 'upload'))
+        for span in timeline['stages']:
+            self.assertLessEqual(span['start'], span['end'])
+        self.assertEqual(timeline['seconds'], max(span['end'] for span in timeline['stages']))
+
+    def test_combined_llm_call_is_labelled(self):
+        llm_calls = self._spans(self._timeline(), 'translation')
+        self.assertEqual(set(llm_calls), {'detection+formatting+translation'})
+        self.assertGreater(llm_calls['detection+formatting+translation']['tokens'], 0)
+
+    @override_settings(LLM_COMBINED_CALL=False)
+    def test_separate_llm_calls_are_recorded_each(self):
+        self.assertEqual(set(self._spans(self._timeline(), 'translation')), {'detection', 'formatting', 'translation'})
+
+    @override_settings(PIPELINED_AUDIO_UPLOAD=False)
+    def test_downloaded_job_records_both_downloads(self):
+        stages = self._spans(self._timeline())
+        self.assertGreater(stages['video_download']['bytes'], 0)
+        self.assertGreater(stages['audio_download']['bytes'], 0)
+        self.assertLessEqual(stages['video_download']['end'], stages['audio_download']['start'])
+        self.assertNotIn('upload', stages)
+
+    def test_missing_translation_is_404(self):
+        self.assertEqual(self.client.get(reverse('translation-timeline', args=[999999])).status_code, 404)
+
+    def test_rows_saved_before_timelines_have_no_stages(self):
+        post = translationPost.objects.create(
+            youtube_title='Fake Song', youtube_link='https://www.youtube.com/watch?v=abc123',
+            generated_content='Hola', original_transcription='Hello', target_language='es',
+        )
+        body = self.client.get(reverse('translation-timeline', args=[post.pk])).json()
+        self.assertEqual(body['stages'], [])
+        self.assertIsNone(body['started_at'])
+
+
+
+def _busy(seconds: float):
+    """Burn CPU in the calling thread for ``seconds``."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+@override_settings(PROFILING_TOKEN='', PROFILING_SAMPLE_RATE=0.0)
+class ProfilingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.profile_dir = Path(tempfile.mkdtemp(prefix='test-profiles-'))
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+
+    @staticmethod
+    def _request(**headers):
+        return RequestFactory().post('/generate-translation/', **headers)
+
+    @override_settings(PROFILING_TOKEN='admin-secret')
+    def test_header_must_match_the_token(self):
+        self.assertTrue(profiling_requested(self._request(HTTP_X_PROFILE_TOKEN='admin-secret')))
+        self.assertFalse(profiling_requested(self._request(HTTP_X_PROFILE_TOKEN='guess')))
+        self.assertFalse(profiling_requested(self._request()))
+        self.assertFalse(profiling_requested())
+
+    def test_header_is_ignored_without_a_token(self):
+        self.assertFalse(profiling_requested(self._request(HTTP_X_PROFILE_TOKEN='')))
+        self.assertFalse(profiling_requested(self._request(HTTP_X_PROFILE_TOKEN='anything')))
+
+    def test_sample_rate_profiles_a_share_of_jobs(self):
+        with mock.patch('translation_generator_app.profiling.random.random', side_effect=[0.2, 0.7]):
+            with override_settings(PROFILING_SAMPLE_RATE=0.5):
+                self.assertTrue(profiling_requested())
+                self.assertFalse(profiling_requested(self._request()))
+        with mock.patch('translation_generator_app.profiling.random.random') as draw:
+            self.assertFalse(profiling_requested())
+            draw.assert_not_called()
+
+    def test_disabled_profile_starts_no_sampling_thread(self):
+        with mock.patch('translation_generator_app.profiling.SamplingProfiler') as profiler_class:
+            with profile_job('view-abc', enabled=False) as profiler, stage('metadata'):
+                self.assertIsNone(profiler)
+                self.assertIsNone(current_profiler())
+        profiler_class.assert_not_called()
+
+    def test_writes_collapsed_stacks_labelled_by_stage(self):
+        with override_settings(PROFILING_DIR=str(self.profile_dir), PROFILING_INTERVAL=0.002):
+            with self.assertLogs('translation_generator_app.profiling', 'INFO'):
+                with profile_job('view-abc') as profiler:
+                    self.assertIs(current_profiler(), profiler)
+                    with stage('translation'):
+                        _busy(0.3)
+        self.assertIsNone(current_profiler())
+
+        [path] = self.profile_dir.glob('*-view-abc-*.collapsed')
+        lines = path.read_text().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, weight = line.rsplit(' ', 1)
+            self.assertGreater(int(weight), 0)
+            self.assertIn('ProfilingTests.test_writes_collapsed_stacks_labelled_by_stage', stack.split(';')[0])
+        self.assertTrue(any(';[translation];' in line and '_busy' in line for line in lines))
+
+    def test_keeps_the_most_recent_files(self):
+        for age in range(3):
+            old = self.profile_dir / f"old-{age}.collapsed"
+            old.write_text('main 1\n')
+            os.utime(old, (time.time() - 60 * (age + 1),) * 2)
+
+        profiler = SamplingProfiler(interval=0.01)
+        self.assertIsNone(profiler.write('view-abc', str(self.profile_dir)))
+        profiler.samples['main;[translation];work'] = 10
+        with override_settings(PROFILING_MAX_FILES=2):
+            path = profiler.write('view-abc', str(self.profile_dir))
+
+        self.assertEqual(path.read_text(), 'main;[translation];work 10\n')
+        self.assertEqual({p.name for p in self.profile_dir.iterdir()}, {path.name, 'old-0.collapsed'})
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def _process(self, response):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_json_is_compressed(self):
+        response = self._process(JsonResponse({'content': 'Hola mundo ' * 100}))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_event_stream_is_not_compressed(self):
+        events = ('event: progress\ndata: {"percent": %d}\n\n' % percent for percent in range(100))
+        response = self._process(StreamingHttpResponse(events, content_type='text/event-stream'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'event: progress'))
+
+    def test_media_is_not_compressed(self):
+        response = self._process(HttpResponse(b'\xff\xfb' * 500, content_type='audio/mpeg'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+@override_settings(ADMISSION_LIMITS={'job': 1})
+class JobAdmissionTests(OfflineServicesMixin, TransactionTestCase):
+    """The view's single job slot is rejected when taken and always given back."""
+
+    def setUp(self):
+        super().setUp()
+        reset_limiters()
+        self.addCleanup(reset_limiters)
+
+    def assertSlotFree(self):
+        job_slot = limiter('job')
+        job_slot.release(job_slot.acquire(timeout=0))
+
+    def test_full_server_answers_429(self):
+        with limiter('job').slot(timeout=0), self.assertLogs('translation_generator_app.views.views_app', 'WARNING'):
+            response = self._post(unique_video_id())
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response['Retry-After'])
+
+    def test_failed_job_releases_the_slot(self):
+        with mock.patch.object(TranslationGeneratorView, '_run_job', side_effect=ValueError('boom')), \
+                self.assertLogs('translation_generator_app.views.views_app', 'ERROR'):
+            response = self._post(unique_video_id())
+        self.assertEqual(response.status_code, 500)
+        self.assertSlotFree()
+
+    def test_event_stream_releases_the_slot_when_done(self):
+        response = self._post(unique_video_id(), HTTP_ACCEPT='text/event-stream')
+        events = b''.join(response.streaming_content).decode()
+        self.assertIn('event: result', events)
+        self.assertSlotFree()
+
+    def test_event_stream_thread_that_cannot_start_releases_the_slot(self):
+        threads = mock.Mock()
+        threads.Thread.return_value.start.side_effect = RuntimeError("can't start new thread")
+        with mock.patch.object(views_app, 'threading', threads), \
+                self.assertLogs('translation_generator_app.views.views_app', 'ERROR'):
+            response = self._post(unique_video_id(), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 500)
+        self.assertSlotFree()
+
+
+
+@override_settings(ADMISSION_MAX_DURATION=3600, ADMISSION_MAX_DOWNLOAD_BYTES=100 * 2**20,
+                   ADMISSION_VIDEO_MAX_DURATION=1200, ADMISSION_VIDEO_MAX_BYTES=0)
+class PlanJobTests(SimpleTestCase):
+
+    @staticmethod
+    def _metadata(duration: int, size: int = 0):
+        return SimpleNamespace(duration=duration, formats=[{'vcodec': 'avc1', 'filesize': size}] if size else [])
+
+    def test_duration_just_over_the_limit_is_not_rounded_down(self):
+        with self.assertRaisesMessage(JobTooLargeException, "Video is 60:01 long; the limit is 60:00."):
+            plan_job(self._metadata(3601))
+        with self.assertRaisesMessage(JobTooLargeException, "Video is 75:30 long"):
+            plan_job(self._metadata(4530))
+
+    def test_size_just_over_the_limit_is_rounded_up(self):
+        with self.assertRaisesMessage(JobTooLargeException, "about 101 MB; the limit is 100 MB."):
+            plan_job(self._metadata(60, 100 * 2**20 + 1))
+
+    def test_long_video_is_downgraded_to_audio(self):
+        self.assertTrue(plan_job(self._metadata(1200)))
+        self.assertFalse(plan_job(self._metadata(1201)))
+        # Exactly at the hard limits is still accepted
+        self.assertFalse(plan_job(self._metadata(3600, 100 * 2**20)))
+
+
+class DeadlineTests(SimpleTestCase):
+
+    def test_budget_bounds_each_operation(self):
+        deadline = Deadline(10)
+        self.assertFalse(deadline.expired)
+        self.assertLessEqual(deadline.remaining(), 10)
+        self.assertEqual(deadline.timeout(2), 2)
+        self.assertLessEqual(deadline.timeout(60), 10)
+        deadline.check('download')
+
+    def test_expired_deadline_fails_fast_naming_the_stage(self):
+        deadline = Deadline(0.01)
+        time.sleep(0.02)
+        self.assertEqual(deadline.remaining(), 0.0)
+        with self.assertRaisesMessage(DeadlineExceededException, 'during translation'):
+            deadline.check('translation')
+
+    def test_job_deadline_is_scoped_to_the_block(self):
+        self.assertIsNone(current_deadline())
+        with job_deadline(30) as deadline:
+            self.assertIs(current_deadline(), deadline)
+            with job_deadline(0) as disabled:
+                self.assertIsNone(disabled)
+                self.assertIsNone(current_deadline())
+            self.assertIs(current_deadline(), deadline)
+        self.assertIsNone(current_deadline())
+
+
+class HedgedCompletionTests(SimpleTestCase):
+    """``TranslationService`` hedging and deadline checks, with the request itself stubbed."""
+
+    def setUp(self):
+        self.service = TranslationService(api_key=TEST_API_KEY)
+        latencies = mock.patch.dict(TranslationService._latencies, clear=True)
+        latencies.start()
+        self.addCleanup(latencies.stop)
+
+    def _learn_latency(self, seconds: float):
+        for _ in range(TranslationService.HEDGE_MIN_SAMPLES):
+            TranslationService._record_latency('gpt-4o-mini', 'detection', seconds)
+
+    def test_slow_call_is_hedged_and_the_first_response_wins(self):
+        self._learn_latency(0.05)
+        responses = iter([lambda: time.sleep(1) or 'slow', lambda: 'hedge'])
+        with mock.patch.object(self.service, '_timed_completion', side_effect=lambda task, kwargs: next(responses)()) \
+                as completion, self.assertLogs('translation_generator_app.services.translation_service', 'INFO'):
+            started = time.monotonic()
+            result = self.service._hedged_completion('detection', {'model': 'gpt-4o-mini'}, None)
+        self.assertEqual(result, 'hedge')
+        self.assertEqual(completion.call_count, 2)
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_no_hedge_without_enough_samples(self):
+        with mock.patch.object(self.service, '_timed_completion', return_value='only') as completion:
+            self.assertEqual(self.service._hedged_completion('detection', {'model': 'gpt-4o-mini'}, None), 'only')
+        self.assertEqual(completion.call_count, 1)
+        self.assertIsNone(self.service._hedge_delay('gpt-4o-mini', 'detection'))
+
+    def test_no_request_after_the_deadline(self):
+        with job_deadline(0.01), mock.patch.object(self.service, '_hedged_completion') as completion:
+            time.sleep(0.02)
+            with self.assertRaisesMessage(DeadlineExceededException, 'during detection'):
+                self.service._create_completion('detection', model='gpt-4o-mini', messages=[])
+        completion.assert_not_called()
+
+
+class TokenBucketTests(SimpleTestCase):
+    """``_TokenBucket`` driven with explicit clock readings."""
+
+    def _bucket(self, limit: float = 60, remaining: float = 1) -> _TokenBucket:
+        bucket = _TokenBucket()
+        bucket.observe(limit, remaining, now=0)
+        return bucket
+
+    def test_unknown_limit_never_waits(self):
+        bucket = _TokenBucket()
+        self.assertEqual(bucket.reserve(1000, now=0), 0)
+        bucket.block(10, now=0)
+        self.assertEqual(bucket.reserve(1000, now=0), 0)
+
+    def test_reservations_queue_behind_the_deficit(self):
+        bucket = self._bucket(limit=60, remaining=1)
+        self.assertEqual(bucket.reserve(1, now=0), 0)
+        self.assertAlmostEqual(bucket.reserve(1, now=0), 1.0)
+        # Half a second refills half a request; the next one queues behind the first
+        self.assertAlmostEqual(bucket.reserve(1, now=0.5), 1.5)
+
+    def test_refund_gives_back_up_to_the_limit(self):
+        bucket = self._bucket(limit=60, remaining=0)
+        bucket.reserve(5, now=0)
+        bucket.refund(5)
+        self.assertEqual(bucket.level, 0)
+        bucket.refund(1000)
+        self.assertEqual(bucket.level, 60)
+
+    def test_observe_never_trusts_more_than_the_server_reports(self):
+        bucket = self._bucket(limit=60, remaining=50)
+        bucket.observe(60, 55, now=0)
+        self.assertEqual(bucket.level, 50)
+        bucket.observe(60, 10, now=0)
+        self.assertEqual(bucket.level, 10)
+
+    def test_block_delays_the_next_reservation(self):
+        bucket = self._bucket(limit=60, remaining=60)
+        bucket.block(5, now=0)
+        self.assertAlmostEqual(bucket.reserve(0, now=0), 5.0)
+        self.assertAlmostEqual(bucket.reserve(0, now=2), 3.0)
+
+
+class RateLimitSchedulerTests(SimpleTestCase):
+
+    def _rate_limit_error(self, headers: dict, code: str = 'rate_limit_exceeded') -> Exception:
+        error = Exception("Rate limit reached")
+        error.code = code
+        error.response = mock.Mock(headers=headers)
+        return error
+
+    def test_parses_reset_durations(self):
+        cases = {'6m0s': 360, '1.5s': 1.5, '20ms': 0.02, '1h2m3s': 3723, '': 0, None: 0, 'soon': 0}
+        for value, seconds in cases.items():
+            with self.subTest(value=value):
+                self.assertAlmostEqual(_duration(value), seconds)
+
+    def test_retry_after_prefers_milliseconds_then_seconds_then_resets(self):
+        resets = {'x-ratelimit-reset-requests': '1s', 'x-ratelimit-reset-tokens': '6m0s'}
+        self.assertEqual(_retry_after({'retry-after-ms': '250', 'retry-after': '3', **resets}), 0.25)
+        self.assertEqual(_retry_after({'retry-after': '3', **resets}), 3)
+        self.assertEqual(_retry_after(resets), 360)
+        self.assertEqual(_retry_after({'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'}), 0)
+
+    def test_observe_reads_the_limit_headers_with_headroom(self):
+        scheduler = RateLimitScheduler(headroom=0.5, max_retries=2)
+        scheduler.observe({
+            'x-ratelimit-limit-requests': '120',
+            'x-ratelimit-remaining-requests': '100',
+            'x-ratelimit-limit-tokens': 'unlimited',
+            'x-ratelimit-remaining-tokens': '5000',
+        })
+        self.assertEqual(scheduler.requests.limit, 60)
+        self.assertEqual(scheduler.requests.level, 40)
+        self.assertIsNone(scheduler.tokens.limit)
+
+    def test_reserve_over_max_wait_reserves_nothing(self):
+        scheduler = RateLimitScheduler(headroom=0.5, max_retries=2)
+        scheduler.observe({'x-ratelimit-limit-requests': '120', 'x-ratelimit-remaining-requests': '60'})
+        self.assertAlmostEqual(scheduler.reserve(100), 1.0, places=2)
+        self.assertIsNone(scheduler.reserve(100, max_wait=0.5))
+        self.assertAlmostEqual(scheduler.requests.level, -1, places=2)
+
+    def test_backoff_waits_for_retry_after_and_blocks_the_key(self):
+        scheduler = RateLimitScheduler(headroom=1, max_retries=2)
+        error = self._rate_limit_error({
+            'retry-after': '2',
+            'x-ratelimit-limit-requests': '60',
+            'x-ratelimit-remaining-requests': '0',
+        })
+        with mock.patch.object(rate_limit_scheduler.random, 'uniform', return_value=0), \
+                self.assertLogs('translation_generator_app.services.rate_limit_scheduler', 'INFO'):
+            self.assertEqual(scheduler.backoff(error, attempt=0), 2)
+        self.assertAlmostEqual(scheduler.reserve(1), 3.0, places=2)
+
+    def test_retries_are_bounded_and_skip_exhausted_quota(self):
+        scheduler = RateLimitScheduler(headroom=1, max_retries=2)
+        self.assertTrue(scheduler.should_retry(self._rate_limit_error({}), attempt=1))
+        self.assertFalse(scheduler.should_retry(self._rate_limit_error({}), attempt=2))
+        self.assertFalse(scheduler.should_retry(self._rate_limit_error({}, code='insufficient_quota'), attempt=0))
+
+    def test_one_scheduler_per_key(self):
+        self.assertIs(RateLimitScheduler.for_key('sk-one'), RateLimitScheduler.for_key('sk-one'))
+        self.assertIsNot(RateLimitScheduler.for_key('sk-one'), RateLimitScheduler.for_key('sk-two'))
+
+
+class CombinedCompletionTests(SimpleTestCase):
+    """The single structured-output call of ``process_transcription`` and its fallback."""
+
+    def setUp(self):
+        self.service = TranslationService(api_key=TEST_API_KEY)
+        model = mock.patch.object(self.service, '_get_model_for_task', return_value='gpt-4o')
+        model.start()
+        self.addCleanup(model.stop)
+
+    @staticmethod
+    def _response(content, finish_reason: str = 'stop', refusal: Optional[str] = None):
+        if not isinstance(content, str):
+            content = json.dumps(content)
+        message = SimpleNamespace(content=content, refusal=refusal)
+        return SimpleNamespace(choices=[SimpleNamespace(finish_reason=finish_reason, message=message)])
+
+    def test_parses_a_valid_response(self):
+        response = self._response({
+            'detected_language': 'en', 'formatted_original': ' Hello\nworld ', 'translation': 'Hola\nmundo\n',
+        })
+        self.assertEqual(self.service._parse_combined_response(response, 'es'),
+                         {'original': 'Hello\nworld', 'translated': 'Hola\nmundo'})
+
+    def test_lyrics_in_the_target_language_are_not_translated(self):
+        response = self._response({'detected_language': 'spa', 'formatted_original': 'Hola mundo', 'translation': None})
+        self.assertEqual(self.service._parse_combined_response(response, 'es'),
+                         {'original': 'Hola mundo', 'translated': 'Hola mundo'})
+
+    def test_rejects_responses_off_the_schema(self):
+        valid = {'detected_language': 'en', 'formatted_original': 'Hello', 'translation': 'Hola'}
+        responses = {
+            'truncated': self._response(valid, finish_reason='length'),
+            'refused': self._response(valid, refusal="I can't help with that"),
+            'not json': self._response('Here are the lyrics: Hello'),
+            'not an object': self._response([valid]),
+            'no original': self._response({**valid, 'formatted_original': '  '}),
+            'no language': self._response({**valid, 'detected_language': None}),
+            'no translation': self._response({**valid, 'translation': None}),
+        }
+        for case, response in responses.items():
+            with self.subTest(case=case):
+                self.assertIsNone(self.service._parse_combined_response(response, 'es'))
+
+    def test_valid_response_is_the_only_call(self):
+        response = self._response({'detected_language': 'en', 'formatted_original': 'Hello', 'translation': 'Hola'})
+        with mock.patch.object(self.service, '_create_completion', return_value=response) as completion, \
+                mock.patch.object(self.service, 'detect_language') as detect:
+            result = self.service.process_transcription('hello', 'es')
+        self.assertEqual(result, {'original': 'Hello', 'translated': 'Hola'})
+        self.assertEqual([call.args[0] for call in completion.call_args_list], ['combined'])
+        detect.assert_not_called()
+
+    def _separate_calls(self):
+        return mock.patch.multiple(
+            self.service,
+            detect_language=mock.Mock(return_value='en'),
+            format_text_as_verses=mock.Mock(return_value='Hello'),
+            translate_text=mock.Mock(return_value='Hola'),
+        )
+
+    def test_invalid_response_falls_back_to_separate_calls(self):
+        with mock.patch.object(self.service, '_create_completion', return_value=self._response('not json')), \
+                self._separate_calls(), \
+                self.assertLogs('translation_generator_app.services.translation_service', 'WARNING') as logs:
+            result = self.service.process_transcription('hello', 'es')
+        self.assertEqual(result, {'original': 'Hello', 'translated': 'Hola'})
+        self.assertIn('using separate calls', logs.output[0])
+
+    def test_model_without_structured_output_falls_back_to_separate_calls(self):
+        rejected = openai.BadRequestError(
+            "response_format json_schema is not supported with this model",
+            response=httpx.Response(400, request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')),
+            body=None,
+        )
+        with mock.patch.object(self.service, '_create_completion', side_effect=rejected), \
+                self._separate_calls(), \
+                self.assertLogs('translation_generator_app.services.translation_service', 'WARNING'):
+            self.assertEqual(self.service.process_transcription('hello', 'es')['translated'], 'Hola')
+
+    @override_settings(LLM_COMBINED_CALL=False)
+    def test_combined_call_can_be_disabled(self):
+        with mock.patch.object(self.service, '_create_completion') as completion, self._separate_calls():
+            self.assertEqual(self.service.process_transcription('hello', 'en')['translated'], 'Hello')
+        completion.assert_not_called()
+
+
+@override_settings(JOB_DEADLINE_SECONDS=1)
+class JobDeadlineViewTests(OfflineServicesMixin, TransactionTestCase):
+
+    transcription_latency = 30
+
+    def test_job_past_its_deadline_answers_504(self):
+        started = time.monotonic()
+        with self.assertLogs('translation_generator_app.views.views_app', 'ERROR'):
+            response = self._post(unique_video_id())
+        self.assertEqual(response.status_code, 504)
+        self.assertIn('deadline', json.loads(response.content)['error'])
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(translationPost.objects.count(), 0)
+
+
+class SingleFlightTests(SimpleTestCase):
+    """In-process coalescing (``result_ttl=0``: nothing is stored in the database)."""
+
+    def setUp(self):
+        self.single_flight = SingleFlight(result_ttl=0)
+        self.key = SingleFlight.make_key(unique_video_id(), 'translation', 'es', 'balanced')
+
+    def _lead(self, fn):
+        """Start a leader running ``fn`` in a thread; return its thread and a dict with its outcome."""
+        outcome = {}
+
+        def run():
+            try:
+                outcome['result'] = self.single_flight.run(self.key, fn)
+            except Exception as e:
+                outcome['error'] = e
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread, outcome
+
+    def test_make_key(self):
+        self.assertEqual(SingleFlight.make_key('abc', 'translation', 'es', 'fast'), 'abc:translation:es:fast')
+
+    def test_concurrent_callers_share_one_run(self):
+        release, calls = threading.Event(), []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return ['shared']
+
+        threads = [self._lead(work) for _ in range(4)]
+        time.sleep(0.2)
+        release.set()
+        for thread, _ in threads:
+            thread.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([outcome['result'] for _, outcome in threads], [['shared']] * 4)
+
+    def test_leader_error_is_not_passed_to_followers(self):
+        started, release = threading.Event(), threading.Event()
+
+        def rejected_key():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("Incorrect API key provided")
+
+        with self.assertLogs('translation_generator_app.services.single_flight', level='INFO') as logs:
+            leader, outcome = self._lead(rejected_key)
+            started.wait(5)
+            follower_outcome = {}
+
+            def follow():
+                follower_outcome['result'] = self.single_flight.run(self.key, lambda: 'own key')
+
+            follower = threading.Thread(target=follow)
+            follower.start()
+            time.sleep(0.2)
+            release.set()
+            leader.join(5)
+            follower.join(5)
+
+        self.assertIsInstance(outcome['error'], RuntimeError)
+        self.assertEqual(follower_outcome['result'], 'own key')
+        self.assertTrue(any('retrying it for its waiters' in line for line in logs.output))
+
+    def test_one_follower_retries_a_failed_leader(self):
+        started, release, calls = threading.Event(), threading.Event(), []
+
+        def rejected_key():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("Incorrect API key provided")
+
+        def own_key():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'own key'
+
+        with self.assertLogs('translation_generator_app.services.single_flight', level='INFO'):
+            leader, outcome = self._lead(rejected_key)
+            started.wait(5)
+            followers = []
+            for _ in range(5):
+                follower_outcome = {}
+                thread = threading.Thread(
+                    target=lambda result=follower_outcome: result.update(result=self.single_flight.run(self.key, own_key))
+                )
+                thread.start()
+                followers.append((thread, follower_outcome))
+            time.sleep(0.2)
+            release.set()
+            for thread, _ in [(leader, outcome)] + followers:
+                thread.join(5)
+
+        self.assertIsInstance(outcome['error'], RuntimeError)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([result['result'] for _, result in followers], ['own key'] * 5)
+
+    def test_async_followers_retry_a_failed_leader_once(self):
+        calls = []
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def rejected_key():
+                await release.wait()
+                raise RuntimeError("Rate limit reached")
+
+            async def own_key():
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return 'own key'
+
+            leader = asyncio.ensure_future(self.single_flight.arun(self.key, rejected_key))
+            await asyncio.sleep(0)
+            followers = [asyncio.ensure_future(self.single_flight.arun(self.key, own_key)) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(leader, *followers, return_exceptions=True)
+
+        leader_result, *follower_results = asyncio.run(scenario())
+        self.assertIsInstance(leader_result, RuntimeError)
+        self.assertEqual(follower_results, ['own key'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_async_leader_error_is_not_passed_to_followers(self):
+        async def scenario():
+            release = asyncio.Event()
+
+            async def rejected_key():
+                await release.wait()
+                raise RuntimeError("Rate limit reached")
+
+            async def own_key():
+                return 'own key'
+
+            leader = asyncio.ensure_future(self.single_flight.arun(self.key, rejected_key))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(self.single_flight.arun(self.key, own_key))
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(leader, follower, return_exceptions=True)
+
+        leader_result, follower_result = asyncio.run(scenario())
+        self.assertIsInstance(leader_result, RuntimeError)
+        self.assertEqual(follower_result, 'own key')
+
+    def test_async_callers_share_one_run(self):
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'shared'
+
+        async def scenario():
+            return await asyncio.gather(*(self.single_flight.arun(self.key, work) for _ in range(3)))
+
+        self.assertEqual(asyncio.run(scenario()), ['shared'] * 3)
+        self.assertEqual(len(calls), 1)
+
+
+class MetadataCacheTests(TestCase):
+    """``MetadataCache`` expiry and size bound, with its clock under the test's control."""
+
+    INFO = {'title': 'Fake Song', 'duration': 212.4, 'formats': [{'format_id': '140', 'url': 'https://expiring'}]}
+
+    def setUp(self):
+        self.now = timezone.now()
+        clock = mock.patch('translation_generator_app.services.metadata_cache.timezone')
+        clock.start().now.side_effect = lambda: self.now
+        self.addCleanup(clock.stop)
+        self.cache = MetadataCache(ttl=3600, negative_ttl=60, max_entries=3)
+
+    def _advance(self, seconds: float):
+        self.now += timedelta(seconds=seconds)
+
+    def test_entries_expire_after_the_ttl(self):
+        self.cache.store('abc123', self.INFO)
+        self._advance(3599)
+        entry = self.cache.get('abc123')
+        self.assertEqual((entry.title, entry.duration), ('Fake Song', 212))
+        self.assertNotIn('url', entry.formats[0])
+        self._advance(2)
+        self.assertIsNone(self.cache.get('abc123'))
+
+    def test_unavailable_videos_expire_after_the_negative_ttl(self):
+        self.cache.store('abc123', self.INFO)
+        self.cache.store_unavailable('private1', 'Private video')
+        self._advance(59)
+        self.assertFalse(self.cache.get('private1').available)
+        self._advance(2)
+        self.assertIsNone(self.cache.get('private1'))
+        self.assertIsNotNone(self.cache.get('abc123'))
+
+    def test_least_recently_fetched_entries_are_pruned(self):
+        with self.assertLogs('translation_generator_app.services.metadata_cache', 'INFO'):
+            for video_id in ('one', 'two', 'three', 'four', 'five'):
+                self.cache.store(video_id, self.INFO)
+                self._advance(1)
+        self.assertEqual(set(VideoMetadata.objects.values_list('video_id', flat=True)), {'three', 'four', 'five'})
+
+        # Refreshing an entry keeps it over older ones
+        self.cache.store('three', self.INFO)
+        self._advance(1)
+        with self.assertLogs('translation_generator_app.services.metadata_cache', 'INFO'):
+            self.cache.store('six', self.INFO)
+        self.assertEqual(set(VideoMetadata.objects.values_list('video_id', flat=True)), {'three', 'five', 'six'})
+
+    def test_zero_ttl_disables_the_cache(self):
+        cache = MetadataCache(ttl=0)
+        self.assertEqual(cache.store('abc123', self.INFO).title, 'Fake Song')
+        self.assertIsNone(cache.get('abc123'))
+        self.assertFalse(VideoMetadata.objects.exists())
+
+
+class TranscriptionPollerTests(SimpleTestCase):
+    """The shared poller against the fake AssemblyAI server."""
+
+    def _fake_assemblyai(self, latency: float):
+        """Route AssemblyAI to a fake server that finishes transcripts after ``latency`` seconds."""
+        services = offline_services(transcription=LatencyProfile(latency=latency), polling_interval=0.02)
+        services.__enter__()
+        self.addCleanup(services.__exit__, None, None, None)
+        TranscriptionService(api_key='test-aai-key')
+
+    @staticmethod
+    def _submit() -> str:
+        return aai.Transcriber().submit('https://example.invalid/song.mp3').id
+
+    def test_resolves_finished_transcripts(self):
+        self._fake_assemblyai(0.1)
+        poller = TranscriptionPoller(min_interval=0.02, max_interval=0.1, batch_threshold=3)
+        futures = [poller.track(self._submit()) for _ in range(4)]
+        for future in futures:
+            self.assertTrue(future.result(timeout=5).text)
+        self.assertEqual(poller.pending_count, 0)
+
+    def test_notify_checks_at_once(self):
+        self._fake_assemblyai(0.0)
+        poller = TranscriptionPoller(min_interval=30, max_interval=30)
+        transcript_id = self._submit()
+        future = poller.track(transcript_id)
+        time.sleep(0.1)
+        self.assertFalse(future.done())
+        poller.notify(transcript_id)
+        self.assertEqual(future.result(timeout=5).id, transcript_id)
+
+    def test_gives_up_after_max_wait(self):
+        self._fake_assemblyai(60)
+        poller = TranscriptionPoller(min_interval=0.02, max_interval=0.05, max_wait=0.2)
+        future = poller.track(self._submit())
+        with self.assertRaisesMessage(TranscriptionException, 'did not finish'):
+            future.result(timeout=5)
+        self.assertEqual(poller.pending_count, 0)
+
+    def test_untrack_cancels(self):
+        self._fake_assemblyai(60)
+        poller = TranscriptionPoller(min_interval=0.02, max_interval=0.05)
+        transcript_id = self._submit()
+        future = poller.track(transcript_id)
+        poller.untrack(transcript_id)
+        self.assertTrue(future.cancelled())
+        self.assertEqual(poller.pending_count, 0)
+        # Unknown IDs are ignored
+        poller.untrack(transcript_id)
+
+    def test_waiter_past_its_deadline_untracks(self):
+        self._fake_assemblyai(60)
+        with job_deadline(0.3), self.assertRaises(DeadlineExceededException):
+            TranscriptionService(api_key='test-aai-key').transcribe_audio('https://example.invalid/song.mp3', 'Song')
+        self.assertEqual(TranscriptionPoller.shared().pending_count, 0)
+
+
+class AudioSegmenterTests(SimpleTestCase):
+    """Cut placement and frame energy on synthetic signals; ffmpeg's pipe is stubbed."""
+
+    def setUp(self):
+        self.segmenter = AudioSegmenter(threshold=0, max_seconds=10)
+
+    def _energy(self, seconds: float, quiet_at=()) -> np.ndarray:
+        energy = np.full(int(seconds / AudioSegmenter.FRAME_SECONDS), 60, dtype=np.float32)
+        for second in quiet_at:
+            frame = int(second / AudioSegmenter.FRAME_SECONDS)
+            energy[frame - 5:frame + 5] = 0
+        return energy
+
+    def test_short_recording_is_not_cut(self):
+        self.assertEqual(self.segmenter.split_points(self._energy(10)), [])
+
+    def test_cuts_at_the_quietest_point_in_range(self):
+        # 8 s is in range (6-10 s after the start); 3 s is too early for a cut
+        cuts = self.segmenter.split_points(self._energy(25, quiet_at=(3, 8, 15.5)))
+        self.assertEqual(cuts[:2], [8.0, 15.5])
+
+    def test_segments_never_exceed_the_maximum(self):
+        cuts = self.segmenter.split_points(self._energy(95, quiet_at=(12, 40, 41, 77)))
+        bounds = [0, *cuts, 95]
+        self.assertEqual(cuts, sorted(cuts))
+        self.assertLessEqual(max(end - start for start, end in zip(bounds, bounds[1:])), 10)
+
+    def _pcm(self, amplitudes) -> bytes:
+        frame_size = int(AudioSegmenter.SAMPLE_RATE * AudioSegmenter.FRAME_SECONDS)
+        return np.repeat(np.asarray(amplitudes, dtype='<i2'), frame_size).tobytes()
+
+    def _decoder(self, stdout: bytes, returncode: int = 0, stderr: bytes = b''):
+        process = mock.Mock(stdout=io.BytesIO(stdout), stderr=io.BytesIO(stderr))
+        process.wait.return_value = returncode
+        return mock.patch('translation_generator_app.services.audio_segmenter.subprocess.Popen',
+                          return_value=process)
+
+    def test_frame_energy_across_pipe_reads(self):
+        self.segmenter.BLOCK_FRAMES = 2
+        # Five frames (three reads) plus half a frame that is dropped
+        pcm = self._pcm([0, 1000, 0, 1000, 0]) + self._pcm([1000])[:200]
+        with self._decoder(pcm):
+            energy = self.segmenter.frame_energy('mix.m4a')
+        self.assertEqual(energy.dtype, np.float32)
+        np.testing.assert_allclose(energy, [0, 60, 0, 60, 0], atol=1e-3)
+
+    def test_frame_energy_reports_decoder_errors(self):
+        with self._decoder(b'', returncode=1, stderr=b'Invalid data found'), \
+                self.assertRaisesMessage(RuntimeError, 'Invalid data found'):
+            self.segmenter.frame_energy('mix.m4a')
+
+    def test_small_files_are_not_probed(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        small, large = directory / 'small.m4a', directory / 'large.m4a'
+        small.write_bytes(b'x' * 1000)
+        large.write_bytes(b'x' * 5000)
+        segmenter = AudioSegmenter(threshold=1, max_seconds=10)
+        with mock.patch.object(AudioSegmenter, 'is_enabled', return_value=True):
+            self.assertFalse(segmenter.may_apply_to(str(small)))
+            self.assertTrue(segmenter.may_apply_to(str(large)))
+
+
+class SegmentedTranscriptionTests(TemporaryMediaMixin, SimpleTestCase):
+    """A split recording takes one transcription slot for all its segments."""
+
+    def _segments(self, audio_file, directory):
+        segments = []
+        for index in range(3):
+            path = Path(directory) / f"segment{index:03d}.m4a"
+            path.write_bytes(b'audio')
+            segments.append(AudioSegment(str(path), index * 300.0, (index + 1) * 300.0))
+        return segments
+
+    def _transcribe(self, transcribe_segmented) -> Tuple[str, list]:
+        audio_file = self.media_root / 'Mix_abc123_audio.m4a'
+        audio_file.write_bytes(b'audio')
+        limiters = mock.Mock(wraps=limiter)
+        with mock.patch.object(AudioSegmenter, 'split', side_effect=self._segments):
+            with mock.patch('translation_generator_app.services.transcription_service.limiter', limiters), \
+                    mock.patch('translation_generator_app.services.async_transcription_service.limiter', limiters), \
+                    self.assertLogs('translation_generator_app.services', 'INFO'):
+                text = transcribe_segmented(str(audio_file))
+        return text, [name for (name,), _ in limiters.call_args_list]
+
+    def test_sync_segments_share_one_slot(self):
+        service = TranscriptionService(api_key=TEST_API_KEY)
+        with mock.patch.object(service, '_run_transcript', side_effect=lambda path: f" {Path(path).stem} "):
+            text, slots = self._transcribe(service._transcribe_segmented)
+        self.assertEqual(text, 'segment000\nsegment001\nsegment002')
+        self.assertEqual(slots, ['transcription'])
+
+    def test_async_segments_share_one_slot(self):
+        service = AsyncTranscriptionService(api_key=TEST_API_KEY)
+
+        async def run_transcript(path):
+            return Path(path).stem
+
+        with mock.patch.object(service, '_run_transcript', side_effect=run_transcript):
+            text, slots = self._transcribe(lambda path: asyncio.run(service._transcribe_segmented(path)))
+        self.assertEqual(text, 'segment000\nsegment001\nsegment002')
+        self.assertEqual(slots, ['transcription'])
+
+
+class CpuPoolTests(SimpleTestCase):
+
+    def test_runs_on_another_thread_in_the_callers_context(self):
+        with job_deadline(30) as deadline:
+            thread, seen = run_cpu_bound(lambda: (threading.get_ident(), current_deadline()))
+        self.assertNotEqual(thread, threading.get_ident())
+        self.assertIs(seen, deadline)
+
+    def test_propagates_exceptions(self):
+        with self.assertRaisesMessage(ValueError, 'bad samples'):
+            run_cpu_bound(int, 'bad samples')
+
+
+class FingerprintServiceTests(TemporaryMediaMixin, TestCase):
+    """Recognition and indexing of the fake melodies."""
+
+    def _song(self, seed: str) -> str:
+        return write_melody_wav(str(self.media_root / f"{seed}.wav"), 400_000, seed)
+
+    def _remember(self, service: FingerprintService, recognition, video_id: str, language: str = 'es'):
+        service.remember(recognition, video_id, 'Song', 'la la la', language, 'balanced',
+                         {'original': 'la la la', 'translated': f"la la la ({language})"})
+
+    def test_recognizes_a_remembered_song(self):
+        video_id = unique_video_id('song')
+        self._remember(FingerprintService(), FingerprintService().recognize(self._song(video_id)), video_id)
+
+        recording = AudioRecording.objects.get(video_id=video_id)
+        self.assertEqual(recording.hash_count, FingerprintHash.objects.filter(recording=recording).count())
+        recognition = FingerprintService().recognize(self._song(video_id))
+        self.assertEqual(recognition.recording, recording)
+        self.assertEqual(recognition.transcript, 'la la la')
+        self.assertEqual(recognition.translation('es', 'balanced')['translated'], 'la la la (es)')
+        self.assertIsNone(FingerprintService().recognize(self._song(unique_video_id('other'))).recording)
+
+    def test_concurrent_index_of_the_same_video_adds_the_translation(self):
+        video_id = unique_video_id('song')
+        first, second = (FingerprintService().recognize(self._song(video_id)) for _ in range(2))
+        self._remember(FingerprintService(), first, video_id, 'es')
+        self._remember(FingerprintService(), second, video_id, 'fr')
+
+        recording = AudioRecording.objects.get(video_id=video_id)
+        self.assertEqual(sorted(recording.translations), ['es:balanced', 'fr:balanced'])
+        self.assertEqual(FingerprintHash.objects.filter(recording=recording).count(), recording.hash_count)
+
+    @override_settings(ADMISSION_LIMITS={'ffmpeg': 1}, ADMISSION_QUEUE_TIMEOUT=0.05)
+    def test_skips_fingerprinting_when_no_ffmpeg_slot_frees_up(self):
+        reset_limiters()
+        self.addCleanup(reset_limiters)
+        with limiter('ffmpeg').slot(), self.assertLogs('translation_generator_app.services.fingerprint_service',
+                                                       'WARNING'):
+            recognition = FingerprintService().recognize(self._song(unique_video_id('song')))
+        self.assertIsNone(recognition.hashes)
+
+
+class MediaStorageTests(TemporaryMediaMixin, SimpleTestCase):
+
+    def test_backends_must_implement_the_interface(self):
+        class PartialStorage(MediaStorage):
+            def save(self, name, local_path):
+                pass
+
+        for storage_class in (MediaStorage, PartialStorage):
+            with self.subTest(storage=storage_class.__name__), self.assertRaises(TypeError):
+                storage_class()
+
+    def test_local_storage_round_trip(self):
+        storage = LocalMediaStorage()
+        source = Path(tempfile.mkdtemp(dir=self.media_root)) / 'upload.m4a'
+        source.write_bytes(b'audio')
+        (self.media_root / '.hidden').touch()
+
+        storage.save('Song_abc_audio.m4a', str(source))
+        self.assertTrue(storage.exists('Song_abc_audio.m4a'))
+        self.assertIsNone(storage.url('Song_abc_audio.m4a'))
+        self.assertEqual([name for name, _ in storage.list()], ['Song_abc_audio.m4a'])
+
+        copy = source.with_name('copy.m4a')
+        self.assertTrue(storage.fetch('Song_abc_audio.m4a', str(copy)))
+        self.assertEqual(copy.read_bytes(), b'audio')
+        self.assertFalse(storage.fetch('Missing_audio.m4a', str(copy)))
+
+        storage.delete('Song_abc_audio.m4a')
+        storage.delete('Song_abc_audio.m4a')
+        self.assertFalse(storage.exists('Song_abc_audio.m4a'))
+
+    @override_settings(MEDIA_STORAGE='ftp')
+    def test_unknown_backend_is_rejected(self):
+        reset_storage()
+        self.addCleanup(reset_storage)
+        with self.assertRaisesMessage(StorageException, "Unknown MEDIA_STORAGE 'ftp'"):
+            get_storage()
+
+
+
+@override_settings(
+    S3_BUCKET='media-bucket', S3_PREFIX='media/', S3_REGION='us-east-1',
+    S3_ACCESS_KEY_ID='test-key', S3_SECRET_ACCESS_KEY='test-secret',
+    S3_ENDPOINT_URL='http://minio:9000', S3_PUBLIC_ENDPOINT_URL='',
+    S3_MULTIPART_CHUNK_MB=5, S3_UPLOAD_CONCURRENCY=1, S3_URL_EXPIRES=600,
+)
+class S3MediaStorageTests(TemporaryMediaMixin, SimpleTestCase):
+    """``S3MediaStorage`` against a boto3 client whose responses are stubbed."""
+
+    def setUp(self):
+        super().setUp()
+        self.storage = S3MediaStorage()
+        self.stubber = Stubber(self.storage.client)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+
+    def test_missing_bucket_is_rejected(self):
+        with override_settings(S3_BUCKET=''), self.assertRaisesMessage(StorageException, 'S3_BUCKET'):
+            S3MediaStorage()
+
+    def test_large_file_is_uploaded_in_parts(self):
+        source = self.media_root / 'Song_abc_video.mp4'
+        with open(source, 'wb') as f:
+            f.truncate(11 * 1024 ** 2)
+
+        calls = []
+        self.storage.client.meta.events.register(
+            'provide-client-params.s3.*', lambda params, model, **kwargs: calls.append((model.name, params))
+        )
+        self.stubber.add_response('create_multipart_upload', {'UploadId': 'upload-1'})
+        # 5 + 5 + 1 MB; the stubber fails on any other call
+        for part in range(3):
+            self.stubber.add_response('upload_part', {'ETag': f'"etag-{part}"'})
+        self.stubber.add_response('complete_multipart_upload', {})
+
+        self.storage.save('Song_abc_video.mp4', str(source))
+        self.stubber.assert_no_pending_responses()
+        create = next(params for name, params in calls if name == 'CreateMultipartUpload')
+        self.assertEqual((create['Bucket'], create['Key'], create['ContentType']),
+                         ('media-bucket', 'media/Song_abc_video.mp4', 'video/mp4'))
+        self.assertEqual(sorted(params['PartNumber'] for name, params in calls if name == 'UploadPart'), [1, 2, 3])
+
+    def test_fetch_downloads_the_object(self):
+        self.stubber.add_response('head_object', {'ContentLength': 5, 'ETag': '"etag"'},
+                                  {'Bucket': 'media-bucket', 'Key': 'media/Song_abc_audio.m4a'})
+        self.stubber.add_response('get_object', {
+            'Body': StreamingBody(io.BytesIO(b'audio'), 5), 'ContentLength': 5, 'ETag': '"etag"',
+        })
+        target = self.media_root / 'Song_abc_audio.m4a'
+
+        self.assertTrue(self.storage.fetch('Song_abc_audio.m4a', str(target)))
+        self.assertEqual(target.read_bytes(), b'audio')
+        self.assertEqual(os.listdir(self.media_root), ['Song_abc_audio.m4a'])
+
+    def test_fetch_of_a_missing_object_leaves_nothing(self):
+        self.stubber.add_client_error('head_object', service_error_code='404', http_status_code=404)
+        target = self.media_root / 'Missing_audio.m4a'
+
+        self.assertFalse(self.storage.fetch('Missing_audio.m4a', str(target)))
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def test_exists(self):
+        key = {'Bucket': 'media-bucket', 'Key': 'media/Song_abc_audio.m4a'}
+        self.stubber.add_response('head_object', {'ContentLength': 5}, key)
+        self.stubber.add_client_error('head_object', service_error_code='404', http_status_code=404,
+                                      expected_params=key)
+        self.stubber.add_client_error('head_object', service_error_code='AccessDenied', http_status_code=403)
+
+        self.assertTrue(self.storage.exists('Song_abc_audio.m4a'))
+        self.assertFalse(self.storage.exists('Song_abc_audio.m4a'))
+        with self.assertRaises(StorageException):
+            self.storage.exists('Song_abc_audio.m4a')
+
+    def test_url_is_presigned_for_the_download(self):
+        url = self.storage.url('Song abc_audio.m4a')
+        self.assertTrue(url.startswith('http://minio:9000/media-bucket/media/Song%20abc_audio.m4a?'), url)
+        self.assertIn('X-Amz-Expires=600', url)
+        self.assertIn('X-Amz-Signature=', url)
+        self.assertIn('response-content-disposition=attachment', url)
+
+    @override_settings(S3_PUBLIC_ENDPOINT_URL='http://localhost:9000')
+    def test_url_is_signed_for_the_public_endpoint(self):
+        url = self.storage.url('Song_abc_audio.m4a')
+        self.assertTrue(url.startswith('http://localhost:9000/media-bucket/media/Song_abc_audio.m4a?'), url)
+        self.assertIsNot(self.storage.signer, self.storage.client)
+
+
+class MediaDownloadViewTests(TemporaryMediaMixin, SimpleTestCase):
+    """``GET /media-download/``, the target of the Streamlit download links."""
+
+    def _get(self, name: str):
+        return self.client.get(reverse('media-download'), {'file': name})
+
+    def test_streams_the_file_as_an_attachment(self):
+        (self.media_root / 'Song_abc123_video.mp4').write_bytes(b'video' * 1000)
+        response = self._get('Song_abc123_video.mp4')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="Song_abc123_video.mp4"', response['Content-Disposition'])
+        self.assertEqual(b''.join(response.streaming_content), b'video' * 1000)
+        response.close()
+
+    def test_only_published_artifacts_are_served(self):
+        (self.media_root / 'Song_abc123_audio.m4a').write_bytes(b'audio')
+        (self.media_root / '.jobs').mkdir()
+        (self.media_root / '.jobs' / 'Song_abc123_audio.m4a').write_bytes(b'scratch')
+        (self.media_root / 'notes.md').write_bytes(b'notes')
+        for name in ('', 'Missing_audio.m4a', 'notes.md', '.jobs/Song_abc123_audio.m4a',
+                     '../Song_abc123_audio.m4a', '.hidden_audio.m4a'):
+            with self.subTest(name=name):
+                response = self._get(name)
+                if name.startswith('..') or name.startswith('.jobs'):
+                    # Reduced to the flat name, which is the published file
+                    self.assertEqual(b''.join(response.streaming_content), b'audio')
+                    response.close()
+                else:
+                    self.assertEqual(response.status_code, 404)
+
+    def test_remote_storage_redirects_to_its_url(self):
+        storage = MemoryMediaStorage()
+        storage.objects['Song_abc123_video.mp4'] = (b'video', time.time())
+        with mock.patch('translation_generator_app.views.media_views.get_storage', return_value=storage):
+            response = self._get('Song_abc123_video.mp4')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://storage.invalid/Song_abc123_video.mp4')
+
+    def test_result_links_point_at_the_download_views(self):
+        result = {
+            'id': 42, 'translation': 'Hola', 'title': 'Song', 'original_transcription': 'Hello',
+            'video_file': '/media/Song_abc123_video.mp4', 'audio_file': '/media/Song_abc123_audio.m4a',
+        }
+        payload = TranslationGeneratorView._result_payload(result)
+        self.assertEqual(payload['video_url'], '/media-download/?file=Song_abc123_video.mp4')
+        self.assertEqual(payload['audio_url'], '/media-download/?file=Song_abc123_audio.m4a')
+        self.assertEqual(payload['audio_mp3_url'], '/audio-mp3/?file=Song_abc123_audio.m4a')
+        # Audio-only jobs have no video link
+        self.assertIsNone(TranslationGeneratorView._result_payload({**result, 'video_file': None})['video_url'])
+
+
+class AudioMp3ViewTests(TemporaryMediaMixin, SimpleTestCase):
+    """``GET /audio-mp3/`` converts on the first request; ``_transcode`` stands in for ffmpeg."""
+
+    AUDIO = 'Song_abc123_audio.m4a'
+
+    @staticmethod
+    def _encode(source, target):
+        Path(target).write_bytes(b'mp3 of ' + Path(source).read_bytes())
+        return target
+
+    def _get(self):
+        return self.client.get(reverse('audio-mp3'), {'file': self.AUDIO})
+
+    def test_converts_on_the_first_request_and_reuses_the_copy(self):
+        (self.media_root / self.AUDIO).write_bytes(b'audio')
+        with mock.patch.object(AudioTranscoder, '_transcode', side_effect=self._encode) as transcode:
+            for _ in range(2):
+                response = self._get()
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], 'audio/mpeg')
+                self.assertEqual(b''.join(response.streaming_content), b'mp3 of audio')
+                response.close()
+        self.assertEqual(transcode.call_count, 1)
+
+    def test_fetches_audio_converted_on_another_node(self):
+        storage = MemoryMediaStorage()
+        storage.objects[self.AUDIO] = (b'audio', time.time())
+        with mock.patch('translation_generator_app.views.media_views.get_storage', return_value=storage), \
+                mock.patch.object(AudioTranscoder, '_transcode', side_effect=self._encode):
+            response = self._get()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://storage.invalid/Song_abc123_audio.mp3')
+        self.assertEqual((self.media_root / self.AUDIO).read_bytes(), b'audio')
+
+    def test_audio_gone_from_the_storage_is_404(self):
+        storage = MemoryMediaStorage()
+        storage.objects[self.AUDIO] = (b'audio', time.time())
+        with mock.patch('translation_generator_app.views.media_views.get_storage', return_value=storage), \
+                mock.patch.object(storage, 'fetch', return_value=False), \
+                mock.patch.object(AudioTranscoder, '_transcode') as transcode:
+            response = self._get()
+        self.assertEqual(response.status_code, 404)
+        transcode.assert_not_called()
+
+
+class AudioTranscoderTests(TemporaryMediaMixin, SimpleTestCase):
+
+    def test_concurrent_requests_share_one_encode(self):
+        audio_file = self.media_root / 'Song_abc123_audio.webm'
+        audio_file.write_bytes(b'audio')
+        started, release = threading.Event(), threading.Event()
+
+        def encode(source, target):
+            started.set()
+            release.wait(5)
+            return AudioMp3ViewTests._encode(source, target)
+
+        with mock.patch.object(AudioTranscoder, '_transcode', side_effect=encode) as transcode:
+            results = []
+
+            def convert():
+                results.append(AudioTranscoder.to_mp3(str(audio_file), timeout=10))
+
+            threads = [threading.Thread(target=convert) for _ in range(4)]
+            threads[0].start()
+            self.assertTrue(started.wait(5))
+            for thread in threads[1:]:
+                thread.start()
+            self.assertIs(AudioTranscoder.submit(str(audio_file)), AudioTranscoder.submit(str(audio_file)))
+            release.set()
+            for thread in threads:
+                thread.join(10)
+
+        self.assertEqual(transcode.call_count, 1)
+        self.assertEqual(results, [str(audio_file.with_suffix('.mp3'))] * 4)
+
+
+class WorkspacePublishTests(TemporaryMediaMixin, SimpleTestCase):
+
+    def _finished_artifact(self, workspace: JobWorkspace) -> Path:
+        scratch = workspace.scratch_path('Song', '_audio.m4a')
+        scratch.write_bytes(b'audio')
+        return scratch
+
+    def test_publishes_into_media_root_and_removes_the_scratch_directory(self):
+        with job_workspace('abc123') as workspace:
+            scratch = self._finished_artifact(workspace)
+            published = workspace.publish('Song', '_audio.m4a')
+        self.assertEqual(Path(published), self.media_root / 'Song_abc123_audio.m4a')
+        self.assertEqual(Path(published).read_bytes(), b'audio')
+        self.assertFalse(scratch.parent.exists())
+
+    def test_remote_storage_gets_the_file_before_it_is_published(self):
+        storage = MemoryMediaStorage()
+        with mock.patch('translation_generator_app.workspace.get_storage', return_value=storage), \
+                job_workspace('abc123') as workspace:
+            self._finished_artifact(workspace)
+            published = asyncio.run(workspace.apublish('Song', '_audio.m4a'))
+        self.assertEqual(storage.objects['Song_abc123_audio.m4a'][0], b'audio')
+        self.assertTrue(Path(published).is_file())
+
+    def test_failed_upload_publishes_nothing(self):
+        storage = MemoryMediaStorage()
+        with mock.patch.object(storage, 'save', side_effect=StorageException('bucket unreachable')), \
+                mock.patch('translation_generator_app.workspace.get_storage', return_value=storage), \
+                job_workspace('abc123') as workspace:
+            self._finished_artifact(workspace)
+            with self.assertRaises(StorageException):
+                workspace.publish('Song', '_audio.m4a')
+        self.assertFalse((self.media_root / 'Song_abc123_audio.m4a').exists())
+
+
+class BackfillTests(TestCase):
+    """Catalog parsing, the checkpoint manifest and resuming a run; ``_process`` stands in for the pipeline."""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp(prefix='test-backfill-'))
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.manifest_path = self.directory / 'catalog.manifest.jsonl'
+        self.items = [BackfillItem(line, f"https://www.youtube.com/watch?v=video{line}") for line in range(1, 6)]
+        self.processed = []
+
+    def _process(self, runner, item):
+        if item.line == self.crash_at:
+            raise KeyboardInterrupt
+        self.processed.append(item.line)
+        result = {'title': f"Song {item.line}", 'translation': 'Hola', 'original_transcription': 'Hello',
+                  'stage_timeline': {}}
+        return result, {'end_to_end': 0.1}
+
+    def _run(self, crash_at: Optional[int] = None, **options) -> dict:
+        self.crash_at = crash_at
+        with CheckpointManifest(str(self.manifest_path)) as manifest, \
+                mock.patch.object(BackfillRunner, '_process', autospec=True, side_effect=self._process), \
+                self.assertLogs('translation_generator_app.backfill', 'INFO'):
+            runner = BackfillRunner(TEST_API_KEY, manifest, workers=1, batch_size=2, **options)
+            return runner.run(self.items)
+
+    def test_reads_csv_and_jsonl_catalogs(self):
+        csv_catalog = self.directory / 'catalog.csv'
+        csv_catalog.write_text("link,target_language\nhttps://youtu.be/abc,fr\nhttps://youtu.be/def,\n")
+        jsonl_catalog = self.directory / 'catalog.jsonl'
+        jsonl_catalog.write_text('{"link": "https://youtu.be/abc", "quality": "fast"}\n\n')
+
+        self.assertEqual(read_catalog(str(csv_catalog), target_language='de'), [
+            BackfillItem(2, 'https://youtu.be/abc', 'fr'), BackfillItem(3, 'https://youtu.be/def', 'de'),
+        ])
+        self.assertEqual(read_catalog(str(jsonl_catalog)), [BackfillItem(1, 'https://youtu.be/abc', 'es', 'fast')])
+
+        jsonl_catalog.write_text('["https://youtu.be/abc"]\n')
+        with self.assertRaisesMessage(InvalidDataException, 'Line 1'):
+            read_catalog(str(jsonl_catalog))
+
+    def test_manifest_ignores_a_torn_last_line(self):
+        self.manifest_path.write_text('{"key": "a", "status": "done"}\n{"key": "b", "sta')
+        with CheckpointManifest(str(self.manifest_path)) as manifest:
+            self.assertEqual((manifest.status('a'), manifest.status('b')), ('done', None))
+            manifest.record([{'key': 'b', 'status': 'failed', 'error': 'Private video'}])
+        with CheckpointManifest(str(self.manifest_path)) as manifest:
+            self.assertEqual((manifest.status('a'), manifest.status('b')), ('done', 'failed'))
+
+    def test_rerun_resumes_after_a_crash(self):
+        with self.assertRaises(KeyboardInterrupt):
+            self._run(crash_at=4)
+        # The batch in progress was written before the crash propagated (item
+        # 5 too if it finished before the crash was collected)
+        with CheckpointManifest(str(self.manifest_path)) as manifest:
+            saved = {item.line for item in self.items if manifest.status(item.key) == 'done'}
+        self.assertIn(saved, ({1, 2, 3}, {1, 2, 3, 5}))
+        self.assertEqual(translationPost.objects.count(), len(saved))
+
+        self.processed = []
+        summary = self._run()
+        self.assertEqual(set(self.processed), {1, 2, 3, 4, 5} - saved)
+        self.assertEqual((summary['done'], summary['skipped'], summary['failed']), (5 - len(saved), len(saved), 0))
+        self.assertEqual(translationPost.objects.count(), 5)
+        with CheckpointManifest(str(self.manifest_path)) as manifest:
+            self.assertEqual({manifest.status(item.key) for item in self.items}, {'done'})
+
+    def test_failed_items_are_retried_only_when_asked(self):
+        self.items.append(self.items[0])
+        failing = self.items[1]
+
+        def process(runner, item):
+            if item is failing:
+                raise TranscriptionException("upload refused")
+            return self._process(runner, item)
+
+        self.crash_at = None
+        with CheckpointManifest(str(self.manifest_path)) as manifest, \
+                mock.patch.object(BackfillRunner, '_process', autospec=True, side_effect=process), \
+                self.assertLogs('translation_generator_app.backfill', 'INFO'):
+            summary = BackfillRunner(TEST_API_KEY, manifest, workers=1, batch_size=2).run(self.items)
+        # The repeated item is processed once
+        self.assertEqual((summary['done'], summary['failed'], summary['skipped']), (4, 1, 1))
+
+        self.processed = []
+        with CheckpointManifest(str(self.manifest_path)) as manifest:
+            self.assertEqual(BackfillRunner(TEST_API_KEY, manifest).pending(self.items), [])
+        self._run(retry_failed=True)
+        self.assertEqual(self.processed, [2])
+
+
+class CacheWarmerTests(TestCase):
+    """Popularity ranking and budget planning of ``CacheWarmer`` (dry runs: no pipeline)."""
+
+    def _request(self, link: str, target_language: str = 'es', hours_ago: float = 1):
+        post = translationPost.objects.create(youtube_title='Song', youtube_link=link, generated_content='Hola',
+                                              target_language=target_language)
+        translationPost.objects.filter(pk=post.pk).update(created_at=timezone.now() - timedelta(hours=hours_ago))
+
+    def _metadata(self, video_id: str, duration: int):
+        VideoMetadata.objects.create(video_id=video_id, title='Song', duration=duration, fetched_at=timezone.now())
+
+    def test_ranks_pairs_by_requests_in_the_window(self):
+        for link in ('https://www.youtube.com/watch?v=hotvideo001', 'https://youtu.be/hotvideo001',
+                     'https://www.youtube.com/embed/hotvideo001'):
+            self._request(link)
+        self._request('https://www.youtube.com/watch?v=hotvideo001', 'fr')
+        self._request('https://www.youtube.com/watch?v=hotvideo001', 'fr', hours_ago=2)
+        self._request('https://www.youtube.com/watch?v=onerequest1')
+        for _ in range(5):
+            self._request('https://www.youtube.com/watch?v=oldvideo001', hours_ago=48)
+
+        hot = CacheWarmer(window_hours=24, min_requests=2, top=10).hot_items()
+        self.assertEqual([(item.video_id, item.target_language, item.requests) for item in hot],
+                         [('hotvideo001', 'es', 3), ('hotvideo001', 'fr', 2)])
+        self.assertEqual(CacheWarmer(window_hours=24, min_requests=2, top=1).hot_items()[0].target_language, 'es')
+
+    def test_budget_refusal_charges_nothing(self):
+        budget = WarmBudget(downloads=2, transcription_minutes=10, tokens=1000)
+        self.assertTrue(budget.try_spend({'downloads': 1, 'transcription_minutes': 6, 'tokens': 500}))
+        self.assertFalse(budget.try_spend({'downloads': 1, 'transcription_minutes': 6, 'tokens': 100}))
+        self.assertEqual(budget.spent, {'downloads': 1, 'transcription_minutes': 6, 'tokens': 500})
+
+    @mock.patch.object(FingerprintService, 'is_enabled', return_value=True)
+    def test_plans_the_most_requested_cold_pairs_within_the_budget(self, _):
+        for video_id, requests, duration in (('longconcert', 4, 3600), ('warmsong001', 3, 200),
+                                             ('coldsong001', 2, 180)):
+            self._metadata(video_id, duration)
+            for _ in range(requests):
+                self._request(f"https://www.youtube.com/watch?v={video_id}")
+        AudioRecording.objects.create(video_id='warmsong001', title='Song', transcript='Hello',
+                                      translations={FingerprintService.translation_key('es', 'balanced'): {}})
+
+        budget = WarmBudget(downloads=2, transcription_minutes=10, tokens=100000)
+        report = CacheWarmer(openai_api_key=TEST_API_KEY, quality='balanced', min_requests=2).warm(budget, dry_run=True)
+
+        self.assertEqual([(item.video_id, outcome) for item, outcome in report['items']], [
+            ('longconcert', 'over_budget'), ('warmsong001', 'already_warm'), ('coldsong001', 'planned'),
+        ])
+        self.assertEqual(report['spent']['downloads'], 1)
+        self.assertEqual(report['spent']['transcription_minutes'], 3)
+
+
+class CleanupMediaTests(TemporaryMediaMixin, SimpleTestCase):
+    """The cron file sweep, which runs without Django."""
+
+    def _touch(self, path: Path, age: float):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+
+    def test_deletes_old_files_and_abandoned_workspaces(self):
+        self._touch(self.media_root / 'Old_abc_audio.m4a', 600)
+        self._touch(self.media_root / 'New_def_audio.m4a', 10)
+        self._touch(self.media_root / '.jobs' / 'deadjob' / 'partial.mp4', 600)
+        os.utime(self.media_root / '.jobs' / 'deadjob', (time.time() - 600,) * 2)
+        self._touch(self.media_root / '.jobs' / 'livejob' / 'partial.mp4', 10)
+
+        with mock.patch('sys.stdout', new_callable=io.StringIO):
+            cleanup_media.cleanup_old_files(str(self.media_root), age_limit=300)
+
+        self.assertEqual(sorted(os.listdir(self.media_root)), ['.jobs', 'New_def_audio.m4a'])
+        self.assertEqual(os.listdir(self.media_root / '.jobs'), ['livejob'])
+
+    def test_keeps_the_workspace_of_a_running_job(self):
+        old = time.time() - 3600
+        abandoned = self.media_root / '.jobs' / 'deadjob'
+        self._touch(abandoned / '.lock', 3600)
+        os.utime(abandoned, (old, old))
+
+        with job_workspace('abc123') as workspace:
+            os.utime(workspace.path, (old, old))
+            with mock.patch('sys.stdout', new_callable=io.StringIO):
+                cleanup_media.cleanup_old_files(str(self.media_root), age_limit=300)
+            self.assertTrue(workspace.path.is_dir())
+        self.assertFalse(abandoned.exists())
+        self.assertFalse(workspace.path.exists())
+
+    def test_does_not_load_django(self):
+        code = "import sys, cleanup_media; print(any(m.startswith('django') for m in sys.modules))"
+        output = subprocess.run([sys.executable, '-c', code], cwd=Path(cleanup_media.__file__).parent,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), 'False')
+
+
+class CleanupExpiredCommandTests(TestCase):
+
+    def _run(self, storage: MediaStorage) -> str:
+        out = io.StringIO()
+        with mock.patch('translation_generator_app.management.commands.cleanup_expired.get_storage',
+                        return_value=storage):
+            call_command('cleanup_expired', stdout=out)
+        return out.getvalue()
+
+    def test_deletes_expired_rows(self):
+        StageResult.objects.create(key='old:metadata', payload='Old')
+        StageResult.objects.filter(key='old:metadata').update(updated_at=timezone.now() - timedelta(days=1))
+        StageResult.objects.create(key='new:metadata', payload='New')
+        VideoMetadata.objects.create(video_id='gone', available=False,
+                                     fetched_at=timezone.now() - timedelta(days=1))
+        VideoMetadata.objects.create(video_id='fresh', fetched_at=timezone.now())
+
+        output = self._run(MemoryMediaStorage())
+
+        self.assertEqual(list(StageResult.objects.values_list('key', flat=True)), ['new:metadata'])
+        self.assertEqual(list(VideoMetadata.objects.values_list('video_id', flat=True)), ['fresh'])
+        self.assertIn('Deleted 1 expired stage results.', output)
+
+    def test_deletes_old_remote_objects(self):
+        storage = MemoryMediaStorage()
+        storage.objects = {'Old_audio.m4a': (b'old', time.time() - 600), 'New_audio.m4a': (b'new', time.time())}
+        output = self._run(storage)
+        self.assertEqual(list(storage.objects), ['New_audio.m4a'])
+        self.assertIn('Deleted 1 old stored files.', output)
@@ -1,11 +1,32 @@
 from django.urls import path
-from .views import TranslationGeneratorView, generate_translation
+from .views import (
+    TranslationGeneratorView, AsyncTranslationGeneratorView, AssemblyAIWebhookView, AudioMp3View,
+    MediaDownloadView, TranslationResultView, TranslationTimelineView, generate_translation
+)
 
 
 urlpatterns = [
     # Class-based view (recommended)
     path('generate-translation/', TranslationGeneratorView.as_view(), name='generate-translation'),
     
+    # Async variant for ASGI servers (uvicorn ai_translation.asgi:application)
+    path('generate-translation-async/', AsyncTranslationGeneratorView.as_view(), name='generate-translation-async'),
+    
+    # AssemblyAI completion notifications (see ASSEMBLYAI_WEBHOOK_URL)
+    path('assemblyai-webhook/', AssemblyAIWebhookView.as_view(), name='assemblyai-webhook'),
+    
+    # Job media streamed from disk (linked from Streamlit)
+    path('media-download/', MediaDownloadView.as_view(), name='media-download'),
+    
+    # MP3 copy of a job's audio, converted on the first request
+    path('audio-mp3/', AudioMp3View.as_view(), name='audio-mp3'),
+    
+    # Stored result, with ETag revalidation and field selection
+    path('translations/<int:pk>/', TranslationResultView.as_view(), name='translation-result'),
+    
+    # Per-stage waterfall of the job that produced it
+    path('translations/<int:pk>/timeline/', TranslationTimelineView.as_view(), name='translation-timeline'),
+    
     # Legacy function-based view (for backwards compatibility)
     # path('generate-translation', generate_translation, name='generate-translation-legacy'),
 ]
@@ -2,8 +2,18 @@
 Views package for translation generator app.
 """
 from .views_app import TranslationGeneratorView, generate_translation
+from .async_views import AsyncTranslationGeneratorView
+from .webhook_views import AssemblyAIWebhookView
+from .media_views import AudioMp3View, MediaDownloadView
+from .result_views import TranslationResultView, TranslationTimelineView
 
 __all__ = [
     'TranslationGeneratorView',
     'generate_translation',
+    'AsyncTranslationGeneratorView',
+    'AssemblyAIWebhookView',
+    'AudioMp3View',
+    'MediaDownloadView',
+    'TranslationResultView',
+    'TranslationTimelineView',
 ] 
\ No newline at end of file
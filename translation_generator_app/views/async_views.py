@@ -0,0 +1,83 @@
+"""
+Async Class-Based Views for Translation Generator API (ASGI).
+"""
+import asyncio
+import logging
+from django.http import JsonResponse
+from django.conf import settings
+
+from ..admission import limiter, plan_job
+from ..services import AsyncYouTubeService, aprocess_video
+from ..serializers import TranslationRequestValidator
+from ..deadline import job_deadline
+from ..profiling import profile_job, profiling_requested
+from .views_app import TranslationGeneratorView
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class AsyncTranslationGeneratorView(TranslationGeneratorView):
+    """
+    Async version of ``TranslationGeneratorView`` for ASGI servers (uvicorn).
+
+    Endpoint: POST /api/generate-translation-async
+
+    Same request body, response and error codes as ``TranslationGeneratorView``.
+    Every external call (yt-dlp, ffmpeg, AssemblyAI, OpenAI) is awaited, so
+    one process multiplexes many I/O-bound jobs on its event loop. Under
+    WSGI Django runs it through ``async_to_sync``, which works but gains
+    nothing. Progress events (``Accept: text/event-stream``) are only served
+    by ``TranslationGeneratorView``; Django 4.1 cannot stream a response
+    from an async iterator.
+    """
+
+    async def post(self, request):
+        """
+        Handle POST request to generate translation from YouTube video.
+
+        Args:
+            request: Django HTTP request
+
+        Returns:
+            JsonResponse with translation result or error
+        """
+        try:
+            # Parse and validate request data
+            data = self._parse_request_data(request)
+            validated_data = TranslationRequestValidator.validate(data)
+
+            # Reject private/removed videos before any job work; the lookup
+            # also fills the metadata cache the title stage reads from
+            metadata = await AsyncYouTubeService.get_metadata(validated_data['link'])
+            include_video = plan_job(metadata)
+
+            # Process the video within the job deadline; cancelling the job
+            # also kills its subprocesses and closes its connections.
+            # Admission is not queued: a full server answers 429 at once
+            label = f"async-{AsyncYouTubeService.extract_video_id(validated_data['link'])}"
+            async with limiter('job').aslot(timeout=0):
+                with job_deadline(settings.JOB_DEADLINE_SECONDS) as deadline, \
+                        profile_job(label, enabled=profiling_requested(request)):
+                    try:
+                        result = await asyncio.wait_for(
+                            aprocess_video(
+                                yt_link=validated_data['link'],
+                                openai_api_key=validated_data['openai_api_key'],
+                                target_language=validated_data.get('target_language', 'es'),
+                                quality=validated_data.get('quality', 'balanced'),
+                                include_video=include_video
+                            ),
+                            timeout=deadline.remaining() if deadline else None
+                        )
+                    except asyncio.TimeoutError:
+                        raise deadline.exceeded('processing')
+
+            return self._success_response(result)
+
+        except Exception as e:
+            return self._error_response(e)
+
+    async def get(self, request):
+        """Handle GET request - return method not allowed."""
+        return JsonResponse({'error': 'Method not allowed. Use POST.'}, status=405)
@@ -0,0 +1,135 @@
+"""
+Downloads of media produced by translation jobs.
+"""
+import logging
+import os
+from typing import Optional
+from django.conf import settings
+from django.http import FileResponse, HttpResponseRedirect, JsonResponse
+from django.views import View
+
+from ..exceptions import AudioConversionException, StorageException
+from ..services import AudioTranscoder
+from ..storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def _media_name(request, suffixes) -> str:
+    """
+    Name given by ``?file=`` if it names a published artifact the view serves.
+
+    Args:
+        request: Django HTTP request
+        suffixes: Name fragments of the artifacts the view serves (e.g. '_audio.')
+
+    Returns:
+        Artifact name, or '' if there is no such artifact in the media storage
+    """
+    # Only flat artifact names can be requested
+    name = os.path.basename(request.GET.get('file', ''))
+    if not name or name.startswith('.') or not any(suffix in name for suffix in suffixes):
+        return ''
+    return name if get_storage().exists(name) else ''
+
+
+def _download_response(name: str, content_type: Optional[str] = None):
+    """
+    Send an artifact: a redirect to the storage's own URL, or the local file streamed from disk.
+
+    Args:
+        name: Artifact name
+        content_type: Content type of a streamed file (guessed when None)
+
+    Returns:
+        HttpResponseRedirect or FileResponse
+    """
+    url = get_storage().url(name)
+    if url:
+        return HttpResponseRedirect(url)
+    kwargs = {'content_type': content_type} if content_type else {}
+    return FileResponse(open(os.path.join(settings.MEDIA_ROOT, name), 'rb'), as_attachment=True, filename=name, **kwargs)
+
+
+class MediaDownloadView(View):
+    """
+    Streams a job's video, audio or transcript file as a download.
+
+    Endpoint: GET /media-download/?file=<file name>
+
+    ``file`` is the name of a ``video_file``, ``audio_file`` or transcript
+    produced by a job. The file is sent from disk in blocks (``sendfile``
+    under gunicorn), so neither the API nor the Streamlit frontend, which
+    links here, holds it in memory. With a remote media storage
+    (``MEDIA_STORAGE=s3``) the response is a redirect to a presigned URL
+    instead, so any node can answer for files produced on another.
+    """
+
+    SUFFIXES = ('_video.', '_audio.', '.txt')
+
+    def get(self, request):
+        """
+        Handle GET request for a media download.
+
+        Args:
+            request: Django HTTP request
+
+        Returns:
+            FileResponse with the file, redirect to the storage, or JsonResponse with an error
+        """
+        try:
+            name = _media_name(request, self.SUFFIXES)
+            if not name:
+                return JsonResponse({'error': 'File not found'}, status=404)
+            return _download_response(name)
+        except StorageException as e:
+            logger.error(f"Media storage error: {str(e)}")
+            return JsonResponse({'error': str(e)}, status=500)
+
+
+class AudioMp3View(View):
+    """
+    Serves the MP3 copy of a job's audio, converting it on the first request.
+
+    Endpoint: GET /audio-mp3/?file=<audio file name>
+
+    ``file`` is the name of the ``audio_file`` returned by the translation
+    endpoints (e.g. ``Song_abc123_audio.m4a``). The response is the MP3 as
+    an attachment; later requests reuse the converted file. With a remote
+    media storage the MP3 is stored there too and the response redirects
+    to it; a node that did not download the audio fetches it first.
+    """
+
+    def get(self, request):
+        """
+        Handle GET request for an MP3 download.
+
+        Args:
+            request: Django HTTP request
+
+        Returns:
+            FileResponse with the MP3, redirect to the storage, or JsonResponse with an error
+        """
+        try:
+            name = _media_name(request, ('_audio.',))
+            if not name:
+                return JsonResponse({'error': 'Audio file not found'}, status=404)
+
+            storage = get_storage()
+            mp3_name = os.path.basename(AudioTranscoder.mp3_path(name))
+            if storage.remote and storage.exists(mp3_name):
+                return _download_response(mp3_name)
+
+            audio_file = os.path.join(settings.MEDIA_ROOT, name)
+            # Produced on another node, unless removed from the storage since
+            if not os.path.isfile(audio_file) and not storage.fetch(name, audio_file):
+                return JsonResponse({'error': 'Audio file not found'}, status=404)
+            mp3_file = AudioTranscoder.to_mp3(audio_file)
+            return _download_response(os.path.basename(mp3_file), content_type='audio/mpeg')
+
+        except AudioConversionException as e:
+            logger.error(f"MP3 conversion error: {str(e)}")
+            return JsonResponse({'error': str(e)}, status=500)
+        except StorageException as e:
+            logger.error(f"Media storage error: {str(e)}")
+            return JsonResponse({'error': str(e)}, status=500)
@@ -0,0 +1,132 @@
+"""
+Retrieval of stored translation results.
+"""
+import hashlib
+import json
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
+
+from ..models import translationPost
+
+
+class TranslationResultView(View):
+    """
+    Returns a stored translation, revalidated with its ETag.
+
+    Endpoint: GET /translations/<id>/?fields=content,title
+
+    Response:
+        {
+            "id": 42,
+            "title": "video title",
+            "link": "https://youtube.com/watch?v=...",
+            "content": "translated text...",
+            "original_transcription": "original text...",
+            "target_language": "es",
+            "created_at": "2024-01-01T12:00:00+00:00"
+        }
+
+    ``fields`` (optional) limits the body to the listed keys. The ETag is
+    the SHA-256 of the body, so a client sending it back in
+    ``If-None-Match`` gets ``304 Not Modified`` with no body while the
+    result is unchanged. Gzip-compressed responses carry the weak form of
+    the same ETag (``W/"..."``), which ``If-None-Match`` also accepts.
+    """
+
+    FIELDS = ('id', 'title', 'link', 'content', 'original_transcription', 'target_language', 'created_at')
+
+    def get(self, request, pk: int):
+        """
+        Handle GET request for a stored translation.
+
+        Args:
+            request: Django HTTP request
+            pk: translationPost ID
+
+        Returns:
+            JSON response with the result, 304 if the client's copy is current, or an error
+        """
+        requested = [name.strip() for name in request.GET.get('fields', '').split(',') if name.strip()]
+        unknown = [name for name in requested if name not in self.FIELDS]
+        if unknown:
+            return JsonResponse(
+                {'error': f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(self.FIELDS)}"},
+                status=400
+            )
+
+        post = translationPost.objects.filter(pk=pk).first()
+        if post is None:
+            return JsonResponse({'error': 'Translation not found'}, status=404)
+
+        payload = {
+            'id': post.pk,
+            'title': post.youtube_title,
+            'link': post.youtube_link,
+            'content': post.generated_content,
+            'original_transcription': post.original_transcription,
+            'target_language': post.target_language,
+            'created_at': post.created_at.isoformat(),
+        }
+        if requested:
+            payload = {name: payload[name] for name in self.FIELDS if name in requested}
+
+        body = json.dumps(payload).encode('utf-8')
+        etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        # Cacheable by the client only, and always revalidated
+        patch_cache_control(response, private=True, no_cache=True)
+        return get_conditional_response(request, etag=etag, response=response)
+
+
+class TranslationTimelineView(View):
+    """
+    Returns the stage waterfall recorded while a translation was processed.
+
+    Endpoint: GET /translations/<id>/timeline/
+
+    Response:
+        {
+            "id": 42,
+            "title": "video title",
+            "started_at": "2024-01-01T12:00:00+00:00",
+            "seconds": 38.2,
+            "stages": [
+                {"name": "metadata", "parent": null, "start": 0.0, "end": 0.41, "bytes": null, "tokens": null},
+                {"name": "video_download", "parent": null, "start": 0.41, "end": 9.8,
+                 "bytes": 48211000, "tokens": null},
+                ...
+            ]
+        }
+
+    ``start`` and ``end`` are seconds since the job started; ``parent`` is
+    the stage a step ran in (e.g. the ``detection``, ``formatting`` and
+    ``translation`` LLM calls of the ``translation`` stage, or the single
+    ``detection+formatting+translation`` call in combined mode). ``stages`` is
+    empty for rows saved before timelines were recorded.
+    """
+
+    def get(self, request, pk: int):
+        """
+        Handle GET request for a translation's timeline.
+
+        Args:
+            request: Django HTTP request
+            pk: translationPost ID
+
+        Returns:
+            JSON response with the timeline, or 404
+        """
+        post = translationPost.objects.filter(pk=pk).only('id', 'youtube_title', 'stage_timeline').first()
+        if post is None:
+            return JsonResponse({'error': 'Translation not found'}, status=404)
+
+        timeline = post.stage_timeline or {}
+        return JsonResponse({
+            'id': post.pk,
+            'title': post.youtube_title,
+            'started_at': timeline.get('started_at'),
+            'seconds': timeline.get('seconds'),
+            'stages': timeline.get('stages', []),
+        })
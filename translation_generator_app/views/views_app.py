@@ -1,20 +1,33 @@
 """
 Class-Based Views for Translation Generator API.
 """
+import contextvars
 import json
 import logging
-from django.http import JsonResponse
+import os
+import queue
+import threading
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-import environ
+from django.db import connection
 
-from ..models import translationPost
-from ..services import YouTubeService, TranscriptionService, TranslationService
+from ..admission import limiter, plan_job
+from ..services import YouTubeService, process_video
 from ..serializers import TranslationRequestValidator
+from ..deadline import job_deadline
+from ..profiling import profile_job, profiling_requested
+from ..progress import track_progress
 from ..exceptions import (
     TranslationGeneratorException,
+    DeadlineExceededException,
+    OverloadedException,
+    JobTooLargeException,
+    VideoUnavailableException,
     YouTubeDownloadException,
     TranscriptionException,
     TranslationException,
@@ -24,13 +37,6 @@ from ..exceptions import (
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-env = environ.Env()
-environ.Env.read_env()
-
-# Access the API key from environment variables
-AAI_API_KEY = env('AAI_API_KEY')
-
 
 class TranslationGeneratorView(View):
     """
@@ -42,22 +48,45 @@ class TranslationGeneratorView(View):
         {
             "link": "https://youtube.com/watch?v=...",
             "openai_api_key": "sk-...",
-            "target_language": "es" (optional, default: "es")
+            "target_language": "es" (optional, default: "es"),
+            "quality": "balanced" (optional: "fast", "balanced" or "best")
         }
     
     Supported languages: es, en, fr, de, it, pt, ru, ja, ko, zh, ar
     
     Response:
         {
+            "id": 42,
+            "result_url": "/translations/42/",
             "content": "translated text...",
             "title": "video title",
             "original_transcription": "original text...",
             "video_file": "/path/to/video.mp4",
-            "audio_file": "/path/to/audio.mp3",
+            "audio_file": "/path/to/audio.m4a",
+            "video_url": "/media-download/?file=video.mp4",
+            "audio_url": "/media-download/?file=audio.m4a",
+            "audio_mp3_url": "/audio-mp3/?file=audio.m4a",
             "target_language": "es"
         }
+    
+    ``audio_file`` is the audio as downloaded (m4a, webm...); the MP3 is
+    only made when ``audio_mp3_url`` is requested. The ``*_url`` fields are
+    paths on the backend, for clients to prefix with its public address. The stored result can be
+    fetched again (with ETag revalidation) from ``result_url``.
+    
+    With ``Accept: text/event-stream`` the response is a stream of
+    Server-Sent Events instead: ``stage`` and ``progress`` events while the
+    job runs (stage, percent, bytes and throughput), then a ``result`` event
+    with the body above or an ``error`` event with ``status``, ``code`` and ``error``.
+    
+    Videos over the ``ADMISSION_*`` size limits are rejected with 413 (or
+    processed audio-only, ``video_file`` null), and requests beyond the
+    concurrent job limit get 429 with a ``Retry-After`` header.
     """
     
+    # Seconds without events after which a keep-alive comment is sent
+    EVENT_STREAM_KEEPALIVE = 15
+    
     @method_decorator(csrf_exempt)
     def dispatch(self, *args, **kwargs):
         """Disable CSRF for this view."""
@@ -78,45 +107,195 @@ class TranslationGeneratorView(View):
             data = self._parse_request_data(request)
             validated_data = TranslationRequestValidator.validate(data)
             
-            # Process the video
-            result = self._process_video(
+            # Reject private/removed videos before any job work; the lookup
+            # also fills the metadata cache the title stage reads from
+            metadata = YouTubeService.get_metadata(validated_data['link'])
+            include_video = plan_job(metadata)
+            
+            # Admission is not queued: a full server answers 429 at once
+            job_slot = limiter('job')
+            acquired_at = job_slot.acquire(timeout=0)
+            # Released here unless a started event-stream job thread took it over
+            slot_handed_over = False
+            try:
+                profile = profiling_requested(request)
+                if self._wants_event_stream(request):
+                    response = self._event_stream_response(validated_data, include_video, acquired_at, profile)
+                    slot_handed_over = True
+                    return response
+                return self._success_response(self._run_job(validated_data, include_video, profile))
+            finally:
+                if not slot_handed_over:
+                    job_slot.release(acquired_at)
+            
+        except Exception as e:
+            return self._error_response(e)
+    
+    def _run_job(self, validated_data: dict, include_video: bool = True, profile: bool = False) -> dict:
+        """Process the video of a validated request within the job deadline, sampling it if ``profile``."""
+        label = f"view-{YouTubeService.extract_video_id(validated_data['link'])}"
+        with job_deadline(settings.JOB_DEADLINE_SECONDS), profile_job(label, enabled=profile):
+            return process_video(
                 yt_link=validated_data['link'],
                 openai_api_key=validated_data['openai_api_key'],
-                target_language=validated_data.get('target_language', 'es')
+                target_language=validated_data.get('target_language', 'es'),
+                quality=validated_data.get('quality', 'balanced'),
+                include_video=include_video
             )
+    
+    @staticmethod
+    def _wants_event_stream(request) -> bool:
+        """Whether the client asked for progress events (``Accept: text/event-stream``)."""
+        return 'text/event-stream' in request.headers.get('Accept', '')
+    
+    def _event_stream_response(self, validated_data: dict, include_video: bool,
+                               acquired_at: float, profile: bool = False) -> StreamingHttpResponse:
+        """
+        Run the job in a background thread and stream its progress as Server-Sent Events.
+        
+        The job keeps running until it finishes or its deadline passes even
+        if the client disconnects; its job slot is released then. The
+        thread is started last, so if this method raises, the slot is
+        still the caller's to release.
+        
+        Args:
+            validated_data: Validated request data
+            include_video: Whether to download the video track
+            acquired_at: Value returned when the job slot was acquired
+            profile: Whether to run the job under the sampling profiler
             
-            return JsonResponse({
-                'content': result['translation'],
-                'title': result['title'],
-                'original_transcription': result['original_transcription'],
-                'video_file': result['video_file'],
-                'audio_file': result['audio_file'],
-                'target_language': result.get('target_language', 'es')
-            }, status=200)
+        Returns:
+            StreamingHttpResponse with ``text/event-stream`` content
+        """
+        events = queue.Queue()
+        
+        def run_job():
+            try:
+                with track_progress(events.put):
+                    result = self._run_job(validated_data, include_video, profile)
+                events.put({'type': 'result', **self._result_payload(result)})
+            except Exception as e:
+                response = self._error_response(e)
+                events.put({'type': 'error', 'status': response.status_code, **json.loads(response.content)})
+            finally:
+                # The job thread opened its own database connection
+                connection.close()
+                limiter('job').release(acquired_at)
+                events.put(None)
+        
+        def stream():
+            while True:
+                try:
+                    event = events.get(timeout=self.EVENT_STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if event is None:
+                    return
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Keep reverse proxies (nginx) from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        threading.Thread(target=contextvars.copy_context().run, args=(run_job,), daemon=True).start()
+        return response
+    
+    @staticmethod
+    def _result_payload(result: dict) -> dict:
+        """
+        Build the response body for a processed video.
+        
+        Args:
+            result: Dictionary returned by ``process_video``
             
+        Returns:
+            Dictionary with the translation, title, transcription and media paths
+        """
+        audio_query = urlencode({'file': os.path.basename(result['audio_file'])})
+        video_query = urlencode({'file': os.path.basename(result['video_file'])}) if result['video_file'] else None
+        translation_id = result.get('id')
+        return {
+            'id': translation_id,
+            'result_url': reverse('translation-result', args=[translation_id]) if translation_id else None,
+            'content': result['translation'],
+            'title': result['title'],
+            'original_transcription': result['original_transcription'],
+            'video_file': result['video_file'],
+            'audio_file': result['audio_file'],
+            'video_url': f"{reverse('media-download')}?{video_query}" if video_query else None,
+            'audio_url': f"{reverse('media-download')}?{audio_query}",
+            'audio_mp3_url': f"{reverse('audio-mp3')}?{audio_query}",
+            'target_language': result.get('target_language', 'es')
+        }
+    
+    def _success_response(self, result: dict) -> JsonResponse:
+        """
+        Build the response for a processed video.
+        
+        Args:
+            result: Dictionary returned by ``process_video``
+            
+        Returns:
+            JsonResponse with status 200
+        """
+        return JsonResponse(self._result_payload(result), status=200)
+    
+    def _error_response(self, error: Exception) -> JsonResponse:
+        """
+        Map an exception raised while handling a request to an error response.
+        
+        Args:
+            error: Exception raised by validation or processing
+            
+        Returns:
+            JsonResponse with the error message, a ``code`` naming the failure
+            (e.g. 'transcription_failed') and matching status code
+        """
+        try:
+            raise error
+        
+        except JobTooLargeException as e:
+            logger.warning(f"Job too large: {str(e)}")
+            return JsonResponse({'error': str(e), 'code': 'job_too_large'}, status=413)
+        
+        except OverloadedException as e:
+            logger.warning(f"Overloaded: {str(e)}")
+            response = JsonResponse({'error': str(e), 'code': 'overloaded', 'retry_after': e.retry_after}, status=429)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+        
         except InvalidDataException as e:
             logger.warning(f"Invalid data: {str(e)}")
-            return JsonResponse({'error': str(e)}, status=400)
+            return JsonResponse({'error': str(e), 'code': 'invalid_data'}, status=400)
+        
+        except VideoUnavailableException as e:
+            logger.warning(str(e))
+            return JsonResponse({'error': str(e), 'code': 'video_unavailable'}, status=400)
+        
+        except DeadlineExceededException as e:
+            logger.error(f"Deadline exceeded: {str(e)}")
+            return JsonResponse({'error': str(e), 'code': 'deadline_exceeded'}, status=504)
         
         except YouTubeDownloadException as e:
             logger.error(f"YouTube download error: {str(e)}")
-            return JsonResponse({'error': f"Download failed: {str(e)}"}, status=500)
+            return JsonResponse({'error': f"Download failed: {str(e)}", 'code': 'download_failed'}, status=500)
         
         except TranscriptionException as e:
             logger.error(f"Transcription error: {str(e)}")
-            return JsonResponse({'error': f"Transcription failed: {str(e)}"}, status=500)
+            return JsonResponse({'error': f"Transcription failed: {str(e)}", 'code': 'transcription_failed'}, status=500)
         
         except TranslationException as e:
             logger.error(f"Translation error: {str(e)}")
-            return JsonResponse({'error': f"Translation failed: {str(e)}"}, status=500)
+            return JsonResponse({'error': f"Translation failed: {str(e)}", 'code': 'translation_failed'}, status=500)
         
         except TranslationGeneratorException as e:
             logger.error(f"General error: {str(e)}")
-            return JsonResponse({'error': str(e)}, status=500)
+            return JsonResponse({'error': str(e), 'code': 'job_failed'}, status=500)
         
         except Exception as e:
             logger.exception(f"Unexpected error: {str(e)}")
-            return JsonResponse({'error': 'An unexpected error occurred'}, status=500)
+            return JsonResponse({'error': 'An unexpected error occurred', 'code': 'internal_error'}, status=500)
     
     def get(self, request):
         """Handle GET request - return method not allowed."""
@@ -139,71 +318,6 @@ class TranslationGeneratorView(View):
             return json.loads(request.body)
         except json.JSONDecodeError:
             raise InvalidDataException("Invalid JSON data")
-    
-    def _process_video(self, yt_link: str, openai_api_key: str, target_language: str = 'es') -> dict:
-        """
-        Process YouTube video: download, transcribe, and translate.
-        
-        Args:
-            yt_link: YouTube video URL
-            openai_api_key: OpenAI API key for translation
-            target_language: Target language code for translation (default: 'es')
-            
-        Returns:
-            Dictionary with processing results
-            
-        Raises:
-            YouTubeDownloadException: If download fails
-            TranscriptionException: If transcription fails
-            TranslationException: If translation fails
-        """
-        # Initialize services
-        youtube_service = YouTubeService()
-        transcription_service = TranscriptionService(api_key=AAI_API_KEY)
-        translation_service = TranslationService(api_key=openai_api_key)
-        
-        # Step 1: Get video title
-        logger.info(f"Fetching title for: {yt_link}")
-        title = youtube_service.get_title(yt_link)
-        logger.info(f"Video title: {title}")
-        
-        # Step 2: Download video and audio
-        logger.info(f"Downloading video and audio for: {title}")
-        video_file, audio_file = youtube_service.download_video_and_audio(yt_link, title)
-        logger.info(f"Downloaded - Video: {video_file}, Audio: {audio_file}")
-        
-        # Step 3: Transcribe audio
-        logger.info(f"Transcribing audio: {audio_file}")
-        original_text = transcription_service.transcribe_audio(audio_file, title)
-        logger.info(f"Transcription complete, length: {len(original_text)} chars")
-        
-        # Step 4: Format and translate
-        logger.info(f"Processing translation and formatting (target language: {target_language})")
-        processed_text = translation_service.process_transcription(original_text, target_language=target_language)
-        logger.info("Translation complete")
-        
-        # Step 5: Save to database
-        translation = translationPost.objects.create(
-            youtube_title=title,
-            youtube_link=yt_link,
-            generated_content=processed_text['translated']
-        )
-        translation.save()
-        logger.info(f"Saved translation to database, ID: {translation.id}")
-        
-        # Prepare transcript file path
-        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '_', '-')).rstrip()
-        transcription_file = settings.MEDIA_ROOT / f"{safe_title}.txt"
-        
-        return {
-            "title": title,
-            "translation": processed_text['translated'],
-            "original_transcription": processed_text['original'],
-            "video_file": video_file,
-            "audio_file": audio_file,
-            "transcription_file": str(transcription_file),
-            "target_language": target_language
-        }
 
 
 # Legacy function-based view support (if needed for backwards compatibility)
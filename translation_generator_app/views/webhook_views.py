@@ -0,0 +1,62 @@
+"""
+Webhook receiver for AssemblyAI transcript notifications.
+"""
+import hmac
+import json
+import logging
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from ..services import TranscriptionPoller
+
+logger = logging.getLogger(__name__)
+
+
+class AssemblyAIWebhookView(View):
+    """
+    Receives AssemblyAI completion webhooks and wakes up the shared poller.
+    
+    Endpoint: POST /assemblyai-webhook/
+    
+    Request Body (sent by AssemblyAI):
+        {
+            "transcript_id": "...",
+            "status": "completed" | "error"
+        }
+    
+    The webhook only speeds up detection: if it reaches a worker that is not
+    tracking the transcript, the owning worker still finds it by polling.
+    """
+    
+    @method_decorator(csrf_exempt)
+    def dispatch(self, *args, **kwargs):
+        """Disable CSRF for this view."""
+        return super().dispatch(*args, **kwargs)
+    
+    def post(self, request):
+        """
+        Handle an AssemblyAI webhook call.
+        
+        Args:
+            request: Django HTTP request
+            
+        Returns:
+            JsonResponse acknowledging the notification
+        """
+        secret = getattr(settings, 'ASSEMBLYAI_WEBHOOK_SECRET', '')
+        if secret and not hmac.compare_digest(request.headers.get('X-Webhook-Secret', ''), secret):
+            logger.warning("Rejected AssemblyAI webhook with an invalid secret")
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+        
+        try:
+            data = json.loads(request.body)
+            transcript_id = data['transcript_id']
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return JsonResponse({'error': 'Invalid webhook payload'}, status=400)
+        
+        logger.info(f"AssemblyAI webhook: transcript {transcript_id} is {data.get('status')}")
+        TranscriptionPoller.shared().notify(transcript_id)
+        return JsonResponse({'received': True}, status=200)
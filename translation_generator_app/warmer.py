@@ -0,0 +1,269 @@
+"""
+Cache Warmer - Keeps the cached artifacts of the most requested videos and languages fresh.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .admission import plan_job
+from .deadline import job_deadline
+from .exceptions import TranslationGeneratorException, VideoUnavailableException, YouTubeDownloadException
+from .models import AudioRecording, VideoMetadata, translationPost
+from .services import FingerprintService, MetadataCache, YouTubeService, process_video
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HotItem:
+    """A (video, target language) pair and how often it was requested in the window."""
+    video_id: str
+    link: str
+    target_language: str
+    requests: int
+    last_requested: datetime
+
+
+@dataclass
+class WarmBudget:
+    """What one warming run may spend; ``spent`` grows as pipeline runs are planned."""
+    downloads: int
+    transcription_minutes: float
+    tokens: int
+    spent: Dict[str, float] = field(
+        default_factory=lambda: {'downloads': 0, 'transcription_minutes': 0.0, 'tokens': 0}
+    )
+
+    def try_spend(self, cost: Dict[str, float]) -> bool:
+        """
+        Charge ``cost`` if it fits in what is left of every limit.
+
+        Args:
+            cost: Amount per limit ('downloads', 'transcription_minutes', 'tokens')
+
+        Returns:
+            True if charged; False leaves the budget untouched
+        """
+        limits = {'downloads': self.downloads, 'transcription_minutes': self.transcription_minutes,
+                  'tokens': self.tokens}
+        if any(self.spent[name] + amount > limits[name] for name, amount in cost.items()):
+            return False
+        for name, amount in cost.items():
+            self.spent[name] += amount
+        return True
+
+
+class CacheWarmer:
+    """
+    Refreshes the cached artifacts of the (video, language) pairs requested most often.
+
+    Popularity is read from ``translationPost``: requests per video and
+    target language over the last ``window_hours``. For each of the ``top``
+    pairs with at least ``min_requests`` requests, in rank order:
+
+    * metadata older than half of ``METADATA_CACHE_TTL`` is extracted
+      again, so a popular video's entry never expires;
+    * if no ``AudioRecording`` of the video holds the translation for the
+      language (at ``quality``), the pipeline runs audio-only and stores
+      the transcript and translation in the fingerprint index, so the next
+      request for the song skips transcription and the LLM.
+
+    Each pipeline run is charged to the budget: one download, the video's
+    minutes of transcription (none if its transcript is stored) and the
+    estimated LLM tokens. A pair that does not fit is left for the next
+    run, while cheaper pairs further down may still fit.
+    """
+
+    # Speech rate of lyrics, to estimate tokens before a transcript exists
+    TOKENS_PER_SECOND = 3
+    # LLM tokens per transcript token: the prompt, the formatted original and the translation
+    LLM_TOKENS_PER_TEXT_TOKEN = 4
+
+    def __init__(self, openai_api_key: Optional[str] = None, quality: Optional[str] = None,
+                 window_hours: Optional[int] = None, top: Optional[int] = None,
+                 min_requests: Optional[int] = None, workers: int = 2):
+        """
+        Initialize the warmer.
+
+        Args:
+            openai_api_key: Key for the translations (default: settings.CACHE_WARM_OPENAI_API_KEY);
+                without one only metadata is refreshed
+            quality: Quality tier of the warmed translations (default: settings.CACHE_WARM_QUALITY)
+            window_hours: Request history considered (default: settings.CACHE_WARM_WINDOW_HOURS)
+            top: Number of pairs kept warm (default: settings.CACHE_WARM_TOP)
+            min_requests: Requests in the window for a pair to count as hot (default: settings.CACHE_WARM_MIN_REQUESTS)
+            workers: Pipeline runs in parallel
+        """
+        self.openai_api_key = openai_api_key if openai_api_key is not None else getattr(settings, 'CACHE_WARM_OPENAI_API_KEY', '')
+        self.quality = quality or getattr(settings, 'CACHE_WARM_QUALITY', 'balanced')
+        self.window_hours = window_hours if window_hours is not None else getattr(settings, 'CACHE_WARM_WINDOW_HOURS', 24)
+        self.top = top if top is not None else getattr(settings, 'CACHE_WARM_TOP', 50)
+        self.min_requests = min_requests if min_requests is not None else getattr(settings, 'CACHE_WARM_MIN_REQUESTS', 2)
+        self.workers = max(1, workers)
+
+    def hot_items(self) -> List[HotItem]:
+        """
+        Rank the (video, language) pairs by requests in the window.
+
+        Returns:
+            Up to ``top`` pairs with at least ``min_requests`` requests, most
+            requested first (ties: most recently requested first)
+        """
+        since = timezone.now() - timedelta(hours=self.window_hours)
+        rows = (
+            translationPost.objects.filter(created_at__gte=since)
+            .values('youtube_link', 'target_language')
+            .annotate(requests=Count('id'), last_requested=Max('created_at'))
+        )
+
+        # Different URLs of a video (watch, youtu.be, embed) count together
+        items: Dict[Tuple[str, str], HotItem] = {}
+        for row in rows:
+            try:
+                video_id = YouTubeService.extract_video_id(row['youtube_link'])
+            except YouTubeDownloadException:
+                continue
+            # Rows saved before the language was recorded used the API default
+            language = row['target_language'] or 'es'
+            item = items.get((video_id, language))
+            if item is None:
+                items[(video_id, language)] = HotItem(video_id, row['youtube_link'], language,
+                                                      row['requests'], row['last_requested'])
+                continue
+            item.requests += row['requests']
+            if row['last_requested'] > item.last_requested:
+                item.link, item.last_requested = row['youtube_link'], row['last_requested']
+
+        hot = [item for item in items.values() if item.requests >= self.min_requests]
+        hot.sort(key=lambda item: (item.requests, item.last_requested), reverse=True)
+        return hot[:self.top]
+
+    def cost(self, metadata: Optional[VideoMetadata], recording: Optional[AudioRecording]) -> Dict[str, float]:
+        """
+        Estimate what running the pipeline for a video consumes.
+
+        Args:
+            metadata: Cached metadata of the video (None if unknown)
+            recording: Stored recording of the video, if any
+
+        Returns:
+            Dictionary with 'downloads', 'transcription_minutes' and 'tokens'
+        """
+        duration = (metadata.duration if metadata else None) or 0
+        if recording is not None:
+            minutes, text_tokens = 0.0, len(recording.transcript) // 4
+        else:
+            minutes, text_tokens = duration / 60, duration * self.TOKENS_PER_SECOND
+        return {
+            'downloads': 1,
+            'transcription_minutes': minutes,
+            'tokens': text_tokens * self.LLM_TOKENS_PER_TEXT_TOKEN,
+        }
+
+    def warm(self, budget: WarmBudget, dry_run: bool = False) -> dict:
+        """
+        Refresh the hot pairs' metadata and run the pipeline for the cold ones within the budget.
+
+        Args:
+            budget: Limits of this run
+            dry_run: Only report what would be done (nothing is extracted or run)
+
+        Returns:
+            Dictionary with the ranked items, what was done with each, the
+            counts per outcome and the budget spent
+        """
+        items = self.hot_items()
+        counts = {'metadata_refreshed': 0, 'already_warm': 0, 'warmed': 0, 'failed': 0,
+                  'over_budget': 0, 'skipped': 0, 'no_key': 0}
+        outcomes: Dict[Tuple[str, str], str] = {}
+        runs: List[HotItem] = []
+        planned_videos = set()
+        translation_key = FingerprintService.translation_key
+
+        for item in items:
+            pair = (item.video_id, item.target_language)
+            try:
+                metadata, refreshed = self._fresh_metadata(item, dry_run)
+                if metadata is not None:
+                    plan_job(metadata)
+            except TranslationGeneratorException as e:
+                logger.info(f"Not warming {item.video_id}: {str(e)}")
+                outcomes[pair] = 'skipped'
+                continue
+            counts['metadata_refreshed'] += refreshed
+            if not FingerprintService.is_enabled():
+                # Nothing but the metadata outlives a job without the fingerprint index
+                outcomes[pair] = 'metadata'
+                continue
+
+            recording = AudioRecording.objects.filter(video_id=item.video_id).first()
+            if recording is not None and translation_key(item.target_language, self.quality) in recording.translations:
+                outcomes[pair] = 'already_warm'
+            elif not self.openai_api_key:
+                outcomes[pair] = 'no_key'
+            else:
+                cost = self.cost(metadata, recording)
+                if item.video_id in planned_videos:
+                    # Another language of the video is being warmed; its transcript is shared
+                    cost['transcription_minutes'] = 0.0
+                if budget.try_spend(cost):
+                    outcomes[pair] = 'planned'
+                    planned_videos.add(item.video_id)
+                    runs.append(item)
+                else:
+                    outcomes[pair] = 'over_budget'
+
+        if runs and not dry_run:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cache-warm') as executor:
+                for item, error in zip(runs, executor.map(self._run_pipeline, runs)):
+                    outcomes[(item.video_id, item.target_language)] = 'failed' if error else 'warmed'
+                    if error:
+                        logger.warning(f"Warming {item.video_id} ({item.target_language}) failed: {error}")
+
+        for outcome in outcomes.values():
+            if outcome in counts:
+                counts[outcome] += 1
+        return {
+            'items': [(item, outcomes[(item.video_id, item.target_language)]) for item in items],
+            'counts': counts,
+            'spent': dict(budget.spent),
+        }
+
+    @staticmethod
+    def _fresh_metadata(item: HotItem, dry_run: bool) -> Tuple[Optional[VideoMetadata], bool]:
+        """Return the video's metadata, extracting it again if it is missing or past half its TTL."""
+        cache = MetadataCache()
+        cached = cache.get(item.video_id)
+        if cached is not None and not cached.available:
+            raise VideoUnavailableException(f"Video unavailable: {cached.error}")
+        stale = cached is None or cached.fetched_at < timezone.now() - timedelta(seconds=cache.ttl / 2)
+        if not stale or dry_run:
+            return cached, False
+        return YouTubeService.get_metadata(item.link, refresh=True), cache.ttl > 0
+
+    def _run_pipeline(self, item: HotItem) -> Optional[str]:
+        """Run the audio-only pipeline for a pair (in a worker thread); returns the error, if any."""
+        close_old_connections()
+        try:
+            with job_deadline(settings.JOB_DEADLINE_SECONDS):
+                # Not saved: warming must not count as a request in the popularity ranking
+                process_video(
+                    yt_link=item.link,
+                    openai_api_key=self.openai_api_key,
+                    target_language=item.target_language,
+                    quality=self.quality,
+                    include_video=False,
+                    save=False
+                )
+            return None
+        except Exception as e:
+            return str(e) or type(e).__name__
+        finally:
+            close_old_connections()
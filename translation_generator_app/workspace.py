@@ -0,0 +1,165 @@
+"""
+Workspace - Private scratch directory per job and atomic publication of its media.
+"""
+import asyncio
+import fcntl
+import os
+import re
+import shutil
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator, Optional
+
+from django.conf import settings
+
+from .storage import get_storage
+
+
+class JobWorkspace:
+    """
+    Scratch directory of one job under ``MEDIA_ROOT/.jobs``.
+
+    Downloads, transcodes and transcripts are written to the scratch
+    directory (together with yt-dlp's ``.part`` and intermediate files)
+    and moved into ``MEDIA_ROOT`` with ``os.replace`` once complete, so a
+    published artifact is never partial. Published names carry the video
+    ID, so videos whose titles sanitize to the same (or an empty) string
+    never share a file; two jobs for the same video publish the same
+    content and the last rename wins. Removing the scratch directory
+    discards everything a failed job left behind.
+
+    While the workspace exists the job holds an exclusive ``flock`` on
+    its ``LOCK_FILE``; the cron sweep (``cleanup_media.py``) leaves locked
+    workspaces alone however old they are. The kernel drops the lock when
+    the worker process dies, so abandoned workspaces are still swept.
+    """
+
+    SCRATCH_DIR = '.jobs'
+    LOCK_FILE = '.lock'
+
+    def __init__(self, video_id: str = '', root: Optional[Path] = None):
+        """
+        Create the scratch directory.
+
+        Args:
+            video_id: Video processed by the job; names its artifacts
+                (a random job ID is used when empty)
+            root: Directory artifacts are published to (default: MEDIA_ROOT)
+        """
+        self.root = Path(root or settings.MEDIA_ROOT)
+        self.job_id = uuid.uuid4().hex[:12]
+        self.video_id = re.sub(r'[^\w-]', '', video_id) or self.job_id
+        self.path = self.root / self.SCRATCH_DIR / self.job_id
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = open(self.path / self.LOCK_FILE, 'wb')
+        fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def artifact_name(self, title: str, suffix: str) -> str:
+        """
+        Build the published file name of an artifact.
+
+        Args:
+            title: Video title
+            suffix: Artifact suffix (e.g. '_video.mp4', '_audio.mp3', '.txt')
+
+        Returns:
+            File name made of the sanitized title, the video ID and the suffix
+        """
+        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '_', '-')).rstrip()
+        return f"{safe_title}_{self.video_id}{suffix}" if safe_title else f"{self.video_id}{suffix}"
+
+    def scratch_path(self, title: str, suffix: str) -> Path:
+        """Path where the job writes an artifact before publishing it."""
+        return self.path / self.artifact_name(title, suffix)
+
+    def artifact_path(self, title: str, suffix: str) -> Path:
+        """Path of an artifact once published."""
+        return self.root / self.artifact_name(title, suffix)
+
+    def publish(self, title: str, suffix: str) -> str:
+        """
+        Atomically move a finished artifact from the scratch directory into place.
+
+        With a remote media storage (``MEDIA_STORAGE``) the file is stored
+        there first, so other nodes can serve it once the job returns.
+
+        Args:
+            title: Video title
+            suffix: Artifact suffix
+
+        Returns:
+            Path of the published artifact
+
+        Raises:
+            StorageException: If the media storage cannot store the file
+        """
+        scratch = self.scratch_path(title, suffix)
+        storage = get_storage()
+        if storage.remote:
+            storage.save(scratch.name, str(scratch))
+        target = self.artifact_path(title, suffix)
+        os.replace(scratch, target)
+        return str(target)
+
+    async def apublish(self, title: str, suffix: str) -> str:
+        """``publish`` for coroutines: an upload to a remote storage runs in a worker thread."""
+        if get_storage().remote:
+            return await asyncio.to_thread(self.publish, title, suffix)
+        return self.publish(title, suffix)
+
+    def cleanup(self):
+        """Remove the scratch directory and anything left in it, then release its lock."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._lock.close()
+
+
+_current_workspace: ContextVar[Optional[JobWorkspace]] = ContextVar('current_workspace', default=None)
+
+
+def current_workspace() -> Optional[JobWorkspace]:
+    """Return the workspace of the job running in the current context, if any."""
+    return _current_workspace.get()
+
+
+@contextmanager
+def job_workspace(video_id: str = '') -> Iterator[JobWorkspace]:
+    """
+    Run the block with a private workspace that services write to.
+
+    The scratch directory is removed when the block exits, whether the
+    job succeeded or not; published artifacts stay in MEDIA_ROOT.
+
+    Args:
+        video_id: Video processed by the job
+
+    Yields:
+        The active JobWorkspace
+    """
+    workspace = JobWorkspace(video_id)
+    token = _current_workspace.set(workspace)
+    try:
+        yield workspace
+    finally:
+        _current_workspace.reset(token)
+        workspace.cleanup()
+
+
+@contextmanager
+def artifact_workspace(video_id: str = '') -> Iterator[JobWorkspace]:
+    """
+    Use the current job's workspace, or a private one for a call made outside a job.
+
+    Args:
+        video_id: Video the artifacts belong to
+
+    Yields:
+        A JobWorkspace
+    """
+    workspace = current_workspace()
+    if workspace is not None:
+        yield workspace
+    else:
+        with job_workspace(video_id) as workspace:
+            yield workspace